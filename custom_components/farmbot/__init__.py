@@ -21,15 +21,20 @@ from . import image_utils, vision
 from .api import FarmbotApiError, FarmbotAuthError
 from .config_flow import FarmbotConfigFlow
 from .const import (
+    CAPTURE_ENGINES,
     DEFAULT_IMAGE_LOOKBACK_HOURS,
     DEFAULT_IMAGE_MAX_HEIGHT,
     DEFAULT_IMAGE_MAX_WIDTH,
     DOMAIN,
     EVENT_VISION_REQUEST,
+    GCODE_DEFAULT_CHORD_TOLERANCE_MM,
     GCODE_DEFAULT_FEED_MM_PER_MIN,
+    GCODE_MAX_CHORD_TOLERANCE_MM,
     GCODE_MAX_FEED_MM_PER_MIN,
     GCODE_MAX_LINES,
+    GCODE_MAX_SIMPLIFY_TOLERANCE_MM,
     GCODE_MIN_FEED_MM_PER_MIN,
+    GRID_REPAIR_MAX_REUSE_SECONDS,
     GRID_REPAIR_MAX_TARGETS_PER_CALL,
     INTEGRATION_VERSION,
     MAX_IMAGE_DIMENSION,
@@ -38,10 +43,13 @@ from .const import (
     MAX_SOIL_RELOCATION_MM,
     MAX_SOIL_Z_OFFSET_MM,
     MIN_SOIL_BASELINE_MM,
+    MOTION_JOB_DEFAULT_PRIORITY,
+    MOTION_JOB_MAX_PRIORITY,
     SERVICE_APPLY_VISION_PLANT_CENTER,
     SERVICE_APPLY_VISION_RADIUS,
     SERVICE_APPLY_VISION_REMOVAL,
     SERVICE_APPLY_VISION_SOIL_HEIGHT,
+    SERVICE_CANCEL_VISION_JOB,
     SERVICE_CREATE_VISION_WEED,
     SERVICE_DELETE_VISION_IMAGE,
     SERVICE_EXECUTE_SEQUENCE,
@@ -50,8 +58,11 @@ from .const import (
     SERVICE_GET_VISION_GRID_REPAIR,
     SERVICE_GET_VISION_IMAGE,
     SERVICE_GET_VISION_INVENTORY,
+    SERVICE_GET_VISION_JOB_QUEUE,
     SERVICE_GET_VISION_SOIL_CAPTURE,
     SERVICE_GET_VISION_SOIL_POINTS,
+    SERVICE_GET_VISION_SOIL_SURFACE,
+    SERVICE_GET_VISION_SOIL_SURVEY,
     SERVICE_GET_VISION_WEEDING,
     SERVICE_LIST_VISION_BOTS,
     SERVICE_MOVE_TO,
@@ -61,9 +72,15 @@ from .const import (
     SERVICE_START_VISION_GCODE,
     SERVICE_START_VISION_GRID_REPAIR,
     SERVICE_START_VISION_SOIL_CAPTURE,
+    SERVICE_START_VISION_SOIL_SURVEY,
     SERVICE_START_VISION_WEEDING,
     SERVICE_UPDATE_VISION_WEED_RADIUS,
     SERVICE_UPSERT_VISION_SPREAD_CURVE,
+    SOIL_SURFACE_CELL_MM,
+    SOIL_SURFACE_MAX_CELL_MM,
+    SOIL_SURFACE_MAX_QUERY_POINTS,
+    SOIL_SURFACE_MIN_CELL_MM,
+    SOIL_SURVEY_MAX_POINTS,
     TOKEN_REFRESH_INTERVAL,
     VISION_ANALYSIS_MODES,
     VISION_CAPABILITIES,
@@ -72,9 +89,12 @@ from .const import (
     VISION_STATUS_VALUES,
     WEEDING_MAX_ATTEMPTS,
     WEEDING_MAX_WEEDS_PER_RUN,
+    WEEDING_TOOL_HOLD_DEFAULT_SECONDS,
+    WEEDING_TOOL_HOLD_MAX_SECONDS,
 )
 from .gcode import GcodeError
 from .manager import FarmbotManager
+from .toolpath import SHAPE_KINDS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -165,6 +185,31 @@ SERVICE_GET_VISION_IMAGE_SCHEMA = vol.Schema(
 
 SERVICE_GET_VISION_SOIL_POINTS_SCHEMA = vol.Schema({vol.Required("config_entry_id"): cv.string})
 
+_SOIL_SURFACE_QUERY_SCHEMA = vol.Schema(
+    {
+        vol.Required("x"): vol.All(vol.Coerce(float), vol.Range(min=-1e6, max=1e6)),
+        vol.Required("y"): vol.All(vol.Coerce(float), vol.Range(min=-1e6, max=1e6)),
+    }
+)
+
+SERVICE_GET_VISION_SOIL_SURFACE_SCHEMA = vol.Schema(
+    {
+        vol.Required("config_entry_id"): cv.string,
+        vol.Optional("cell_mm", default=SOIL_SURFACE_CELL_MM): vol.All(
+            vol.Coerce(float),
+            vol.Range(min=SOIL_SURFACE_MIN_CELL_MM, max=SOIL_SURFACE_MAX_CELL_MM),
+        ),
+        # Without it a cached surface is served as is, with no API call.
+        vol.Optional("refresh", default=False): cv.boolean,
+        vol.Optional("query", default=list): vol.All(
+            [_SOIL_SURFACE_QUERY_SCHEMA], vol.Length(max=SOIL_SURFACE_MAX_QUERY_POINTS)
+        ),
+    }
+)
+
+# Higher runs first; equal priorities run in the order they were queued.
+_MOTION_JOB_PRIORITY = vol.All(vol.Coerce(int), vol.Range(min=0, max=MOTION_JOB_MAX_PRIORITY))
+
 SERVICE_START_VISION_SOIL_CAPTURE_SCHEMA = vol.Schema(
     {
         vol.Required("config_entry_id"): cv.string,
@@ -181,6 +226,9 @@ SERVICE_START_VISION_SOIL_CAPTURE_SCHEMA = vol.Schema(
             vol.Length(min=1, max=3),
         ),
         vol.Optional("batch_id"): _cv_uuid,
+        vol.Optional("priority", default=MOTION_JOB_DEFAULT_PRIORITY): _MOTION_JOB_PRIORITY,
+        # "lua" runs the frames on the bot instead of one RPC round trip each.
+        vol.Optional("engine", default="rpc"): vol.In(CAPTURE_ENGINES),
     }
 )
 
@@ -198,6 +246,41 @@ SERVICE_FINISH_VISION_SOIL_CAPTURE_BATCH_SCHEMA = vol.Schema(
     }
 )
 
+# A survey point is a soil-height point by ID or a bare X/Y coordinate.
+_SOIL_SURVEY_POINT_SCHEMA = vol.Schema(
+    {
+        vol.Optional("point_id"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional("x"): vol.Coerce(float),
+        vol.Optional("y"): vol.Coerce(float),
+    }
+)
+
+SERVICE_START_VISION_SOIL_SURVEY_SCHEMA = vol.Schema(
+    {
+        vol.Required("config_entry_id"): cv.string,
+        vol.Required("points"): vol.All(
+            [_SOIL_SURVEY_POINT_SCHEMA], vol.Length(min=1, max=SOIL_SURVEY_MAX_POINTS)
+        ),
+        vol.Optional("capture_z", default=0): vol.Coerce(float),
+        vol.Optional("baseline_mm", default=15): vol.All(
+            vol.Coerce(float),
+            vol.Range(min=MIN_SOIL_BASELINE_MM, max=MAX_SOIL_BASELINE_MM),
+        ),
+        vol.Optional("z_offsets_mm", default=lambda: [0.0]): vol.All(
+            [vol.All(vol.Coerce(float), vol.Range(min=0, max=MAX_SOIL_Z_OFFSET_MM))],
+            vol.Length(min=1, max=3),
+        ),
+        vol.Optional("priority", default=MOTION_JOB_DEFAULT_PRIORITY): _MOTION_JOB_PRIORITY,
+    }
+)
+
+SERVICE_GET_VISION_SOIL_SURVEY_SCHEMA = vol.Schema(
+    {
+        vol.Required("config_entry_id"): cv.string,
+        vol.Required("survey_id"): _cv_uuid,
+    }
+)
+
 _GRID_REPAIR_TARGET_SCHEMA = vol.Schema(
     {
         vol.Required("x"): vol.Coerce(float),
@@ -222,6 +305,16 @@ SERVICE_START_VISION_GRID_REPAIR_SCHEMA = vol.Schema(
             [_GRID_REPAIR_TARGET_SCHEMA],
             vol.Length(min=1, max=GRID_REPAIR_MAX_TARGETS_PER_CALL),
         ),
+        vol.Optional("priority", default=MOTION_JOB_DEFAULT_PRIORITY): _MOTION_JOB_PRIORITY,
+        # Visit the cells in the quickest order instead of the order given.
+        vol.Optional("optimize_route", default=False): cv.boolean,
+        # Move on once each photo is taken; verify uploads in the background.
+        vol.Optional("pipeline", default=False): cv.boolean,
+        vol.Optional("engine", default="rpc"): vol.In(CAPTURE_ENGINES),
+        # Seconds: cells with a processed image this recent are not revisited.
+        vol.Optional("reuse_recent_images_within"): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=GRID_REPAIR_MAX_REUSE_SECONDS)
+        ),
     }
 )
 
@@ -239,24 +332,62 @@ SERVICE_DELETE_VISION_IMAGE_SCHEMA = vol.Schema(
     }
 )
 
-SERVICE_START_VISION_GCODE_SCHEMA = vol.Schema(
+# Which fields a shape needs depends on its kind; toolpath checks that.
+_GCODE_SHAPE_SCHEMA = vol.Schema(
     {
-        vol.Required("config_entry_id"): cv.string,
-        vol.Required("lines"): vol.All([cv.string], vol.Length(min=1, max=GCODE_MAX_LINES)),
-        vol.Optional("feed_mm_per_min", default=GCODE_DEFAULT_FEED_MM_PER_MIN): vol.All(
-            vol.Coerce(float),
-            vol.Range(min=GCODE_MIN_FEED_MM_PER_MIN, max=GCODE_MAX_FEED_MM_PER_MIN),
+        vol.Required("kind"): vol.In(SHAPE_KINDS),
+        vol.Optional("center_x"): vol.Coerce(float),
+        vol.Optional("center_y"): vol.Coerce(float),
+        vol.Optional("radius"): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+        vol.Optional("inner_radius"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional("pitch_mm"): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+        vol.Optional("x_min"): vol.Coerce(float),
+        vol.Optional("y_min"): vol.Coerce(float),
+        vol.Optional("x_max"): vol.Coerce(float),
+        vol.Optional("y_max"): vol.Coerce(float),
+        vol.Optional("spacing_mm"): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+        vol.Optional("along", default="x"): vol.In(["x", "y"]),
+        vol.Optional("z"): vol.Coerce(float),
+        vol.Optional("chord_tolerance_mm", default=GCODE_DEFAULT_CHORD_TOLERANCE_MM): vol.All(
+            vol.Coerce(float), vol.Range(min=0.01, max=GCODE_MAX_CHORD_TOLERANCE_MM)
         ),
-        vol.Optional("return_to_start", default=True): cv.boolean,
-        # `dry_run` validates and returns the resolved program without moving.
-        vol.Optional("dry_run", default=False): cv.boolean,
-        # Raw G-code bypasses FarmBot OS's motion planning, so this must be set
-        # deliberately. It exists to make the path awkward to reach by accident
-        # from an automation that merely knows the service name.
-        vol.Required("acknowledge_experimental"): vol.All(cv.boolean, vol.In([True])),
     }
 )
 
+SERVICE_START_VISION_GCODE_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required("config_entry_id"): cv.string,
+            vol.Exclusive("lines", "program"): vol.All(
+                [cv.string], vol.Length(min=1, max=GCODE_MAX_LINES)
+            ),
+            # A circle, spiral or raster fill, generated here instead of sent
+            # as lines.
+            vol.Exclusive("shape", "program"): _GCODE_SHAPE_SCHEMA,
+            # The `plan_id` of a dry run: run that validated program as it is.
+            vol.Exclusive("plan_id", "program"): vol.All(cv.string, vol.Match(r"^[0-9a-f]{32}$")),
+            vol.Optional("feed_mm_per_min", default=GCODE_DEFAULT_FEED_MM_PER_MIN): vol.All(
+                vol.Coerce(float),
+                vol.Range(min=GCODE_MIN_FEED_MM_PER_MIN, max=GCODE_MAX_FEED_MM_PER_MIN),
+            ),
+            vol.Optional("return_to_start", default=True): cv.boolean,
+            vol.Optional("pipeline", default=False): cv.boolean,
+            # Merge nearly collinear segments within this chord tolerance (mm).
+            vol.Optional("simplify_tolerance_mm"): vol.All(
+                vol.Coerce(float), vol.Range(min=0.01, max=GCODE_MAX_SIMPLIFY_TOLERANCE_MM)
+            ),
+            # `dry_run` validates and returns the resolved program without moving.
+            vol.Optional("dry_run", default=False): cv.boolean,
+            # Raw G-code bypasses FarmBot OS's motion planning, so this must be set
+            # deliberately. It exists to make the path awkward to reach by accident
+            # from an automation that merely knows the service name.
+            vol.Required("acknowledge_experimental"): vol.All(cv.boolean, vol.In([True])),
+            vol.Optional("priority", default=MOTION_JOB_DEFAULT_PRIORITY): _MOTION_JOB_PRIORITY,
+        }
+    ),
+    cv.has_at_least_one_key("lines", "shape", "plan_id"),
+)
+
 SERVICE_GET_VISION_GCODE_SCHEMA = vol.Schema(
     {
         vol.Required("config_entry_id"): cv.string,
@@ -322,17 +453,28 @@ SERVICE_START_VISION_WEEDING_SCHEMA = vol.Schema(
             vol.Coerce(int), vol.Range(min=1, max=4)
         ),
         vol.Optional("tool_slot_from_bot", default=False): cv.boolean,
+        vol.Optional("tool_hold_seconds", default=WEEDING_TOOL_HOLD_DEFAULT_SECONDS): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=WEEDING_TOOL_HOLD_MAX_SECONDS)
+        ),
         vol.Optional("avoid_tall_plants", default=True): cv.boolean,
         vol.Optional("tall_plant_height_mm", default=300): vol.All(
             vol.Coerce(float), vol.Range(min=0, max=5000)
         ),
+        vol.Optional("optimize_order", default=True): cv.boolean,
         vol.Required("acknowledge_rotary_tool"): vol.All(cv.boolean, vol.In([True])),
+        vol.Optional("priority", default=MOTION_JOB_DEFAULT_PRIORITY): _MOTION_JOB_PRIORITY,
     }
 )
 SERVICE_GET_VISION_WEEDING_SCHEMA = vol.Schema(
     {vol.Required("config_entry_id"): cv.string, vol.Required("run_id"): _cv_uuid}
 )
 
+SERVICE_GET_VISION_JOB_QUEUE_SCHEMA = vol.Schema({vol.Required("config_entry_id"): cv.string})
+
+SERVICE_CANCEL_VISION_JOB_SCHEMA = vol.Schema(
+    {vol.Required("config_entry_id"): cv.string, vol.Required("job_id"): _cv_uuid}
+)
+
 SERVICE_APPLY_VISION_SOIL_HEIGHT_SCHEMA = vol.Schema(
     {
         vol.Required("config_entry_id"): cv.string,
@@ -487,6 +629,45 @@ def _get_manager(hass: HomeAssistant, config_entry_id: str) -> FarmbotManager:
     return manager
 
 
+def _queue_placement(record: dict | None) -> dict:
+    """Where a freshly queued motion job sits in its bot's queue."""
+    record = record or {}
+    return {
+        key: record.get(key)
+        for key in ("job_id", "queue_position", "estimated_start_at")
+        if key in record
+    }
+
+
+def _soil_points(manager: FarmbotManager, points: list[dict]) -> list[dict]:
+    """This bot's active soil-height points with finite coordinates, by X then Y."""
+    eligible = []
+    for point in points:
+        if not manager.is_soil_height_point(point):
+            continue
+        if point.get("device_id") is not None and not vision.same_device(
+            point.get("device_id"), manager.device_id
+        ):
+            continue
+        try:
+            coordinates = [float(point[axis]) for axis in ("x", "y", "z")]
+            if not all(math.isfinite(value) for value in coordinates):
+                continue
+            eligible.append(
+                {
+                    "id": int(point["id"]),
+                    "name": str(point.get("name") or "Soil Height"),
+                    "x": coordinates[0],
+                    "y": coordinates[1],
+                    "z": coordinates[2],
+                    "updated_at": point.get("updated_at"),
+                }
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+    return sorted(eligible, key=lambda item: (item["x"], item["y"], item["id"]))
+
+
 async def _safe_api_call(manager: FarmbotManager, coro, *, context: str):
     """Await a FarmbotApiClient call, converting failures to HA exceptions.
 
@@ -771,7 +952,6 @@ def _async_register_services(hass: HomeAssistant) -> None:
             for tool in tools
             if isinstance(tool, dict) and tool.get("id") is not None
         }
-        eligible = []
         tool_slots = []
         for point in points:
             if (
@@ -801,36 +981,46 @@ def _async_register_services(hass: HomeAssistant) -> None:
                         )
                 except (KeyError, TypeError, ValueError):
                     pass
-            if not manager.is_soil_height_point(point):
-                continue
-            if point.get("device_id") is not None and not vision.same_device(
-                point.get("device_id"), manager.device_id
-            ):
-                continue
-            try:
-                coordinates = [float(point[axis]) for axis in ("x", "y", "z")]
-                if not all(math.isfinite(value) for value in coordinates):
-                    continue
-                eligible.append(
-                    {
-                        "id": int(point["id"]),
-                        "name": str(point.get("name") or "Soil Height"),
-                        "x": coordinates[0],
-                        "y": coordinates[1],
-                        "z": coordinates[2],
-                        "updated_at": point.get("updated_at"),
-                    }
-                )
-            except (KeyError, TypeError, ValueError):
-                continue
+        eligible = _soil_points(manager, points)
+        manager.note_soil_points(eligible)
         return {
             "device_id": manager.device_id,
             "generated_at": dt_util.utcnow().isoformat(),
-            "points": sorted(eligible, key=lambda item: (item["x"], item["y"], item["id"])),
+            "points": eligible,
             "tool_slots": sorted(tool_slots, key=lambda item: item["tool_name"].casefold()),
             "motion": manager.soil_motion_state(firmware),
         }
 
+    async def get_vision_soil_surface(call: ServiceCall) -> dict:
+        """Return the interpolated soil surface, and soil Z at any queried X/Y."""
+        manager = _get_manager(hass, call.data["config_entry_id"])
+        cell_mm = call.data["cell_mm"]
+        surface = None if call.data["refresh"] else manager.cached_soil_surface(cell_mm)
+        if surface is None:
+            points = await _safe_api_call(
+                manager, manager.api.async_get_points(), context="fetch soil-height points"
+            )
+            firmware = await _safe_api_call(
+                manager,
+                manager.api.async_get_firmware_config(),
+                context="fetch motion configuration",
+            )
+            surface = manager.refresh_soil_surface(
+                _soil_points(manager, points), firmware, cell_mm=cell_mm
+            )
+        query = call.data["query"]
+        return {
+            "device_id": manager.device_id,
+            "generated_at": dt_util.utcnow().isoformat(),
+            "revision": surface.revision,
+            "point_count": len(surface),
+            "radius_mm": surface.radius_mm,
+            **surface.grid(),
+            "heights": surface.heights(
+                [item["x"] for item in query], [item["y"] for item in query]
+            ),
+        }
+
     def _soil_updated_at(point: dict) -> datetime | None:
         value = dt_util.parse_datetime(str(point.get("updated_at") or ""))
         if value is None:
@@ -915,6 +1105,8 @@ def _async_register_services(hass: HomeAssistant) -> None:
                 baseline_mm=float(call.data["baseline_mm"]),
                 z_offsets_mm=z_offsets,
                 batch_id=call.data.get("batch_id"),
+                priority=call.data["priority"],
+                engine=call.data["engine"],
             )
         except ValueError as err:
             return {"status": "rejected", "message": str(err)[:240]}
@@ -922,6 +1114,7 @@ def _async_register_services(hass: HomeAssistant) -> None:
             "status": "queued",
             "capture_id": capture_id,
             "message": "Soil capture queued",
+            **_queue_placement(manager.soil_capture(capture_id)),
         }
 
     async def get_vision_soil_capture(call: ServiceCall) -> dict:
@@ -938,6 +1131,85 @@ def _async_register_services(hass: HomeAssistant) -> None:
         except ValueError as err:
             return {"status": "rejected", "message": str(err)[:240]}
 
+    async def start_vision_soil_survey(call: ServiceCall) -> dict:
+        manager = _get_manager(hass, call.data["config_entry_id"])
+        points = []
+        for number, item in enumerate(call.data["points"], start=1):
+            point_id = item.get("point_id")
+            if point_id is not None:
+                point = await _safe_api_call(
+                    manager,
+                    manager.api.async_get_point(point_id),
+                    context="fetch soil point for survey",
+                )
+                if not manager.is_soil_height_point(point):
+                    return {
+                        "status": "rejected",
+                        "message": f"Survey point {number}: eligible soil-height point not found",
+                    }
+                if point.get("device_id") is not None and not vision.same_device(
+                    point.get("device_id"), manager.device_id
+                ):
+                    return {
+                        "status": "rejected",
+                        "message": f"Survey point {number} belongs to another FarmBot",
+                    }
+            elif "x" in item and "y" in item:
+                point = {"id": None, "x": item["x"], "y": item["y"]}
+            else:
+                return {
+                    "status": "rejected",
+                    "message": f"Survey point {number} needs a point_id or both X and Y",
+                }
+            try:
+                coordinates = (float(point["x"]), float(point["y"]))
+            except (KeyError, TypeError, ValueError):
+                coordinates = (math.nan, math.nan)
+            if not all(math.isfinite(value) for value in coordinates):
+                return {
+                    "status": "rejected",
+                    "message": f"Survey point {number} coordinates must be finite",
+                }
+            points.append({**point, "x": coordinates[0], "y": coordinates[1]})
+        values = [call.data["capture_z"], call.data["baseline_mm"], *call.data["z_offsets_mm"]]
+        if not all(math.isfinite(float(value)) for value in values):
+            return {"status": "rejected", "message": "Capture values must be finite"}
+        z_offsets = [float(value) for value in call.data["z_offsets_mm"]]
+        if z_offsets != sorted(set(z_offsets)):
+            return {
+                "status": "rejected",
+                "message": "Z offsets must be unique and in ascending order",
+            }
+        firmware = await _safe_api_call(
+            manager,
+            manager.api.async_get_firmware_config(),
+            context="fetch motion configuration",
+        )
+        try:
+            survey_id = manager.start_soil_survey(
+                points=points,
+                firmware_config=firmware,
+                capture_z=float(call.data["capture_z"]),
+                baseline_mm=float(call.data["baseline_mm"]),
+                z_offsets_mm=z_offsets,
+                priority=call.data["priority"],
+            )
+        except ValueError as err:
+            return {"status": "rejected", "message": str(err)[:240]}
+        return {
+            "status": "queued",
+            "survey_id": survey_id,
+            "message": "Soil survey queued",
+            **_queue_placement(manager.soil_survey(survey_id)),
+        }
+
+    async def get_vision_soil_survey(call: ServiceCall) -> dict:
+        manager = _get_manager(hass, call.data["config_entry_id"])
+        survey = manager.soil_survey(call.data["survey_id"])
+        if survey is None:
+            return {"status": "failed", "message": "Soil survey was not found", "points": []}
+        return survey
+
     async def start_vision_grid_repair(call: ServiceCall) -> dict:
         """Queue bounded move-and-photo commands for missing grid cells."""
         manager = _get_manager(hass, call.data["config_entry_id"])
@@ -950,6 +1222,11 @@ def _async_register_services(hass: HomeAssistant) -> None:
             repair_id = manager.start_grid_repair(
                 targets=[dict(item) for item in call.data["targets"]],
                 firmware_config=firmware,
+                priority=call.data["priority"],
+                optimize_route=call.data["optimize_route"],
+                pipeline=call.data["pipeline"],
+                engine=call.data["engine"],
+                reuse_recent_images_within=call.data.get("reuse_recent_images_within"),
             )
         except ValueError as err:
             return {"status": "rejected", "message": str(err)[:240]}
@@ -957,6 +1234,7 @@ def _async_register_services(hass: HomeAssistant) -> None:
             "status": "queued",
             "repair_id": repair_id,
             "message": "Photo-grid repair queued",
+            **_queue_placement(manager.grid_repair(repair_id)),
         }
 
     async def get_vision_grid_repair(call: ServiceCall) -> dict:
@@ -973,7 +1251,9 @@ def _async_register_services(hass: HomeAssistant) -> None:
         path, so the whole program is resolved and bounds-checked here first
         and rejected as a unit. ``dry_run`` performs exactly that validation
         and returns the resolved program without moving anything, which is
-        what the Vision app's preview uses.
+        what the Vision app's preview uses. The preview's ``plan_id`` runs
+        that validated program without resolving it again, for as long as the
+        bot has not moved and its movement settings are unchanged.
         """
         manager = _get_manager(hass, call.data["config_entry_id"])
         firmware = await _safe_api_call(
@@ -981,17 +1261,30 @@ def _async_register_services(hass: HomeAssistant) -> None:
             manager.api.async_get_firmware_config(),
             context="fetch motion configuration for raw G-code",
         )
-        lines = list(call.data["lines"])
+        lines = list(call.data["lines"]) if "lines" in call.data else None
+        shape = dict(call.data["shape"]) if "shape" in call.data else None
+        plan_id = call.data.get("plan_id")
         feed = float(call.data["feed_mm_per_min"])
+        simplify = call.data.get("simplify_tolerance_mm")
         try:
             if call.data["dry_run"]:
-                program, _ = manager.plan_gcode(
-                    lines=lines, firmware_config=firmware, feed_mm_per_min=feed
-                )
+                if plan_id is not None:
+                    plan, _ = manager.gcode_plan(plan_id, firmware)
+                else:
+                    plan, _ = manager.plan_gcode(
+                        lines=lines,
+                        shape=shape,
+                        firmware_config=firmware,
+                        feed_mm_per_min=feed,
+                        simplify_tolerance_mm=simplify,
+                    )
+                program = plan.program
                 extent = program.extent()
-                return {
+                preview = {
                     "status": "validated",
+                    "plan_id": plan.plan_id,
                     "moves": len(program.moves),
+                    "chunks": len(plan.chunks),
                     "total_distance_mm": round(program.total_distance_mm, 1),
                     "feed_mm_per_min": program.feed_mm_per_min,
                     "extent": {
@@ -1001,11 +1294,19 @@ def _async_register_services(hass: HomeAssistant) -> None:
                     "warnings": list(program.warnings),
                     "message": f"Program is valid: {len(program.moves)} move(s)",
                 }
+                if program.simplification is not None:
+                    preview["simplification"] = dict(program.simplification)
+                return preview
             run_id = manager.start_gcode_run(
                 lines=lines,
+                shape=shape,
+                plan_id=plan_id,
                 firmware_config=firmware,
                 feed_mm_per_min=feed,
                 return_to_start=call.data["return_to_start"],
+                pipeline=call.data["pipeline"],
+                simplify_tolerance_mm=simplify,
+                priority=call.data["priority"],
             )
         except GcodeError as err:
             return {"status": "rejected", "message": str(err)[:240]}
@@ -1013,6 +1314,7 @@ def _async_register_services(hass: HomeAssistant) -> None:
             "status": "queued",
             "run_id": run_id,
             "message": "Raw G-code run queued",
+            **_queue_placement(manager.gcode_run(run_id)),
         }
 
     async def get_vision_gcode(call: ServiceCall) -> dict:
@@ -1050,8 +1352,10 @@ def _async_register_services(hass: HomeAssistant) -> None:
                 "tool_slot_z",
                 "tool_pullout_direction",
                 "tool_slot_from_bot",
+                "tool_hold_seconds",
                 "avoid_tall_plants",
                 "tall_plant_height_mm",
+                "optimize_order",
             )
         }
         settings_data["tool_id"] = call.data.get("tool_id")
@@ -1060,10 +1364,18 @@ def _async_register_services(hass: HomeAssistant) -> None:
                 weeds=list(call.data["weeds"]),
                 settings=settings_data,
                 firmware_config=firmware,
+                priority=call.data["priority"],
             )
         except ValueError as err:
             return {"status": "rejected", "message": str(err)[:240]}
-        return {"status": "queued", "run_id": run_id, "message": "Adaptive weeding queued"}
+        run = manager.weeding_run(run_id)
+        return {
+            "status": "queued",
+            "run_id": run_id,
+            "message": "Adaptive weeding queued",
+            "planned_transit_mm": run["route"]["planned_transit_mm"],
+            **_queue_placement(run),
+        }
 
     async def get_vision_weeding(call: ServiceCall) -> dict:
         manager = _get_manager(hass, call.data["config_entry_id"])
@@ -1072,6 +1384,23 @@ def _async_register_services(hass: HomeAssistant) -> None:
             return {"status": "failed", "message": "Adaptive weeding run was not found"}
         return run
 
+    async def get_vision_job_queue(call: ServiceCall) -> dict:
+        """Report the gantry job that is running and the ones waiting behind it."""
+        manager = _get_manager(hass, call.data["config_entry_id"])
+        return manager.motion_job_queue()
+
+    async def cancel_vision_job(call: ServiceCall) -> dict:
+        """Cancel a queued or running soil, grid, G-code or weeding job."""
+        manager = _get_manager(hass, call.data["config_entry_id"])
+        job_id = call.data["job_id"]
+        if not manager.cancel_motion_job(job_id):
+            return {
+                "status": "rejected",
+                "job_id": job_id,
+                "message": "Job is not queued or running",
+            }
+        return {"status": "cancelled", "job_id": job_id, "message": "Job cancelled"}
+
     async def delete_vision_image(call: ServiceCall) -> dict:
         """Delete one image this FarmBot owns.
 
@@ -1089,6 +1418,7 @@ def _async_register_services(hass: HomeAssistant) -> None:
             context="fetch image metadata for deletion",
         )
         if image is None:
+            manager.forget_vision_image(image_id)
             return {
                 "status": "deleted",
                 "image_id": image_id,
@@ -1105,6 +1435,7 @@ def _async_register_services(hass: HomeAssistant) -> None:
             manager.api.async_delete_image(image_id),
             context="delete image",
         )
+        manager.forget_vision_image(image_id)
         return {"status": "deleted", "image_id": image_id, "message": "Image deleted"}
 
     async def apply_vision_soil_height(call: ServiceCall) -> dict:
@@ -1166,6 +1497,7 @@ def _async_register_services(hass: HomeAssistant) -> None:
             requested = {"x": recommended_x, "y": recommended_y, "z": recommended}
             if any(abs(persisted[axis] - requested[axis]) > 0.5 for axis in requested):
                 return {"status": "conflict", "message": "FarmBot did not persist the soil point"}
+            manager.note_soil_point(created_id, **persisted)
             return {
                 "status": "applied",
                 "point_id": created_id,
@@ -1283,6 +1615,7 @@ def _async_register_services(hass: HomeAssistant) -> None:
             for axis in ("x", "y", "z")
         ):
             return {"status": "conflict", "message": "FarmBot did not persist the soil point"}
+        manager.note_soil_point(point_id, **persisted)
         return {
             "status": "applied",
             "point_id": point_id,
@@ -1750,6 +2083,13 @@ def _async_register_services(hass: HomeAssistant) -> None:
         schema=SERVICE_GET_VISION_SOIL_POINTS_SCHEMA,
         supports_response=SupportsResponse.ONLY,
     )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_VISION_SOIL_SURFACE,
+        _vision_response_service(get_vision_soil_surface),
+        schema=SERVICE_GET_VISION_SOIL_SURFACE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
     hass.services.async_register(
         DOMAIN,
         SERVICE_START_VISION_SOIL_CAPTURE,
@@ -1771,6 +2111,20 @@ def _async_register_services(hass: HomeAssistant) -> None:
         schema=SERVICE_FINISH_VISION_SOIL_CAPTURE_BATCH_SCHEMA,
         supports_response=SupportsResponse.ONLY,
     )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_VISION_SOIL_SURVEY,
+        _vision_response_service(start_vision_soil_survey),
+        schema=SERVICE_START_VISION_SOIL_SURVEY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_VISION_SOIL_SURVEY,
+        _vision_response_service(get_vision_soil_survey),
+        schema=SERVICE_GET_VISION_SOIL_SURVEY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
     hass.services.async_register(
         DOMAIN,
         SERVICE_START_VISION_GRID_REPAIR,
@@ -1820,6 +2174,20 @@ def _async_register_services(hass: HomeAssistant) -> None:
         schema=SERVICE_GET_VISION_WEEDING_SCHEMA,
         supports_response=SupportsResponse.ONLY,
     )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_VISION_JOB_QUEUE,
+        _vision_response_service(get_vision_job_queue),
+        schema=SERVICE_GET_VISION_JOB_QUEUE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CANCEL_VISION_JOB,
+        _vision_response_service(cancel_vision_job),
+        schema=SERVICE_CANCEL_VISION_JOB_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
     hass.services.async_register(
         DOMAIN,
         SERVICE_APPLY_VISION_SOIL_HEIGHT,
@@ -1901,9 +2269,12 @@ def _async_remove_services_if_last_entry(hass: HomeAssistant) -> None:
         SERVICE_GET_VISION_INVENTORY,
         SERVICE_GET_VISION_IMAGE,
         SERVICE_GET_VISION_SOIL_POINTS,
+        SERVICE_GET_VISION_SOIL_SURFACE,
         SERVICE_START_VISION_SOIL_CAPTURE,
         SERVICE_GET_VISION_SOIL_CAPTURE,
         SERVICE_FINISH_VISION_SOIL_CAPTURE_BATCH,
+        SERVICE_START_VISION_SOIL_SURVEY,
+        SERVICE_GET_VISION_SOIL_SURVEY,
         SERVICE_START_VISION_GRID_REPAIR,
         SERVICE_GET_VISION_GRID_REPAIR,
         SERVICE_DELETE_VISION_IMAGE,
@@ -1921,6 +2292,8 @@ def _async_remove_services_if_last_entry(hass: HomeAssistant) -> None:
         SERVICE_GET_VISION_GCODE,
         SERVICE_START_VISION_WEEDING,
         SERVICE_GET_VISION_WEEDING,
+        SERVICE_GET_VISION_JOB_QUEUE,
+        SERVICE_CANCEL_VISION_JOB,
     ):
         hass.services.async_remove(DOMAIN, service)
 
@@ -1933,6 +2306,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     manager = FarmbotManager(hass, token, device_id, mqtt_host, entry=entry)
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = manager
+    await manager.async_load_run_records()
 
     # Check and refresh token immediately on startup
     _LOGGER.info("Checking token expiry on startup")
@@ -2033,6 +2407,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     manager = hass.data[DOMAIN].pop(entry.entry_id, None)
     if manager:
+        await manager.async_release_capture_hardware()
         await manager.disconnect_mqtt()
         await manager.async_close()
 
@@ -291,6 +291,11 @@ class FarmbotApiClient:
         data = await self._request_json("GET", "/tools")
         return data if isinstance(data, list) else []
 
+    async def async_get_device(self) -> dict:
+        """Return the device resource, including ``mounted_tool_id``."""
+        data = await self._request_json("GET", "/device")
+        return data if isinstance(data, dict) else {}
+
     async def async_get_active_plants(self) -> list[dict]:
         """Return Plant points that are planted/sprouted/active (not archived)."""
         points = await self.async_get_points(pointer_type=POINTER_TYPE_PLANT)
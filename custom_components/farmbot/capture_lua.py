@@ -0,0 +1,151 @@
+"""On-bot Lua execution of photo capture routes.
+
+The ordinary capture engine drives every photo-grid cell and soil frame from
+Home Assistant: a ``move`` RPC, a ``read_status`` poll until the reported
+position matches, then a ``wait`` + ``take_photo`` RPC. That is several MQTT
+round trips per cell, and on a slow link the gantry spends more time waiting
+for the network than moving.
+
+This module compiles a capture route into Lua for FarmBot OS to run locally,
+wrapped in the same ``lua`` CeleryScript node as raw G-code
+(:func:`gcode.lua_node`). For each stop the script moves, settles, checks
+``get_xyz()`` against a tolerance and only then calls ``take_photo()``. It
+reports every stop through ``send_message`` as one log line of a fixed form,
+which the manager parses off the logs topic with :func:`parse_report`.
+
+The route is split into chunks of ``CAPTURE_LUA_STOPS_PER_CHUNK`` stops. Each
+chunk is one acknowledged RPC, so a stalled bot is noticed within one chunk's
+timeout and an emergency stop or disconnect between chunks ends the run.
+
+A report is not proof of an image: ``take_photo`` uploads out of band. The
+caller still verifies every image against the REST API, and anything without
+an ``ok`` report or a verified image is captured again the ordinary way.
+"""
+
+from __future__ import annotations
+
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+from .const import CAPTURE_LUA_STOPS_PER_CHUNK
+
+REPORT_PREFIX = "ha-capture"
+
+# `ha-capture <tag> <stop number> ok|miss [<x> <y> <z>]`
+_REPORT = re.compile(
+    rf"^{REPORT_PREFIX} (?P<tag>[0-9a-f]+) (?P<number>\d+) (?P<outcome>ok|miss)"
+    r"(?: (?P<x>\S+) (?P<y>\S+) (?P<z>\S+))?$"
+)
+
+# Shared by every chunk: one report line per stop, with the position
+# FarmBot OS itself read when it checked the stop.
+_PRELUDE = """local tag='{tag}'; local tolerance={tolerance}; local settle={settle}
+local function report(number, outcome, p)
+  if p then
+    send_message('info', string.format('{prefix} %s %d %s %.1f %.1f %.1f',
+      tag, number, outcome, p.x, p.y, p.z))
+  else
+    send_message('info', string.format('{prefix} %s %d %s', tag, number, outcome))
+  end
+end
+local function capture(number, x, y, z, safe, travel)
+  if travel then
+    local here=get_xyz()
+    if not here or here.z < travel - 0.5 then move({{z=travel,speed=100}}) end
+    if z ~= travel then move({{x=x,y=y,z=travel,speed=100}}) end
+  end
+  move({{x=x,y=y,z=z,speed=100,safe_z=safe}})
+  wait(settle)
+  local p=get_xyz()
+  if p and math.sqrt((p.x-x)^2+(p.y-y)^2+(p.z-z)^2) <= tolerance then
+    take_photo(); report(number, 'ok', p)
+  else
+    report(number, 'miss', p)
+  end
+end"""
+
+
+@dataclass(frozen=True)
+class CaptureChunk:
+    """One Lua node's worth of stops, numbered from 1 along the whole route."""
+
+    numbers: tuple[int, ...]
+    stops: tuple[dict[str, Any], ...]
+    source: str
+
+
+@dataclass(frozen=True)
+class CaptureReport:
+    """What FarmBot OS logged for one stop."""
+
+    tag: str
+    number: int
+    ok: bool
+    position: dict[str, float] | None
+
+
+def new_tag() -> str:
+    """A short ID tying report lines to the run that is waiting for them."""
+    return uuid.uuid4().hex[:8]
+
+
+def _lua_number(value: float) -> str:
+    text = f"{float(value):.3f}".rstrip("0").rstrip(".")
+    return "0" if text in {"", "-0"} else text
+
+
+def route_chunks(
+    tag: str,
+    stops: list[dict[str, Any]],
+    *,
+    tolerance_mm: float,
+    settle_ms: int,
+    stops_per_chunk: int = CAPTURE_LUA_STOPS_PER_CHUNK,
+) -> list[CaptureChunk]:
+    """Compile ``stops`` into bounded Lua chunks.
+
+    Each stop has X, Y, Z and ``safe_z``, and optionally a ``travel_z`` to
+    cross at before descending to it (see ``routing.plan_z_travel``).
+    """
+    prelude = _PRELUDE.format(
+        tag=tag,
+        tolerance=_lua_number(tolerance_mm),
+        settle=int(settle_ms),
+        prefix=REPORT_PREFIX,
+    )
+    chunks = []
+    for first in range(0, len(stops), stops_per_chunk):
+        batch = stops[first : first + stops_per_chunk]
+        numbers = tuple(range(first + 1, first + len(batch) + 1))
+        calls = []
+        for number, stop in zip(numbers, batch):
+            safe = stop.get("safe_z", True)
+            travel = stop.get("travel_z")
+            calls.append(
+                f"capture({number}, {_lua_number(stop['x'])}, {_lua_number(stop['y'])}, "
+                f"{_lua_number(stop['z'])}, {'true' if safe else 'false'}, "
+                f"{'nil' if safe or travel is None else _lua_number(travel)})"
+            )
+        chunks.append(CaptureChunk(numbers, tuple(batch), "\n".join([prelude, *calls])))
+    return chunks
+
+
+def parse_report(message: str) -> CaptureReport | None:
+    """Parse one capture report log line, or ``None`` for any other message."""
+    match = _REPORT.match(message.strip())
+    if match is None:
+        return None
+    position = None
+    if match.group("x") is not None:
+        try:
+            position = {axis: float(match.group(axis)) for axis in ("x", "y", "z")}
+        except ValueError:
+            position = None
+    return CaptureReport(
+        tag=match.group("tag"),
+        number=int(match.group("number")),
+        ok=match.group("outcome") == "ok",
+        position=position,
+    )
@@ -8,9 +8,13 @@ from homeassistant.core import callback
 
 from .const import (
     API_BASE_URL,
+    DEFAULT_COORDINATE_DEADBAND_MM,
+    DEFAULT_COORDINATE_MIN_INTERVAL_SECONDS,
     DEFAULT_VISION_ENABLED,
     DEFAULT_VISION_HEARTBEAT_TIMEOUT_MINUTES,
     DOMAIN,
+    OPTION_COORDINATE_DEADBAND_MM,
+    OPTION_COORDINATE_MIN_INTERVAL_SECONDS,
     OPTION_VISION_ENABLED,
     OPTION_VISION_HEARTBEAT_TIMEOUT_MINUTES,
 )
@@ -199,7 +203,7 @@ class FarmbotConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
 
 class FarmbotOptionsFlow(config_entries.OptionsFlow):
-    """FarmBot Vision bridge options: no FarmBot credentials are re-entered here."""
+    """FarmBot Vision bridge and sensor options: no credentials are re-entered here."""
 
     async def async_step_init(self, user_input=None):
         """Show/save the FarmBot Vision bridge safety and feature options."""
@@ -220,6 +224,19 @@ class FarmbotOptionsFlow(config_entries.OptionsFlow):
                         DEFAULT_VISION_HEARTBEAT_TIMEOUT_MINUTES,
                     ),
                 ): vol.All(vol.Coerce(int), vol.Range(min=1, max=120)),
+                vol.Optional(
+                    OPTION_COORDINATE_DEADBAND_MM,
+                    default=current.get(
+                        OPTION_COORDINATE_DEADBAND_MM, DEFAULT_COORDINATE_DEADBAND_MM
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+                vol.Optional(
+                    OPTION_COORDINATE_MIN_INTERVAL_SECONDS,
+                    default=current.get(
+                        OPTION_COORDINATE_MIN_INTERVAL_SECONDS,
+                        DEFAULT_COORDINATE_MIN_INTERVAL_SECONDS,
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
             }
         )
         return self.async_show_form(step_id="init", data_schema=data_schema)
@@ -58,6 +58,21 @@ VISION_CAPABILITIES = [
     # only pre-validated straight cuts and keeps current recovery inside one
     # FarmBot OS Lua command so an overload can turn the tool off immediately.
     "adaptive_rotary_weeding",
+    # Soil, grid, G-code and weeding starts queue behind whatever is on the
+    # gantry instead of being refused as busy; each accepts a `priority` and
+    # can be listed with get_vision_job_queue or cancelled with
+    # cancel_vision_job.
+    "queued_motion_jobs",
+    # start_vision_grid_repair accepts `optimize_route` and reports the
+    # estimated travel time before and after under `route`.
+    "optimized_photo_grid_route",
+    # start_vision_soil_survey captures many soil points in one job: one
+    # lighting cycle, one return to the starting position and an optimised
+    # point order, with per-point progress from get_vision_soil_survey.
+    "soil_survey",
+    # get_vision_soil_surface returns soil Z interpolated from the soil points
+    # on a regular grid, and at caller-supplied X/Y.
+    "soil_surface",
 ]
 
 # Service names (existing)
@@ -69,9 +84,12 @@ SERVICE_LIST_VISION_BOTS = "list_vision_bots"
 SERVICE_GET_VISION_INVENTORY = "get_vision_inventory"
 SERVICE_GET_VISION_IMAGE = "get_vision_image"
 SERVICE_GET_VISION_SOIL_POINTS = "get_vision_soil_points"
+SERVICE_GET_VISION_SOIL_SURFACE = "get_vision_soil_surface"
 SERVICE_START_VISION_SOIL_CAPTURE = "start_vision_soil_capture"
 SERVICE_GET_VISION_SOIL_CAPTURE = "get_vision_soil_capture"
 SERVICE_FINISH_VISION_SOIL_CAPTURE_BATCH = "finish_vision_soil_capture_batch"
+SERVICE_START_VISION_SOIL_SURVEY = "start_vision_soil_survey"
+SERVICE_GET_VISION_SOIL_SURVEY = "get_vision_soil_survey"
 SERVICE_START_VISION_GRID_REPAIR = "start_vision_grid_repair"
 SERVICE_GET_VISION_GRID_REPAIR = "get_vision_grid_repair"
 SERVICE_DELETE_VISION_IMAGE = "delete_vision_image"
@@ -89,6 +107,8 @@ SERVICE_START_VISION_GCODE = "start_vision_gcode"
 SERVICE_GET_VISION_GCODE = "get_vision_gcode"
 SERVICE_START_VISION_WEEDING = "start_vision_weeding"
 SERVICE_GET_VISION_WEEDING = "get_vision_weeding"
+SERVICE_GET_VISION_JOB_QUEUE = "get_vision_job_queue"
+SERVICE_CANCEL_VISION_JOB = "cancel_vision_job"
 
 # Home Assistant event fired for farmbot.request_vision_analysis
 EVENT_VISION_REQUEST = "farmbot_vision_request"
@@ -107,6 +127,17 @@ OPTION_VISION_HEARTBEAT_TIMEOUT_MINUTES = "vision_heartbeat_timeout_minutes"
 DEFAULT_VISION_ENABLED = False
 DEFAULT_VISION_HEARTBEAT_TIMEOUT_MINUTES = 10
 
+# X/Y/Z coordinate sensors are pushed from the MQTT status stream. While the
+# gantry is moving, a new value is only written once it has drifted past the
+# deadband *and* the minimum interval has elapsed, so a long traverse does not
+# turn every status broadcast into a recorder row. The first status after the
+# bot stops always writes the exact final position.
+OPTION_COORDINATE_DEADBAND_MM = "coordinate_deadband_mm"
+OPTION_COORDINATE_MIN_INTERVAL_SECONDS = "coordinate_min_interval_seconds"
+
+DEFAULT_COORDINATE_DEADBAND_MM = 1.0
+DEFAULT_COORDINATE_MIN_INTERVAL_SECONDS = 2.0
+
 # FarmBot point/plant filtering
 POINTER_TYPE_PLANT = "Plant"
 ACTIVE_PLANT_STAGES = {"planted", "sprouted", "active"}
@@ -152,6 +183,22 @@ SOIL_CAPTURE_COORDINATE_TOLERANCE_MM = 5.0
 SOIL_CAPTURE_POSITION_TOLERANCE_MM = 5.0
 SOIL_CAPTURE_POSITION_TIMEOUT_SECONDS = 60
 SOIL_CAPTURE_LIGHTING_PIN = 7
+# A soil survey captures many points inside one lighting cycle and one
+# restore-to-origin. The cap keeps one survey's run record and queue estimate
+# bounded; the route ordering is nearest-neighbour plus 2-opt under a budget.
+SOIL_SURVEY_MAX_POINTS = 50
+SOIL_SURVEY_ROUTE_TIME_BUDGET_SECONDS = 0.1
+# The soil surface is inverse-distance weighted over the soil points within
+# SOIL_SURFACE_RADIUS_MM of each grid node; nodes with none stay unknown
+# rather than being extrapolated across the bed. The radius also bounds how
+# much of the grid one changed point invalidates.
+SOIL_SURFACE_CELL_MM = 50.0
+SOIL_SURFACE_MIN_CELL_MM = 10.0
+SOIL_SURFACE_MAX_CELL_MM = 500.0
+SOIL_SURFACE_RADIUS_MM = 1000.0
+SOIL_SURFACE_IDW_POWER = 2.0
+SOIL_SURFACE_MAX_NODES = 250_000
+SOIL_SURFACE_MAX_QUERY_POINTS = 5000
 
 # Photo-grid repairs deliberately verify each capture through the REST API.
 # FarmBot's take_photo command reports camera failures asynchronously, so an
@@ -171,6 +218,11 @@ GRID_REPAIR_COORDINATE_TOLERANCE_MM = 25.0
 GRID_REPAIR_POSITION_TOLERANCE_MM = 15.0
 GRID_REPAIR_POSITION_TIMEOUT_SECONDS = 60
 GRID_REPAIR_LIGHTING_PIN = 7
+# Soil captures, soil surveys and photo-grid repairs share one lease on the
+# lighting and the park position. The light is switched off and the gantry
+# driven back once no capture run has started for this long, so a chained
+# survey -> repair pays for one lighting cycle and one trip home.
+CAPTURE_HARDWARE_IDLE_SECONDS = 30.0
 # One `start_vision_grid_repair` call carries a whole bed grid.
 #
 # The previous cap was twelve, which forced the Vision app to slice a 77-cell
@@ -190,15 +242,51 @@ GRID_REPAIR_MAX_TARGETS_PER_CALL = 256
 # must not be raised here without also raising it there.
 GRID_REPAIR_LEGACY_MAX_TARGETS_PER_CALL = 12
 # Cell-to-cell travel inside the grid skips FarmBot's `safe_z` retract only
-# when every cell shares one Z *and* that Z is within this margin of the top
-# of the Z axis -- i.e. the gantry is already as retracted as `safe_z` could
-# make it, so the retract/descend cycle adds wear and time without adding
-# clearance. Any lower capture height keeps `safe_z` on every move.
+# at a height within this margin of the top of the Z axis -- i.e. where the
+# gantry is already nearly as retracted as `safe_z` could make it, so the
+# retract/descend cycle adds wear and time without adding clearance. Cells
+# are grouped into clusters that cross at their highest Z (see
+# routing.plan_z_travel); a cluster whose highest cell is lower than this
+# keeps `safe_z` on every move.
 GRID_REPAIR_FLAT_TRAVEL_TOP_MARGIN_MM = 25.0
+# How far below a cluster's travel height a member cell may sit. Crossing at
+# the highest cell's Z then descending this far is still far less Z travel
+# than a full retract, and keeps the camera clear of anything the lower
+# cells look down on.
+GRID_REPAIR_Z_CLUSTER_SPAN_MM = 20.0
 # If this many photo-grid targets fail back-to-back, the bot is likely stuck,
 # disconnected, or the camera is dead; grinding through the rest of a large
 # grid is pointless, so the batch aborts early instead.
 GRID_REPAIR_MAX_CONSECUTIVE_FAILURES = 5
+# With `optimize_route`, how long the route optimiser may improve the visiting
+# order (see routing.py). It runs in an executor when the repair's turn on the
+# gantry comes; a quarter of a second is ample for a 256-cell route.
+GRID_REPAIR_ROUTE_TIME_BUDGET_SECONDS = 0.25
+# With `pipeline`, the gantry moves on as soon as take_photo is acknowledged
+# and each image is verified in the background. At most this many cells may
+# be awaiting verification at once (each polls the image API), so a stalled
+# upload queue holds the gantry back instead of piling up unverified cells.
+GRID_REPAIR_PIPELINE_DEPTH = 4
+# With `reuse_recent_images_within`, a cell that already has a processed image
+# within GRID_REPAIR_COORDINATE_TOLERANCE_MM, taken inside the window, is
+# completed with that image instead of being photographed again. The window
+# is capped at a day, which is also how long recent_images.py keeps an image.
+GRID_REPAIR_MAX_REUSE_SECONDS = 24 * 60 * 60
+
+# --------------------------------------------------------------------------
+# On-bot Lua capture engine (see capture_lua.py)
+# --------------------------------------------------------------------------
+# `engine` values for photo-grid repairs and soil captures: "rpc" drives each
+# stop from Home Assistant, "lua" runs the route on the bot in chunks.
+CAPTURE_ENGINES = ("rpc", "lua")
+# Stops per Lua node. Each chunk is one acknowledged RPC: small enough that a
+# stalled bot is noticed quickly, large enough to amortise the round trip.
+CAPTURE_LUA_STOPS_PER_CHUNK = 8
+# Per stop, on top of the move: settle, position check and take_photo.
+CAPTURE_LUA_SECONDS_PER_STOP = 5.0
+# Report lines travel on the logs topic, not with the RPC acknowledgement, so
+# they may trail it slightly.
+CAPTURE_LUA_REPORT_GRACE_SECONDS = 5.0
 
 # --------------------------------------------------------------------------
 # Experimental raw G-code execution (see gcode.py)
@@ -212,14 +300,37 @@ GCODE_MAX_LINES = 2000
 GCODE_MAX_MOVES = 1000
 # `gcode()` blocks until the firmware answers, so one Lua node holding a whole
 # shape would keep a single RPC open for the entire run. Twenty calls per node
-# bounds each acknowledgement and gives the caller progress between chunks.
+# bounds each acknowledgement and gives the caller progress between chunks
+# when no duration estimate is available.
 GCODE_CALLS_PER_LUA_CHUNK = 20
-GCODE_CHUNK_RPC_TIMEOUT_SECONDS = 240
+# With per-move estimates, chunks are sized by duration instead: about this
+# much motion per node, so a dense curve of millimetre segments is not a
+# round trip every 20 short segments and a run of long traverses still acknowledges
+# steadily. The call cap bounds the size of one node's Lua source.
+GCODE_CHUNK_TARGET_SECONDS = 10.0
+GCODE_MAX_CALLS_PER_LUA_CHUNK = 200
+# Validated programs kept for a later `plan_id` run, newest last. A plan is
+# tied to the start position (quantised to this step) and the firmware
+# movement settings it was resolved against.
+GCODE_PLAN_CACHE_SIZE = 16
+GCODE_PLAN_POSITION_QUANTUM_MM = 0.1
+# Shape toolpaths (circle, spiral, raster) are generated server-side. Curves
+# are split so no chord strays further than this from the true arc.
+GCODE_DEFAULT_CHORD_TOLERANCE_MM = 0.5
+GCODE_MAX_CHORD_TOLERANCE_MM = 5.0
+# Chunks a pipelined run keeps in flight: the one FarmBot OS is executing plus
+# one queued behind it, so the next chunk is already on the bot when the
+# current one finishes. More would only queue further ahead of the e-stop and
+# disconnect checks; it matches the motion lane's in-flight limit.
+GCODE_PIPELINE_DEPTH = 2
 GCODE_DEFAULT_FEED_MM_PER_MIN = 400.0
 GCODE_MIN_FEED_MM_PER_MIN = 1.0
 # Roughly FarmBot's own maximum traverse. Higher belongs in firmware config,
 # not in a program that arrives over a service call.
 GCODE_MAX_FEED_MM_PER_MIN = 3000.0
+# Largest chord tolerance path simplification may use. A few millimetres
+# already merges any finely drawn curve; more would visibly cut corners.
+GCODE_MAX_SIMPLIFY_TOLERANCE_MM = 5.0
 # Firmware speeds are steps/second. The floor keeps a very short segment from
 # asking for ~0 steps/second; the fallback ceiling applies only when
 # `movement_max_spd_*` is missing, where "unknown" must mean slow.
@@ -229,9 +340,97 @@ GCODE_FALLBACK_MAX_STEPS_PER_SECOND = 800.0
 # Adaptive rotary-tool weeding. These are hard integration-side ceilings; the
 # Vision app may choose more conservative values.
 WEEDING_MAX_WEEDS_PER_RUN = 100
-WEEDING_RPC_TIMEOUT_SECONDS = 300
 WEEDING_MAX_PATH_MM = 500.0
 WEEDING_MAX_ATTEMPTS = 5
+# How long plan_weeding may improve the order and direction of the cuts (see
+# routing.py). Planning runs inside the start service call, so this is kept
+# short; a 100-weed run converges well within it.
+WEEDING_ROUTE_TIME_BUDGET_SECONDS = 0.1
+# Weeds per Lua node (see weeding_lua.py). Each chunk is one acknowledged RPC
+# carrying the shared routine once; a stalled bot or an emergency stop is
+# still noticed within one chunk of cuts.
+WEEDING_WEEDS_PER_LUA_CHUNK = 10
+# Per-weed reports arrive on the logs topic and may trail the acknowledgement.
+WEEDING_LUA_REPORT_GRACE_SECONDS = 5.0
+# A managed rotary tool stays mounted this long after a weeding run so the
+# next queued run skips homing and the tool change. Another kind of gantry
+# job, or the hold running out, returns it to its slot first.
+WEEDING_TOOL_HOLD_DEFAULT_SECONDS = 120
+WEEDING_TOOL_HOLD_MAX_SECONDS = 3600
+# The UTM tool-verification input: it reads 0 while a tool is mounted.
+TOOL_VERIFICATION_PIN = 63
+
+# Outbound CeleryScript scheduling (see outbound.py). Emergency lock/unlock
+# never queue. Motion allows two unacknowledged requests so a chunked job can
+# keep one queued on the bot while the previous one runs; pin and status I/O
+# gets its own slots so a switch never waits behind a five-minute Lua node.
+OUTBOUND_LANE_INFLIGHT_LIMITS = {"motion": 2, "io": 4}
+OUTBOUND_LANE_QUEUE_LIMIT = 32
+# A fire-and-forget request whose acknowledgement never arrives stops holding
+# its lane's slot after this long. Awaited requests hold theirs until the
+# caller's own timeout releases them.
+OUTBOUND_INFLIGHT_EXPIRY_SECONDS = 60.0
+OUTBOUND_LATENCY_SAMPLES = 256
+
+# RPC latency tracing (see latency.py): each CeleryScript kind/outcome keeps a
+# rolling window of publish-to-acknowledgement times, bucketed in milliseconds.
+RPC_LATENCY_WINDOW = 256
+RPC_LATENCY_BUCKETS_MS = (
+    50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0,
+    5000.0, 10000.0, 30000.0, 60000.0, 120000.0, 300000.0,
+)
+# Publish times are kept per label until the acknowledgement arrives; a
+# fire-and-forget request whose acknowledgement never comes is forgotten once
+# this many newer ones are waiting.
+RPC_LATENCY_MAX_OUTSTANDING = 256
+
+# Motion job queue (see jobs.py). Every gantry job waits its turn here instead
+# of being refused while another runs. Higher priorities run first; equal
+# priorities run in the order they were queued.
+MOTION_JOB_DEFAULT_PRIORITY = 50
+MOTION_JOB_MAX_PRIORITY = 100
+MOTION_JOB_MAX_QUEUED = 20
+# When a job's turn comes the bot may still be finishing something this
+# integration did not start (a sequence from the web app, say). The job waits
+# for FarmBot to report itself idle for at most this long before failing.
+MOTION_JOB_IDLE_TIMEOUT_SECONDS = 600
+# Fixed per-job overhead (API calls, lighting, waiting for idle) added to a
+# job's modelled motion time when estimating when queued jobs will start.
+MOTION_JOB_ESTIMATE_BASE_SECONDS = 20.0
+# Per photo, on top of the move: settle, capture, upload and processing.
+MOTION_JOB_ESTIMATE_SECONDS_PER_PHOTO = 12.0
+# The part of that a pipelined photo-grid repair, or a capture run on the bot
+# (engine "lua"), still waits for per photo.
+MOTION_JOB_ESTIMATE_SECONDS_PER_PIPELINED_PHOTO = 4.0
+
+# Motion time model (see motion.py). Factory defaults stand in for firmware
+# values FarmBot did not report; a missing maximum speed falls back to
+# GCODE_FALLBACK_MAX_STEPS_PER_SECOND. Safe-Z moves retract to FarmBot OS's
+# default safe height.
+MOTION_DEFAULT_STEPS_PER_MM = {"x": 5.0, "y": 5.0, "z": 25.0}
+MOTION_DEFAULT_MIN_STEPS_PER_SECOND = 50.0
+MOTION_DEFAULT_ACCEL_STEPS = 300.0
+MOTION_SAFE_Z_MM = 0.0
+# A movement RPC is given its modelled duration times this factor plus this
+# margin (MQTT round trip, FarmBot OS planning, firmware slower than its
+# config) before it is treated as failed. A short hop fails in well under a
+# minute; a long one is never cut off mid-move.
+MOTION_TIMEOUT_FACTOR = 1.5
+MOTION_TIMEOUT_MARGIN_SECONDS = 20.0
+# A queued G-code program was resolved against the position the bot had when
+# it was submitted; if the gantry is elsewhere by the time the run starts, the
+# run is refused rather than executed from the wrong origin.
+GCODE_START_POSITION_TOLERANCE_MM = 2.0
+
+# Run records (see runs.py). Soil captures, grid repairs, G-code and weeding
+# runs are kept per kind up to this count and age, then the oldest finished
+# ones are dropped. They are persisted per config entry so a status lookup
+# still answers after a restart; writes are debounced because a running job
+# updates its record constantly.
+RUN_RECORD_STORAGE_VERSION = 1
+RUN_RECORD_MAX_PER_KIND = 50
+RUN_RECORD_MAX_AGE_DAYS = 14
+RUN_RECORD_SAVE_DELAY_SECONDS = 10.0
 
 # Decompression-bomb guards applied to the *decoded* source image, before any
 # resize. A native FarmBot frame is 2592x1944 (~5 MP); these limits leave
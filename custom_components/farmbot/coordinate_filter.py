@@ -0,0 +1,52 @@
+"""Write throttling for the pushed X/Y/Z coordinate sensors.
+
+FarmBot OS publishes its status several times a second while moving. Writing
+every one of those positions to the recorder buys nothing, so while the bot
+reports itself busy a new value is only accepted once it has moved past the
+configured deadband *and* the minimum write interval has elapsed. The first
+status after the bot goes idle is always accepted if the position differs
+from the last written one, so the recorded final position is exact.
+
+Kept free of Home Assistant entity imports so the decision can be tested on
+its own.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable
+
+from .const import OPTION_COORDINATE_DEADBAND_MM, OPTION_COORDINATE_MIN_INTERVAL_SECONDS
+
+
+class CoordinateWriteFilter:
+    """Decide which status updates for one axis are worth writing."""
+
+    def __init__(self, axis: str, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self._axis = axis
+        self._clock = clock
+        self._last_write = 0.0
+        self.value: Any = None
+
+    def update(self, status: dict[str, Any] | None, options: dict[str, float]) -> bool:
+        """Take one MQTT status dict; True if ``value`` changed and should be written."""
+        status = status or {}
+        position = (status.get("location_data") or {}).get("position") or {}
+        value = position.get(self._axis)
+        if value is None or value == self.value:
+            return False
+        now = self._clock()
+        moving = bool((status.get("informational_settings") or {}).get("busy", False))
+        if moving and self.value is not None:
+            try:
+                drift = abs(float(value) - float(self.value))
+            except (TypeError, ValueError):
+                drift = float("inf")
+            if (
+                drift < options[OPTION_COORDINATE_DEADBAND_MM]
+                or now - self._last_write < options[OPTION_COORDINATE_MIN_INTERVAL_SECONDS]
+            ):
+                return False
+        self.value = value
+        self._last_write = now
+        return True
@@ -0,0 +1,25 @@
+"""Diagnostics for the FarmBot integration.
+
+Only runtime measurements are exported. The config entry's token, MQTT host
+and device credentials never appear here, so nothing needs redacting.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass, entry) -> dict[str, Any]:
+    """Return RPC latency, outbound-queue metrics and recent runs for one FarmBot."""
+    manager = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if manager is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "connection": manager.connection_state(),
+        "rpc_latency_ms": manager.rpc_latency_snapshot(),
+        "outbound": manager.outbound_metrics(),
+        "recent_runs": manager.recent_runs(5),
+    }
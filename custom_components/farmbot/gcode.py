@@ -34,25 +34,52 @@ the axes finish together and keeps a segment close to its chord.
 
 The firmware appends its own ``Q`` (queue) parameter. Setting ``Q`` explicitly
 crashes FarmBot OS, so ``Q`` is rejected as an input word.
+
+Because every segment is its own firmware move -- with its own acceleration
+and deceleration, its own slot under ``GCODE_MAX_MOVES`` and its own ``gcode()``
+call -- a curve drawn as hundreds of tiny segments stutters. ``parse_program``
+can optionally simplify the resolved path (``simplify_tolerance_mm``): runs of
+segments at one feed rate are reduced with a Douglas-Peucker pass, so
+collinear and nearly collinear points within the chord tolerance are dropped
+and the segments either side merge into one. Only points the caller wrote are
+kept, so the merged path stays inside the bounds already checked, and every
+merged move has its speeds resolved again from its own deltas.
+
+Lines are parsed one at a time, since G-code is modal, but the parsed moves
+are resolved together: targets, distances, per-axis speeds, clamping and
+bounds violations are computed over whole columns, with NumPy when it is
+installed and a plain pass over ``array`` columns otherwise. A rejection
+still names the first offending line, exactly as a line-by-line check would.
 """
 
 from __future__ import annotations
 
+import hashlib
+import json
 import math
 import re
+from array import array
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Sequence
 
 from .const import (
     GCODE_CALLS_PER_LUA_CHUNK,
+    GCODE_CHUNK_TARGET_SECONDS,
     GCODE_FALLBACK_MAX_STEPS_PER_SECOND,
+    GCODE_MAX_CALLS_PER_LUA_CHUNK,
     GCODE_MAX_FEED_MM_PER_MIN,
     GCODE_MAX_LINES,
     GCODE_MAX_MOVES,
     GCODE_MIN_FEED_MM_PER_MIN,
     GCODE_MIN_STEPS_PER_SECOND,
+    GCODE_PLAN_POSITION_QUANTUM_MM,
 )
 
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover - Home Assistant ships NumPy
+    _np = None
+
 AXES = ("x", "y", "z")
 # G-code parameter letter per axis, and the firmware's speed letter for it.
 _AXIS_WORD = {"x": "X", "y": "Y", "z": "Z"}
@@ -74,28 +101,41 @@ class GcodeError(ValueError):
     """
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GcodeMove:
-    """One resolved ``G00`` ready to hand to the firmware verbatim."""
+    """One resolved ``G00`` ready to hand to the firmware verbatim.
+
+    A program can hold ``GCODE_MAX_MOVES`` of these, so a move keeps its
+    coordinates and speeds as plain ``(x, y, z)`` tuples in slots; ``target``
+    and ``speeds`` give the same values by axis name.
+    """
 
     line_number: int
     source: str
     # Absolute millimetre target for every axis, including axes the line did
     # not mention -- the firmware is told exactly where to be, never "leave
     # this one alone", so a resolved program is unambiguous on replay.
-    target: dict[str, float]
+    point: tuple[float, float, float]
     # Per-axis speeds in steps/second (the firmware's A/B/C words).
-    speeds: dict[str, float]
+    axis_speeds: tuple[float, float, float]
     distance_mm: float
     clamped_axes: tuple[str, ...] = ()
 
+    @property
+    def target(self) -> dict[str, float]:
+        return dict(zip(AXES, self.point))
+
+    @property
+    def speeds(self) -> dict[str, float]:
+        return dict(zip(AXES, self.axis_speeds))
+
     def params(self) -> dict[str, float]:
         """The G-code parameter table, as ``gcode()`` wants it."""
         params: dict[str, float] = {}
-        for axis in AXES:
-            params[_AXIS_WORD[axis]] = round(self.target[axis], 3)
-        for axis in AXES:
-            params[_SPEED_WORD[axis]] = round(self.speeds[axis])
+        for axis, value in zip(AXES, self.point):
+            params[_AXIS_WORD[axis]] = round(value, 3)
+        for axis, value in zip(AXES, self.axis_speeds):
+            params[_SPEED_WORD[axis]] = round(value)
         return params
 
 
@@ -108,6 +148,9 @@ class GcodeProgram:
     feed_mm_per_min: float
     clamped_axes: tuple[str, ...] = ()
     warnings: list[str] = field(default_factory=list)
+    # Set when the path was simplified: tolerance_mm, moves_before,
+    # moves_after and max_deviation_mm.
+    simplification: dict[str, float] | None = None
 
     @property
     def total_distance_mm(self) -> float:
@@ -122,6 +165,67 @@ class GcodeProgram:
         return result
 
 
+@dataclass(frozen=True)
+class GcodePlan:
+    """A validated program rendered to Lua chunks, ready to run as it is.
+
+    A preview returns the plan's ID so the run that follows can execute this
+    exact program without parsing and rendering it again. ``firmware_key``
+    and ``start_cell`` record what it was resolved against; the plan is only
+    valid while both still match the bot.
+    """
+
+    plan_id: str
+    program: GcodeProgram
+    chunks: tuple[str, ...]
+    chunk_seconds: tuple[float, ...]
+    firmware_key: str
+    start_cell: tuple[int, ...]
+
+
+def firmware_key(firmware_config: dict[str, Any]) -> str:
+    """Fingerprint the firmware settings a resolved program depends on.
+
+    Every ``movement_*`` parameter is included: steps per mm and speed limits
+    shape the resolved moves, axis lengths the bounds, and acceleration the
+    chunk estimates.
+    """
+    relevant = {
+        key: value for key, value in firmware_config.items() if key.startswith("movement_")
+    }
+    payload = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def start_cell(position: dict[str, Any]) -> tuple[int, ...] | None:
+    """The start position on a ``GCODE_PLAN_POSITION_QUANTUM_MM`` grid.
+
+    ``None`` when any axis is unknown; such a program cannot be planned.
+    """
+    try:
+        return tuple(
+            round(float(position[axis]) / GCODE_PLAN_POSITION_QUANTUM_MM) for axis in AXES
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def plan_id(
+    source: list[str] | dict[str, Any],
+    *,
+    feed_mm_per_min: float,
+    simplify_tolerance_mm: float | None,
+    firmware_key: str,
+    start_cell: tuple[int, ...],
+) -> str:
+    """A stable ID for a program (lines or a shape spec) under these conditions."""
+    payload = json.dumps(
+        [source, feed_mm_per_min, simplify_tolerance_mm, firmware_key, list(start_cell)],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
 def _axis_steps_per_mm(firmware_config: dict[str, Any], axis: str) -> float:
     value = firmware_config.get(f"movement_step_per_mm_{axis}")
     try:
@@ -180,174 +284,579 @@ def parse_program(
     axis_bounds: dict[str, list[float] | None],
     firmware_config: dict[str, Any],
     default_feed_mm_per_min: float,
+    simplify_tolerance_mm: float | None = None,
 ) -> GcodeProgram:
     """Validate a G-code program and resolve it into firmware-ready moves.
 
     Raises :class:`GcodeError` -- naming the offending line -- rather than
-    partially accepting a program.
+    partially accepting a program. With ``simplify_tolerance_mm`` the
+    resolved path is simplified (see the module docstring) and the move
+    limit applies to the simplified program.
     """
+    if simplify_tolerance_mm is not None and not (
+        math.isfinite(simplify_tolerance_mm) and simplify_tolerance_mm > 0
+    ):
+        raise GcodeError("Simplification tolerance must be a positive number of mm")
     if len(lines) > GCODE_MAX_LINES:
         raise GcodeError(f"Program has {len(lines)} lines; the limit is {GCODE_MAX_LINES}")
-    for axis in AXES:
-        value = start_position.get(axis)
-        if value is None or not math.isfinite(float(value)):
-            raise GcodeError(
-                "FarmBot has not reported a position for every axis; home or move it "
-                "once before running raw G-code"
-            )
-        if axis_bounds.get(axis) is None:
-            raise GcodeError("FarmBot axis bounds are unavailable")
+    _check_start(start_position, axis_bounds)
 
     steps_per_mm = {axis: _axis_steps_per_mm(firmware_config, axis) for axis in AXES}
     max_steps = {axis: _axis_max_steps_per_second(firmware_config, axis) for axis in AXES}
 
-    position = {axis: float(start_position[axis]) for axis in AXES}
-    program_start = dict(position)
-    feed = float(default_feed_mm_per_min)
-    absolute = True
-    moves: list[GcodeMove] = []
-    clamped: set[str] = set()
-    warnings: list[str] = []
+    program_start = {axis: float(start_position[axis]) for axis in AXES}
+    rows = _MoveRows()
+    feed, pending = _parse_lines(
+        lines,
+        float(default_feed_mm_per_min),
+        rows,
+        limit_moves=simplify_tolerance_mm is None,
+    )
+    # A line that fails to parse stops the scan, but a bounds or speed error
+    # found in bulk on an earlier line still comes first, as it would if the
+    # program were checked line by line.
+    resolved = _resolve_rows(rows, program_start, axis_bounds, steps_per_mm, max_steps)
+    errors = [error for error in (pending, resolved.error) if error is not None]
+    if errors:
+        raise min(errors, key=lambda error: error[:2])[2]
+    moves = resolved.moves(rows)
+    # The feed rate of each move, or None where the line set its own speeds.
+    move_feeds = rows.move_feeds()
 
-    for line_number, raw in enumerate(lines, start=1):
-        text = _strip_comment(raw)
-        if not text:
-            continue
-        words = _words(text, line_number)
-        letters = [letter for letter, _ in words]
-        if "Q" in letters:
+    if not moves:
+        raise GcodeError("Program contains no movement")
+    simplification = None
+    if simplify_tolerance_mm is not None:
+        before = len(moves)
+        moves, deviation = _simplify(
+            moves,
+            move_feeds,
+            start=program_start,
+            tolerance_mm=simplify_tolerance_mm,
+            steps_per_mm=steps_per_mm,
+            max_steps=max_steps,
+        )
+        if len(moves) > GCODE_MAX_MOVES:
             raise GcodeError(
-                f"Line {line_number}: Q is added by FarmBot OS and must not be set "
-                "(setting it crashes FarmBot OS)"
+                f"Program has {len(moves)} moves after simplification; the limit is "
+                f"{GCODE_MAX_MOVES}"
             )
-        if "N" in letters:
-            raise GcodeError(f"Line {line_number}: line numbers (N) are not supported")
+        simplification = {
+            "tolerance_mm": simplify_tolerance_mm,
+            "moves_before": before,
+            "moves_after": len(moves),
+            "max_deviation_mm": round(deviation, 3),
+        }
+    return _program(moves, program_start, feed, simplification=simplification)
 
-        g_values = [value for letter, value in words if letter == "G"]
-        m_values = [value for letter, value in words if letter == "M"]
-        if m_values:
-            raise GcodeError(
-                f"Line {line_number}: M{int(m_values[0]):02d} is not supported. "
-                f"Supported: {_SUPPORTED_SUMMARY}"
-            )
-        if len(g_values) > 1:
-            raise GcodeError(f"Line {line_number}: more than one G code on a line")
 
-        if not g_values:
-            # A bare `F400` sets the modal feed rate for everything after it.
-            if letters == ["F"]:
-                feed = _validated_feed(dict(words)["F"], line_number)
+def _parse_lines(
+    lines: list[str], default_feed_mm_per_min: float, rows: _MoveRows, *, limit_moves: bool
+) -> tuple[float, tuple[int, int, GcodeError] | None]:
+    """Parse each line into ``rows``, keeping the modal state as G-code does.
+
+    Returns the final feed rate and, if the scan stopped early, the reason as
+    ``(line, rank, error)``: rank 0 for a line that does not parse, 2 for
+    the move limit (checked after that line's own bounds and speeds).
+    """
+    feed = default_feed_mm_per_min
+    absolute = True
+    line_number = 0
+    try:
+        for line_number, raw in enumerate(lines, start=1):
+            text = _strip_comment(raw)
+            if not text:
                 continue
-            raise GcodeError(
-                f"Line {line_number}: no G code and not a feed rate. "
-                f"Supported: {_SUPPORTED_SUMMARY}"
-            )
+            words = _words(text, line_number)
+            letters = [letter for letter, _ in words]
+            if "Q" in letters:
+                raise GcodeError(
+                    f"Line {line_number}: Q is added by FarmBot OS and must not be set "
+                    "(setting it crashes FarmBot OS)"
+                )
+            if "N" in letters:
+                raise GcodeError(f"Line {line_number}: line numbers (N) are not supported")
 
-        code = int(round(g_values[0]))
-        values = {letter: value for letter, value in words if letter != "G"}
+            g_values = [value for letter, value in words if letter == "G"]
+            m_values = [value for letter, value in words if letter == "M"]
+            if m_values:
+                raise GcodeError(
+                    f"Line {line_number}: M{int(m_values[0]):02d} is not supported. "
+                    f"Supported: {_SUPPORTED_SUMMARY}"
+                )
+            if len(g_values) > 1:
+                raise GcodeError(f"Line {line_number}: more than one G code on a line")
+
+            if not g_values:
+                # A bare `F400` sets the modal feed rate for everything after it.
+                if letters == ["F"]:
+                    feed = _validated_feed(dict(words)["F"], line_number)
+                    continue
+                raise GcodeError(
+                    f"Line {line_number}: no G code and not a feed rate. "
+                    f"Supported: {_SUPPORTED_SUMMARY}"
+                )
 
-        if code in (20, 21):
-            if code == 20:
+            code = int(round(g_values[0]))
+            values = {letter: value for letter, value in words if letter != "G"}
+
+            if code in (20, 21):
+                if code == 20:
+                    raise GcodeError(
+                        f"Line {line_number}: G20 (inches) is not supported; FarmBot works in "
+                        "millimetres (G21)"
+                    )
+                if values:
+                    raise GcodeError(f"Line {line_number}: G21 takes no parameters")
+                continue
+            if code in (90, 91):
+                if values:
+                    raise GcodeError(f"Line {line_number}: G{code} takes no parameters")
+                absolute = code == 90
+                continue
+            if code == 1:
                 raise GcodeError(
-                    f"Line {line_number}: G20 (inches) is not supported; FarmBot works in "
-                    "millimetres (G21)"
+                    f"Line {line_number}: the FarmBot firmware does not implement G01. Use G00 -- "
+                    "note it is not guaranteed to move in a straight line, so curves need short "
+                    "segments"
+                )
+            if code != 0:
+                raise GcodeError(
+                    f"Line {line_number}: G{code:02d} is not supported. Supported: "
+                    f"{_SUPPORTED_SUMMARY}"
                 )
-            if values:
-                raise GcodeError(f"Line {line_number}: G21 takes no parameters")
-            continue
-        if code in (90, 91):
-            if values:
-                raise GcodeError(f"Line {line_number}: G{code} takes no parameters")
-            absolute = code == 90
-            continue
-        if code == 1:
-            raise GcodeError(
-                f"Line {line_number}: the FarmBot firmware does not implement G01. Use G00 -- "
-                "note it is not guaranteed to move in a straight line, so curves need short "
-                "segments"
-            )
-        if code != 0:
-            raise GcodeError(
-                f"Line {line_number}: G{code:02d} is not supported. Supported: "
-                f"{_SUPPORTED_SUMMARY}"
-            )
 
-        unknown = set(values) - {"X", "Y", "Z", "F", "A", "B", "C"}
-        if unknown:
-            raise GcodeError(
-                f"Line {line_number}: G00 does not accept {', '.join(sorted(unknown))}"
-            )
-        if "F" in values:
-            feed = _validated_feed(values["F"], line_number)
+            unknown = set(values) - {"X", "Y", "Z", "F", "A", "B", "C"}
+            if unknown:
+                raise GcodeError(
+                    f"Line {line_number}: G00 does not accept {', '.join(sorted(unknown))}"
+                )
+            if "F" in values:
+                feed = _validated_feed(values["F"], line_number)
 
-        target = dict(position)
-        moved = False
-        for axis in AXES:
-            word = _AXIS_WORD[axis]
-            if word not in values:
+            if not any(_AXIS_WORD[axis] in values for axis in AXES):
+                # A G00 with only an F is just a feed-rate change; nothing to send.
                 continue
-            moved = True
-            target[axis] = values[word] if absolute else position[axis] + values[word]
+            rows.append(line_number, text, absolute, feed, values)
+            if limit_moves and len(rows) > GCODE_MAX_MOVES:
+                return feed, (
+                    line_number,
+                    2,
+                    GcodeError(f"Program has more than {GCODE_MAX_MOVES} moves"),
+                )
+        return feed, None
+    except GcodeError as err:
+        return feed, (line_number, 0, err)
 
-        if not moved:
-            # A G00 with only an F is just a feed-rate change; nothing to send.
-            continue
 
-        for axis in AXES:
-            low, high = axis_bounds[axis]  # type: ignore[misc]
-            if not low - 0.001 <= target[axis] <= high + 0.001:
-                raise GcodeError(
-                    f"Line {line_number}: {_AXIS_WORD[axis]}{target[axis]:.1f} is outside the "
-                    f"{axis.upper()} axis range {low:.0f} to {high:.0f} mm"
-                )
+def resolve_path(
+    points: list[dict[str, float]],
+    *,
+    label: str,
+    start_position: dict[str, float],
+    axis_bounds: dict[str, list[float] | None],
+    firmware_config: dict[str, Any],
+    feed_mm_per_min: float,
+) -> GcodeProgram:
+    """Resolve a generated path of absolute points into firmware-ready moves.
 
-        explicit_speeds = {
-            axis: values[_SPEED_WORD[axis]]
-            for axis in AXES
-            if _SPEED_WORD[axis] in values
-        }
-        speeds, distance, move_clamped = _resolve_speeds(
-            start=position,
-            target=target,
-            feed_mm_per_min=feed,
-            steps_per_mm=steps_per_mm,
-            max_steps=max_steps,
-            explicit=explicit_speeds,
-            line_number=line_number,
+    The counterpart of :func:`parse_program` for paths that were never text
+    (see :mod:`.toolpath`): every point is bounds-checked and gets its speeds
+    resolved exactly as a written ``G00`` to it would, under the same move
+    limit. Errors name the point as ``"{label} N"``.
+    """
+    _check_start(start_position, axis_bounds)
+    steps_per_mm = {axis: _axis_steps_per_mm(firmware_config, axis) for axis in AXES}
+    max_steps = {axis: _axis_max_steps_per_second(firmware_config, axis) for axis in AXES}
+    if len(points) > GCODE_MAX_MOVES:
+        raise GcodeError(f"Path has {len(points)} points; the limit is {GCODE_MAX_MOVES}")
+
+    program_start = {axis: float(start_position[axis]) for axis in AXES}
+    rows = _MoveRows()
+    for number, point in enumerate(points, start=1):
+        rows.append(
+            number,
+            f"{label} {number}",
+            True,
+            float(feed_mm_per_min),
+            {_AXIS_WORD[axis]: float(point[axis]) for axis in AXES},
         )
-        clamped.update(move_clamped)
-        moves.append(
-            GcodeMove(
-                line_number=line_number,
-                source=text,
-                target=dict(target),
-                speeds=speeds,
-                distance_mm=distance,
-                clamped_axes=move_clamped,
+    resolved = _resolve_rows(
+        rows, program_start, axis_bounds, steps_per_mm, max_steps, label=label
+    )
+    if resolved.error is not None:
+        raise resolved.error[2]
+    moves = resolved.moves(rows)
+    if not moves:
+        raise GcodeError("Path contains no movement")
+    return _program(moves, program_start, float(feed_mm_per_min))
+
+
+def _check_start(
+    start_position: dict[str, float], axis_bounds: dict[str, list[float] | None]
+) -> None:
+    for axis in AXES:
+        value = start_position.get(axis)
+        if value is None or not math.isfinite(float(value)):
+            raise GcodeError(
+                "FarmBot has not reported a position for every axis; home or move it "
+                "once before running raw G-code"
             )
-        )
-        if len(moves) > GCODE_MAX_MOVES:
-            raise GcodeError(f"Program has more than {GCODE_MAX_MOVES} moves")
-        position = target
+        if axis_bounds.get(axis) is None:
+            raise GcodeError("FarmBot axis bounds are unavailable")
 
-    if not moves:
-        raise GcodeError("Program contains no movement")
+
+def _out_of_bounds(where: str, axis: str, value: float, low: float, high: float) -> GcodeError:
+    return GcodeError(
+        f"{where}: {_AXIS_WORD[axis]}{value:.1f} is outside the "
+        f"{axis.upper()} axis range {low:.0f} to {high:.0f} mm"
+    )
+
+
+def _program(
+    moves: list[GcodeMove],
+    start: dict[str, float],
+    feed_mm_per_min: float,
+    *,
+    simplification: dict[str, float] | None = None,
+) -> GcodeProgram:
+    """Wrap resolved moves, warning about any axis whose speed was clamped."""
+    clamped: set[str] = set()
+    for move in moves:
+        clamped.update(move.clamped_axes)
+    warnings = []
     if clamped:
         warnings.append(
             "Speed was clamped to the firmware's configured maximum on the "
             + ", ".join(axis.upper() for axis in sorted(clamped))
             + " axis"
         )
-
     return GcodeProgram(
         moves=moves,
-        start_position=program_start,
-        feed_mm_per_min=feed,
+        start_position=start,
+        feed_mm_per_min=feed_mm_per_min,
         clamped_axes=tuple(sorted(clamped)),
         warnings=warnings,
+        simplification=simplification,
     )
 
 
+class _MoveRows:
+    """Parsed ``G00`` moves as columns, ready to be resolved in bulk.
+
+    Each axis word is stored as a float, NaN where the line did not give it,
+    in ``array("d")`` columns that NumPy can view without copying.
+    """
+
+    def __init__(self) -> None:
+        self.line_numbers: list[int] = []
+        self.sources: list[str] = []
+        self.absolute = array("b")
+        self.feeds = array("d")
+        self.values = tuple(array("d") for _ in AXES)
+        self.explicit = tuple(array("d") for _ in AXES)
+
+    def __len__(self) -> int:
+        return len(self.line_numbers)
+
+    def append(
+        self,
+        line_number: int,
+        source: str,
+        absolute: bool,
+        feed: float,
+        values: dict[str, float],
+    ) -> None:
+        self.line_numbers.append(line_number)
+        self.sources.append(source)
+        self.absolute.append(absolute)
+        self.feeds.append(feed)
+        for index, axis in enumerate(AXES):
+            self.values[index].append(values.get(_AXIS_WORD[axis], math.nan))
+            self.explicit[index].append(values.get(_SPEED_WORD[axis], math.nan))
+
+    def move_feeds(self) -> list[float | None]:
+        """The feed rate of each move, or None where the line set its own speeds."""
+        return [
+            None if any(not math.isnan(column[row]) for column in self.explicit) else feed
+            for row, feed in enumerate(self.feeds)
+        ]
+
+
+@dataclass
+class _Resolved:
+    """Resolved columns: per-axis targets, speeds and clamp flags by row."""
+
+    targets: list[list[float]]
+    speeds: list[list[float]]
+    clamped: list[list[bool]]
+    distances: list[float]
+    # The first rejection as (line, rank, error); rank 0 is out of bounds and
+    # rank 1 a non-positive explicit speed, the order a line is checked in.
+    error: tuple[int, int, GcodeError] | None = None
+
+    def moves(self, rows: _MoveRows) -> list[GcodeMove]:
+        x, y, z = self.targets
+        speed_x, speed_y, speed_z = self.speeds
+        return [
+            GcodeMove(
+                line_number=rows.line_numbers[row],
+                source=rows.sources[row],
+                point=(x[row], y[row], z[row]),
+                axis_speeds=(speed_x[row], speed_y[row], speed_z[row]),
+                distance_mm=self.distances[row],
+                clamped_axes=tuple(
+                    axis for index, axis in enumerate(AXES) if self.clamped[index][row]
+                ),
+            )
+            for row in range(len(rows))
+        ]
+
+
+def _resolve_rows(
+    rows: _MoveRows,
+    start: dict[str, float],
+    axis_bounds: dict[str, list[float] | None],
+    steps_per_mm: dict[str, float],
+    max_steps: dict[str, float],
+    *,
+    label: str = "Line",
+) -> _Resolved:
+    """Resolve every row at once: targets, distances, speeds and rejections.
+
+    Uses NumPy when it is installed (Home Assistant ships it) and a plain
+    pass over the ``array`` columns otherwise; both give the same moves and
+    report the same first offending line.
+    """
+    resolve = _resolve_rows_numpy if _np is not None else _resolve_rows_array
+    return resolve(rows, start, axis_bounds, steps_per_mm, max_steps, label)
+
+
+def _resolve_rows_array(
+    rows: _MoveRows,
+    start: dict[str, float],
+    axis_bounds: dict[str, list[float] | None],
+    steps_per_mm: dict[str, float],
+    max_steps: dict[str, float],
+    label: str,
+) -> _Resolved:
+    count = len(rows)
+    targets = [[0.0] * count for _ in AXES]
+    speeds = [[0.0] * count for _ in AXES]
+    clamped = [[False] * count for _ in AXES]
+    distances = [0.0] * count
+    bounds = [axis_bounds[axis] for axis in AXES]
+    scale = [steps_per_mm[axis] for axis in AXES]
+    ceilings = [max_steps[axis] for axis in AXES]
+    position = [start[axis] for axis in AXES]
+    for row in range(count):
+        absolute = rows.absolute[row]
+        target = list(position)
+        for index in range(3):
+            value = rows.values[index][row]
+            if not math.isnan(value):
+                target[index] = value if absolute else position[index] + value
+        for index, axis in enumerate(AXES):
+            low, high = bounds[index]  # type: ignore[misc]
+            if not low - 0.001 <= target[index] <= high + 0.001:
+                line = rows.line_numbers[row]
+                error = _out_of_bounds(f"{label} {line}", axis, target[index], low, high)
+                return _Resolved([], [], [], [], (line, 0, error))
+        deltas = [target[index] - position[index] for index in range(3)]
+        distance = math.sqrt(sum(delta * delta for delta in deltas))
+        seconds = distance / (rows.feeds[row] / 60.0) if distance > 0 else 0.0
+        for index in range(3):
+            requested = rows.explicit[index][row]
+            if not math.isnan(requested):
+                if requested <= 0:
+                    line = rows.line_numbers[row]
+                    error = GcodeError(
+                        f"{label} {line}: {_SPEED_WORD[AXES[index]]} speed must be positive"
+                    )
+                    return _Resolved([], [], [], [], (line, 1, error))
+            elif seconds > 0:
+                requested = abs(deltas[index]) / seconds * scale[index]
+            else:
+                requested = GCODE_MIN_STEPS_PER_SECOND
+            if requested > ceilings[index]:
+                requested = ceilings[index]
+                clamped[index][row] = True
+            speeds[index][row] = max(requested, GCODE_MIN_STEPS_PER_SECOND)
+            targets[index][row] = target[index]
+        distances[row] = distance
+        position = target
+    return _Resolved(targets, speeds, clamped, distances)
+
+
+def _resolve_rows_numpy(
+    rows: _MoveRows,
+    start: dict[str, float],
+    axis_bounds: dict[str, list[float] | None],
+    steps_per_mm: dict[str, float],
+    max_steps: dict[str, float],
+    label: str,
+) -> _Resolved:
+    np = _np
+    count = len(rows)
+    if not count:
+        return _Resolved([[], [], []], [[], [], []], [[], [], []], [])
+    order = np.arange(count)
+    absolute = np.frombuffer(rows.absolute, dtype=np.int8).astype(bool)
+    targets = np.empty((3, count))
+    for index, axis in enumerate(AXES):
+        values = np.frombuffer(rows.values[index], dtype=np.float64)
+        given = ~np.isnan(values)
+        # Relative words accumulate from the last absolute one (or the start).
+        cumulative = np.cumsum(np.where(given & ~absolute, values, 0.0))
+        last = np.maximum.accumulate(np.where(given & absolute, order, -1))
+        anchored = last >= 0
+        anchor = np.where(anchored, last, 0)
+        targets[index] = (
+            np.where(anchored, values[anchor], start[axis])
+            + cumulative
+            - np.where(anchored, cumulative[anchor], 0.0)
+        )
+
+    low = np.array([axis_bounds[axis][0] for axis in AXES])[:, None]  # type: ignore[index]
+    high = np.array([axis_bounds[axis][1] for axis in AXES])[:, None]  # type: ignore[index]
+    outside = (targets < low - 0.001) | (targets > high + 0.001)
+    explicit = np.stack([np.frombuffer(column, dtype=np.float64) for column in rows.explicit])
+    has_explicit = ~np.isnan(explicit)
+    bad_speed = has_explicit & (explicit <= 0)
+    candidates = []
+    for rank, mask in ((0, outside), (1, bad_speed)):
+        flagged = mask.any(axis=0)
+        if flagged.any():
+            row = int(flagged.argmax())
+            candidates.append((row, rank, int(mask[:, row].argmax())))
+    if candidates:
+        row, rank, index = min(candidates)
+        axis = AXES[index]
+        line = rows.line_numbers[row]
+        if rank == 0:
+            low_mm, high_mm = axis_bounds[axis]  # type: ignore[misc]
+            value = float(targets[index, row])
+            error = _out_of_bounds(f"{label} {line}", axis, value, low_mm, high_mm)
+        else:
+            error = GcodeError(f"{label} {line}: {_SPEED_WORD[axis]} speed must be positive")
+        return _Resolved([], [], [], [], (line, rank, error))
+
+    start_point = np.array([[start[axis]] for axis in AXES])
+    previous = np.concatenate([start_point, targets[:, :-1]], axis=1)
+    deltas = targets - previous
+    distances = np.sqrt(deltas[0] * deltas[0] + deltas[1] * deltas[1] + deltas[2] * deltas[2])
+    feeds = np.frombuffer(rows.feeds, dtype=np.float64)
+    seconds = np.where(distances > 0, distances / (feeds / 60.0), 0.0)
+    scale = np.array([[steps_per_mm[axis]] for axis in AXES])
+    ceilings = np.array([[max_steps[axis]] for axis in AXES])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proportional = np.abs(deltas) / seconds * scale
+    requested = np.where(seconds > 0, proportional, GCODE_MIN_STEPS_PER_SECOND)
+    requested = np.where(has_explicit, explicit, requested)
+    clamped = requested > ceilings
+    speeds = np.maximum(np.where(clamped, ceilings, requested), GCODE_MIN_STEPS_PER_SECOND)
+    return _Resolved(targets.tolist(), speeds.tolist(), clamped.tolist(), distances.tolist())
+
+
+def _segment_distance(
+    point: tuple[float, ...], a: tuple[float, ...], b: tuple[float, ...]
+) -> float:
+    """Distance from ``point`` to the segment ``a``-``b``."""
+    chord = [high - low for low, high in zip(a, b)]
+    length_squared = sum(component * component for component in chord)
+    if length_squared == 0:
+        return math.dist(point, a)
+    along = sum((p - low) * component for p, low, component in zip(point, a, chord))
+    fraction = min(1.0, max(0.0, along / length_squared))
+    return math.dist(point, [low + fraction * component for low, component in zip(a, chord)])
+
+
+def _douglas_peucker(points: list[tuple[float, ...]], tolerance: float) -> tuple[list[int], float]:
+    """Indexes of the points to keep, and the largest deviation of a dropped one.
+
+    Iterative, so a long run cannot hit the recursion limit. The first and
+    last points are always kept.
+    """
+    keep = {0, len(points) - 1}
+    deviation = 0.0
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        farthest, distance = first, -1.0
+        for index in range(first + 1, last):
+            candidate = _segment_distance(points[index], points[first], points[last])
+            if candidate > distance:
+                farthest, distance = index, candidate
+        if distance > tolerance:
+            keep.add(farthest)
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+        else:
+            deviation = max(deviation, distance)
+    return sorted(keep), deviation
+
+
+def _simplify(
+    moves: list[GcodeMove],
+    move_feeds: list[float | None],
+    *,
+    start: dict[str, float],
+    tolerance_mm: float,
+    steps_per_mm: dict[str, float],
+    max_steps: dict[str, float],
+) -> tuple[list[GcodeMove], float]:
+    """Merge runs of nearly collinear moves; see the module docstring.
+
+    A run is consecutive moves at one feed rate. Moves whose line set its own
+    A/B/C speeds are never merged, since those speeds belong to that segment.
+    """
+    result: list[GcodeMove] = []
+    deviation = 0.0
+    position = dict(start)
+    index = 0
+    while index < len(moves):
+        end = index + 1
+        if move_feeds[index] is not None:
+            while end < len(moves) and move_feeds[end] == move_feeds[index]:
+                end += 1
+        run = moves[index:end]
+        points = [tuple(position[axis] for axis in AXES)] + [
+            move.point for move in run
+        ]
+        kept, run_deviation = _douglas_peucker(points, tolerance_mm)
+        deviation = max(deviation, run_deviation)
+        for previous, current in zip(kept, kept[1:]):
+            move = run[current - 1]
+            if current == previous + 1:
+                result.append(move)
+                continue
+            speeds, distance, move_clamped = _resolve_speeds(
+                start=dict(zip(AXES, points[previous])),
+                target=move.target,
+                feed_mm_per_min=float(move_feeds[index]),  # type: ignore[arg-type]
+                steps_per_mm=steps_per_mm,
+                max_steps=max_steps,
+                explicit={},
+                line_number=move.line_number,
+            )
+            first_line = run[previous].line_number
+            result.append(
+                GcodeMove(
+                    line_number=move.line_number,
+                    source=f"{move.source} (merged lines {first_line}-{move.line_number})",
+                    point=move.point,
+                    axis_speeds=(speeds["x"], speeds["y"], speeds["z"]),
+                    distance_mm=distance,
+                    clamped_axes=move_clamped,
+                )
+            )
+        position = run[-1].target
+        index = end
+    return result, deviation
+
+
 def _validated_feed(value: float, line_number: int) -> float:
     if not GCODE_MIN_FEED_MM_PER_MIN <= value <= GCODE_MAX_FEED_MM_PER_MIN:
         raise GcodeError(
@@ -407,24 +916,64 @@ def _lua_number(value: float) -> str:
     return text or "0"
 
 
-def lua_chunks(moves: list[GcodeMove]) -> list[str]:
+def chunk_moves(
+    moves: list[GcodeMove],
+    *,
+    move_seconds: Sequence[float] | None = None,
+    target_seconds: float = GCODE_CHUNK_TARGET_SECONDS,
+) -> list[list[GcodeMove]]:
+    """Group moves into the batches that each become one Lua node.
+
+    Without ``move_seconds`` every batch holds ``GCODE_CALLS_PER_LUA_CHUNK``
+    moves. With a duration per move, a batch grows until the next move would
+    take it past ``target_seconds`` (or it reaches
+    ``GCODE_MAX_CALLS_PER_LUA_CHUNK``), so each acknowledgement covers about
+    the same amount of motion however long the segments are. A single move
+    longer than the target is a batch of its own.
+    """
+    if move_seconds is None:
+        return [
+            moves[index : index + GCODE_CALLS_PER_LUA_CHUNK]
+            for index in range(0, len(moves), GCODE_CALLS_PER_LUA_CHUNK)
+        ]
+    batches: list[list[GcodeMove]] = []
+    batch: list[GcodeMove] = []
+    elapsed = 0.0
+    for move, seconds in zip(moves, move_seconds):
+        if batch and (
+            elapsed + seconds > target_seconds or len(batch) >= GCODE_MAX_CALLS_PER_LUA_CHUNK
+        ):
+            batches.append(batch)
+            batch, elapsed = [], 0.0
+        batch.append(move)
+        elapsed += seconds
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def lua_source(batch: list[GcodeMove]) -> str:
+    """Render one batch of moves as the Lua source of one node."""
+    statements = []
+    for move in batch:
+        params = ", ".join(
+            f"{word} = {_lua_number(value)}" for word, value in move.params().items()
+        )
+        statements.append(f'gcode("G00", {{ {params} }})')
+    return "\n".join(statements)
+
+
+def lua_chunks(
+    moves: list[GcodeMove], *, move_seconds: Sequence[float] | None = None
+) -> list[str]:
     """Render moves as Lua source, split into bounded chunks.
 
     ``gcode()`` blocks until the firmware answers, so a whole shape in one Lua
     node would hold a single RPC open for the entire run. Chunking bounds each
-    acknowledgement and gives the caller real progress between them.
+    acknowledgement and gives the caller real progress between them; see
+    :func:`chunk_moves` for how the chunks are sized.
     """
-    chunks: list[str] = []
-    for index in range(0, len(moves), GCODE_CALLS_PER_LUA_CHUNK):
-        batch = moves[index : index + GCODE_CALLS_PER_LUA_CHUNK]
-        statements = []
-        for move in batch:
-            params = ", ".join(
-                f"{word} = {_lua_number(value)}" for word, value in move.params().items()
-            )
-            statements.append(f'gcode("G00", {{ {params} }})')
-        chunks.append("\n".join(statements))
-    return chunks
+    return [lua_source(batch) for batch in chunk_moves(moves, move_seconds=move_seconds)]
 
 
 def lua_node(source: str) -> dict[str, Any]:
@@ -0,0 +1,189 @@
+"""Per-bot motion job queue.
+
+Only one thing may drive the gantry at a time. Soil captures, photo-grid
+repairs, raw G-code runs, adaptive weeding runs, a soil batch's final
+restore and the return of a held rotary tool are all queued on one
+:class:`MotionJobScheduler` per bot and run back to back, highest priority
+first and first-come first-served within a priority. A caller that used to
+be refused with "FarmBot is busy" now gets a queued job it can poll or
+cancel.
+
+The run record a caller polls *is* the queue entry. The scheduler writes
+``job_id``, ``job_kind``, ``priority``, ``queue_position``,
+``estimated_start_at``, ``estimated_duration_seconds`` and
+``estimated_finish_at`` onto it and keeps them current as jobs ahead of it
+start, finish or are cancelled, so the existing ``get_vision_*`` services
+report queue state without a separate lookup. Durations come from the
+manager's motion model (see motion.py).
+
+The scheduler only orders access. Checking that the bot is connected,
+unlocked and idle when a job's turn comes, and cancelling the task that runs
+it, is the manager's job.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable
+
+from homeassistant.util import dt as dt_util
+
+from .const import MOTION_JOB_MAX_QUEUED
+
+
+class MotionJobQueueFull(ValueError):
+    """Too many motion jobs are already waiting for this bot."""
+
+
+@dataclass(order=True)
+class _Job:
+    sort_key: tuple[int, int]
+    job_id: str = field(compare=False)
+    record: dict[str, Any] = field(compare=False)
+    estimated_seconds: float = field(compare=False)
+    granted: asyncio.Future | None = field(default=None, compare=False)
+    started_at: datetime | None = field(default=None, compare=False)
+    discarded: bool = field(default=False, compare=False)
+
+
+class MotionJobScheduler:
+    """A priority queue that hands the gantry to one job at a time."""
+
+    def __init__(self, *, clock: Callable[[], datetime] = dt_util.utcnow) -> None:
+        self._clock = clock
+        self._heap: list[_Job] = []
+        self._jobs: dict[str, _Job] = {}
+        self._sequence = itertools.count()
+        self._running: _Job | None = None
+
+    @property
+    def active(self) -> bool:
+        """Is a job running or waiting?"""
+        return bool(self._jobs)
+
+    def enqueue(
+        self,
+        record: dict[str, Any],
+        *,
+        job_id: str,
+        kind: str,
+        priority: int,
+        estimated_seconds: float,
+    ) -> None:
+        """Add ``record`` to the queue and annotate it with its place in line."""
+        if sum(1 for job in self._jobs.values() if job is not self._running) >= (
+            MOTION_JOB_MAX_QUEUED
+        ):
+            raise MotionJobQueueFull(
+                f"FarmBot already has {MOTION_JOB_MAX_QUEUED} motion jobs waiting"
+            )
+        record.update(
+            job_id=job_id,
+            job_kind=kind,
+            priority=int(priority),
+            queue_position=None,
+            estimated_start_at=None,
+            estimated_duration_seconds=round(max(0.0, estimated_seconds)),
+            estimated_finish_at=None,
+        )
+        job = _Job(
+            sort_key=(-int(priority), next(self._sequence)),
+            job_id=job_id,
+            record=record,
+            estimated_seconds=max(0.0, estimated_seconds),
+        )
+        self._jobs[job_id] = job
+        heapq.heappush(self._heap, job)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def turn(self, job_id: str) -> AsyncIterator[None]:
+        """Wait until ``job_id`` holds the gantry, and release it afterwards."""
+        job = self._jobs[job_id]
+        if self._running is not job:
+            job.granted = asyncio.get_running_loop().create_future()
+            await job.granted
+        job.started_at = self._clock()
+        self._refresh()
+        try:
+            yield
+        finally:
+            self.discard(job_id)
+
+    def discard(self, job_id: str) -> None:
+        """Forget ``job_id`` whether it is waiting or running. Idempotent."""
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return
+        job.discarded = True
+        job.record["queue_position"] = None
+        if self._running is job:
+            self._running = None
+        self._dispatch()
+
+    def is_waiting(self, job_id: str) -> bool:
+        """Is ``job_id`` queued but not yet holding the gantry?"""
+        job = self._jobs.get(job_id)
+        return job is not None and job is not self._running
+
+    def snapshot(self) -> dict[str, Any]:
+        """The running job and the waiting jobs in the order they will run."""
+        return {
+            "running": _summary(self._running.record) if self._running else None,
+            "queued": [_summary(job.record) for job in self._waiting()],
+        }
+
+    def _waiting(self) -> list[_Job]:
+        return sorted(job for job in self._heap if not job.discarded and job is not self._running)
+
+    def _dispatch(self) -> None:
+        if self._running is None:
+            while self._heap:
+                job = heapq.heappop(self._heap)
+                if job.discarded:
+                    continue
+                self._running = job
+                job.record["queue_position"] = None
+                if job.granted is not None and not job.granted.done():
+                    job.granted.set_result(None)
+                break
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Recompute queue positions and estimated start and finish times."""
+        now = self._clock()
+        cursor = now
+        running = self._running
+        if running is not None:
+            started = running.started_at or now
+            cursor = max(now, started + timedelta(seconds=running.estimated_seconds))
+            if running.started_at is None:
+                running.record["estimated_start_at"] = now.isoformat()
+            running.record["estimated_finish_at"] = cursor.isoformat()
+        for position, job in enumerate(self._waiting(), start=1):
+            job.record["queue_position"] = position
+            job.record["estimated_start_at"] = cursor.isoformat()
+            cursor += timedelta(seconds=job.estimated_seconds)
+            job.record["estimated_finish_at"] = cursor.isoformat()
+
+
+def _summary(record: dict[str, Any]) -> dict[str, Any]:
+    return {
+        key: record.get(key)
+        for key in (
+            "job_id",
+            "job_kind",
+            "priority",
+            "status",
+            "message",
+            "queue_position",
+            "estimated_start_at",
+            "estimated_duration_seconds",
+            "estimated_finish_at",
+        )
+    }
@@ -0,0 +1,117 @@
+"""Rolling latency histograms for FarmBot RPCs and outbound publishes.
+
+A slow photo-grid cell can come from the MQTT broker, FarmBot OS executing
+the command, the camera or the image upload. Timing each ``rpc_request``
+from the moment it is published to the moment its ``rpc_ok``/``rpc_error``
+arrives, split by CeleryScript kind and outcome, separates the first two from
+the rest and makes regressions after a FarmBot OS upgrade visible.
+
+Histograms are rolling: they describe the last ``RPC_LATENCY_WINDOW`` samples
+of each series, so an old outlier ages out instead of skewing the
+percentiles forever. Everything here is in-memory and reset on restart.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Any, Iterable
+
+from .const import RPC_LATENCY_BUCKETS_MS, RPC_LATENCY_WINDOW
+
+# CeleryScript kinds traced individually; everything else is "other".
+TRACED_RPC_KINDS = ("move", "take_photo", "read_status", "lua", "write_pin")
+RPC_OUTCOMES = ("ok", "error", "timeout", "cancelled")
+
+
+def rpc_kind(commands: Iterable[dict[str, Any]]) -> str:
+    """The traced kind of an ``rpc_request`` body: its first traced command."""
+    for item in commands:
+        kind = item.get("kind") if isinstance(item, dict) else None
+        if kind in TRACED_RPC_KINDS:
+            return kind
+    return "other"
+
+
+class RollingHistogram:
+    """Bucket counts and percentiles over the most recent samples."""
+
+    __slots__ = ("_samples", "_bounds", "total")
+
+    def __init__(
+        self,
+        window: int = RPC_LATENCY_WINDOW,
+        bounds_ms: tuple[float, ...] = RPC_LATENCY_BUCKETS_MS,
+    ) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._bounds = bounds_ms
+        self.total = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, value_ms: float) -> None:
+        self._samples.append(max(0.0, float(value_ms)))
+        self.total += 1
+
+    def percentile(self, fraction: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return _nearest_rank(ordered, fraction)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Summary of the current window, rounded to 0.1 ms."""
+        ordered = sorted(self._samples)
+        if not ordered:
+            return {"samples": 0, "total": self.total}
+        buckets: dict[str, int] = {}
+        index = 0
+        for bound in self._bounds:
+            count = 0
+            while index < len(ordered) and ordered[index] <= bound:
+                count += 1
+                index += 1
+            buckets[f"le_{bound:g}"] = count
+        buckets["le_inf"] = len(ordered) - index
+        return {
+            "samples": len(ordered),
+            "total": self.total,
+            "mean": round(sum(ordered) / len(ordered), 1),
+            "p50": round(_nearest_rank(ordered, 0.5), 1),
+            "p90": round(_nearest_rank(ordered, 0.9), 1),
+            "p95": round(_nearest_rank(ordered, 0.95), 1),
+            "p99": round(_nearest_rank(ordered, 0.99), 1),
+            "max": round(ordered[-1], 1),
+            "buckets": buckets,
+        }
+
+
+def _nearest_rank(ordered: list[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class RpcLatencyTracker:
+    """Publish-to-acknowledgement latency by CeleryScript kind and outcome."""
+
+    def __init__(self, window: int = RPC_LATENCY_WINDOW) -> None:
+        self._window = window
+        self._series: dict[tuple[str, str], RollingHistogram] = {}
+
+    def record(self, kind: str, outcome: str, value_ms: float) -> None:
+        key = (kind, outcome)
+        histogram = self._series.get(key)
+        if histogram is None:
+            histogram = self._series[key] = RollingHistogram(self._window)
+        histogram.record(value_ms)
+
+    def histogram(self, kind: str, outcome: str = "ok") -> RollingHistogram | None:
+        return self._series.get((kind, outcome))
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """``{kind: {outcome: summary}}`` for every series seen so far."""
+        result: dict[str, dict[str, Any]] = {}
+        for (kind, outcome), histogram in sorted(self._series.items()):
+            result.setdefault(kind, {})[outcome] = histogram.snapshot()
+        return result
@@ -1,4 +1,6 @@
 import asyncio
+import functools
+import itertools
 import json
 import logging
 import math
@@ -7,7 +9,7 @@ import ssl
 import time
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional, Tuple
+from typing import Any, Awaitable, Callable, Optional, Tuple
 
 import paho.mqtt.client as mqtt
 import requests
@@ -15,28 +17,48 @@ from homeassistant.helpers import aiohttp_client
 from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.util import dt as dt_util
 
+from . import capture_lua, motion, routing, soil_surface, spatial, toolpath, vision, weeding_lua
 from . import gcode as gcode_lib
-from . import vision
 from .api import FarmbotApiClient, FarmbotApiError
 from .const import (
     API_BASE_URL,
+    CAPTURE_ENGINES,
+    CAPTURE_HARDWARE_IDLE_SECONDS,
+    CAPTURE_LUA_REPORT_GRACE_SECONDS,
+    CAPTURE_LUA_SECONDS_PER_STOP,
+    DEFAULT_COORDINATE_DEADBAND_MM,
+    DEFAULT_COORDINATE_MIN_INTERVAL_SECONDS,
     DEFAULT_VISION_ENABLED,
     DEFAULT_VISION_HEARTBEAT_TIMEOUT_MINUTES,
     EVENT_BUTTON_INPUT,
     EVENT_VISION_REQUEST,
-    GCODE_CHUNK_RPC_TIMEOUT_SECONDS,
     GCODE_DEFAULT_FEED_MM_PER_MIN,
+    GCODE_PIPELINE_DEPTH,
+    GCODE_PLAN_CACHE_SIZE,
+    GCODE_START_POSITION_TOLERANCE_MM,
     GRID_REPAIR_COORDINATE_TOLERANCE_MM,
     GRID_REPAIR_FLAT_TRAVEL_TOP_MARGIN_MM,
     GRID_REPAIR_IMAGE_TIMEOUT_SECONDS,
     GRID_REPAIR_LIGHTING_PIN,
     GRID_REPAIR_MAX_CONSECUTIVE_FAILURES,
     GRID_REPAIR_MAX_PHOTO_ATTEMPTS,
+    GRID_REPAIR_MAX_REUSE_SECONDS,
+    GRID_REPAIR_PIPELINE_DEPTH,
     GRID_REPAIR_POSITION_TIMEOUT_SECONDS,
     GRID_REPAIR_POSITION_TOLERANCE_MM,
+    GRID_REPAIR_ROUTE_TIME_BUDGET_SECONDS,
+    GRID_REPAIR_Z_CLUSTER_SPAN_MM,
+    MOTION_JOB_DEFAULT_PRIORITY,
+    MOTION_JOB_ESTIMATE_BASE_SECONDS,
+    MOTION_JOB_ESTIMATE_SECONDS_PER_PHOTO,
+    MOTION_JOB_ESTIMATE_SECONDS_PER_PIPELINED_PHOTO,
+    MOTION_JOB_IDLE_TIMEOUT_SECONDS,
     MQTT_PORT,
+    OPTION_COORDINATE_DEADBAND_MM,
+    OPTION_COORDINATE_MIN_INTERVAL_SECONDS,
     OPTION_VISION_ENABLED,
     OPTION_VISION_HEARTBEAT_TIMEOUT_MINUTES,
+    RPC_LATENCY_MAX_OUTSTANDING,
     SIGNAL_BUTTON_INPUT,
     SIGNAL_SEQUENCE_SELECTED,
     SIGNAL_STATE,
@@ -49,17 +71,28 @@ from .const import (
     SOIL_CAPTURE_POSITION_TOLERANCE_MM,
     SOIL_CAPTURE_SETTLE_MILLISECONDS,
     SOIL_RPC_TIMEOUT_SECONDS,
+    SOIL_SURFACE_CELL_MM,
+    SOIL_SURVEY_MAX_POINTS,
+    SOIL_SURVEY_ROUTE_TIME_BUDGET_SECONDS,
     TOKEN_REFRESH_WINDOW,
+    TOOL_VERIFICATION_PIN,
     TOPIC_COMMAND,
     TOPIC_FROM_DEVICE,
     TOPIC_LOGS,
     TOPIC_STATUS,
+    WEEDING_LUA_REPORT_GRACE_SECONDS,
     WEEDING_MAX_ATTEMPTS,
     WEEDING_MAX_PATH_MM,
-    WEEDING_RPC_TIMEOUT_SECONDS,
+    WEEDING_MAX_WEEDS_PER_RUN,
+    WEEDING_ROUTE_TIME_BUDGET_SECONDS,
 )
 from .image_utils import inspect_capture_image
+from .jobs import MotionJobQueueFull, MotionJobScheduler
 from .jwt_util import decode_jwt_payload
+from .latency import RpcLatencyTracker, rpc_kind
+from .outbound import OutboundCommandScheduler
+from .recent_images import RecentImages
+from .runs import RunRecords, RunRecordStore
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -68,6 +101,9 @@ _PIN_BINDING_FAILURE_RE = re.compile(
     r"^(?:Failed to find associated Sequence for:|Unknown PinBinding:)\s*(?P<label>.+)$"
 )
 _BUTTON_PIN_RE = re.compile(r"\(Pi (?P<pin>\d+)\)|Pi GPIO (?P<gpio>\d+)")
+# Gantry jobs that decide for themselves what happens to a held rotary tool;
+# any other job has it returned to its slot before it starts.
+_TOOL_AWARE_JOB_KINDS = ("weeding", "tool_dismount")
 
 
 def _mask(s: str, keep_start: int = 4, keep_end: int = 4) -> str:
@@ -153,19 +189,52 @@ class FarmbotManager:
         self._known_ready_vision_image_ids: Optional[set[int]] = None
         self._vision_image_monitor_started_at = dt_util.utcnow()
         self._pending_rpcs: dict[str, asyncio.Future] = {}
-        self._soil_capture_lock = asyncio.Lock()
-        self.soil_captures: dict[str, dict[str, Any]] = {}
+        self._outbound = OutboundCommandScheduler(
+            self._publish_rpc,
+            on_failed=self._outbound_failed,
+            on_wakeup=self._schedule_outbound_pump,
+        )
+        self._outbound_timer: Optional[asyncio.TimerHandle] = None
+        self.rpc_latency = RpcLatencyTracker()
+        self._rpc_published_at: dict[str, tuple[str, float]] = {}
+        self._motion_jobs = MotionJobScheduler()
+        self._motion_job_tasks: dict[str, asyncio.Task] = {}
+        # Lighting and park position held across consecutive capture runs
+        # (see _acquire_capture_hardware).
+        self._capture_hardware: dict[str, Any] | None = None
+        # The rotary tool a finished weeding run left mounted, and the timer
+        # that returns it to its slot (see _hold_rotary_tool).
+        self._tool_lease: dict[str, Any] | None = None
+        # Interpolated soil heights, kept in step with the soil points every
+        # time they are fetched or written (see soil_surface.py).
+        self._soil_surface: soil_surface.SoilSurface | None = None
+        # Replaced with the bot's own firmware config whenever a job is
+        # started; factory defaults until then.
+        self._motion = motion.MotionModel(None)
+        self._runs = RunRecordStore(hass, self.entry_id)
+        self.soil_captures: RunRecords = self._runs.kinds["soil_captures"]
+        self.soil_surveys: RunRecords = self._runs.kinds["soil_surveys"]
         self._soil_capture_tasks: set[asyncio.Task] = set()
-        self._soil_capture_task_batches: dict[asyncio.Task, str | None] = {}
         self._soil_capture_batches: dict[str, dict[str, Any]] = {}
         self._soil_batch_finish_tasks: dict[str, asyncio.Task] = {}
         self._soil_batch_finish_results: dict[str, dict[str, str]] = {}
         self._claimed_soil_image_ids: set[int] = set()
-        self.grid_repairs: dict[str, dict[str, Any]] = {}
+        # Report lines of on-bot Lua captures in progress, by run tag.
+        self._lua_capture_reports: dict[str, dict[int, capture_lua.CaptureReport]] = {}
+        # Per-weed reports of batched weeding Lua in progress, by run tag.
+        self._lua_weeding_reports: dict[str, dict[int, weeding_lua.WeedReport]] = {}
+        self.grid_repairs: RunRecords = self._runs.kinds["grid_repairs"]
         self._grid_repair_tasks: set[asyncio.Task] = set()
-        self.gcode_runs: dict[str, dict[str, Any]] = {}
+        # Fed by every image listing; photo-grid repairs reuse fresh matches.
+        self._recent_images = RecentImages(
+            cell_mm=GRID_REPAIR_COORDINATE_TOLERANCE_MM,
+            max_age=timedelta(seconds=GRID_REPAIR_MAX_REUSE_SECONDS),
+        )
+        self.gcode_runs: RunRecords = self._runs.kinds["gcode_runs"]
         self._gcode_tasks: set[asyncio.Task] = set()
-        self.weeding_runs: dict[str, dict[str, Any]] = {}
+        # Validated G-code programs by plan ID, oldest first.
+        self._gcode_plans: dict[str, gcode_lib.GcodePlan] = {}
+        self.weeding_runs: RunRecords = self._runs.kinds["weeding_runs"]
         self._weeding_tasks: set[asyncio.Task] = set()
 
     # -------------------- Token Refresh --------------------
@@ -382,6 +451,12 @@ class FarmbotManager:
             state = payload.get("body", payload) or {}
             self.status = state
             self._status_revision += 1
+            info = state.get("informational_settings") or {}
+            if info.get("locked") and self._capture_hardware is not None:
+                # Nothing deferred may move the gantry after an emergency stop.
+                self.hass.loop.call_soon_threadsafe(
+                    self._drop_capture_hardware, "FarmBot was emergency-stopped"
+                )
             # Paho callback thread -> HA loop:
             self.hass.loop.call_soon_threadsafe(
                 async_dispatcher_send, self.hass, SIGNAL_STATE, self.status
@@ -394,8 +469,24 @@ class FarmbotManager:
             _LOGGER.debug("Unhandled topic %s", msg.topic)
 
     def _handle_log_message(self, payload: dict[str, Any]) -> None:
-        """Turn FarmBot OS PinBinding trigger logs into durable HA diagnostics."""
+        """Turn FarmBot OS PinBinding trigger logs into durable HA diagnostics.
+
+        Progress reports of on-bot Lua captures and weeding runs arrive here
+        too and are handed to the run waiting for them.
+        """
         message = str(payload.get("message") or "").strip()
+        report = capture_lua.parse_report(message)
+        if report is not None:
+            reports = self._lua_capture_reports.get(report.tag)
+            if reports is not None:
+                reports[report.number] = report
+            return
+        weed_report = weeding_lua.parse_report(message)
+        if weed_report is not None:
+            weed_reports = self._lua_weeding_reports.get(weed_report.tag)
+            if weed_reports is not None:
+                weed_reports[weed_report.number] = weed_report
+            return
         trigger = _PIN_BINDING_TRIGGER_RE.match(message)
         failure = _PIN_BINDING_FAILURE_RE.match(message)
         if trigger is None and failure is None:
@@ -441,6 +532,18 @@ class FarmbotManager:
         topic = TOPIC_COMMAND.format(device_id=self.device_id)
         _LOGGER.debug("Publishing RPC to %s: %s", topic, rpc)
         self._mqtt.publish(topic, json.dumps(rpc))
+        label = str(rpc["args"]["label"])
+        self._rpc_published_at[label] = (rpc_kind(rpc.get("body") or []), time.monotonic())
+        while len(self._rpc_published_at) > RPC_LATENCY_MAX_OUTSTANDING:
+            self._rpc_published_at.pop(next(iter(self._rpc_published_at)))
+
+    def _trace_rpc_outcome(self, label: str, outcome: str) -> None:
+        """Record publish-to-answer latency for ``label`` if it was published."""
+        published = self._rpc_published_at.pop(label, None)
+        if published is None:
+            return
+        kind, published_at = published
+        self.rpc_latency.record(kind, outcome, (time.monotonic() - published_at) * 1000.0)
 
     def send_rpc_request(
         self, commands: list, priority: int = 600, label: str | None = None
@@ -452,14 +555,74 @@ class FarmbotManager:
             "args": {"label": label, "priority": priority},
             "body": commands,
         }
-        self._publish_rpc(rpc)
+        self._outbound.submit(rpc, awaited=label in self._pending_rpcs)
         return label
 
+    def rpc_latency_snapshot(self) -> dict[str, dict[str, Any]]:
+        """Rolling publish-to-acknowledgement histograms by kind and outcome."""
+        return self.rpc_latency.snapshot()
+
+    def outbound_metrics(self) -> dict[str, Any]:
+        """Per-lane queue depth, in-flight counts and publish latency."""
+        return self._outbound.metrics()
+
+    async def async_load_run_records(self) -> None:
+        """Restore the run records persisted before the last restart."""
+        await self._runs.async_load()
+
+    def recent_runs(self, limit: int = 10) -> dict[str, list[dict[str, Any]]]:
+        """The newest ``limit`` records of each run kind, newest first."""
+        return {
+            kind: [
+                {
+                    key: record.get(key)
+                    for key in (
+                        "capture_id",
+                        "survey_id",
+                        "repair_id",
+                        "run_id",
+                        "status",
+                        "message",
+                        "created_at",
+                        "completed_at",
+                    )
+                    if key in record
+                }
+                for record in records.recent(limit)
+            ]
+            for kind, records in self._runs.kinds.items()
+        }
+
+    def connection_state(self) -> dict[str, bool]:
+        """Whether the bot is reachable over MQTT and whether it is emergency-stopped."""
+        return self._live_connection_state()
+
+    def _outbound_failed(self, label: str, err: Exception) -> None:
+        """A queued request was discarded or could not be published."""
+        self.hass.loop.call_soon_threadsafe(self._fail_pending_rpc, label, err)
+
+    def _fail_pending_rpc(self, label: str, err: Exception) -> None:
+        future = self._pending_rpcs.get(label)
+        if future is not None and not future.done():
+            future.set_exception(err)
+
+    def _schedule_outbound_pump(self, delay: float) -> None:
+        """Re-run the outbound scheduler once a stale in-flight slot can expire."""
+
+        def arm() -> None:
+            if self._outbound_timer is not None:
+                self._outbound_timer.cancel()
+            self._outbound_timer = self.hass.loop.call_later(delay, self._outbound.pump)
+
+        self.hass.loop.call_soon_threadsafe(arm)
+
     def _resolve_rpc_response(self, payload: dict[str, Any]) -> None:
         """Resolve an acknowledged RPC on the HA event-loop thread."""
         if payload.get("kind") not in {"rpc_ok", "rpc_error"}:
             return
         label = str((payload.get("args") or {}).get("label") or "")
+        self._trace_rpc_outcome(label, "ok" if payload.get("kind") == "rpc_ok" else "error")
+        self._outbound.acknowledge(label)
         future = self._pending_rpcs.pop(label, None)
         if future is None or future.done():
             return
@@ -492,8 +655,15 @@ class FarmbotManager:
         try:
             self.send_rpc_request(commands, priority=priority, label=label)
             return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            self._trace_rpc_outcome(label, "timeout")
+            raise
+        except asyncio.CancelledError:
+            self._trace_rpc_outcome(label, "cancelled")
+            raise
         finally:
             self._pending_rpcs.pop(label, None)
+            self._outbound.release(label)
 
     def send_write_pin(self, pin: int, value: int):
         cs = [
@@ -669,6 +839,254 @@ class FarmbotManager:
             "locked": bool(info.get("locked", False)),
         }
 
+    # -------------------- Motion job queue --------------------
+    def _queue_motion_job(
+        self,
+        *,
+        job_id: str,
+        kind: str,
+        record: dict[str, Any],
+        priority: int,
+        estimated_seconds: float,
+        tasks: set[asyncio.Task] | None,
+        run: Callable[[], Awaitable[None]],
+    ) -> asyncio.Task:
+        """Queue ``run`` behind every other gantry job; ``record`` is its queue entry."""
+        self._motion_jobs.enqueue(
+            record,
+            job_id=job_id,
+            kind=kind,
+            priority=priority,
+            estimated_seconds=estimated_seconds,
+        )
+        task = asyncio.create_task(
+            self._run_motion_job(job_id, record, run), name=f"farmbot-{kind}-{job_id}"
+        )
+        self._motion_job_tasks[job_id] = task
+        if tasks is not None:
+            tasks.add(task)
+
+        def finished(done: asyncio.Task) -> None:
+            if tasks is not None:
+                tasks.discard(done)
+            self._motion_job_tasks.pop(job_id, None)
+            self._motion_jobs.discard(job_id)
+            if done.cancelled():
+                record.update(
+                    status="cancelled",
+                    message="Cancelled",
+                    completed_at=dt_util.utcnow().isoformat(),
+                )
+            self._runs.schedule_save()
+
+        task.add_done_callback(finished)
+        return task
+
+    async def _run_motion_job(
+        self, job_id: str, record: dict[str, Any], run: Callable[[], Awaitable[None]]
+    ) -> None:
+        async with self._motion_jobs.turn(job_id):
+            problem = await self._wait_until_ready_for_motion(record)
+            if problem is None and record.get("job_kind") not in _TOOL_AWARE_JOB_KINDS:
+                problem = await self._release_tool_lease()
+            if problem is not None:
+                _LOGGER.warning(
+                    "FarmBot %s job %s not started: %s", record.get("job_kind"), job_id, problem
+                )
+                record.update(
+                    status="failed", message=problem, completed_at=dt_util.utcnow().isoformat()
+                )
+                return
+            await run()
+
+    async def _wait_until_ready_for_motion(self, record: dict[str, Any]) -> str | None:
+        """Wait for the bot to go idle; return why the job cannot start, if it cannot."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + MOTION_JOB_IDLE_TIMEOUT_SECONDS
+        while True:
+            connection = self._live_connection_state()
+            if not connection["connected"]:
+                return "FarmBot is not connected"
+            if connection["locked"]:
+                return "FarmBot is emergency-stopped"
+            info = (self.status or {}).get("informational_settings") or {}
+            if not info.get("busy", False):
+                return None
+            if loop.time() >= deadline:
+                return "FarmBot stayed busy with another activity"
+            record["message"] = "Waiting for FarmBot to finish its current activity"
+            await asyncio.sleep(1)
+
+    def motion_job_queue(self) -> dict[str, Any]:
+        """The running gantry job and the queued ones, in the order they will run."""
+        return self._motion_jobs.snapshot()
+
+    def cancel_motion_job(self, job_id: str) -> bool:
+        """Cancel a queued or running gantry job. False if it is not active."""
+        task = self._motion_job_tasks.get(job_id)
+        if task is None or task.done():
+            return False
+        if self._motion_jobs.is_waiting(job_id):
+            # Nothing has moved yet, so the line can close up right away; a
+            # running job keeps the gantry until its task has unwound.
+            self._motion_jobs.discard(job_id)
+        task.cancel()
+        return True
+
+    # -------------------- Capture lighting and park lease --------------------
+    def _pin_is_on(self, pin: int) -> bool:
+        state = (self.status or {}).get("pins", {}).get(str(pin), 0)
+        return bool(state.get("value", 0) if isinstance(state, dict) else state)
+
+    async def _acquire_capture_hardware(
+        self, *, lighting_pin: int, park: dict[str, Any] | None
+    ) -> None:
+        """Claim the lighting and the park position for a capture run.
+
+        The first run of a chain records where the gantry was parked; later
+        runs that start within CAPTURE_HARDWARE_IDLE_SECONDS keep it and
+        cancel the pending restore. The light is switched on whenever the
+        status stream shows it off, and only a light this lease switched on
+        is switched off again.
+        """
+        lease = self._capture_hardware
+        if lease is None:
+            lease = self._capture_hardware = {
+                "lights": {},
+                "park": None,
+                "timer": None,
+                "restore_job": None,
+            }
+        self._cancel_capture_hardware_restore(lease)
+        if lease["park"] is None and park is not None:
+            if all(park.get(axis) is not None for axis in ("x", "y", "z")):
+                lease["park"] = {axis: float(park[axis]) for axis in ("x", "y", "z")}
+        if self._pin_is_on(lighting_pin):
+            lease["lights"].setdefault(lighting_pin, False)
+            return
+        await self.async_rpc_request(
+            [
+                {
+                    "kind": "write_pin",
+                    "args": {"pin_number": lighting_pin, "pin_value": 1, "pin_mode": 0},
+                }
+            ],
+            timeout=SOIL_RPC_TIMEOUT_SECONDS,
+        )
+        lease["lights"][lighting_pin] = True
+        _LOGGER.info("Switched lighting pin %d on for capture", lighting_pin)
+
+    def _release_capture_hardware(self) -> None:
+        """A capture run is done: restore once no other run starts in time."""
+        lease = self._capture_hardware
+        if lease is None:
+            return
+        self._cancel_capture_hardware_restore(lease)
+        lease["timer"] = self.hass.loop.call_later(
+            CAPTURE_HARDWARE_IDLE_SECONDS, self._capture_hardware_idle
+        )
+
+    def _cancel_capture_hardware_restore(self, lease: dict[str, Any]) -> None:
+        if lease["timer"] is not None:
+            lease["timer"].cancel()
+            lease["timer"] = None
+        if lease["restore_job"] is not None:
+            self.cancel_motion_job(lease["restore_job"])
+            lease["restore_job"] = None
+
+    def _capture_hardware_idle(self) -> None:
+        """Queue the restore: driving back to the park position needs the gantry."""
+        lease = self._capture_hardware
+        if lease is None:
+            return
+        lease["timer"] = None
+        job_id = str(uuid.uuid4())
+        record: dict[str, Any] = {
+            "status": "queued",
+            "message": "Lighting and park position restore queued",
+        }
+        try:
+            self._queue_motion_job(
+                job_id=job_id,
+                kind="capture_restore",
+                record=record,
+                priority=MOTION_JOB_DEFAULT_PRIORITY,
+                estimated_seconds=MOTION_JOB_ESTIMATE_BASE_SECONDS,
+                tasks=None,
+                run=lambda: self._restore_capture_hardware(record),
+            )
+        except MotionJobQueueFull as err:
+            _LOGGER.warning("Could not queue the capture restore, retrying later: %s", err)
+            lease["timer"] = self.hass.loop.call_later(
+                CAPTURE_HARDWARE_IDLE_SECONDS, self._capture_hardware_idle
+            )
+            return
+        lease["restore_job"] = job_id
+
+    async def _restore_capture_hardware(self, record: dict[str, Any]) -> None:
+        """Switch off the lights the lease switched on and drive back to park."""
+        lease, self._capture_hardware = self._capture_hardware, None
+        if lease is None:
+            record.update(status="complete", message="Nothing to restore")
+            return
+        record.update(status="running", message="Restoring lighting and the park position")
+        await self._switch_off_lease_lights(lease)
+        park = lease["park"]
+        if park is not None:
+            try:
+                await self.async_rpc_request(
+                    [self._move_command(**park, speed=100, safe_z=True)],
+                    timeout=self._move_timeout(park, safe_z=True),
+                )
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.warning("Could not restore FarmBot position after capture: %s", err)
+        record.update(
+            status="complete",
+            message="Lighting and park position restored",
+            completed_at=dt_util.utcnow().isoformat(),
+        )
+
+    def _drop_capture_hardware(self, reason: str) -> None:
+        """Forget the lease without touching the hardware.
+
+        After an emergency stop nothing may move on its own once the bot is
+        unlocked, so the pending restore is cancelled, not deferred.
+        """
+        lease, self._capture_hardware = self._capture_hardware, None
+        if lease is None:
+            return
+        self._cancel_capture_hardware_restore(lease)
+        _LOGGER.info("Dropped the capture lighting and park lease: %s", reason)
+
+    async def async_release_capture_hardware(self) -> None:
+        """On unload: switch off lighting the lease switched on, leave the gantry.
+
+        Runs before MQTT disconnects. The gantry is not driven back: nothing
+        could supervise the move once the integration is gone.
+        """
+        lease = self._capture_hardware
+        if lease is None:
+            return
+        self._drop_capture_hardware("integration is unloading")
+        await self._switch_off_lease_lights(lease)
+
+    async def _switch_off_lease_lights(self, lease: dict[str, Any]) -> None:
+        for pin, switched_on in lease["lights"].items():
+            if not switched_on:
+                continue
+            try:
+                await self.async_rpc_request(
+                    [
+                        {
+                            "kind": "write_pin",
+                            "args": {"pin_number": pin, "pin_value": 0, "pin_mode": 0},
+                        }
+                    ],
+                    timeout=SOIL_RPC_TIMEOUT_SECONDS,
+                )
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.warning("Could not switch lighting pin %d back off: %s", pin, err)
+
     def soil_motion_state(self, firmware_config: dict[str, Any]) -> dict[str, Any]:
         info = (self.status or {}).get("informational_settings") or {}
         position = (self.status or {}).get("location_data", {}).get("position") or {}
@@ -687,7 +1105,7 @@ class FarmbotManager:
             z_bounds = None
         return {
             "connected": connection["connected"],
-            "busy": bool(info.get("busy", False)) or self._soil_capture_lock.locked(),
+            "busy": bool(info.get("busy", False)) or self._motion_jobs.active,
             "locked": connection["locked"],
             "position": {axis: position.get(axis) for axis in ("x", "y", "z")},
             "z_direction": z_direction,
@@ -698,6 +1116,52 @@ class FarmbotManager:
             },
         }
 
+    def refresh_soil_surface(
+        self,
+        points: list[dict[str, Any]],
+        firmware_config: dict[str, Any],
+        *,
+        cell_mm: float = SOIL_SURFACE_CELL_MM,
+    ) -> soil_surface.SoilSurface:
+        """The cached soil surface, brought up to date with ``points``.
+
+        The grid spans the bed's X and Y travel, or the points themselves when
+        the firmware does not give an axis length. It is only rebuilt from
+        scratch when those bounds or the cell size change.
+        """
+        ranges = []
+        for axis in ("x", "y"):
+            length = self._axis_length(firmware_config, axis)
+            if length is not None:
+                ranges.append((0.0, length))
+                continue
+            values = [float(point[axis]) for point in points]
+            ranges.append((min(values), max(values)) if values else (0.0, 0.0))
+        surface = self._soil_surface
+        if surface is None or not surface.fits(ranges[0], ranges[1], cell_mm):
+            surface = self._soil_surface = soil_surface.SoilSurface(
+                ranges[0], ranges[1], cell_mm=cell_mm
+            )
+        surface.update(points)
+        return surface
+
+    def cached_soil_surface(self, cell_mm: float | None = None) -> soil_surface.SoilSurface | None:
+        """The soil surface as last refreshed, without an API call."""
+        surface = self._soil_surface
+        if surface is not None and cell_mm is not None and surface.cell_mm != cell_mm:
+            surface = self._soil_surface = surface.regridded(cell_mm)
+        return surface
+
+    def note_soil_points(self, points: list[dict[str, Any]]) -> None:
+        """Refresh a cached soil surface from freshly fetched soil points."""
+        if self._soil_surface is not None:
+            self._soil_surface.update(points)
+
+    def note_soil_point(self, point_id: int, x: float, y: float, z: float) -> None:
+        """Fold one written soil point into a cached soil surface."""
+        if self._soil_surface is not None:
+            self._soil_surface.upsert(point_id, x, y, z)
+
     @staticmethod
     def _soil_lateral_offsets(y: float, baseline: float, y_max: float) -> list[float]:
         """Choose a centered triplet, falling back to an in-bounds one-sided set."""
@@ -753,6 +1217,30 @@ class FarmbotManager:
                 )
         return commands, frames
 
+    def _validate_soil_point(
+        self,
+        state: dict[str, Any],
+        point: dict[str, Any],
+        *,
+        capture_z: float,
+        baseline_mm: float,
+        z_offsets_mm: list[float],
+    ) -> list[float]:
+        """Check one capture point against the bot's bounds; return its laterals."""
+        bounds = state["axis_bounds"]
+        if any(bounds[axis] is None for axis in ("x", "y", "z")):
+            raise ValueError("FarmBot axis bounds are unavailable")
+        x, y = float(point["x"]), float(point["y"])
+        if not bounds["x"][0] <= x <= bounds["x"][1]:
+            raise ValueError("soil point X is outside FarmBot bounds")
+        laterals = self._soil_lateral_offsets(y, baseline_mm, bounds["y"][1])
+        z_direction = int(state["z_direction"])
+        for offset in z_offsets_mm:
+            z = capture_z + z_direction * offset
+            if not bounds["z"][0] <= z <= bounds["z"][1]:
+                raise ValueError("soil capture Z is outside FarmBot bounds")
+        return laterals
+
     def start_soil_capture(
         self,
         *,
@@ -762,61 +1250,41 @@ class FarmbotManager:
         baseline_mm: float,
         z_offsets_mm: list[float],
         batch_id: str | None = None,
+        priority: int = MOTION_JOB_DEFAULT_PRIORITY,
+        engine: str = "rpc",
     ) -> str:
-        """Create a bounded asynchronous capture session and return its ID."""
+        """Queue a bounded asynchronous capture session and return its ID.
+
+        The ``"lua"`` engine photographs every frame on the bot first (see
+        capture_lua.py); any frame it misses is captured the ordinary way.
+        """
+        if engine not in CAPTURE_ENGINES:
+            raise ValueError(f"capture engine must be one of {', '.join(CAPTURE_ENGINES)}")
         state = self.soil_motion_state(firmware_config)
         if not state["connected"]:
             raise ValueError("FarmBot is not connected")
         if state["locked"]:
             raise ValueError("FarmBot is emergency-stopped")
-        # Prune tasks whose done-callback discard hasn't run yet so a batch
-        # that just finished doesn't cause a spurious "FarmBot is busy".
-        self._soil_capture_tasks = {t for t in self._soil_capture_tasks if not t.done()}
-        self._grid_repair_tasks = {t for t in self._grid_repair_tasks if not t.done()}
-        active_soil_tasks = {task for task in self._soil_capture_tasks if not task.done()}
-        same_batch_active = bool(
-            batch_id
-            and active_soil_tasks
-            and all(
-                self._soil_capture_task_batches.get(task) == batch_id for task in active_soil_tasks
-            )
+        laterals = self._validate_soil_point(
+            state, point, capture_z=capture_z, baseline_mm=baseline_mm, z_offsets_mm=z_offsets_mm
         )
-        reported_busy = bool(
-            ((self.status or {}).get("informational_settings") or {}).get("busy", False)
-        )
-        if (
-            (reported_busy and not same_batch_active)
-            or (active_soil_tasks and not same_batch_active)
-            or any(not task.done() for task in self._grid_repair_tasks)
-        ):
-            raise ValueError("FarmBot is busy")
-        bounds = state["axis_bounds"]
-        if any(bounds[axis] is None for axis in ("x", "y", "z")):
-            raise ValueError("FarmBot axis bounds are unavailable")
         x, y = float(point["x"]), float(point["y"])
-        if not bounds["x"][0] <= x <= bounds["x"][1]:
-            raise ValueError("soil point X is outside FarmBot bounds")
-        laterals = self._soil_lateral_offsets(y, baseline_mm, bounds["y"][1])
         z_direction = int(state["z_direction"])
-        for offset in z_offsets_mm:
-            z = capture_z + z_direction * offset
-            if not bounds["z"][0] <= z <= bounds["z"][1]:
-                raise ValueError("soil capture Z is outside FarmBot bounds")
-        original_position: dict[str, Any] | None = state["position"]
-        if batch_id is not None:
-            if not all(state["position"].get(axis) is not None for axis in ("x", "y", "z")):
-                raise ValueError("FarmBot position is unavailable")
-            self._soil_capture_batches.setdefault(
-                batch_id,
-                {
-                    "batch_id": batch_id,
-                    "original_position": dict(state["position"]),
-                    "created_at": dt_util.utcnow().isoformat(),
-                },
-            )
-            original_position = None
+        if batch_id is not None and not all(
+            state["position"].get(axis) is not None for axis in ("x", "y", "z")
+        ):
+            raise ValueError("FarmBot position is unavailable")
+        self._motion = motion.MotionModel(firmware_config)
+        _commands, frames = self._soil_capture_commands(
+            x=x,
+            y=y,
+            capture_z=capture_z,
+            lateral_offsets=laterals,
+            z_offsets=z_offsets_mm,
+            z_direction=z_direction,
+        )
         capture_id = str(uuid.uuid4())
-        self.soil_captures[capture_id] = {
+        record = {
             "capture_id": capture_id,
             "status": "queued",
             "message": "Capture queued",
@@ -824,9 +1292,20 @@ class FarmbotManager:
             "created_at": dt_util.utcnow().isoformat(),
             "expected_frames": [],
             "batch_id": batch_id,
+            "engine": engine,
         }
-        task = asyncio.create_task(
-            self._run_soil_capture(
+
+        async def run() -> None:
+            # The position to come back to is wherever the gantry is parked
+            # when this capture's turn comes, not when it was queued.
+            parked = dict(self.soil_motion_state(firmware_config)["position"])
+            original_position: dict[str, Any] | None = parked
+            if batch_id is not None:
+                batch = self._soil_capture_batches.get(batch_id)
+                if batch is not None and batch.get("original_position") is None:
+                    batch["original_position"] = parked
+                original_position = None
+            await self._run_soil_capture(
                 capture_id=capture_id,
                 point=point,
                 capture_z=capture_z,
@@ -834,17 +1313,41 @@ class FarmbotManager:
                 z_offsets=z_offsets_mm,
                 z_direction=z_direction,
                 original_position=original_position,
+                engine=engine,
+            )
+
+        self._queue_motion_job(
+            job_id=capture_id,
+            kind="soil_capture",
+            record=record,
+            priority=priority,
+            estimated_seconds=self._estimate_route_seconds(
+                state["position"],
+                frames,
+                safe_z=True,
+                return_to_start=batch_id is None,
+                dwell_seconds=(
+                    MOTION_JOB_ESTIMATE_SECONDS_PER_PIPELINED_PHOTO
+                    if engine == "lua"
+                    else MOTION_JOB_ESTIMATE_SECONDS_PER_PHOTO
+                ),
             ),
-            name=f"farmbot-soil-{capture_id}",
+            tasks=self._soil_capture_tasks,
+            run=run,
         )
-        self._soil_capture_tasks.add(task)
-        self._soil_capture_task_batches[task] = batch_id
-
-        def discard_finished(finished: asyncio.Task) -> None:
-            self._soil_capture_tasks.discard(finished)
-            self._soil_capture_task_batches.pop(finished, None)
-
-        task.add_done_callback(discard_finished)
+        self.soil_captures[capture_id] = record
+        if batch_id is not None:
+            batch = self._soil_capture_batches.setdefault(
+                batch_id,
+                {
+                    "batch_id": batch_id,
+                    "original_position": None,
+                    "created_at": dt_util.utcnow().isoformat(),
+                    "priority": int(priority),
+                },
+            )
+            # The restore must not overtake any capture of its own batch.
+            batch["priority"] = min(int(batch.get("priority", priority)), int(priority))
         return capture_id
 
     async def _run_soil_capture(
@@ -857,329 +1360,317 @@ class FarmbotManager:
         z_offsets: list[float],
         z_direction: int,
         original_position: dict[str, Any] | None,
+        engine: str = "rpc",
     ) -> None:
         record = self.soil_captures[capture_id]
-        light_state = (self.status or {}).get("pins", {}).get(str(SOIL_CAPTURE_LIGHTING_PIN), 0)
-        initial_light_value = int(
-            bool(light_state.get("value", 0) if isinstance(light_state, dict) else light_state)
-        )
-        async with self._soil_capture_lock:
-            final_status = "failed"
-            final_message = "Soil capture failed"
-            try:
-                before = {
-                    int(item["id"])
-                    for item in await self.api.async_get_images()
-                    if isinstance(item, dict) and item.get("id") is not None
-                }
-                record["before_image_ids"] = sorted(before)
-                started_at = dt_util.utcnow()
-                _commands, expected = self._soil_capture_commands(
-                    x=float(point["x"]),
-                    y=float(point["y"]),
-                    capture_z=capture_z,
-                    lateral_offsets=lateral_offsets,
-                    z_offsets=z_offsets,
-                    z_direction=z_direction,
-                )
-                record.update(
-                    status="running",
-                    message="Preparing verified soil image capture",
-                    expected_frames=expected,
-                    started_at=started_at.isoformat(),
-                    attempts=[],
-                )
-                if not initial_light_value:
-                    await self.async_rpc_request(
-                        [
-                            {
-                                "kind": "write_pin",
-                                "args": {
-                                    "pin_number": SOIL_CAPTURE_LIGHTING_PIN,
-                                    "pin_value": 1,
-                                    "pin_mode": 0,
-                                },
-                            }
-                        ],
-                        timeout=SOIL_RPC_TIMEOUT_SECONDS,
-                    )
-                    _LOGGER.info(
-                        "Soil capture %s switched lighting pin %d on",
-                        capture_id,
-                        SOIL_CAPTURE_LIGHTING_PIN,
-                    )
+        final_status = "failed"
+        final_message = "Soil capture failed"
+        try:
+            before = {
+                int(item["id"])
+                for item in await self.api.async_get_images()
+                if isinstance(item, dict) and item.get("id") is not None
+            }
+            record["before_image_ids"] = sorted(before)
+            started_at = dt_util.utcnow()
+            _commands, expected = self._soil_capture_commands(
+                x=float(point["x"]),
+                y=float(point["y"]),
+                capture_z=capture_z,
+                lateral_offsets=lateral_offsets,
+                z_offsets=z_offsets,
+                z_direction=z_direction,
+            )
+            record.update(
+                status="running",
+                message="Preparing verified soil image capture",
+                expected_frames=expected,
+                started_at=started_at.isoformat(),
+                attempts=[],
+            )
+            await self._acquire_capture_hardware(
+                lighting_pin=SOIL_CAPTURE_LIGHTING_PIN, park=original_position
+            )
 
-                total = len(expected)
-                for frame_number, target in enumerate(expected, start=1):
-                    record.update(
-                        status="running",
-                        message=(
-                            f"Moving to soil frame {frame_number}/{total} at "
-                            f"X {target['x']:.1f}, Y {target['y']:.1f}, Z {target['z']:.1f}"
-                        ),
-                        current_frame=frame_number,
-                    )
-                    coordinates = {axis: float(target[axis]) for axis in ("x", "y", "z")}
-                    await self.async_rpc_request(
-                        [self._move_command(**coordinates, speed=100, safe_z=True)],
-                        timeout=SOIL_RPC_TIMEOUT_SECONDS,
-                    )
-                    reported = await self._wait_for_grid_position(
-                        target=target,
-                        timeout=SOIL_CAPTURE_POSITION_TIMEOUT_SECONDS,
-                        tolerance_mm=SOIL_CAPTURE_POSITION_TOLERANCE_MM,
+            total = len(expected)
+            reports: dict[int, capture_lua.CaptureReport] = {}
+            if engine == "lua":
+                reports = await self._run_lua_capture(
+                    record=record,
+                    stops=[{**target, "safe_z": True} for target in expected],
+                    tolerance_mm=SOIL_CAPTURE_POSITION_TOLERANCE_MM,
+                )
+            for frame_number, target in enumerate(expected, start=1):
+                accepted = None
+                first_attempt = 1
+                report = reports.get(frame_number)
+                if report is not None and report.ok:
+                    # Every frame of the route is already uploading, so the
+                    # nearest new image must not be claimed from `before`
+                    # unless it really is this frame's.
+                    verified, reason = await self._verify_soil_frame(
+                        before=set(before), target=target, started_at=started_at
                     )
-                    if reported is None:
-                        observed = self._reported_position()
-                        observed_text = (
-                            "unavailable"
-                            if observed is None
-                            else (
-                                f"X {observed['x']:.1f}, Y {observed['y']:.1f}, "
-                                f"Z {observed['z']:.1f}"
-                            )
-                        )
-                        raise RuntimeError(
-                            f"soil frame {frame_number}/{total}: FarmBot did not reach "
-                            f"X {target['x']:.1f}, Y {target['y']:.1f}, Z {target['z']:.1f} "
-                            f"within {SOIL_CAPTURE_POSITION_TOLERANCE_MM:g} mm; "
-                            f"last position was {observed_text}"
-                        )
-
-                    accepted = None
-                    last_reason = "camera did not produce an image"
-                    for attempt in range(1, SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS + 1):
-                        attempt_started = dt_util.utcnow()
-                        record.update(
-                            status="waiting_images",
-                            message=(
-                                f"Soil frame {frame_number}/{total}: capture attempt "
-                                f"{attempt}/{SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS}"
-                            ),
-                            photo_attempt=attempt,
-                        )
-                        try:
-                            await self.async_rpc_request(
-                                [
-                                    {
-                                        "kind": "wait",
-                                        "args": {"milliseconds": SOIL_CAPTURE_SETTLE_MILLISECONDS},
-                                    },
-                                    {"kind": "take_photo", "args": {}},
-                                ],
-                                timeout=SOIL_RPC_TIMEOUT_SECONDS,
-                            )
-                            frame, image, reason = await self._wait_for_soil_frame_image(
-                                before=before,
-                                target=target,
-                                started_at=attempt_started,
-                                timeout=SOIL_CAPTURE_IMAGE_TIMEOUT_SECONDS,
-                            )
-                            if image is not None and image.get("id") is not None:
-                                image_id = int(image["id"])
-                                before.add(image_id)
-                                self._claimed_soil_image_ids.add(image_id)
-                            if frame is None or image is None:
-                                last_reason = reason
-                            else:
-                                attachment_url = image.get("attachment_url")
-                                if not attachment_url:
-                                    last_reason = "processed image had no downloadable attachment"
-                                else:
-                                    raw, _content_type = await self.api.async_download_image(
-                                        str(attachment_url)
-                                    )
-                                    quality = await self.hass.async_add_executor_job(
-                                        inspect_capture_image, raw
-                                    )
-                                    if quality.usable:
-                                        accepted = {
-                                            **frame,
-                                            "capture_attempt": attempt,
-                                            "quality": "usable",
-                                            "contrast": quality.contrast,
-                                            "detail_score": quality.laplacian_energy,
-                                        }
-                                        break
-                                    last_reason = quality.reason
-                        except asyncio.CancelledError:
-                            raise
-                        except Exception as err:  # pylint: disable=broad-except
-                            last_reason = str(err)[:180] or type(err).__name__
-
-                        attempt_record = {
-                            "frame": frame_number,
-                            "attempt": attempt,
-                            "reason": last_reason,
-                        }
-                        record["attempts"].append(attempt_record)
-                        record["message"] = (
-                            f"Soil frame {frame_number}/{total} attempt {attempt}/"
-                            f"{SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS} rejected: {last_reason}"
-                        )[:240]
-                        _LOGGER.warning(
-                            "Soil capture %s frame %d/%d attempt %d/%d rejected: %s",
-                            capture_id,
-                            frame_number,
-                            total,
-                            attempt,
-                            SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS,
-                            last_reason,
+                    if verified is not None:
+                        accepted = {**verified, "capture_attempt": 1}
+                        before.add(int(accepted["image_id"]))
+                    else:
+                        record["attempts"].append(
+                            {"frame": frame_number, "attempt": 1, "reason": reason}
                         )
-
-                    if accepted is None:
-                        raise RuntimeError(
-                            f"soil frame {frame_number}/{total} failed after "
-                            f"{SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS} attempts: {last_reason}"
-                        )
-                    record["frames"].append(accepted)
-                    _LOGGER.info(
-                        "Soil capture %s accepted frame %d/%d image %s on attempt %d at "
-                        "X %.1f Y %.1f Z %.1f",
-                        capture_id,
-                        frame_number,
-                        total,
-                        accepted["image_id"],
-                        accepted["capture_attempt"],
-                        accepted["x"],
-                        accepted["y"],
-                        accepted["z"],
-                    )
-                final_status = "complete"
-                final_message = f"Captured {len(record['frames'])} soil images"
-                record.update(
-                    message=(
-                        "Capture complete; retaining position for the measurement batch"
-                        if original_position is None
-                        else "Restoring the FarmBot starting position"
+                        first_attempt = 2
+                if accepted is None:
+                    accepted = await self._capture_soil_frame(
+                        capture_id=capture_id,
+                        record=record,
+                        before=before,
+                        target=target,
+                        frame_number=frame_number,
+                        total=total,
+                        first_attempt=first_attempt,
                     )
+                record["frames"].append(accepted)
+                _LOGGER.info(
+                    "Soil capture %s accepted frame %d/%d image %s on attempt %d at "
+                    "X %.1f Y %.1f Z %.1f",
+                    capture_id,
+                    frame_number,
+                    total,
+                    accepted["image_id"],
+                    accepted["capture_attempt"],
+                    accepted["x"],
+                    accepted["y"],
+                    accepted["z"],
                 )
-            except Exception as err:  # pylint: disable=broad-except
-                _LOGGER.warning("Soil capture %s failed: %s", capture_id, err)
-                final_message = str(err)[:240] or "Soil capture failed"
-                record.update(
-                    message=(
-                        "Capture failed; retaining position for measurement batch cleanup"
-                        if original_position is None
-                        else "Capture failed; restoring the FarmBot position"
-                    )
+            final_status = "complete"
+            final_message = f"Captured {len(record['frames'])} soil images"
+            record.update(
+                message=(
+                    "Capture complete; retaining position for the measurement batch"
+                    if original_position is None
+                    else "Capture complete"
                 )
-            finally:
-                if not initial_light_value:
-                    try:
-                        await self.async_rpc_request(
-                            [
-                                {
-                                    "kind": "write_pin",
-                                    "args": {
-                                        "pin_number": SOIL_CAPTURE_LIGHTING_PIN,
-                                        "pin_value": 0,
-                                        "pin_mode": 0,
-                                    },
-                                }
-                            ],
-                            timeout=SOIL_RPC_TIMEOUT_SECONDS,
-                        )
-                    except Exception as err:  # pylint: disable=broad-except
-                        _LOGGER.warning(
-                            "Could not restore lighting after soil capture %s: %s",
-                            capture_id,
-                            err,
-                        )
-                if original_position is not None and all(
-                    original_position.get(axis) is not None for axis in ("x", "y", "z")
-                ):
-                    try:
-                        await self.async_rpc_request(
-                            [
-                                self._move_command(
-                                    **{
-                                        axis: float(original_position[axis])
-                                        for axis in ("x", "y", "z")
-                                    },
-                                    speed=100,
-                                    safe_z=True,
-                                )
-                            ],
-                            timeout=60,
-                        )
-                    except Exception as err:  # pylint: disable=broad-except
-                        _LOGGER.warning(
-                            "Could not restore FarmBot position after soil capture %s: %s",
-                            capture_id,
-                            err,
-                        )
-                record.update(
-                    status=final_status,
-                    message=final_message,
-                    completed_at=dt_util.utcnow().isoformat(),
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Soil capture %s failed: %s", capture_id, err)
+            final_message = str(err)[:240] or "Soil capture failed"
+            record.update(
+                message=(
+                    "Capture failed; retaining position for measurement batch cleanup"
+                    if original_position is None
+                    else "Capture failed"
                 )
+            )
+        finally:
+            self._release_capture_hardware()
+            record.update(
+                status=final_status,
+                message=final_message,
+                completed_at=dt_util.utcnow().isoformat(),
+            )
 
-    def finish_soil_capture_batch(self, batch_id: str) -> dict[str, str]:
-        """Queue one batch restore and return its current status immediately."""
+    async def _verify_soil_frame(
+        self,
+        *,
+        before: set[int],
+        target: dict[str, float],
+        started_at,
+    ) -> tuple[dict[str, Any] | None, str]:
+        """Wait for one soil frame's image and check it is usable for matching.
 
-        result = self._soil_batch_finish_results.get(batch_id)
-        if result is not None:
-            return dict(result)
-        if batch_id not in self._soil_capture_batches:
-            return {"status": "complete", "message": "Soil capture batch is already finished"}
-        active = self._soil_batch_finish_tasks.get(batch_id)
-        if active is not None and not active.done():
-            return {
-                "status": "running",
-                "message": "Waiting to restore the FarmBot starting position",
-            }
-        self._soil_batch_finish_results[batch_id] = {
-            "status": "queued",
-            "message": "FarmBot position restoration queued",
-        }
-        task = asyncio.create_task(
-            self._run_soil_batch_finish(batch_id),
-            name=f"farmbot-soil-finish-{batch_id}",
+        Returns the frame (without its attempt number) or ``None`` and the
+        reason it was rejected. Any image considered is added to ``before``
+        and claimed, so a retry never picks the same one again.
+        """
+        frame, image, reason = await self._wait_for_soil_frame_image(
+            before=before,
+            target=target,
+            started_at=started_at,
+            timeout=SOIL_CAPTURE_IMAGE_TIMEOUT_SECONDS,
+        )
+        if image is not None and image.get("id") is not None:
+            image_id = int(image["id"])
+            before.add(image_id)
+            self._claimed_soil_image_ids.add(image_id)
+        if frame is None or image is None:
+            return None, reason
+        attachment_url = image.get("attachment_url")
+        if not attachment_url:
+            return None, "processed image had no downloadable attachment"
+        raw, _content_type = await self.api.async_download_image(str(attachment_url))
+        quality = await self.hass.async_add_executor_job(inspect_capture_image, raw)
+        if not quality.usable:
+            return None, quality.reason
+        return (
+            {
+                **frame,
+                "quality": "usable",
+                "contrast": quality.contrast,
+                "detail_score": quality.laplacian_energy,
+            },
+            "usable",
+        )
+
+    async def _capture_soil_frame(
+        self,
+        *,
+        capture_id: str,
+        record: dict[str, Any],
+        before: set[int],
+        target: dict[str, float],
+        frame_number: int,
+        total: int,
+        first_attempt: int = 1,
+    ) -> dict[str, Any]:
+        """Move to one soil frame, confirm the position and photograph it.
+
+        Retries the photo up to SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS in all (an
+        on-bot attempt already made counts via ``first_attempt``) and raises
+        when the position or every attempt fails.
+        """
+        record.update(
+            status="running",
+            message=(
+                f"Moving to soil frame {frame_number}/{total} at "
+                f"X {target['x']:.1f}, Y {target['y']:.1f}, Z {target['z']:.1f}"
+            ),
+            current_frame=frame_number,
         )
+        coordinates = {axis: float(target[axis]) for axis in ("x", "y", "z")}
+        await self.async_rpc_request(
+            [self._move_command(**coordinates, speed=100, safe_z=True)],
+            timeout=self._move_timeout(coordinates, safe_z=True),
+        )
+        reported = await self._wait_for_grid_position(
+            target=target,
+            timeout=SOIL_CAPTURE_POSITION_TIMEOUT_SECONDS,
+            tolerance_mm=SOIL_CAPTURE_POSITION_TOLERANCE_MM,
+        )
+        if reported is None:
+            observed = self._reported_position()
+            observed_text = (
+                "unavailable"
+                if observed is None
+                else (f"X {observed['x']:.1f}, Y {observed['y']:.1f}, Z {observed['z']:.1f}")
+            )
+            raise RuntimeError(
+                f"soil frame {frame_number}/{total}: FarmBot did not reach "
+                f"X {target['x']:.1f}, Y {target['y']:.1f}, Z {target['z']:.1f} "
+                f"within {SOIL_CAPTURE_POSITION_TOLERANCE_MM:g} mm; "
+                f"last position was {observed_text}"
+            )
+
+        last_reason = "camera did not produce an image"
+        for attempt in range(first_attempt, SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS + 1):
+            attempt_started = dt_util.utcnow()
+            record.update(
+                status="waiting_images",
+                message=(
+                    f"Soil frame {frame_number}/{total}: capture attempt "
+                    f"{attempt}/{SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS}"
+                ),
+                photo_attempt=attempt,
+            )
+            try:
+                await self.async_rpc_request(
+                    [
+                        {
+                            "kind": "wait",
+                            "args": {"milliseconds": SOIL_CAPTURE_SETTLE_MILLISECONDS},
+                        },
+                        {"kind": "take_photo", "args": {}},
+                    ],
+                    timeout=SOIL_RPC_TIMEOUT_SECONDS,
+                )
+                verified, last_reason = await self._verify_soil_frame(
+                    before=before, target=target, started_at=attempt_started
+                )
+                if verified is not None:
+                    return {**verified, "capture_attempt": attempt}
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:  # pylint: disable=broad-except
+                last_reason = str(err)[:180] or type(err).__name__
+
+            record["attempts"].append(
+                {"frame": frame_number, "attempt": attempt, "reason": last_reason}
+            )
+            record["message"] = (
+                f"Soil frame {frame_number}/{total} attempt {attempt}/"
+                f"{SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS} rejected: {last_reason}"
+            )[:240]
+            _LOGGER.warning(
+                "Soil capture %s frame %d/%d attempt %d/%d rejected: %s",
+                capture_id,
+                frame_number,
+                total,
+                attempt,
+                SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS,
+                last_reason,
+            )
+
+        raise RuntimeError(
+            f"soil frame {frame_number}/{total} failed after "
+            f"{SOIL_CAPTURE_MAX_PHOTO_ATTEMPTS} attempts: {last_reason}"
+        )
+
+    def finish_soil_capture_batch(self, batch_id: str) -> dict[str, str]:
+        """Queue one batch restore and return its current status immediately."""
+
+        result = self._soil_batch_finish_results.get(batch_id)
+        if result is not None:
+            return dict(result)
+        if batch_id not in self._soil_capture_batches:
+            return {"status": "complete", "message": "Soil capture batch is already finished"}
+        record: dict[str, Any] = {
+            "status": "queued",
+            "message": "FarmBot position restoration queued",
+        }
+        # Queued behind every capture of the batch that is already waiting:
+        # same or lower priority than all of them, and first-come first-served.
+        batch = self._soil_capture_batches[batch_id]
+        task = self._queue_motion_job(
+            job_id=str(uuid.uuid4()),
+            kind="soil_batch_finish",
+            record=record,
+            priority=int(batch.get("priority", MOTION_JOB_DEFAULT_PRIORITY)),
+            estimated_seconds=MOTION_JOB_ESTIMATE_BASE_SECONDS,
+            tasks=None,
+            run=lambda: self._run_soil_batch_finish(batch_id),
+        )
+        self._soil_batch_finish_results[batch_id] = record
         self._soil_batch_finish_tasks[batch_id] = task
         task.add_done_callback(lambda _task: self._soil_batch_finish_tasks.pop(batch_id, None))
-        return dict(self._soil_batch_finish_results[batch_id])
+        return dict(record)
 
     async def _run_soil_batch_finish(self, batch_id: str) -> None:
-        """Wait behind the last capture and restore without holding an HTTP request."""
+        """Restore the batch's starting position once its turn on the gantry comes."""
 
+        record = self._soil_batch_finish_results.setdefault(batch_id, {})
         batch = self._soil_capture_batches.get(batch_id)
         if batch is None:
-            self._soil_batch_finish_results[batch_id] = {
-                "status": "complete",
-                "message": "Soil capture batch is already finished",
-            }
+            record.update(status="complete", message="Soil capture batch is already finished")
             return
-        original = batch["original_position"]
-        self._soil_batch_finish_results[batch_id] = {
-            "status": "running",
-            "message": "Waiting to restore the FarmBot starting position",
-        }
+        original = batch.get("original_position") or {}
+        record.update(
+            status="running",
+            message="Restoring the FarmBot starting position",
+        )
         try:
             if not all(original.get(axis) is not None for axis in ("x", "y", "z")):
                 raise ValueError("Soil capture batch starting position is unavailable")
-            async with self._soil_capture_lock:
-                connection = self._live_connection_state()
-                if not connection["connected"]:
-                    raise ValueError("FarmBot is not connected")
-                if connection["locked"]:
-                    raise ValueError("FarmBot is emergency-stopped")
-                await self.async_rpc_request(
-                    [
-                        self._move_command(
-                            **{axis: float(original[axis]) for axis in ("x", "y", "z")},
-                            speed=100,
-                            safe_z=True,
-                        )
-                    ],
-                    timeout=60,
-                )
+            await self.async_rpc_request(
+                [
+                    self._move_command(
+                        **{axis: float(original[axis]) for axis in ("x", "y", "z")},
+                        speed=100,
+                        safe_z=True,
+                    )
+                ],
+                timeout=self._move_timeout(original, safe_z=True),
+            )
             self._soil_capture_batches.pop(batch_id, None)
-            self._soil_batch_finish_results[batch_id] = {
-                "status": "complete",
-                "message": "FarmBot starting position restored",
-            }
+            record.update(status="complete", message="FarmBot starting position restored")
             _LOGGER.info(
                 "Finished soil capture batch %s and restored X %.1f Y %.1f Z %.1f",
                 batch_id,
@@ -1188,17 +1679,13 @@ class FarmbotManager:
                 float(original["z"]),
             )
         except asyncio.CancelledError:
-            self._soil_batch_finish_results[batch_id] = {
-                "status": "failed",
-                "message": "FarmBot position restoration was interrupted",
-            }
+            record.update(
+                status="failed", message="FarmBot position restoration was interrupted"
+            )
             raise
         except Exception as err:  # pylint: disable=broad-except
             message = str(err)[:240] or "FarmBot position restoration failed"
-            self._soil_batch_finish_results[batch_id] = {
-                "status": "failed",
-                "message": message,
-            }
+            record.update(status="failed", message=message)
             _LOGGER.warning("Could not finish soil capture batch %s: %s", batch_id, err)
         finally:
             while len(self._soil_batch_finish_results) > 64:
@@ -1215,41 +1702,18 @@ class FarmbotManager:
     ) -> tuple[dict[str, Any] | None, dict[str, Any] | None, str]:
         """Wait for one new processed image and validate its recorded coordinates."""
         deadline = asyncio.get_running_loop().time() + timeout
+        index: spatial.GridIndex[dict[str, Any]] = spatial.GridIndex(
+            SOIL_CAPTURE_COORDINATE_TOLERANCE_MM
+        )
+        seen: set[int] = set()
         while asyncio.get_running_loop().time() < deadline:
-            images = await self.api.async_get_images()
-            candidates: list[tuple[float, dict[str, Any]]] = []
-            for image in images:
-                if not isinstance(image, dict) or not vision.is_image_ready(image):
-                    continue
-                try:
-                    image_id = int(image["id"])
-                except (KeyError, TypeError, ValueError):
-                    continue
-                if image_id in before or not vision.same_device(
-                    image.get("device_id"), self.device_id
-                ):
-                    continue
-                created = dt_util.parse_datetime(str(image.get("created_at") or ""))
-                if created is not None:
-                    try:
-                        if created < started_at:
-                            continue
-                    except TypeError:
-                        continue
-                meta = self._image_meta(image)
-                try:
-                    distance = math.sqrt(
-                        sum(
-                            (float(meta[axis]) - float(target[axis])) ** 2
-                            for axis in ("x", "y", "z")
-                        )
-                    )
-                except (KeyError, TypeError, ValueError):
-                    continue
-                candidates.append((distance, image))
-            if candidates:
-                distance, image = min(candidates, key=lambda item: item[0])
-                meta = self._image_meta(image)
+            self._index_new_images(
+                index, seen, await self.api.async_get_images(), before, started_at
+            )
+            hit = index.nearest(target["x"], target["y"], target["z"])
+            if hit is not None:
+                distance, entry = hit
+                image = entry.item
                 if distance > SOIL_CAPTURE_COORDINATE_TOLERANCE_MM:
                     return (
                         None,
@@ -1260,9 +1724,9 @@ class FarmbotManager:
                 return (
                     {
                         "image_id": int(image["id"]),
-                        "x": float(meta["x"]),
-                        "y": float(meta["y"]),
-                        "z": float(meta.get("z") or 0),
+                        "x": entry.x,
+                        "y": entry.y,
+                        "z": entry.z,
                         "lateral_offset_mm": float(target["lateral_offset_mm"]),
                         "z_offset_mm": float(target["z_offset_mm"]),
                         "distance_from_target_mm": distance,
@@ -1273,10 +1737,44 @@ class FarmbotManager:
             await asyncio.sleep(2)
         return None, None, "no new processed image appeared before the upload timeout"
 
-    @staticmethod
-    def _image_meta(image: dict[str, Any]) -> dict[str, Any]:
-        meta = image.get("meta")
-        return meta if isinstance(meta, dict) else image
+    def _index_new_images(
+        self,
+        index: spatial.GridIndex[dict[str, Any]],
+        seen: set[int],
+        images: list[Any],
+        before: set[int],
+        started_at,
+    ) -> None:
+        """Add this device's new processed images in ``images`` to ``index``.
+
+        ``seen`` carries over between polls of one wait, so each image is
+        inspected once however many times the listing is read. An image that
+        is not processed yet is not marked seen; it is looked at again.
+        """
+        for image in images:
+            if not isinstance(image, dict) or not vision.is_image_ready(image):
+                continue
+            try:
+                image_id = int(image["id"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if image_id in seen:
+                continue
+            seen.add(image_id)
+            if image_id in before or not vision.same_device(
+                image.get("device_id"), self.device_id
+            ):
+                continue
+            created = dt_util.parse_datetime(str(image.get("created_at") or ""))
+            if created is not None:
+                try:
+                    if created < started_at:
+                        continue
+                except TypeError:
+                    continue
+            position = spatial.coordinates(image)
+            if position is not None:
+                index.insert(image_id, *position, item=image)
 
     @classmethod
     def _match_soil_frames(
@@ -1284,37 +1782,300 @@ class FarmbotManager:
         images: list[dict[str, Any]],
         expected: list[dict[str, float]],
     ) -> list[dict[str, Any]]:
-        remaining = list(images)
-        matched: list[dict[str, Any]] = []
-        for target in expected:
-            candidates = []
-            for image in remaining:
-                meta = cls._image_meta(image)
+        """Pair expected frames with images one-to-one within 2.5 mm.
+
+        Lateral frames sit only a baseline apart, so each frame's nearest
+        image is not necessarily its own; the pairing is solved as a whole
+        (see :func:`spatial.assign`). Matched frames come back in
+        ``expected`` order.
+        """
+        index: spatial.GridIndex[dict[str, Any]] = spatial.GridIndex(2.5)
+        for position, image in enumerate(images):
+            coordinates = spatial.coordinates(image)
+            if coordinates is not None:
+                index.insert(position, *coordinates, item=image)
+        pairs = spatial.assign(
+            [(float(target["x"]), float(target["y"]), float(target["z"])) for target in expected],
+            index,
+            gate=2.5,
+        )
+        return [
+            {
+                "image_id": int(pairs[position][1].item["id"]),
+                **target,
+            }
+            for position, target in enumerate(expected)
+            if position in pairs
+        ]
+
+    def soil_capture(self, capture_id: str) -> dict[str, Any] | None:
+        record = self.soil_captures.get(capture_id)
+        if record is None:
+            return None
+        return {
+            key: value
+            for key, value in record.items()
+            if key not in {"expected_frames", "before_image_ids"}
+        }
+
+    # -------------------- Multi-point soil survey --------------------
+
+    @staticmethod
+    def _serpentine_soil_frames(
+        frames: list[dict[str, float]],
+        per_row: int,
+        previous: dict[str, float] | None,
+    ) -> list[dict[str, float]]:
+        """Visit one point's frames back and forth across the laterals.
+
+        ``frames`` come one Z level after another, laterals in order within
+        each; every other level is reversed so consecutive frames are always
+        neighbours. The first level runs whichever way starts nearer to
+        ``previous`` (the last frame of the point before).
+        """
+        rows = [frames[start : start + per_row] for start in range(0, len(frames), per_row)]
+        flip = False
+        if previous is not None and rows and len(rows[0]) > 1:
+            first, last = rows[0][0], rows[0][-1]
+            flip = abs(float(last["y"]) - float(previous["y"])) < abs(
+                float(first["y"]) - float(previous["y"])
+            )
+        ordered = []
+        for level, row in enumerate(rows):
+            ordered.extend(reversed(row) if (level % 2 == 1) != flip else row)
+        return ordered
+
+    def start_soil_survey(
+        self,
+        *,
+        points: list[dict[str, Any]],
+        firmware_config: dict[str, Any],
+        capture_z: float,
+        baseline_mm: float,
+        z_offsets_mm: list[float],
+        priority: int = MOTION_JOB_DEFAULT_PRIORITY,
+    ) -> str:
+        """Queue one soil capture run over many points and return its ID.
+
+        Every point is validated before anything is queued. When the survey's
+        turn comes, the points are ordered for the least travel time from the
+        gantry's position, lighting is switched on once, each point's frames
+        are captured exactly as :meth:`start_soil_capture` would capture
+        them, and the gantry returns to where it started once at the end. A
+        point that fails is recorded and the survey moves on to the next.
+        """
+        if not 1 <= len(points) <= SOIL_SURVEY_MAX_POINTS:
+            raise ValueError(f"a soil survey takes 1 to {SOIL_SURVEY_MAX_POINTS} points")
+        state = self.soil_motion_state(firmware_config)
+        if not state["connected"]:
+            raise ValueError("FarmBot is not connected")
+        if state["locked"]:
+            raise ValueError("FarmBot is emergency-stopped")
+        z_direction = int(state["z_direction"])
+        self._motion = motion.MotionModel(firmware_config)
+        entries = []
+        planned_frames: list[dict[str, float]] = []
+        for position, point in enumerate(points):
+            laterals = self._validate_soil_point(
+                state,
+                point,
+                capture_z=capture_z,
+                baseline_mm=baseline_mm,
+                z_offsets_mm=z_offsets_mm,
+            )
+            _commands, frames = self._soil_capture_commands(
+                x=float(point["x"]),
+                y=float(point["y"]),
+                capture_z=capture_z,
+                lateral_offsets=laterals,
+                z_offsets=z_offsets_mm,
+                z_direction=z_direction,
+            )
+            planned_frames.extend(frames)
+            entries.append(
+                {
+                    "index": position,
+                    "point_id": point.get("id"),
+                    "x": float(point["x"]),
+                    "y": float(point["y"]),
+                    "z": capture_z,
+                    "lateral_offsets": laterals,
+                }
+            )
+        survey_id = str(uuid.uuid4())
+        record = {
+            "survey_id": survey_id,
+            "status": "queued",
+            "message": "Soil survey queued",
+            "points": [
+                {
+                    "index": entry["index"],
+                    "point_id": entry["point_id"],
+                    "x": entry["x"],
+                    "y": entry["y"],
+                    "status": "queued",
+                    "frames": [],
+                }
+                for entry in entries
+            ],
+            "completed_points": 0,
+            "failed_points": 0,
+            "created_at": dt_util.utcnow().isoformat(),
+            "expected_frames": [],
+        }
+
+        async def run() -> None:
+            original_position = dict(self.soil_motion_state(firmware_config)["position"])
+            route = entries
+            if len(entries) > 1 and all(
+                original_position.get(axis) is not None for axis in ("x", "y", "z")
+            ):
+                route, before, after = await self.hass.async_add_executor_job(
+                    functools.partial(
+                        routing.optimize_route,
+                        {axis: float(original_position[axis]) for axis in ("x", "y", "z")},
+                        entries,
+                        self._motion.move_seconds,
+                        time_budget=SOIL_SURVEY_ROUTE_TIME_BUDGET_SECONDS,
+                    )
+                )
+                record["route"] = {
+                    "order": [entry["index"] for entry in route],
+                    "estimated_travel_seconds_before": round(before, 1),
+                    "estimated_travel_seconds_after": round(after, 1),
+                }
+            await self._run_soil_survey(
+                survey_id=survey_id,
+                route=route,
+                z_offsets=z_offsets_mm,
+                z_direction=z_direction,
+                original_position=original_position,
+            )
+
+        self._queue_motion_job(
+            job_id=survey_id,
+            kind="soil_survey",
+            record=record,
+            priority=priority,
+            estimated_seconds=self._estimate_route_seconds(
+                state["position"], planned_frames, safe_z=True, return_to_start=True
+            ),
+            tasks=self._soil_capture_tasks,
+            run=run,
+        )
+        self.soil_surveys[survey_id] = record
+        return survey_id
+
+    async def _run_soil_survey(
+        self,
+        *,
+        survey_id: str,
+        route: list[dict[str, Any]],
+        z_offsets: list[float],
+        z_direction: int,
+        original_position: dict[str, Any],
+    ) -> None:
+        """Capture every point of a survey inside one lighting cycle."""
+        record = self.soil_surveys[survey_id]
+        final_status, final_message = "failed", "Soil survey failed"
+        total = len(route)
+        try:
+            before = {
+                int(item["id"])
+                for item in await self.api.async_get_images()
+                if isinstance(item, dict) and item.get("id") is not None
+            }
+            started_at = dt_util.utcnow()
+            record.update(
+                status="running",
+                message="Preparing soil survey",
+                before_image_ids=sorted(before),
+                started_at=started_at.isoformat(),
+            )
+            await self._acquire_capture_hardware(
+                lighting_pin=SOIL_CAPTURE_LIGHTING_PIN, park=original_position
+            )
+            previous = None
+            stop_reason = None
+            for number, entry in enumerate(route, start=1):
+                state = self._live_connection_state()
+                if not state["connected"] or state["locked"]:
+                    stop_reason = (
+                        "FarmBot is emergency-stopped"
+                        if state["locked"]
+                        else "FarmBot lost its MQTT connection"
+                    )
+                    break
+                progress = record["points"][entry["index"]]
+                _commands, frames = self._soil_capture_commands(
+                    x=entry["x"],
+                    y=entry["y"],
+                    capture_z=entry["z"],
+                    lateral_offsets=entry["lateral_offsets"],
+                    z_offsets=z_offsets,
+                    z_direction=z_direction,
+                )
+                frames = self._serpentine_soil_frames(
+                    frames, len(entry["lateral_offsets"]), previous
+                )
+                record["expected_frames"] = frames
+                record.update(
+                    message=f"Surveying point {number} of {total}",
+                    current_point=entry["index"],
+                )
+                progress.update(status="running", attempts=[])
                 try:
-                    distance = math.sqrt(
-                        sum(
-                            (float(meta[axis]) - float(target[axis])) ** 2
-                            for axis in ("x", "y", "z")
+                    for frame_number, target in enumerate(frames, start=1):
+                        progress["frames"].append(
+                            await self._capture_soil_frame(
+                                capture_id=survey_id,
+                                record=progress,
+                                before=before,
+                                target=target,
+                                frame_number=frame_number,
+                                total=len(frames),
+                            )
                         )
+                        before.add(int(progress["frames"][-1]["image_id"]))
+                        previous = target
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.warning(
+                        "Soil survey %s point %d/%d failed: %s", survey_id, number, total, err
                     )
-                except (KeyError, TypeError, ValueError):
+                    progress.update(status="failed", message=str(err)[:240])
+                    record["failed_points"] += 1
                     continue
-                if distance <= 2.5:
-                    candidates.append((distance, image))
-            if not candidates:
-                continue
-            _, image = min(candidates, key=lambda item: item[0])
-            remaining.remove(image)
-            matched.append(
-                {
-                    "image_id": int(image["id"]),
-                    **target,
-                }
+                progress.update(
+                    status="complete", message=f"Captured {len(frames)} soil images"
+                )
+                record["completed_points"] += 1
+            for progress in record["points"]:
+                if progress["status"] == "queued":
+                    progress["status"] = "skipped"
+            completed = record["completed_points"]
+            summary = f"Captured {completed} of {total} soil survey point(s)"
+            if stop_reason is not None:
+                final_message = f"Soil survey stopped: {stop_reason}. {summary}"
+            elif completed == total:
+                final_status, final_message = "complete", summary
+            else:
+                final_message = f"{summary}; {record['failed_points']} failed"
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Soil survey %s failed: %s", survey_id, err)
+            final_message = str(err)[:240] or final_message
+        finally:
+            record["expected_frames"] = []
+            self._release_capture_hardware()
+            record.update(
+                status=final_status,
+                message=final_message,
+                completed_at=dt_util.utcnow().isoformat(),
             )
-        return matched
 
-    def soil_capture(self, capture_id: str) -> dict[str, Any] | None:
-        record = self.soil_captures.get(capture_id)
+    def soil_survey(self, survey_id: str) -> dict[str, Any] | None:
+        record = self.soil_surveys.get(survey_id)
         if record is None:
             return None
         return {
@@ -1324,26 +2085,41 @@ class FarmbotManager:
         }
 
     def start_grid_repair(
-        self, *, targets: list[dict[str, float]], firmware_config: dict[str, Any]
+        self,
+        *,
+        targets: list[dict[str, float]],
+        firmware_config: dict[str, Any],
+        priority: int = MOTION_JOB_DEFAULT_PRIORITY,
+        optimize_route: bool = False,
+        pipeline: bool = False,
+        engine: str = "rpc",
+        reuse_recent_images_within: float | None = None,
     ) -> str:
-        """Start a safe, bounded photo-grid repair and return its session ID."""
+        """Queue a safe, bounded photo-grid repair and return its session ID.
+
+        With ``reuse_recent_images_within`` (seconds) a cell that already has
+        a processed image that recent at its coordinates is completed with it
+        and not visited; those cells are listed under ``reused_frames``.
+        With ``optimize_route`` the cells are re-ordered for the shortest
+        travel time from wherever the gantry is when the repair's turn comes.
+        With ``pipeline`` the gantry moves on once each photo is taken and
+        images are verified in the background (see ``_run_grid_repair``).
+        The ``"lua"`` engine runs the route on the bot (see capture_lua.py).
+        """
+        if engine not in CAPTURE_ENGINES:
+            raise ValueError(f"capture engine must be one of {', '.join(CAPTURE_ENGINES)}")
+        if reuse_recent_images_within is not None and not (
+            0 < reuse_recent_images_within <= GRID_REPAIR_MAX_REUSE_SECONDS
+        ):
+            raise ValueError(
+                "reuse_recent_images_within must be between 0 and "
+                f"{GRID_REPAIR_MAX_REUSE_SECONDS} seconds"
+            )
         state = self.soil_motion_state(firmware_config)
         if not state["connected"]:
             raise ValueError("FarmBot is not connected")
         if state["locked"]:
             raise ValueError("FarmBot is emergency-stopped")
-        # Prune tasks whose done-callback discard hasn't run yet so a batch
-        # that just finished doesn't cause a spurious "FarmBot is busy" when
-        # the Vision app immediately queues the next chunk.
-        self._grid_repair_tasks = {t for t in self._grid_repair_tasks if not t.done()}
-        self._soil_capture_tasks = {t for t in self._soil_capture_tasks if not t.done()}
-        if (
-            state["busy"]
-            or self._soil_capture_lock.locked()
-            or any(not task.done() for task in self._grid_repair_tasks)
-            or any(not task.done() for task in self._soil_capture_tasks)
-        ):
-            raise ValueError("FarmBot is busy")
         bounds = state["axis_bounds"]
         if any(bounds[axis] is None for axis in ("x", "y", "z")):
             raise ValueError("FarmBot axis bounds are unavailable")
@@ -1368,7 +2144,7 @@ class FarmbotManager:
         if len({item["index"] for item in normalized}) != len(normalized):
             raise ValueError("Repair target indexes must be unique")
         repair_id = str(uuid.uuid4())
-        self.grid_repairs[repair_id] = {
+        record = {
             "repair_id": repair_id,
             "status": "queued",
             "message": "Photo-grid repair queued",
@@ -1376,44 +2152,198 @@ class FarmbotManager:
             "frames": [],
             "completed_targets": [],
             "failed_targets": [],
+            "engine": engine,
             "created_at": dt_util.utcnow().isoformat(),
         }
-        task = asyncio.create_task(
-            self._run_grid_repair(
+        if pipeline:
+            record["pipelined"] = True
+        self._motion = motion.MotionModel(firmware_config)
+        z_top = self._z_top(bounds["z"], state["z_direction"])
+        _travel, z_plan = self._plan_grid_z_travel(normalized, z_top)
+
+        async def run() -> None:
+            original_position = dict(self.soil_motion_state(firmware_config)["position"])
+            route = normalized
+            if reuse_recent_images_within is not None:
+                route = await self._reuse_recent_grid_images(
+                    record, normalized, reuse_recent_images_within
+                )
+                if not route:
+                    count = len(record["reused_frames"])
+                    record.update(
+                        status="complete",
+                        message=f"Reused {count} recent photo-grid image(s); nothing to capture",
+                        completed_at=dt_util.utcnow().isoformat(),
+                    )
+                    return
+            if optimize_route:
+                route = await self._optimize_grid_route(record, route, original_position)
+            await self._run_grid_repair(
                 repair_id=repair_id,
-                targets=normalized,
-                original_position=state["position"],
-                flat_travel=self._grid_flat_travel(normalized, bounds["z"]),
+                targets=route,
+                original_position=original_position,
+                z_top=z_top,
+                pipeline=pipeline,
+                engine=engine,
+            )
+
+        self._queue_motion_job(
+            job_id=repair_id,
+            kind="grid_repair",
+            record=record,
+            priority=priority,
+            estimated_seconds=self._estimate_route_seconds(
+                state["position"],
+                normalized,
+                safe_z=z_plan["safe_z_moves"] > 1,
+                return_to_start=True,
+                dwell_seconds=(
+                    MOTION_JOB_ESTIMATE_SECONDS_PER_PIPELINED_PHOTO
+                    if pipeline or engine == "lua"
+                    else MOTION_JOB_ESTIMATE_SECONDS_PER_PHOTO
+                ),
             ),
-            name=f"farmbot-grid-repair-{repair_id}",
+            tasks=self._grid_repair_tasks,
+            run=run,
         )
-        self._grid_repair_tasks.add(task)
-        task.add_done_callback(self._grid_repair_tasks.discard)
+        self.grid_repairs[repair_id] = record
         return repair_id
 
+    async def _reuse_recent_grid_images(
+        self,
+        record: dict[str, Any],
+        targets: list[dict[str, float]],
+        within_seconds: float,
+    ) -> list[dict[str, float]]:
+        """Complete cells that have a fresh image already; return the rest.
+
+        The image list is read once when the repair's turn comes, so an image
+        uploaded while the repair was queued still counts.
+        """
+        self._recent_images.update(
+            await self.api.async_get_images(), device_id=self.device_id
+        )
+        now = dt_util.utcnow()
+        since = now - timedelta(seconds=within_seconds)
+        reused: list[dict[str, Any]] = record.setdefault("reused_frames", [])
+        remaining = []
+        for target in targets:
+            match = self._recent_images.nearest(
+                target, radius_mm=GRID_REPAIR_COORDINATE_TOLERANCE_MM, since=since
+            )
+            if match is None:
+                remaining.append(target)
+                continue
+            distance, image = match
+            reused.append(
+                {
+                    "image_id": image.image_id,
+                    "x": image.x,
+                    "y": image.y,
+                    "z": image.z,
+                    "distance_from_target_mm": distance,
+                    "age_seconds": round((now - image.created_at).total_seconds(), 1),
+                    "target_index": target.get("index"),
+                }
+            )
+            record["completed_targets"].append(target)
+        if reused:
+            _LOGGER.info(
+                "Photo-grid repair %s reused %d recent image(s); %d cell(s) left to capture",
+                record.get("repair_id"),
+                len(reused),
+                len(remaining),
+            )
+        return remaining
+
+    async def _optimize_grid_route(
+        self,
+        record: dict[str, Any],
+        targets: list[dict[str, float]],
+        start: dict[str, Any],
+    ) -> list[dict[str, float]]:
+        """Re-order ``targets`` for travel time and note the saving on ``record``.
+
+        Legs are costed as straight moves: the safe-Z retract and descent at
+        every cell take the same time whatever the order.
+        """
+        if not all(start.get(axis) is not None for axis in ("x", "y", "z")):
+            return targets
+        cost = self._motion.move_seconds
+        ordered, before, after = await self.hass.async_add_executor_job(
+            functools.partial(
+                routing.optimize_route,
+                {axis: float(start[axis]) for axis in ("x", "y", "z")},
+                targets,
+                cost,
+                time_budget=GRID_REPAIR_ROUTE_TIME_BUDGET_SECONDS,
+            )
+        )
+        record["route"] = {
+            "optimized": True,
+            "order": [item["index"] for item in ordered],
+            "estimated_travel_seconds_before": round(before, 1),
+            "estimated_travel_seconds_after": round(after, 1),
+        }
+        _LOGGER.info(
+            "Photo-grid repair %s route optimised: %.1f s -> %.1f s of travel",
+            record.get("repair_id"),
+            before,
+            after,
+        )
+        return ordered
+
     @staticmethod
-    def _grid_flat_travel(
+    def _z_top(z_bounds: list[float] | None, z_direction: int) -> float | None:
+        """The top (home end) of the Z axis, from ``soil_motion_state``.
+
+        With ``movement_home_up_z`` the axis runs ``[-L, 0]``; without it,
+        ``[0, L]``. Either way the top is the end FarmBot OS homes to.
+        """
+        if z_bounds is None:
+            return None
+        return float(z_bounds[1] if z_direction < 0 else z_bounds[0])
+
+    def _plan_grid_z_travel(
+        self,
         targets: list[dict[str, float]],
-        z_bounds: list[float] | None,
-    ) -> bool:
-        """May cell-to-cell travel skip FarmBot's ``safe_z`` retract?
-
-        Only when every cell is photographed at the same Z *and* that Z is
-        already within GRID_REPAIR_FLAT_TRAVEL_TOP_MARGIN_MM of the top of the
-        Z axis. Under those two conditions ``safe_z`` cannot lift the gantry
-        anywhere it isn't already, so retracting and descending once per cell
-        buys no clearance -- it just adds two Z moves and their settle time to
-        all 77 cells. Any lower capture height, or a grid whose cells differ
-        in Z, keeps ``safe_z`` on every move.
+        z_top: float | None,
+    ) -> tuple[list[float | None], dict[str, Any]]:
+        """Plan Z travel between cells; see :func:`routing.plan_z_travel`.
+
+        Without a finite top of the Z axis nothing is known to be clear, so
+        every move keeps ``safe_z``.
         """
-        if not targets or z_bounds is None:
-            return False
-        heights = {round(float(target["z"]), 3) for target in targets}
-        if len(heights) != 1:
-            return False
-        z = next(iter(heights))
-        top = float(z_bounds[1])
-        return math.isfinite(top) and abs(top - z) <= GRID_REPAIR_FLAT_TRAVEL_TOP_MARGIN_MM
+        top = float(z_top) if z_top is not None else math.nan
+        if not math.isfinite(top):
+            return [None] * len(targets), {
+                "clusters": [],
+                "safe_z_moves": len(targets),
+                "z_travel_saved_mm": 0.0,
+            }
+        return routing.plan_z_travel(
+            targets,
+            z_top=top,
+            top_margin=GRID_REPAIR_FLAT_TRAVEL_TOP_MARGIN_MM,
+            span=GRID_REPAIR_Z_CLUSTER_SPAN_MM,
+            safe_height=self._motion.safe_height,
+        )
+
+    def _cluster_travel_points(
+        self, target: dict[str, float], travel_z: float
+    ) -> list[dict[str, float]]:
+        """Rise to ``travel_z``, cross at it, then descend to ``target``."""
+        points = []
+        current = self._reported_position()
+        # Half a millimetre of slack keeps encoder noise from adding a lift.
+        # Heights are distances from the retract height, whichever way Z runs.
+        safe = self._motion.safe_height
+        if current is None or abs(current["z"] - safe) > abs(travel_z - safe) + 0.5:
+            points.append({"z": travel_z})
+        if target["z"] != travel_z:
+            points.append({"x": target["x"], "y": target["y"], "z": travel_z})
+        points.append(target)
+        return points
 
     async def _capture_grid_target(
         self,
@@ -1424,10 +2354,18 @@ class FarmbotManager:
         target_number: int,
         total: int,
         safe_z: bool = True,
+        travel_z: float | None = None,
+        verify: bool = True,
     ) -> dict[str, Any] | None:
         """Move to and photograph a single photo-grid cell.
 
-        Returns the captured frame dict on success. On a known failure mode
+        Without ``safe_z``, a ``travel_z`` makes the gantry cross to the cell
+        at that height and then descend to it (see ``_plan_grid_z_travel``).
+
+        Returns the captured frame dict on success. With ``verify`` false it
+        returns as soon as ``take_photo`` is acknowledged, with the ``before``
+        image IDs and ``started_at`` time that ``_wait_for_grid_image`` needs
+        to verify the image later. On a known failure mode
         (movement not confirmed, or no processed image after retries) the
         target is appended to ``record["failed_targets"]``, a human-readable
         reason is appended to ``record["failure_reasons"]``, a warning is
@@ -1474,15 +2412,12 @@ class FarmbotManager:
         # later targets to run at a stale position, which previously
         # produced repeated images.
         coordinates = {axis: float(target[axis]) for axis in ("x", "y", "z")}
+        points = [coordinates]
+        if travel_z is not None and not safe_z:
+            points = self._cluster_travel_points(coordinates, travel_z)
         await self.async_rpc_request(
-            [
-                self._move_command(
-                    **coordinates,
-                    speed=100,
-                    safe_z=safe_z,
-                )
-            ],
-            timeout=SOIL_RPC_TIMEOUT_SECONDS,
+            [self._move_command(**point, speed=100, safe_z=safe_z) for point in points],
+            timeout=self._motion_timeout([(point, 100, safe_z) for point in points]),
         )
         reported_position = await self._wait_for_grid_position(
             target=target,
@@ -1553,6 +2488,8 @@ class FarmbotManager:
                     err,
                 )
                 continue
+            if not verify:
+                return {"before": before, "started_at": started_at}
             failure_code = "upload_timeout"
             frame = await self._wait_for_grid_image(
                 before=before,
@@ -1588,260 +2525,459 @@ class FarmbotManager:
         repair_id: str,
         targets: list[dict[str, float]],
         original_position: dict[str, Any],
-        flat_travel: bool = False,
+        z_top: float | None = None,
+        pipeline: bool = False,
+        engine: str = "rpc",
     ) -> None:
         """Photograph every requested cell as one continuous run.
 
         Lighting, the drive in from wherever the gantry was parked and the
         drive back to it are run-level: they happen once around the whole
         route, never per cell and never per caller-side batch.
+
+        With ``pipeline`` the gantry moves to the next cell as soon as
+        ``take_photo`` is acknowledged at a confirmed position, and each
+        image is waited for in the background (at most
+        GRID_REPAIR_PIPELINE_DEPTH at a time). A cell whose image never
+        arrives is not failed straight away: once the route is done it is
+        revisited and photographed the ordinary, verified way, so
+        ``completed_targets`` still only ever holds verified images.
+
+        The ``"lua"`` engine runs the whole route on the bot first and then
+        verifies the images the same way; cells the bot did not report as
+        photographed at the right position join the revisits.
         """
         record = self.grid_repairs[repair_id]
+        # Planned on the final route: optimize_route may have re-ordered it.
+        travel, record["z_plan"] = self._plan_grid_z_travel(targets, z_top)
+        # A retry may start anywhere in the grid, so it only skips safe_z
+        # when the whole route is one cluster.
+        retry_travel_z = travel[-1] if len(record["z_plan"]["clusters"]) == 1 else None
+        # (target number, target, background verification) in route order.
+        pending: list[tuple[int, dict[str, float], asyncio.Task]] = []
+        unverified: list[tuple[int, dict[str, float]]] = []
         final_status, final_message = "failed", "Photo-grid repair failed"
-        light_state = (self.status or {}).get("pins", {}).get(str(GRID_REPAIR_LIGHTING_PIN), 0)
-        initial_light_value = int(
-            bool(light_state.get("value", 0) if isinstance(light_state, dict) else light_state)
-        )
-        async with self._soil_capture_lock:
-            try:
-                if not initial_light_value:
-                    await self.async_rpc_request(
-                        [
-                            {
-                                "kind": "write_pin",
-                                "args": {
-                                    "pin_number": GRID_REPAIR_LIGHTING_PIN,
-                                    "pin_value": 1,
-                                    "pin_mode": 0,
-                                },
-                            }
-                        ],
-                        timeout=SOIL_RPC_TIMEOUT_SECONDS,
-                    )
-                total = len(targets)
-                consecutive_failures = 0
-                abort_reason: str | None = None
-                for index, target in enumerate(targets, start=1):
-                    state = self._live_connection_state()
-                    if not state["connected"] or state["locked"]:
-                        stop_reason = (
-                            "FarmBot is emergency-stopped"
-                            if state["locked"]
-                            else "FarmBot lost its MQTT connection"
-                        )
-                        abort_reason = (
-                            f"Photo-grid repair stopped before cell {index}/{total}: {stop_reason}"
-                        )
-                        _LOGGER.warning("Photo-grid repair %s aborted: %s", repair_id, stop_reason)
-                        break
+        try:
+            await self._acquire_capture_hardware(
+                lighting_pin=GRID_REPAIR_LIGHTING_PIN, park=original_position
+            )
+            total = len(targets)
+            consecutive_failures = 0
+            abort_reason: str | None = None
+
+            def _fail(target: dict[str, float], number: int, reason: str, code: str) -> None:
+                record["failed_targets"].append(target)
+                record.setdefault("failure_reasons", []).append(reason)
+                record.setdefault("failures", []).append(
+                    {"index": target.get("index"), "reason": reason, "code": code}
+                )
+                _LOGGER.warning(
+                    "Photo-grid repair %s target %d/%d at X %.1f Y %.1f Z %.1f failed: %s",
+                    repair_id,
+                    number,
+                    total,
+                    target["x"],
+                    target["y"],
+                    target["z"],
+                    reason,
+                )
 
-                    try:
-                        frame = await self._capture_grid_target(
-                            repair_id=repair_id,
-                            record=record,
-                            target=target,
-                            target_number=index,
-                            total=total,
-                            # The move into the grid starts from wherever the
-                            # gantry was parked and must clear whatever is
-                            # between there and the first cell. Once inside,
-                            # flat travel (when allowed) keeps the camera at
-                            # its capture height for the whole route.
-                            safe_z=not flat_travel or index == 1,
-                        )
-                    except asyncio.CancelledError:
-                        raise
-                    except Exception as err:  # pylint: disable=broad-except
-                        frame = None
-                        reason = str(err)[:240] or "Unexpected error during photo-grid capture"
-                        record["failed_targets"].append(target)
-                        record.setdefault("failure_reasons", []).append(reason)
-                        record.setdefault("failures", []).append(
-                            {"index": target.get("index"), "reason": reason, "code": "error"}
-                        )
-                        _LOGGER.warning(
-                            "Photo-grid repair %s target %d/%d at X %.1f Y %.1f Z %.1f failed: %s",
-                            repair_id,
-                            index,
-                            total,
-                            target["x"],
-                            target["y"],
-                            target["z"],
-                            reason,
-                        )
+            def _stop_reason() -> str | None:
+                state = self._live_connection_state()
+                if state["locked"]:
+                    return "FarmBot is emergency-stopped"
+                if not state["connected"]:
+                    return "FarmBot lost its MQTT connection"
+                return None
 
-                    if frame is not None:
-                        record["frames"].append(frame)
-                        record["completed_targets"].append(target)
-                        consecutive_failures = 0
-                        continue
+            async def _verify_later(
+                number: int, target: dict[str, float], before: set[int], started_at
+            ) -> None:
+                task = asyncio.create_task(
+                    self._wait_for_grid_image(
+                        before=before,
+                        target=target,
+                        started_at=started_at,
+                        timeout=GRID_REPAIR_IMAGE_TIMEOUT_SECONDS,
+                    )
+                )
+                pending.append((number, target, task))
+                while len(pending) >= GRID_REPAIR_PIPELINE_DEPTH:
+                    await _settle_oldest()
+
+            async def _settle_oldest() -> None:
+                number, target, task = pending.pop(0)
+                frame = await task
+                if frame is None:
+                    unverified.append((number, target))
+                    return
+                record["frames"].append({**frame, "target_index": target.get("index")})
+                record["completed_targets"].append(target)
+
+            async def _capture(number: int, target: dict[str, float], **kwargs) -> bool:
+                """Capture one cell; True when it succeeded (or was queued to verify)."""
+                try:
+                    frame = await self._capture_grid_target(
+                        repair_id=repair_id,
+                        record=record,
+                        target=target,
+                        target_number=number,
+                        total=total,
+                        **kwargs,
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:  # pylint: disable=broad-except
+                    reason = str(err)[:240] or "Unexpected error during photo-grid capture"
+                    _fail(target, number, reason, "error")
+                    return False
+                if frame is None:
+                    return False
+                if kwargs.get("verify", True):
+                    record["frames"].append(frame)
+                    record["completed_targets"].append(target)
+                    return True
+                await _verify_later(number, target, **frame)
+                return True
 
-                    consecutive_failures += 1
-                    if consecutive_failures >= GRID_REPAIR_MAX_CONSECUTIVE_FAILURES:
-                        abort_reason = (
-                            f"Photo-grid repair aborted after {consecutive_failures} "
-                            f"consecutive failed cells (of {total} requested)"
-                        )
-                        _LOGGER.warning("Photo-grid repair %s aborted: %s", repair_id, abort_reason)
-                        break
-
-                # An abort leaves the tail of the route untouched. Naming those
-                # cells lets the caller resume them without re-photographing
-                # anything this run already captured.
-                attempted = {
-                    item.get("index")
-                    for group in ("completed_targets", "failed_targets")
-                    for item in record[group]
+            if engine == "lua":
+                before = {
+                    int(item["id"])
+                    for item in await self.api.async_get_images()
+                    if isinstance(item, dict) and item.get("id") is not None
                 }
-                record["unattempted_targets"] = [
-                    item for item in targets if item.get("index") not in attempted
-                ]
-                succeeded = len(record["frames"])
-                failed_targets = record["failed_targets"]
-                failure_reasons = record.get("failure_reasons") or []
-
-                def _summary() -> str:
-                    plural = "" if total == 1 else "s"
-                    text = f"Captured {succeeded} of {total} photo-grid cell{plural}"
-                    if failed_targets:
-                        text += f"; {len(failed_targets)} failed (first: {failure_reasons[0]})"
-                    return text
+                started_at = dt_util.utcnow()
+                record["started_at"] = started_at.isoformat()
+                reports = await self._run_lua_capture(
+                    record=record,
+                    stops=[
+                        {**target, "safe_z": travel_z is None, "travel_z": travel_z}
+                        for target, travel_z in zip(targets, travel)
+                    ],
+                    tolerance_mm=GRID_REPAIR_POSITION_TOLERANCE_MM,
+                )
+                for number, target in enumerate(targets, start=1):
+                    report = reports.get(number)
+                    if report is None or not report.ok:
+                        unverified.append((number, target))
+                    else:
+                        await _verify_later(number, target, before, started_at)
+
+            for index, target in enumerate(targets if engine == "rpc" else [], start=1):
+                stop_reason = _stop_reason()
+                if stop_reason is not None:
+                    abort_reason = (
+                        f"Photo-grid repair stopped before cell {index}/{total}: {stop_reason}"
+                    )
+                    _LOGGER.warning("Photo-grid repair %s aborted: %s", repair_id, stop_reason)
+                    break
+
+                if await _capture(
+                    index,
+                    target,
+                    # The move into the grid starts from wherever the
+                    # gantry was parked and must clear whatever is
+                    # between there and the first cell. Once inside a
+                    # cluster, the camera crosses at the cluster's
+                    # highest capture height instead of retracting.
+                    safe_z=travel[index - 1] is None,
+                    travel_z=travel[index - 1],
+                    verify=not pipeline,
+                ):
+                    consecutive_failures = 0
+                    continue
 
+                consecutive_failures += 1
+                if consecutive_failures >= GRID_REPAIR_MAX_CONSECUTIVE_FAILURES:
+                    abort_reason = (
+                        f"Photo-grid repair aborted after {consecutive_failures} "
+                        f"consecutive failed cells (of {total} requested)"
+                    )
+                    _LOGGER.warning("Photo-grid repair %s aborted: %s", repair_id, abort_reason)
+                    break
+
+            # Verification needs only the image API, so photos already taken
+            # are still waited for when the route was cut short.
+            while pending:
+                await _settle_oldest()
+            unverified.sort(key=lambda item: item[0])
+            if unverified:
+                record["verification_retries"] = [target.get("index") for _, target in unverified]
+            consecutive_failures = 0
+            for position, (number, target) in enumerate(unverified, start=1):
+                if abort_reason is None:
+                    stop_reason = _stop_reason()
+                    if stop_reason is not None:
+                        abort_reason = f"Photo-grid repair stopped during retries: {stop_reason}"
                 if abort_reason is not None:
-                    final_status = "failed"
-                    final_message = f"{abort_reason}. {_summary()}."
-                elif total > 0 and succeeded == total:
-                    final_status = "complete"
-                    final_message = (
-                        f"Verified {succeeded} photo-grid image(s) at the requested coordinates"
+                    _fail(
+                        target,
+                        number,
+                        "FarmBot did not produce a processed image at "
+                        f"X {target['x']:.1f}, Y {target['y']:.1f}, Z {target['z']:.1f} "
+                        "and the cell was not retried",
+                        "upload_timeout",
                     )
-                else:
-                    final_status = "failed"
-                    final_message = _summary()
-                final_message = final_message[:240] or final_message
-            except Exception as err:  # pylint: disable=broad-except
-                _LOGGER.warning("Photo-grid repair %s failed: %s", repair_id, err)
-                final_message = str(err)[:240] or final_message
-            finally:
-                _LOGGER.info(
-                    "Photo-grid repair %s finished: requested %d target(s), "
-                    "captured %d frame(s), %d failed",
-                    repair_id,
-                    len(targets),
-                    len(record["frames"]),
-                    len(record["failed_targets"]),
+                    continue
+                record["message"] = (
+                    f"Re-photographing cell {position} of {len(unverified)} "
+                    "whose image did not arrive"
                 )
-                if not initial_light_value:
-                    try:
-                        await self.async_rpc_request(
-                            [
-                                {
-                                    "kind": "write_pin",
-                                    "args": {
-                                        "pin_number": GRID_REPAIR_LIGHTING_PIN,
-                                        "pin_value": 0,
-                                        "pin_mode": 0,
-                                    },
-                                }
-                            ],
-                            timeout=SOIL_RPC_TIMEOUT_SECONDS,
-                        )
-                    except Exception as err:  # pylint: disable=broad-except
-                        _LOGGER.warning(
-                            "Could not restore lighting after grid repair %s: %s",
-                            repair_id,
-                            err,
-                        )
-                if all(original_position.get(axis) is not None for axis in ("x", "y", "z")):
-                    try:
-                        await self.async_rpc_request(
-                            [
-                                self._move_command(
-                                    **{
-                                        axis: float(original_position[axis])
-                                        for axis in ("x", "y", "z")
-                                    },
-                                    speed=100,
-                                    safe_z=True,
-                                )
-                            ],
-                            timeout=60,
-                        )
-                    except Exception as err:  # pylint: disable=broad-except
-                        _LOGGER.warning(
-                            "Could not restore position after grid repair %s: %s",
-                            repair_id,
-                            err,
-                        )
-                record.update(
-                    status=final_status,
-                    message=final_message,
-                    completed_at=dt_util.utcnow().isoformat(),
+                if await _capture(
+                    number, target, safe_z=retry_travel_z is None, travel_z=retry_travel_z
+                ):
+                    consecutive_failures = 0
+                    continue
+                consecutive_failures += 1
+                if consecutive_failures >= GRID_REPAIR_MAX_CONSECUTIVE_FAILURES:
+                    abort_reason = (
+                        f"Photo-grid repair aborted after {consecutive_failures} "
+                        f"consecutive failed retries (of {total} requested)"
+                    )
+                    _LOGGER.warning("Photo-grid repair %s aborted: %s", repair_id, abort_reason)
+
+            # An abort leaves the tail of the route untouched. Naming those
+            # cells lets the caller resume them without re-photographing
+            # anything this run already captured.
+            attempted = {
+                item.get("index")
+                for group in ("completed_targets", "failed_targets")
+                for item in record[group]
+            }
+            record["unattempted_targets"] = [
+                item for item in targets if item.get("index") not in attempted
+            ]
+            succeeded = len(record["frames"])
+            failed_targets = record["failed_targets"]
+            failure_reasons = record.get("failure_reasons") or []
+            reused = len(record.get("reused_frames") or [])
+
+            def _summary() -> str:
+                plural = "" if total == 1 else "s"
+                text = f"Captured {succeeded} of {total} photo-grid cell{plural}"
+                if reused:
+                    text += f" (reused {reused} recent image(s) for the rest of the grid)"
+                if failed_targets:
+                    text += f"; {len(failed_targets)} failed (first: {failure_reasons[0]})"
+                return text
+
+            if abort_reason is not None:
+                final_status = "failed"
+                final_message = f"{abort_reason}. {_summary()}."
+            elif total > 0 and succeeded == total:
+                final_status = "complete"
+                final_message = (
+                    f"Verified {succeeded} photo-grid image(s) at the requested coordinates"
                 )
+                if reused:
+                    final_message += f"; reused {reused} recent image(s)"
+            else:
+                final_status = "failed"
+                final_message = _summary()
+            final_message = final_message[:240] or final_message
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Photo-grid repair %s failed: %s", repair_id, err)
+            final_message = str(err)[:240] or final_message
+        finally:
+            for _, _, task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*(task for _, _, task in pending), return_exceptions=True)
+            _LOGGER.info(
+                "Photo-grid repair %s finished: requested %d target(s), "
+                "captured %d frame(s), %d failed",
+                repair_id,
+                len(targets),
+                len(record["frames"]),
+                len(record["failed_targets"]),
+            )
+            self._release_capture_hardware()
+            record.update(
+                status=final_status,
+                message=final_message,
+                completed_at=dt_util.utcnow().isoformat(),
+            )
 
     # -------------------- Experimental raw G-code --------------------
 
     def plan_gcode(
-        self, *, lines: list[str], firmware_config: dict[str, Any], feed_mm_per_min: float
-    ) -> tuple[gcode_lib.GcodeProgram, dict[str, Any]]:
+        self,
+        *,
+        lines: list[str] | None = None,
+        shape: dict[str, Any] | None = None,
+        firmware_config: dict[str, Any],
+        feed_mm_per_min: float,
+        simplify_tolerance_mm: float | None = None,
+    ) -> tuple[gcode_lib.GcodePlan, dict[str, Any]]:
         """Validate a program against this bot without sending anything.
 
         Split out from :meth:`start_gcode_run` so a caller can dry-run a
         program -- the app previews one before every send -- and get the exact
-        same verdict the real run would give.
+        same verdict the real run would give. The validated plan is cached
+        under its ``plan_id``, so the same program previewed again, or run by
+        ID, is not parsed and rendered a second time.
+
+        Give either ``lines`` or a ``shape`` spec, which is generated here
+        (see :mod:`.toolpath`) and checked the same way.
+        """
+        if (lines is None) == (shape is None):
+            raise gcode_lib.GcodeError("Give either lines or a shape")
+        if shape is not None and simplify_tolerance_mm is not None:
+            raise gcode_lib.GcodeError(
+                "Simplification applies to written lines; a shape is generated to its "
+                "chord tolerance"
+            )
+        state = self._gcode_state(firmware_config)
+        feed = feed_mm_per_min or GCODE_DEFAULT_FEED_MM_PER_MIN
+        firmware_key = gcode_lib.firmware_key(firmware_config)
+        cell = gcode_lib.start_cell(state["position"])
+        plan_id = None
+        if cell is not None:
+            plan_id = gcode_lib.plan_id(
+                lines if shape is None else shape,
+                feed_mm_per_min=feed,
+                simplify_tolerance_mm=simplify_tolerance_mm,
+                firmware_key=firmware_key,
+                start_cell=cell,
+            )
+            cached = self._gcode_plans.pop(plan_id, None)
+            if cached is not None:
+                self._gcode_plans[plan_id] = cached
+                return cached, state
+        if shape is not None:
+            program = toolpath.shape_program(
+                shape,
+                start_position=state["position"],
+                axis_bounds=state["axis_bounds"],
+                firmware_config=firmware_config,
+                feed_mm_per_min=feed,
+            )
+        else:
+            program = gcode_lib.parse_program(
+                lines,
+                start_position=state["position"],
+                axis_bounds=state["axis_bounds"],
+                firmware_config=firmware_config,
+                default_feed_mm_per_min=feed,
+                simplify_tolerance_mm=simplify_tolerance_mm,
+            )
+        self._motion = motion.MotionModel(firmware_config)
+        chunks = self._gcode_chunks(program)
+        plan = gcode_lib.GcodePlan(
+            plan_id=plan_id,
+            program=program,
+            chunks=tuple(gcode_lib.lua_source(moves) for moves, _ in chunks),
+            chunk_seconds=tuple(seconds for _, seconds in chunks),
+            firmware_key=firmware_key,
+            start_cell=cell,
+        )
+        self._gcode_plans[plan_id] = plan
+        while len(self._gcode_plans) > GCODE_PLAN_CACHE_SIZE:
+            self._gcode_plans.pop(next(iter(self._gcode_plans)))
+        return plan, state
+
+    def gcode_plan(
+        self, plan_id: str, firmware_config: dict[str, Any]
+    ) -> tuple[gcode_lib.GcodePlan, dict[str, Any]]:
+        """Look up a previewed plan, provided it still holds for this bot.
+
+        A plan is dropped once the gantry has moved off its start position or
+        the firmware movement settings have changed, because its resolved
+        moves and bounds checks no longer apply.
         """
+        state = self._gcode_state(firmware_config)
+        plan = self._gcode_plans.get(plan_id)
+        if plan is None:
+            raise gcode_lib.GcodeError("G-code plan was not found; preview the program again")
+        if plan.firmware_key != gcode_lib.firmware_key(firmware_config):
+            del self._gcode_plans[plan_id]
+            raise gcode_lib.GcodeError(
+                "FarmBot's movement settings changed after the program was planned; "
+                "preview it again"
+            )
+        if plan.start_cell != gcode_lib.start_cell(state["position"]):
+            del self._gcode_plans[plan_id]
+            raise gcode_lib.GcodeError(
+                "FarmBot moved after the program was planned; preview it again"
+            )
+        return plan, state
+
+    def _gcode_state(self, firmware_config: dict[str, Any]) -> dict[str, Any]:
         state = self.soil_motion_state(firmware_config)
         if not state["connected"]:
             raise gcode_lib.GcodeError("FarmBot is not connected")
         if state["locked"]:
             raise gcode_lib.GcodeError("FarmBot is emergency-stopped")
-        program = gcode_lib.parse_program(
-            lines,
-            start_position=state["position"],
-            axis_bounds=state["axis_bounds"],
-            firmware_config=firmware_config,
-            default_feed_mm_per_min=feed_mm_per_min or GCODE_DEFAULT_FEED_MM_PER_MIN,
-        )
-        return program, state
+        return state
+
+    def _gcode_chunks(
+        self, program: gcode_lib.GcodeProgram
+    ) -> list[tuple[list[gcode_lib.GcodeMove], float]]:
+        """Split a program into Lua chunks sized by estimated motion time.
+
+        Returns each chunk's moves with its own motion estimate, which is what
+        that chunk's RPC timeout is derived from.
+        """
+        move_seconds = self._motion.gcode_move_seconds(program.start_position, program.moves)
+        chunks = []
+        index = 0
+        for moves in gcode_lib.chunk_moves(program.moves, move_seconds=move_seconds):
+            chunks.append((moves, sum(move_seconds[index : index + len(moves)])))
+            index += len(moves)
+        return chunks
 
     def start_gcode_run(
         self,
         *,
-        lines: list[str],
+        lines: list[str] | None = None,
+        shape: dict[str, Any] | None = None,
+        plan_id: str | None = None,
         firmware_config: dict[str, Any],
-        feed_mm_per_min: float,
+        feed_mm_per_min: float = GCODE_DEFAULT_FEED_MM_PER_MIN,
         return_to_start: bool = True,
+        pipeline: bool = False,
+        simplify_tolerance_mm: float | None = None,
+        priority: int = MOTION_JOB_DEFAULT_PRIORITY,
     ) -> str:
-        """Validate a raw G-code program and start executing it.
+        """Validate a raw G-code program and queue it for execution.
 
         The program is resolved and bounds-checked in full before the first
         chunk is published, so a program that would leave the bed is refused
-        outright rather than stopped partway through.
+        outright rather than stopped partway through. It is resolved against
+        the current position, so when its turn comes it only runs if the
+        gantry is still there. ``pipeline`` keeps the next chunk queued on
+        FarmBot OS while the current one runs (see :meth:`_run_gcode`).
+
+        Pass ``lines``, a ``shape`` spec or the ``plan_id`` of a preview; a
+        plan runs exactly as it was validated, with its feed rate and
+        simplification.
         """
-        program, state = self.plan_gcode(
-            lines=lines, firmware_config=firmware_config, feed_mm_per_min=feed_mm_per_min
-        )
-        self._gcode_tasks = {t for t in self._gcode_tasks if not t.done()}
-        self._grid_repair_tasks = {t for t in self._grid_repair_tasks if not t.done()}
-        self._soil_capture_tasks = {t for t in self._soil_capture_tasks if not t.done()}
-        if (
-            state["busy"]
-            or self._soil_capture_lock.locked()
-            or any(not task.done() for task in self._gcode_tasks)
-            or any(not task.done() for task in self._grid_repair_tasks)
-            or any(not task.done() for task in self._soil_capture_tasks)
-        ):
-            raise gcode_lib.GcodeError("FarmBot is busy")
+        if sum(source is not None for source in (lines, shape, plan_id)) != 1:
+            raise gcode_lib.GcodeError("Give either lines, a shape or plan_id")
+        if plan_id is not None:
+            plan, state = self.gcode_plan(plan_id, firmware_config)
+        else:
+            plan, state = self.plan_gcode(
+                lines=lines,
+                shape=shape,
+                firmware_config=firmware_config,
+                feed_mm_per_min=feed_mm_per_min,
+                simplify_tolerance_mm=simplify_tolerance_mm,
+            )
+        program = plan.program
 
+        self._motion = motion.MotionModel(firmware_config)
         run_id = str(uuid.uuid4())
         extent = program.extent()
-        self.gcode_runs[run_id] = {
+        record = {
             "run_id": run_id,
             "status": "queued",
             "message": "Raw G-code run queued",
             "moves": len(program.moves),
-            "chunks_total": len(gcode_lib.lua_chunks(program.moves)),
+            "plan_id": plan.plan_id,
+            "chunks_total": len(plan.chunks),
             "chunks_sent": 0,
+            "pipeline": pipeline,
             "total_distance_mm": round(program.total_distance_mm, 1),
             "feed_mm_per_min": program.feed_mm_per_min,
             "start_position": {
@@ -1853,96 +2989,228 @@ class FarmbotManager:
             "warnings": list(program.warnings),
             "created_at": dt_util.utcnow().isoformat(),
         }
-        task = asyncio.create_task(
-            self._run_gcode(
+        if program.simplification is not None:
+            record["simplification"] = dict(program.simplification)
+
+        async def run() -> None:
+            reported = self._reported_position()
+            if reported is None or any(
+                abs(reported[axis] - program.start_position[axis])
+                > GCODE_START_POSITION_TOLERANCE_MM
+                for axis in ("x", "y", "z")
+            ):
+                record.update(
+                    status="failed",
+                    message="FarmBot moved after the program was planned; submit it again",
+                    completed_at=dt_util.utcnow().isoformat(),
+                )
+                return
+            await self._run_gcode(
                 run_id=run_id,
-                program=program,
+                plan=plan,
                 original_position=state["position"] if return_to_start else None,
-            ),
-            name=f"farmbot-gcode-{run_id}",
-        )
-        self._gcode_tasks.add(task)
-        task.add_done_callback(self._gcode_tasks.discard)
+                pipeline=pipeline,
+            )
+
+        duration = sum(plan.chunk_seconds)
+        if return_to_start and program.moves:
+            duration += self._motion.move_seconds(
+                program.moves[-1].target, program.start_position, safe_z=True
+            )
+        try:
+            self._queue_motion_job(
+                job_id=run_id,
+                kind="gcode",
+                record=record,
+                priority=priority,
+                estimated_seconds=MOTION_JOB_ESTIMATE_BASE_SECONDS + duration,
+                tasks=self._gcode_tasks,
+                run=run,
+            )
+        except ValueError as err:
+            raise gcode_lib.GcodeError(str(err)) from err
+        self.gcode_runs[run_id] = record
         return run_id
 
     async def _run_gcode(
         self,
         *,
         run_id: str,
-        program: gcode_lib.GcodeProgram,
+        plan: gcode_lib.GcodePlan,
         original_position: dict[str, Any] | None,
+        pipeline: bool = False,
     ) -> None:
-        """Publish each Lua chunk in order, aborting on disconnect or e-stop."""
+        """Publish each Lua chunk in order, aborting on disconnect or e-stop.
+
+        Unpipelined, a chunk is published only once the previous one has been
+        acknowledged, so the Farmduino idles for a broker round trip at every
+        chunk boundary. Pipelined, up to ``GCODE_PIPELINE_DEPTH`` chunks are in
+        flight: FarmBot OS holds the next chunk while the current one runs and
+        starts it as soon as the firmware answers. The e-stop and disconnect
+        checks still run before every chunk is published, and ``chunks_sent``
+        only counts acknowledged chunks, in order. A queued chunk's timeout
+        covers the motion of the chunk ahead of it as well as its own.
+
+        The record's ``timing`` compares the wall-clock time of the chunks
+        with the motion estimate, so the dispatch overhead of either mode can
+        be read off a finished run.
+        """
         record = self.gcode_runs[run_id]
-        chunks = gcode_lib.lua_chunks(program.moves)
+        program = plan.program
+        chunks, chunk_seconds = plan.chunks, plan.chunk_seconds
+        # Chunks queued on FarmBot OS behind the one being waited for:
+        # (chunk number, motion seconds, pending acknowledgement).
+        queued: list[tuple[int, float, asyncio.Task]] = []
         final_status, final_message = "failed", "Raw G-code run failed"
-        async with self._soil_capture_lock:
-            try:
-                record.update(status="running", message="Executing raw G-code")
-                for index, chunk in enumerate(chunks, start=1):
-                    state = self._live_connection_state()
-                    if not state["connected"] or state["locked"]:
-                        stop_reason = (
-                            "FarmBot is emergency-stopped"
-                            if state["locked"]
-                            else "FarmBot lost its MQTT connection"
-                        )
-                        raise RuntimeError(
-                            f"Stopped after {index - 1} of {len(chunks)} chunks: {stop_reason}"
-                        )
-                    await self.async_rpc_request(
-                        [gcode_lib.lua_node(chunk)],
-                        timeout=GCODE_CHUNK_RPC_TIMEOUT_SECONDS,
-                    )
-                    record["chunks_sent"] = index
-                    record["message"] = f"Executed chunk {index} of {len(chunks)}"
-                final_status = "complete"
-                final_message = (
-                    f"Executed {len(program.moves)} raw G-code move(s) over "
-                    f"{program.total_distance_mm:.0f} mm"
+        started = time.monotonic()
+
+        def check_available() -> None:
+            state = self._live_connection_state()
+            if not state["connected"] or state["locked"]:
+                stop_reason = (
+                    "FarmBot is emergency-stopped"
+                    if state["locked"]
+                    else "FarmBot lost its MQTT connection"
                 )
-            except asyncio.CancelledError:
-                raise
-            except Exception as err:  # pylint: disable=broad-except
-                _LOGGER.warning("Raw G-code run %s failed: %s", run_id, err)
-                final_message = str(err)[:240] or final_message
-            finally:
-                _LOGGER.info(
-                    "Raw G-code run %s finished: %d/%d chunk(s) sent, %d move(s) planned",
-                    run_id,
-                    record["chunks_sent"],
-                    len(chunks),
-                    len(program.moves),
+                raise RuntimeError(
+                    f"Stopped after {record['chunks_sent']} of {len(chunks)} chunks: "
+                    f"{stop_reason}"
                 )
-                # Restoring position goes back through FarmBot OS's own planner
-                # (safe_z and all), deliberately: whatever the raw program did,
-                # the return trip should be the supervised kind of move.
-                if original_position is not None and all(
-                    original_position.get(axis) is not None for axis in ("x", "y", "z")
-                ):
-                    try:
-                        await self.async_rpc_request(
-                            [
-                                self._move_command(
-                                    **{
-                                        axis: float(original_position[axis])
-                                        for axis in ("x", "y", "z")
-                                    },
-                                    speed=100,
-                                    safe_z=True,
-                                )
-                            ],
-                            timeout=60,
-                        )
-                    except Exception as err:  # pylint: disable=broad-except
-                        _LOGGER.warning(
-                            "Could not restore position after G-code run %s: %s", run_id, err
+
+        def publish(number: int, ahead_seconds: float) -> Awaitable[dict[str, Any]]:
+            return self.async_rpc_request(
+                [gcode_lib.lua_node(chunks[number - 1])],
+                timeout=motion.rpc_timeout(ahead_seconds + chunk_seconds[number - 1]),
+            )
+
+        def acknowledged(number: int) -> None:
+            record["chunks_sent"] = number
+            record["message"] = f"Executed chunk {number} of {len(chunks)}"
+
+        try:
+            record.update(status="running", message="Executing raw G-code")
+            if not pipeline:
+                for number in range(1, len(chunks) + 1):
+                    check_available()
+                    await publish(number, 0.0)
+                    acknowledged(number)
+            else:
+                published = 0
+                while published < len(chunks) or queued:
+                    while published < len(chunks) and len(queued) < GCODE_PIPELINE_DEPTH:
+                        check_available()
+                        published += 1
+                        ahead = sum(seconds for _, seconds, _ in queued)
+                        queued.append(
+                            (
+                                published,
+                                chunk_seconds[published - 1],
+                                asyncio.ensure_future(publish(published, ahead)),
+                            )
                         )
-                record.update(
-                    status=final_status,
-                    message=final_message,
-                    completed_at=dt_util.utcnow().isoformat(),
+                    number, _, acknowledgement = queued.pop(0)
+                    await acknowledgement
+                    acknowledged(number)
+            final_status = "complete"
+            final_message = (
+                f"Executed {len(program.moves)} raw G-code move(s) over "
+                f"{program.total_distance_mm:.0f} mm"
+            )
+        except asyncio.CancelledError:
+            for _, _, acknowledgement in queued:
+                acknowledgement.cancel()
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Raw G-code run %s failed: %s", run_id, err)
+            final_message = str(err)[:240] or final_message
+        finally:
+            if queued:
+                final_message = await self._settle_queued_gcode_chunks(
+                    record, queued, final_message
                 )
+            record["timing"] = {
+                "estimated_motion_seconds": round(
+                    sum(chunk_seconds[: record["chunks_sent"] + record.get("chunks_overrun", 0)]),
+                    2,
+                ),
+                "elapsed_seconds": round(time.monotonic() - started, 2),
+            }
+            _LOGGER.info(
+                "Raw G-code run %s finished: %d/%d chunk(s) sent, %d move(s) planned, "
+                "%.1f s for %.1f s of estimated motion",
+                run_id,
+                record["chunks_sent"],
+                len(chunks),
+                len(program.moves),
+                record["timing"]["elapsed_seconds"],
+                record["timing"]["estimated_motion_seconds"],
+            )
+            # Restoring position goes back through FarmBot OS's own planner
+            # (safe_z and all), deliberately: whatever the raw program did,
+            # the return trip should be the supervised kind of move.
+            if original_position is not None and all(
+                original_position.get(axis) is not None for axis in ("x", "y", "z")
+            ):
+                try:
+                    await self.async_rpc_request(
+                        [
+                            self._move_command(
+                                **{
+                                    axis: float(original_position[axis])
+                                    for axis in ("x", "y", "z")
+                                },
+                                speed=100,
+                                safe_z=True,
+                            )
+                        ],
+                        timeout=self._move_timeout(original_position, safe_z=True),
+                    )
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.warning(
+                        "Could not restore position after G-code run %s: %s", run_id, err
+                    )
+            record.update(
+                status=final_status,
+                message=final_message,
+                completed_at=dt_util.utcnow().isoformat(),
+            )
+
+    async def _settle_queued_gcode_chunks(
+        self,
+        record: dict[str, Any],
+        queued: list[tuple[int, float, asyncio.Task]],
+        message: str,
+    ) -> str:
+        """Account for pipelined chunks still on FarmBot OS after a failure.
+
+        There is no way to withdraw a single published RPC, so a chunk queued
+        behind the one that failed still runs unless the bot is locked. Its
+        acknowledgement is awaited rather than dropped, so the restore move is
+        not raced against it, and the motion it did is reported as
+        ``chunks_overrun`` instead of being hidden. With the bot locked or
+        unreachable there is nothing to wait for.
+        """
+        state = self._live_connection_state()
+        if not state["connected"] or state["locked"]:
+            for _, _, acknowledgement in queued:
+                acknowledgement.cancel()
+        outcomes = await asyncio.gather(
+            *(acknowledgement for _, _, acknowledgement in queued), return_exceptions=True
+        )
+        if state["locked"]:
+            return message
+        if not state["connected"]:
+            return f"{message}; {len(queued)} queued chunk(s) may still have run"[:240]
+        overrun = [
+            number
+            for (number, _, _), outcome in zip(queued, outcomes)
+            if not isinstance(outcome, BaseException)
+        ]
+        record["chunks_overrun"] = len(overrun)
+        if not overrun:
+            return message
+        chunk_list = ", ".join(str(number) for number in overrun)
+        return f"{message}; queued chunk(s) {chunk_list} had already run"[:240]
 
     def gcode_run(self, run_id: str) -> dict[str, Any] | None:
         return self.gcode_runs.get(run_id)
@@ -1957,81 +3225,6 @@ class FarmbotManager:
         rendered = f"{float(value):.6f}".rstrip("0").rstrip(".")
         return "0" if rendered in {"", "-0"} else rendered
 
-    @classmethod
-    def _weeding_lua(cls, weed: dict[str, Any], settings: dict[str, Any]) -> str:
-        """Build the trusted adaptive Lua routine for one straight cut.
-
-        Current is watched inside FarmBot OS, not polled through Home Assistant.
-        The callback switches the rotary output off as soon as the configured
-        load is exceeded. A cut overload reverses the next pass at half speed;
-        another overload raises the working height. Contact while lowering
-        raises the next attempt immediately.
-        """
-        number = cls._lua_number
-        start = weed["start"]
-        end = weed["end"]
-        transit_start = weed["transit_start"]
-        soil_z = float(weed["soil_z"])
-        tool_height = float(settings["tool_height_mm"])
-        safe_z = float(weed["travel_z"])
-        motor_pin = int(settings["motor_pin"])
-        current_pin = int(settings["current_pin"])
-        max_load = float(settings["max_load"])
-        attempts = int(settings["max_attempts"])
-        cut_speed = int(settings["cut_speed_percent"])
-        approach_speed = int(settings["approach_speed_percent"])
-        height_step = float(settings["height_step_mm"])
-        waypoint_moves = "\n".join(
-            f"move({{x={number(point['x'])},y={number(point['y'])},z=safez,speed=approach}})"
-            for point in weed.get("approach_waypoints", [])
-        )
-        return f"""local motor={motor_pin}; local current={current_pin}
-local limit={number(max_load)}
-local overloaded=false; local phase='idle'; local zoff={number(tool_height)}
-local ax={number(start["x"])}; local ay={number(start["y"])}
-local bx={number(end["x"])}; local by={number(end["y"])}
-local transitx={number(transit_start["x"])}; local transity={number(transit_start["y"])}
-local safez={number(safe_z)}; local soilz={number(soil_z)}
-local cutspd={cut_speed}; local approach={approach_speed}
-local riskz=-300
-watch_pin(current,function(data)
-  if tonumber(data.value) and tonumber(data.value) > limit and not overloaded then
-    overloaded=true; off(motor); toast('Rotary overload during '..phase,'warning')
-  end
-end)
-move({{z=safez,speed=approach}})
-move({{x=transitx,y=transity,z=safez,speed=approach}})
-{waypoint_moves}
-move({{x=ax,y=ay,z=safez,speed=approach}})
-local fromx=ax; local fromy=ay; local tox=bx; local toy=by
-for attempt=1,{attempts} do
-  overloaded=false; phase='lower'; on(motor)
-  local targetz=soilz+zoff
-  if targetz < riskz then
-    move({{x=fromx,y=fromy,z=riskz,speed=approach}})
-    move({{x=fromx,y=fromy,z=targetz,speed=25}})
-  else
-    move({{x=fromx,y=fromy,z=targetz,speed=approach}})
-  end
-  if overloaded then
-    zoff=zoff+{number(height_step)}
-  else
-    phase='cut'
-    local speed=cutspd
-    if attempt > 1 then speed=math.max(10,math.floor(cutspd/2)) end
-    move({{x=tox,y=toy,z=soilz+zoff,speed=speed}})
-    if not overloaded then
-      off(motor); phase='done'; toast('Weed pass complete','success'); break
-    end
-    if attempt > 1 then zoff=zoff+{number(height_step)} end
-  end
-  off(motor); move({{x=fromx,y=fromy,z=safez,speed=approach}})
-  local tx=fromx; local ty=fromy; fromx=tox; fromy=toy; tox=tx; toy=ty
-  move({{x=fromx,y=fromy,z=safez,speed=approach}})
-end
-off(motor); phase='retract'; move({{z=safez,speed=approach}})
-move({{x=bx,y=by,z=safez,speed=approach}})"""
-
     def plan_weeding(
         self,
         *,
@@ -2039,12 +3232,22 @@ move({{x=bx,y=by,z=safez,speed=approach}})"""
         settings: dict[str, Any],
         firmware_config: dict[str, Any],
     ) -> dict[str, Any]:
-        """Validate every cut and hardware limit before the first weed moves."""
+        """Validate every cut and hardware limit before the first weed moves.
+
+        Also plans the visiting order: unless ``optimize_order`` is false, the
+        cuts are re-ordered (and directly approached ones possibly reversed)
+        to minimise transit from the current position -- or from the tool
+        slot when ``manage_tool`` is set, returning there at the end. The
+        returned motion state carries the ``weeds`` to run, in order, and a
+        ``route`` summary with the planned transit distance.
+        """
         state = self.soil_motion_state(firmware_config)
         if not state["connected"]:
             raise ValueError("FarmBot is not connected")
         if state["locked"]:
             raise ValueError("FarmBot is emergency-stopped")
+        if not 1 <= len(weeds) <= WEEDING_MAX_WEEDS_PER_RUN:
+            raise ValueError(f"a weeding run takes 1 to {WEEDING_MAX_WEEDS_PER_RUN} weeds")
         attempts = int(settings["max_attempts"])
         if not 1 <= attempts <= WEEDING_MAX_ATTEMPTS:
             raise ValueError(f"max_attempts must be between 1 and {WEEDING_MAX_ATTEMPTS}")
@@ -2119,6 +3322,35 @@ move({{x=bx,y=by,z=safez,speed=approach}})"""
                             f"approach waypoint {axis.upper()} is outside "
                             "FarmBot's configured axis bounds"
                         )
+        tool_slot = None
+        if settings.get("manage_tool"):
+            # Mounting ends, and dismounting starts, in front of the slot.
+            tool_slot = {"x": front_x, "y": front_y}
+        position = state["position"]
+        if tool_slot is not None:
+            origin = tool_slot
+        elif position.get("x") is not None and position.get("y") is not None:
+            origin = {"x": float(position["x"]), "y": float(position["y"])}
+        else:
+            origin = weeds[0]["transit_start"]
+        if settings.get("optimize_order", True):
+            ordered, before, after = routing.order_weeds(
+                origin,
+                weeds,
+                finish=tool_slot,
+                time_budget=WEEDING_ROUTE_TIME_BUDGET_SECONDS,
+            )
+        else:
+            ordered = list(weeds)
+            before = after = routing.weed_transit_mm(origin, weeds, finish=tool_slot)
+        state["weeds"] = ordered
+        state["route"] = {
+            "optimized": ordered != list(weeds),
+            "order": [int(weed["weed_id"]) for weed in ordered],
+            "reversed": [int(weed["weed_id"]) for weed in ordered if weed.get("reversed")],
+            "request_order_transit_mm": round(before, 1),
+            "planned_transit_mm": round(after, 1),
+        }
         return state
 
     @classmethod
@@ -2214,26 +3446,126 @@ move_absolute({number(front[0])},{number(front[1])},{number(z)},50)
 move_absolute({number(front[0])},{number(front[1])},{number(z + 50)},50)
 {postcheck}update_device({{mounted_tool_id=0}}); find_home()"""
 
+    @staticmethod
+    def _rotary_tool(settings: dict[str, Any]) -> tuple[str, Any]:
+        """What identifies the managed tool: its ID when given, else its name."""
+        if settings.get("tool_id"):
+            return ("id", int(settings["tool_id"]))
+        return ("name", str(settings["tool_name"]))
+
+    async def _rotary_tool_mounted(
+        self, settings: dict[str, Any], lease: dict[str, Any] | None
+    ) -> bool:
+        """Is the tool ``settings`` manages already on the UTM?
+
+        A tool-verification reading in the status stream that says nothing is
+        mounted settles it. Otherwise the device resource's
+        ``mounted_tool_id`` decides, matched by name through the tool list
+        when no ``tool_id`` was given. If the API cannot answer, a lease this
+        manager holds on the same tool is trusted.
+        """
+        pin = ((self.status or {}).get("pins") or {}).get(str(TOOL_VERIFICATION_PIN)) or {}
+        try:
+            if pin.get("value") is not None and float(pin["value"]) != 0:
+                return False
+        except (TypeError, ValueError):
+            pass
+        tool = self._rotary_tool(settings)
+        try:
+            device = await self.api.async_get_device()
+            mounted = int(device.get("mounted_tool_id") or 0)
+            if not mounted:
+                return False
+            if tool[0] == "id":
+                return mounted == tool[1]
+            return any(
+                item.get("id") == mounted and item.get("name") == tool[1]
+                for item in await self.api.async_get_tools()
+            )
+        except (FarmbotApiError, TypeError, ValueError) as err:
+            _LOGGER.debug("Could not read the mounted tool, relying on the lease: %s", err)
+            return lease is not None and lease["tool"] == tool
+
+    def _hold_rotary_tool(self, settings: dict[str, Any], seconds: float) -> str:
+        """Leave the tool mounted for ``seconds``; returns when the hold ends."""
+        held_until = (dt_util.utcnow() + timedelta(seconds=seconds)).isoformat()
+        self._tool_lease = {
+            "tool": self._rotary_tool(settings),
+            "settings": dict(settings),
+            "held_until": held_until,
+            "timer": self.hass.loop.call_later(seconds, self._tool_lease_expired),
+        }
+        return held_until
+
+    def _take_tool_lease(self) -> dict[str, Any] | None:
+        """Claim the held tool, if any, for the job starting now."""
+        lease, self._tool_lease = self._tool_lease, None
+        if lease is not None and lease["timer"] is not None:
+            lease["timer"].cancel()
+        return lease
+
+    def _tool_lease_expired(self) -> None:
+        """Queue the held tool's return to its slot like any other gantry job."""
+        lease = self._tool_lease
+        if lease is None:
+            return
+        lease["timer"] = None
+        record: dict[str, Any] = {"status": "queued", "message": "Rotary tool return queued"}
+        try:
+            self._queue_motion_job(
+                job_id=str(uuid.uuid4()),
+                kind="tool_dismount",
+                record=record,
+                priority=MOTION_JOB_DEFAULT_PRIORITY,
+                estimated_seconds=MOTION_JOB_ESTIMATE_BASE_SECONDS,
+                tasks=None,
+                run=lambda: self._run_tool_dismount(record),
+            )
+        except MotionJobQueueFull as err:
+            # The lease stays; the next job that is not a weeding run returns it.
+            _LOGGER.warning("Could not queue the rotary tool's return: %s", err)
+
+    async def _run_tool_dismount(self, record: dict[str, Any]) -> None:
+        record.update(status="running", message="Returning the rotary tool to its slot")
+        problem = await self._release_tool_lease()
+        record.update(
+            status="failed" if problem else "complete",
+            message=problem or "Rotary tool returned to its slot",
+            completed_at=dt_util.utcnow().isoformat(),
+        )
+
+    async def _release_tool_lease(self) -> str | None:
+        """Return a held tool to its slot; says why not if that failed."""
+        lease = self._take_tool_lease()
+        if lease is None:
+            return None
+        return await self._return_rotary_tool(lease["settings"])
+
+    async def _return_rotary_tool(self, settings: dict[str, Any]) -> str | None:
+        try:
+            await self.async_rpc_request(
+                [gcode_lib.lua_node(self._dismount_tool_lua(settings))],
+                timeout=self._motion_timeout(motion.tool_legs(settings, mount=False)),
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error("Could not return the rotary tool to its slot: %s", err)
+            return f"Could not return the rotary tool to its slot: {err}"[:240]
+        return None
+
     def start_weeding_run(
         self,
         *,
         weeds: list[dict[str, Any]],
         settings: dict[str, Any],
         firmware_config: dict[str, Any],
+        priority: int = MOTION_JOB_DEFAULT_PRIORITY,
     ) -> str:
-        state = self.plan_weeding(weeds=weeds, settings=settings, firmware_config=firmware_config)
-        active_sets = (
-            self._soil_capture_tasks,
-            self._grid_repair_tasks,
-            self._gcode_tasks,
-            self._weeding_tasks,
-        )
-        for task_set in active_sets:
-            task_set.intersection_update(task for task in task_set if not task.done())
-        if state["busy"] or any(active_sets):
-            raise ValueError("FarmBot is busy")
+        plan = self.plan_weeding(weeds=weeds, settings=settings, firmware_config=firmware_config)
+        weeds = plan["weeds"]
         run_id = str(uuid.uuid4())
-        self.weeding_runs[run_id] = {
+        record = {
             "run_id": run_id,
             "status": "queued",
             "message": "Adaptive weeding queued",
@@ -2241,113 +3573,178 @@ move_absolute({number(front[0])},{number(front[1])},{number(z + 50)},50)
             "weeds_completed": 0,
             "weeds_failed": 0,
             "results": [],
+            "route": plan["route"],
             "created_at": dt_util.utcnow().isoformat(),
         }
-        task = asyncio.create_task(
-            self._run_weeding(run_id=run_id, weeds=weeds, settings=settings),
-            name=f"farmbot-weeding-{run_id}",
+        self._motion = motion.MotionModel(firmware_config)
+        start = plan["position"]
+        if any(start.get(axis) is None for axis in ("x", "y", "z")):
+            start = {**weeds[0]["transit_start"], "z": weeds[0]["travel_z"]}
+        self._queue_motion_job(
+            job_id=run_id,
+            kind="weeding",
+            record=record,
+            priority=priority,
+            estimated_seconds=MOTION_JOB_ESTIMATE_BASE_SECONDS
+            + self._motion.weeding_seconds(start, weeds, settings),
+            tasks=self._weeding_tasks,
+            run=lambda: self._run_weeding(run_id=run_id, weeds=weeds, settings=settings),
         )
-        self._weeding_tasks.add(task)
-        task.add_done_callback(self._weeding_tasks.discard)
+        self.weeding_runs[run_id] = record
         return run_id
 
     async def _run_weeding(
         self, *, run_id: str, weeds: list[dict[str, Any]], settings: dict[str, Any]
     ) -> None:
         record = self.weeding_runs[run_id]
-        async with self._soil_capture_lock:
-            record.update(status="running", message="Starting adaptive rotary weeding")
-            tool_mounted = False
-            final_status, final_message = "failed", "Adaptive weeding failed"
-            try:
-                if settings.get("manage_tool"):
-                    record["message"] = "Finding home and mounting the rotary tool"
+        record.update(status="running", message="Starting adaptive rotary weeding")
+        tool_mounted = False
+        final_status, final_message = "failed", "Adaptive weeding failed"
+        try:
+            if settings.get("manage_tool"):
+                lease = self._take_tool_lease()
+                if await self._rotary_tool_mounted(settings, lease):
+                    record.update(message="Reusing the mounted rotary tool", tool_reused=True)
+                else:
+                    if lease is not None and lease["tool"] != self._rotary_tool(settings):
+                        record["message"] = "Returning the previous tool to its slot"
+                        problem = await self._return_rotary_tool(lease["settings"])
+                        if problem is not None:
+                            raise RuntimeError(problem)
+                    record.update(
+                        message="Finding home and mounting the rotary tool", tool_reused=False
+                    )
                     await self.async_rpc_request(
                         [gcode_lib.lua_node(self._mount_tool_lua(settings))],
-                        timeout=WEEDING_RPC_TIMEOUT_SECONDS,
+                        timeout=self._motion_timeout(motion.tool_legs(settings, mount=True)),
                     )
-                    tool_mounted = True
-                for index, weed in enumerate(weeds, start=1):
-                    state = self._live_connection_state()
-                    if not state["connected"] or state["locked"]:
-                        raise RuntimeError(
-                            "FarmBot is emergency-stopped"
-                            if state["locked"]
-                            else "FarmBot lost its MQTT connection"
-                        )
-                    record["message"] = f"Mowing weed {index} of {len(weeds)}"
-                    try:
-                        await self.async_rpc_request(
-                            [gcode_lib.lua_node(self._weeding_lua(weed, settings))],
-                            timeout=WEEDING_RPC_TIMEOUT_SECONDS,
-                        )
-                        record["weeds_completed"] += 1
-                        record["results"].append(
-                            {"weed_id": int(weed["weed_id"]), "status": "attempted"}
-                        )
-                    except asyncio.CancelledError:
-                        raise
-                    except Exception as err:  # continue with the next weed
-                        message = str(err)[:160] or "weeding command failed"
-                        record["weeds_failed"] += 1
-                        record["results"].append(
-                            {
-                                "weed_id": int(weed["weed_id"]),
-                                "status": "failed",
-                                "message": message,
-                            }
-                        )
-                        _LOGGER.warning(
-                            "Weeding run %s weed %s failed: %s", run_id, weed["weed_id"], err
-                        )
-                final_status = "complete"
-                final_message = (
-                    f"Attempted {record['weeds_completed']} of {len(weeds)} weed(s); "
-                    f"{record['weeds_failed']} failed"
+                tool_mounted = True
+            await self._run_weeding_chunks(run_id=run_id, weeds=weeds, settings=settings)
+            final_status = "complete"
+            final_message = (
+                f"Attempted {record['weeds_completed']} of {len(weeds)} weed(s); "
+                f"{record['weeds_failed']} failed"
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            final_message = str(err)[:240] or final_message
+        finally:
+            # Lua also switches the tool off. This separate supervised write
+            # covers Lua/RPC failure before its cleanup statement executes.
+            try:
+                await self.async_rpc_request(
+                    [
+                        {
+                            "kind": "write_pin",
+                            "args": {
+                                "pin_number": int(settings["motor_pin"]),
+                                "pin_value": 0,
+                                "pin_mode": 0,
+                            },
+                        }
+                    ],
+                    timeout=30,
                 )
-            except asyncio.CancelledError:
-                raise
             except Exception as err:  # pylint: disable=broad-except
-                final_message = str(err)[:240] or final_message
-            finally:
-                # Lua also switches the tool off. This separate supervised write
-                # covers Lua/RPC failure before its cleanup statement executes.
+                _LOGGER.error(
+                    "Could not confirm rotary tool off after weeding run %s: %s", run_id, err
+                )
+            hold_seconds = float(settings.get("tool_hold_seconds") or 0)
+            if tool_mounted and final_status == "complete" and hold_seconds > 0:
+                # The next weeding run reuses it; anything else returns it first.
+                record["tool_held_until"] = self._hold_rotary_tool(settings, hold_seconds)
+            elif tool_mounted:
+                record["message"] = "Returning the rotary tool to its slot"
                 try:
                     await self.async_rpc_request(
-                        [
-                            {
-                                "kind": "write_pin",
-                                "args": {
-                                    "pin_number": int(settings["motor_pin"]),
-                                    "pin_value": 0,
-                                    "pin_mode": 0,
-                                },
-                            }
-                        ],
-                        timeout=30,
+                        [gcode_lib.lua_node(self._dismount_tool_lua(settings))],
+                        timeout=self._motion_timeout(motion.tool_legs(settings, mount=False)),
                     )
                 except Exception as err:  # pylint: disable=broad-except
                     _LOGGER.error(
-                        "Could not confirm rotary tool off after weeding run %s: %s", run_id, err
+                        "Could not dismount rotary tool after run %s: %s", run_id, err
                     )
-                if tool_mounted:
-                    record["message"] = "Returning the rotary tool to its slot"
-                    try:
-                        await self.async_rpc_request(
-                            [gcode_lib.lua_node(self._dismount_tool_lua(settings))],
-                            timeout=WEEDING_RPC_TIMEOUT_SECONDS,
-                        )
-                    except Exception as err:  # pylint: disable=broad-except
-                        _LOGGER.error(
-                            "Could not dismount rotary tool after run %s: %s", run_id, err
-                        )
-                        final_status = "failed"
-                        final_message = f"Weeding finished, but tool dismount failed: {err}"[:240]
-                record.update(
-                    status=final_status,
-                    message=final_message,
-                    completed_at=dt_util.utcnow().isoformat(),
+                    final_status = "failed"
+                    final_message = f"Weeding finished, but tool dismount failed: {err}"[:240]
+            record.update(
+                status=final_status,
+                message=final_message,
+                completed_at=dt_util.utcnow().isoformat(),
+            )
+
+    async def _run_weeding_chunks(
+        self, *, run_id: str, weeds: list[dict[str, Any]], settings: dict[str, Any]
+    ) -> None:
+        """Cut ``weeds`` on the bot in batched Lua chunks (see weeding_lua.py).
+
+        Every weed still gets its own ``results`` entry, from its report line.
+        A weed without a report counts as attempted when its chunk was
+        acknowledged and as failed when the chunk's RPC failed; either way the
+        run carries on with the next chunk, as it did weed by weed.
+        """
+        record = self.weeding_runs[run_id]
+        tag = capture_lua.new_tag()
+        reports: dict[int, weeding_lua.WeedReport] = {}
+        self._lua_weeding_reports[tag] = reports
+        attempts = int(settings["max_attempts"])
+        try:
+            for chunk in weeding_lua.run_chunks(tag, weeds, settings):
+                state = self._live_connection_state()
+                if not state["connected"] or state["locked"]:
+                    raise RuntimeError(
+                        "FarmBot is emergency-stopped"
+                        if state["locked"]
+                        else "FarmBot lost its MQTT connection"
+                    )
+                first, last = chunk.numbers[0], chunk.numbers[-1]
+                record["message"] = (
+                    f"Mowing weed {first} of {len(weeds)}"
+                    if first == last
+                    else f"Mowing weeds {first}-{last} of {len(weeds)}"
                 )
+                legs = [
+                    leg
+                    for weed in chunk.weeds
+                    for leg in motion.weed_legs(weed, settings, attempts=attempts)
+                ]
+                chunk_error = None
+                try:
+                    await self.async_rpc_request(
+                        [gcode_lib.lua_node(chunk.source)], timeout=self._motion_timeout(legs)
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:  # continue with the next chunk
+                    chunk_error = str(err)[:160] or "weeding command failed"
+                    _LOGGER.warning(
+                        "Weeding run %s weeds %d-%d failed: %s", run_id, first, last, err
+                    )
+                else:
+                    deadline = asyncio.get_running_loop().time() + WEEDING_LUA_REPORT_GRACE_SECONDS
+                    while (
+                        any(number not in reports for number in chunk.numbers)
+                        and asyncio.get_running_loop().time() < deadline
+                    ):
+                        await asyncio.sleep(0.1)
+                for number, weed in zip(chunk.numbers, chunk.weeds):
+                    result: dict[str, Any] = {"weed_id": int(weed["weed_id"])}
+                    report = reports.get(number)
+                    if report is not None and report.outcome == "error":
+                        result.update(status="failed", message=str(report.message)[:160])
+                    elif report is None and chunk_error is not None:
+                        result.update(status="failed", message=chunk_error)
+                    else:
+                        result["status"] = "attempted"
+                        if report is not None:
+                            result.update(outcome=report.outcome, passes=report.passes)
+                    if result["status"] == "attempted":
+                        record["weeds_completed"] += 1
+                    else:
+                        record["weeds_failed"] += 1
+                    record["results"].append(result)
+        finally:
+            self._lua_weeding_reports.pop(tag, None)
 
     def weeding_run(self, run_id: str) -> dict[str, Any] | None:
         return self.weeding_runs.get(run_id)
@@ -2360,6 +3757,105 @@ move_absolute({number(front[0])},{number(front[1])},{number(z + 50)},50)
             return None
         return normalized if all(math.isfinite(value) for value in normalized.values()) else None
 
+    def _motion_timeout(self, legs: list[motion.Leg]) -> float:
+        """How long to wait for moves that start wherever FarmBot reports it is."""
+        start = self._reported_position() or {axis: 0.0 for axis in ("x", "y", "z")}
+        return motion.rpc_timeout(self._motion.path_seconds(start, legs))
+
+    def _move_timeout(self, target: dict[str, Any], *, safe_z: bool, speed: int = 100) -> float:
+        """How long to wait for one ``move`` RPC to ``target``."""
+        return self._motion_timeout(
+            [({axis: float(target[axis]) for axis in ("x", "y", "z")}, speed, safe_z)]
+        )
+
+    def _estimate_route_seconds(
+        self,
+        start: dict[str, Any] | None,
+        targets: list[dict[str, Any]],
+        *,
+        safe_z: bool,
+        return_to_start: bool,
+        dwell_seconds: float = MOTION_JOB_ESTIMATE_SECONDS_PER_PHOTO,
+    ) -> float:
+        """Queue estimate for a job that photographs ``targets`` in order."""
+        if not targets:
+            return MOTION_JOB_ESTIMATE_BASE_SECONDS
+        if start is None or any(start.get(axis) is None for axis in ("x", "y", "z")):
+            start, return_to_start = targets[0], False
+        return MOTION_JOB_ESTIMATE_BASE_SECONDS + self._motion.route_seconds(
+            {axis: float(start[axis]) for axis in ("x", "y", "z")},
+            targets,
+            safe_z=safe_z,
+            dwell_seconds=dwell_seconds,
+            return_to_start=return_to_start,
+        )
+
+    async def _run_lua_capture(
+        self,
+        *,
+        record: dict[str, Any],
+        stops: list[dict[str, Any]],
+        tolerance_mm: float,
+    ) -> dict[int, capture_lua.CaptureReport]:
+        """Run a capture route on the bot and return its reports by stop number.
+
+        Stops are numbered from 1 in route order. A stop with no report -- its
+        chunk failed or timed out, or the run stopped on a disconnect or
+        emergency stop -- is simply missing from the result; the caller
+        captures it again the ordinary way.
+        """
+        tag = capture_lua.new_tag()
+        reports: dict[int, capture_lua.CaptureReport] = {}
+        self._lua_capture_reports[tag] = reports
+        chunks = capture_lua.route_chunks(
+            tag, stops, tolerance_mm=tolerance_mm, settle_ms=SOIL_CAPTURE_SETTLE_MILLISECONDS
+        )
+        summary = record["lua_capture"] = {"chunks": len(chunks), "chunks_sent": 0}
+        start = self._reported_position() or {
+            axis: float(stops[0][axis]) for axis in ("x", "y", "z")
+        }
+        try:
+            for index, chunk in enumerate(chunks, start=1):
+                state = self._live_connection_state()
+                if not state["connected"] or state["locked"]:
+                    break
+                record.update(
+                    status="running",
+                    message=(
+                        f"Capturing stops {chunk.numbers[0]}-{chunk.numbers[-1]} "
+                        f"of {len(stops)} on the bot"
+                    ),
+                )
+                legs = [
+                    ({axis: float(stop[axis]) for axis in ("x", "y", "z")}, 100, stop["safe_z"])
+                    for stop in chunk.stops
+                ]
+                seconds = self._motion.path_seconds(start, legs)
+                seconds += len(chunk.stops) * CAPTURE_LUA_SECONDS_PER_STOP
+                try:
+                    await self.async_rpc_request(
+                        [gcode_lib.lua_node(chunk.source)], timeout=motion.rpc_timeout(seconds)
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.warning(
+                        "On-bot capture chunk %d/%d failed: %s", index, len(chunks), err
+                    )
+                    break
+                summary["chunks_sent"] = index
+                start = legs[-1][0]
+                deadline = asyncio.get_running_loop().time() + CAPTURE_LUA_REPORT_GRACE_SECONDS
+                while (
+                    any(number not in reports for number in chunk.numbers)
+                    and asyncio.get_running_loop().time() < deadline
+                ):
+                    await asyncio.sleep(0.1)
+        finally:
+            self._lua_capture_reports.pop(tag, None)
+        summary["reported_ok"] = sum(1 for report in reports.values() if report.ok)
+        return dict(reports)
+
     async def _wait_for_grid_position(
         self,
         *,
@@ -2419,44 +3915,27 @@ move_absolute({number(front[0])},{number(front[1])},{number(z + 50)},50)
         rejects the repeated-at-the-old-position failure mode.
         """
         deadline = asyncio.get_running_loop().time() + timeout
+        index: spatial.GridIndex[dict[str, Any]] = spatial.GridIndex(
+            GRID_REPAIR_COORDINATE_TOLERANCE_MM
+        )
+        seen: set[int] = set()
         while asyncio.get_running_loop().time() < deadline:
-            images = await self.api.async_get_images()
-            matches: list[tuple[float, dict[str, Any]]] = []
-            for image in images:
-                if not isinstance(image, dict) or not vision.is_image_ready(image):
-                    continue
-                try:
-                    image_id = int(image["id"])
-                except (KeyError, TypeError, ValueError):
-                    continue
-                if image_id in before or not vision.same_device(
-                    image.get("device_id"), self.device_id
-                ):
-                    continue
-                created = dt_util.parse_datetime(str(image.get("created_at") or ""))
-                if created is not None:
-                    try:
-                        if created < started_at:
-                            continue
-                    except TypeError:
-                        continue
-                meta = self._image_meta(image)
-                try:
-                    distance = math.sqrt(
-                        sum((float(meta[axis]) - target[axis]) ** 2 for axis in ("x", "y", "z"))
-                    )
-                except (KeyError, TypeError, ValueError):
-                    continue
-                if distance <= GRID_REPAIR_COORDINATE_TOLERANCE_MM:
-                    matches.append((distance, image))
-            if matches:
-                distance, image = min(matches, key=lambda item: item[0])
-                meta = self._image_meta(image)
+            self._index_new_images(
+                index, seen, await self.api.async_get_images(), before, started_at
+            )
+            hit = index.nearest(
+                target["x"],
+                target["y"],
+                target["z"],
+                max_distance=GRID_REPAIR_COORDINATE_TOLERANCE_MM,
+            )
+            if hit is not None:
+                distance, entry = hit
                 return {
-                    "image_id": int(image["id"]),
-                    "x": float(meta["x"]),
-                    "y": float(meta["y"]),
-                    "z": float(meta.get("z") or 0),
+                    "image_id": entry.key,
+                    "x": entry.x,
+                    "y": entry.y,
+                    "z": entry.z,
                     "distance_from_target_mm": distance,
                 }
             await asyncio.sleep(2)
@@ -2468,7 +3947,7 @@ move_absolute({number(front[0])},{number(front[1])},{number(z + 50)},50)
 
     def _claim_active_soil_images(self, ready: dict[int, dict[str, Any]]) -> None:
         """Claim matching capture frames before the ordinary image event can see them."""
-        for record in self.soil_captures.values():
+        for record in itertools.chain(self.soil_captures.values(), self.soil_surveys.values()):
             if record.get("status") not in {"running", "waiting_images"}:
                 continue
             expected = record.get("expected_frames") or []
@@ -2517,6 +3996,21 @@ move_absolute({number(front[0])},{number(front[1])},{number(z + 50)},50)
             ),
         }
 
+    def coordinate_sensor_options(self) -> dict:
+        """Return the coordinate-sensor deadband options, merged with defaults."""
+        options = dict(self._entry.options) if self._entry is not None else {}
+        return {
+            OPTION_COORDINATE_DEADBAND_MM: float(
+                options.get(OPTION_COORDINATE_DEADBAND_MM, DEFAULT_COORDINATE_DEADBAND_MM)
+            ),
+            OPTION_COORDINATE_MIN_INTERVAL_SECONDS: float(
+                options.get(
+                    OPTION_COORDINATE_MIN_INTERVAL_SECONDS,
+                    DEFAULT_COORDINATE_MIN_INTERVAL_SECONDS,
+                )
+            ),
+        }
+
     def vision_is_available(self, *, now=None) -> bool:
         """True when a FarmBot Vision heartbeat was received within the timeout."""
         if self.vision_last_heartbeat is None:
@@ -2586,6 +4080,10 @@ move_absolute({number(front[0])},{number(front[1])},{number(z + 50)},50)
             async_dispatcher_send(self.hass, SIGNAL_VISION_STATE)
         return changed
 
+    def forget_vision_image(self, image_id: int) -> None:
+        """Stop offering a deleted image for photo-grid reuse."""
+        self._recent_images.discard(int(image_id))
+
     async def async_poll_new_vision_images(self) -> list[int]:
         """Detect newly processed FarmBot photos and request their analysis.
 
@@ -2614,6 +4112,7 @@ move_absolute({number(front[0])},{number(front[1])},{number(z + 50)},50)
                 continue
             ready[image_id] = image
 
+        self._recent_images.update(ready.values(), device_id=self.device_id)
         ready_ids = set(ready)
         if self._known_ready_vision_image_ids is None:
             # Do not replay historical photos on startup. A photo created after
@@ -2667,18 +4166,19 @@ move_absolute({number(front[0])},{number(front[1])},{number(z + 50)},50)
         future FarmBot-owned resource has an obvious place to release on
         unload.
         """
-        for task in list(self._soil_capture_tasks):
-            task.cancel()
-        for task in list(self._grid_repair_tasks):
-            task.cancel()
-        for task in list(self._soil_batch_finish_tasks.values()):
+        # A held tool stays mounted: the gantry cannot move during unload, and
+        # the device's mounted_tool_id lets the next run reuse it.
+        self._take_tool_lease()
+        jobs = list(self._motion_job_tasks.values())
+        for task in jobs:
             task.cancel()
-        if self._soil_capture_tasks:
-            await asyncio.gather(*self._soil_capture_tasks, return_exceptions=True)
-        if self._grid_repair_tasks:
-            await asyncio.gather(*self._grid_repair_tasks, return_exceptions=True)
-        if self._soil_batch_finish_tasks:
-            await asyncio.gather(*self._soil_batch_finish_tasks.values(), return_exceptions=True)
+        if jobs:
+            await asyncio.gather(*jobs, return_exceptions=True)
+        await self._runs.async_flush()
+        if self._outbound_timer is not None:
+            self._outbound_timer.cancel()
+            self._outbound_timer = None
+        self._outbound.cancel_all("FarmBot integration is unloading")
         for future in self._pending_rpcs.values():
             if not future.done():
                 future.cancel()
@@ -0,0 +1,311 @@
+"""Firmware-aware motion time estimates.
+
+Every job this integration drives -- soil captures, photo-grid repairs, raw
+G-code and adaptive weeding -- used to wait a fixed time for each movement
+RPC (two to five minutes) and guess its own duration from per-item
+constants. A short hop then took minutes to be reported as failed, a long
+diagonal across a big bed could time out while still moving, and queue ETAs
+were only roughly right.
+
+:class:`MotionModel` predicts how long FarmBot takes to make a move from the
+same firmware parameters the Farmduino uses:
+
+- ``movement_step_per_mm_*`` converts millimetres to steps;
+- ``movement_max_spd_*`` is the cruise speed (scaled by a move's speed
+  percentage, or set per axis by G-code ``A``/``B``/``C`` words);
+- ``movement_min_spd_*`` is the speed each move starts and ends at;
+- ``movement_steps_acc_dec_*`` is the number of steps over which the axis
+  ramps between the two.
+
+Each axis follows a trapezoidal velocity profile: constant acceleration from
+the minimum to the cruise speed over the ramp, cruise, and the mirror-image
+deceleration. A move too short to reach cruise speed peaks partway (a
+triangle). The axes move at the same time, each at its own speed, so a move
+lasts as long as its slowest axis. A ``safe_z`` move is modelled the way
+FarmBot OS performs it: up to the safe height, across, and down.
+
+Missing or unusable firmware values fall back to FarmBot's factory defaults,
+except the maximum speed, which falls back to the same conservative ceiling
+raw G-code uses -- an unknown speed must mean "slow", and here that makes the
+estimate (and so the timeout) longer, not shorter.
+
+:func:`rpc_timeout` turns an estimate into the time to wait for a movement
+RPC's acknowledgement, with headroom for RPC latency and a firmware slower
+than configured.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Iterable, Sequence
+
+from .const import (
+    GCODE_FALLBACK_MAX_STEPS_PER_SECOND,
+    MOTION_DEFAULT_ACCEL_STEPS,
+    MOTION_DEFAULT_MIN_STEPS_PER_SECOND,
+    MOTION_DEFAULT_STEPS_PER_MM,
+    MOTION_SAFE_Z_MM,
+    MOTION_TIMEOUT_FACTOR,
+    MOTION_TIMEOUT_MARGIN_SECONDS,
+)
+
+AXES = ("x", "y", "z")
+
+# One leg of a path: where to go, at what speed percentage, with safe_z.
+Leg = tuple[dict[str, float], int, bool]
+
+# Below this Z the weeding Lua lowers the tool at 25 % speed (``riskz``).
+_WEEDING_RISK_Z = -300.0
+
+
+def _positive(firmware_config: dict[str, Any], key: str, default: float) -> float:
+    try:
+        value = float(firmware_config.get(key))
+    except (TypeError, ValueError):
+        return default
+    return value if math.isfinite(value) and value > 0 else default
+
+
+@dataclass(frozen=True)
+class AxisProfile:
+    """One axis's motion parameters, in steps."""
+
+    steps_per_mm: float
+    max_steps_per_second: float
+    min_steps_per_second: float
+    accel_steps: float
+
+    @classmethod
+    def from_firmware(cls, firmware_config: dict[str, Any], axis: str) -> AxisProfile:
+        return cls(
+            steps_per_mm=_positive(
+                firmware_config,
+                f"movement_step_per_mm_{axis}",
+                MOTION_DEFAULT_STEPS_PER_MM[axis],
+            ),
+            max_steps_per_second=_positive(
+                firmware_config, f"movement_max_spd_{axis}", GCODE_FALLBACK_MAX_STEPS_PER_SECOND
+            ),
+            min_steps_per_second=_positive(
+                firmware_config, f"movement_min_spd_{axis}", MOTION_DEFAULT_MIN_STEPS_PER_SECOND
+            ),
+            accel_steps=_positive(
+                firmware_config, f"movement_steps_acc_dec_{axis}", MOTION_DEFAULT_ACCEL_STEPS
+            ),
+        )
+
+    def seconds(self, distance_mm: float, *, cruise_steps_per_second: float | None = None) -> float:
+        """Time to travel ``distance_mm`` from rest to rest."""
+        steps = abs(distance_mm) * self.steps_per_mm
+        if steps <= 0:
+            return 0.0
+        cruise = self.max_steps_per_second
+        if cruise_steps_per_second is not None:
+            cruise = cruise_steps_per_second
+        start = min(self.min_steps_per_second, cruise)
+        if cruise <= start:
+            return steps / cruise
+        # Constant acceleration that takes the axis from ``start`` to
+        # ``cruise`` in exactly ``accel_steps`` steps.
+        accel = (cruise**2 - start**2) / (2 * self.accel_steps)
+        if steps >= 2 * self.accel_steps:
+            return 2 * (cruise - start) / accel + (steps - 2 * self.accel_steps) / cruise
+        peak = math.sqrt(start**2 + accel * steps)
+        return 2 * (peak - start) / accel
+
+
+class MotionModel:
+    """Duration estimates for one bot's firmware configuration."""
+
+    def __init__(
+        self, firmware_config: dict[str, Any] | None, *, safe_height: float = MOTION_SAFE_Z_MM
+    ) -> None:
+        firmware_config = firmware_config or {}
+        self.axes = {axis: AxisProfile.from_firmware(firmware_config, axis) for axis in AXES}
+        self.safe_height = safe_height
+
+    def axis_seconds(self, axis: str, distance_mm: float, *, speed_percent: int = 100) -> float:
+        profile = self.axes[axis]
+        cruise = profile.max_steps_per_second * max(1, min(100, int(speed_percent))) / 100
+        return profile.seconds(
+            distance_mm, cruise_steps_per_second=max(cruise, profile.min_steps_per_second)
+        )
+
+    def move_seconds(
+        self,
+        start: dict[str, float],
+        end: dict[str, float],
+        *,
+        speed_percent: int = 100,
+        safe_z: bool = False,
+    ) -> float:
+        """One ``move``; axes missing from ``end`` stay where they are."""
+        target = {axis: float(end.get(axis, start[axis])) for axis in AXES}
+        if safe_z and (target["x"], target["y"]) != (float(start["x"]), float(start["y"])):
+            up = {**start, "z": self.safe_height}
+            across = {**target, "z": self.safe_height}
+            return (
+                self.move_seconds(start, up, speed_percent=speed_percent)
+                + self.move_seconds(up, across, speed_percent=speed_percent)
+                + self.move_seconds(across, target, speed_percent=speed_percent)
+            )
+        return max(
+            self.axis_seconds(axis, target[axis] - float(start[axis]), speed_percent=speed_percent)
+            for axis in AXES
+        )
+
+    def path_seconds(self, start: dict[str, float], legs: Iterable[Leg]) -> float:
+        """A sequence of moves, each ``(target, speed_percent, safe_z)``."""
+        total = 0.0
+        position = {axis: float(start[axis]) for axis in AXES}
+        for target, speed_percent, safe_z in legs:
+            total += self.move_seconds(position, target, speed_percent=speed_percent, safe_z=safe_z)
+            position.update({axis: float(value) for axis, value in target.items()})
+        return total
+
+    def route_seconds(
+        self,
+        start: dict[str, float],
+        targets: Sequence[dict[str, float]],
+        *,
+        safe_z: bool = True,
+        dwell_seconds: float = 0.0,
+        return_to_start: bool = False,
+    ) -> float:
+        """Visit ``targets`` in order at full speed, pausing at each."""
+        legs: list[Leg] = [
+            ({axis: float(target[axis]) for axis in AXES}, 100, safe_z) for target in targets
+        ]
+        if return_to_start:
+            legs.append((dict(start), 100, True))
+        return self.path_seconds(start, legs) + dwell_seconds * len(targets)
+
+    def gcode_seconds(self, start: dict[str, float], moves: Sequence[Any]) -> float:
+        """Resolved G-code moves, each at its own per-axis step rate."""
+        return sum(self.gcode_move_seconds(start, moves))
+
+    def gcode_move_seconds(self, start: dict[str, float], moves: Sequence[Any]) -> list[float]:
+        """The duration of each resolved G-code move, in order."""
+        durations = []
+        position = dict(start)
+        for move in moves:
+            durations.append(
+                max(
+                    self.axes[axis].seconds(
+                        move.target[axis] - position[axis],
+                        cruise_steps_per_second=move.speeds[axis],
+                    )
+                    for axis in AXES
+                )
+            )
+            position = move.target
+        return durations
+
+    def weeding_seconds(
+        self,
+        start: dict[str, float],
+        weeds: Sequence[dict[str, Any]],
+        settings: dict[str, Any],
+        *,
+        attempts: int = 1,
+    ) -> float:
+        """A whole weeding run, tool changes included when the tool is managed.
+
+        ``attempts`` is how many passes each cut is assumed to take; one is
+        the expected case, ``max_attempts`` the worst.
+        """
+        total = 0.0
+        position = {axis: float(start[axis]) for axis in AXES}
+        if settings.get("manage_tool"):
+            total += self.path_seconds(position, tool_legs(settings, mount=True))
+            position = _front_of_slot(settings, z=self.safe_height)
+        for weed in weeds:
+            total += self.path_seconds(position, weed_legs(weed, settings, attempts=attempts))
+            position = {
+                "x": float(weed["end"]["x"]),
+                "y": float(weed["end"]["y"]),
+                "z": float(weed["travel_z"]),
+            }
+        if settings.get("manage_tool"):
+            total += self.path_seconds(position, tool_legs(settings, mount=False))
+        return total
+
+
+def weed_legs(weed: dict[str, Any], settings: dict[str, Any], *, attempts: int = 1) -> list[Leg]:
+    """The moves of the adaptive weeding Lua for one cut.
+
+    Mirrors ``pass`` in weeding_lua.py: retract, transit at travel Z,
+    lower (slowly below the soil-risk height), cut, and retract over the end.
+    Each pass after the first is the Lua's overload retry: back to the
+    pass's start at travel Z, over to its end (which becomes the new start),
+    lower again and cut the other way at half speed. From the third pass on
+    the working height has also been raised by ``height_step_mm`` per pass.
+    """
+    approach = int(settings["approach_speed_percent"])
+    cut_speed = int(settings["cut_speed_percent"])
+    height_step = float(settings.get("height_step_mm") or 0.0)
+    safe = float(weed["travel_z"])
+    base_cut_z = float(weed["soil_z"]) + float(settings["tool_height_mm"])
+    start = {"x": float(weed["start"]["x"]), "y": float(weed["start"]["y"])}
+    end = {"x": float(weed["end"]["x"]), "y": float(weed["end"]["y"])}
+    transit = weed["transit_start"]
+    legs: list[Leg] = [({"z": safe}, approach, False)]
+    for point in [transit, *weed.get("approach_waypoints", []), start]:
+        legs.append(({"x": float(point["x"]), "y": float(point["y"]), "z": safe}, approach, False))
+    here, there = start, end
+    for attempt in range(1, max(1, attempts) + 1):
+        cut_z = base_cut_z + height_step * max(0, attempt - 2)
+        if cut_z < _WEEDING_RISK_Z:
+            legs.append(({**here, "z": _WEEDING_RISK_Z}, approach, False))
+            legs.append(({**here, "z": cut_z}, 25, False))
+        else:
+            legs.append(({**here, "z": cut_z}, approach, False))
+        speed = cut_speed if attempt == 1 else max(10, cut_speed // 2)
+        legs.append(({**there, "z": cut_z}, speed, False))
+        if attempt < attempts:
+            legs.append(({**here, "z": safe}, approach, False))
+            here, there = there, here
+            legs.append(({**here, "z": safe}, approach, False))
+    legs.append(({"z": safe}, approach, False))
+    legs.append(({**end, "z": safe}, approach, False))
+    return legs
+
+
+def _front_of_slot(settings: dict[str, Any], *, z: float) -> dict[str, float]:
+    x, y = float(settings["tool_slot_x"]), float(settings["tool_slot_y"])
+    dx, dy = {1: (100, 0), 2: (-100, 0), 3: (0, 100), 4: (0, -100)}[
+        int(settings["tool_pullout_direction"])
+    ]
+    return {"x": x + dx, "y": y + dy, "z": z}
+
+
+def tool_legs(settings: dict[str, Any], *, mount: bool) -> list[Leg]:
+    """The moves of mounting (from home) or dismounting (then homing) the tool."""
+    slot_z = float(settings["tool_slot_z"])
+    slot = {"x": float(settings["tool_slot_x"]), "y": float(settings["tool_slot_y"]), "z": slot_z}
+    front = _front_of_slot(settings, z=MOTION_SAFE_Z_MM)
+    home = {axis: 0.0 for axis in AXES}
+    if mount:
+        return [
+            (home, 100, False),
+            (front, 100, True),
+            ({**front, "z": slot_z + 50}, 50, False),
+            ({**front, "z": slot_z}, 50, False),
+            (slot, 50, False),
+            ({**front, "z": slot_z}, 50, False),
+            (front, 100, True),
+        ]
+    return [
+        ({"z": MOTION_SAFE_Z_MM}, 100, False),
+        ({**slot, "z": MOTION_SAFE_Z_MM}, 100, False),
+        (slot, 50, False),
+        ({**front, "z": slot_z}, 50, False),
+        ({**front, "z": slot_z + 50}, 50, False),
+        (home, 100, False),
+    ]
+
+
+def rpc_timeout(estimated_seconds: float) -> float:
+    """How long to wait for a movement RPC expected to take ``estimated_seconds``."""
+    return max(0.0, estimated_seconds) * MOTION_TIMEOUT_FACTOR + MOTION_TIMEOUT_MARGIN_SECONDS
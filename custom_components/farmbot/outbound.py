@@ -0,0 +1,322 @@
+"""Outbound CeleryScript scheduling for one FarmBot.
+
+Every ``rpc_request`` this integration publishes goes through one
+:class:`OutboundCommandScheduler` per bot instead of straight to the MQTT
+client, so a burst of automation calls cannot bury an emergency stop behind
+itself and cannot pile an unbounded backlog onto FarmBot OS.
+
+Requests are sorted into lanes by the CeleryScript they carry:
+
+``safety``
+    ``emergency_lock``/``emergency_unlock``. Published immediately, ahead of
+    everything, with no in-flight limit and no queue. A lock additionally
+    discards every queued (not yet published) motion request, so nothing that
+    was waiting when the bot was stopped can run after it is unlocked.
+``motion``
+    Anything that moves the gantry or runs code on the bot (``move``, ``lua``,
+    ``execute``, ``take_photo``, ...). At most
+    ``OUTBOUND_LANE_INFLIGHT_LIMITS["motion"]`` unacknowledged at once.
+``io``
+    Pin reads/writes and status reads, which FarmBot OS answers quickly and
+    which should not wait behind a long motion command.
+
+A request is *in flight* from publish until FarmBot OS answers with
+``rpc_ok``/``rpc_error`` for its label. Requests nobody awaits (switch
+toggles, ``move_to``, sequences) also stop counting after
+``OUTBOUND_INFLIGHT_EXPIRY_SECONDS``, so a lost acknowledgement cannot wedge
+a lane.
+
+Each lane's queue is bounded. A queued, unawaited ``write_pin`` is idempotent,
+so a newer write to the same pin replaces it in place, and a write identical
+to the last one already sent to that pin is not sent twice. When a queue is full the oldest
+unawaited request is dropped; if every queued request is awaited by a caller
+the new request is refused instead.
+
+The scheduler is synchronous and guarded by a lock: sync service handlers
+call it from executor threads, MQTT acknowledgements reach it on the event
+loop.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .const import (
+    OUTBOUND_INFLIGHT_EXPIRY_SECONDS,
+    OUTBOUND_LANE_INFLIGHT_LIMITS,
+    OUTBOUND_LANE_QUEUE_LIMIT,
+    OUTBOUND_LATENCY_SAMPLES,
+)
+from .latency import RollingHistogram
+
+_LOGGER = logging.getLogger(__name__)
+
+LANE_SAFETY = "safety"
+LANE_MOTION = "motion"
+LANE_IO = "io"
+LANES = (LANE_SAFETY, LANE_MOTION, LANE_IO)
+
+_SAFETY_KINDS = frozenset({"emergency_lock", "emergency_unlock"})
+_IO_KINDS = frozenset({"write_pin", "toggle_pin", "read_pin", "read_status", "sync"})
+
+
+class OutboundQueueFull(RuntimeError):
+    """A lane's queue is full of requests that callers are still awaiting."""
+
+
+def command_lane(commands: list[dict[str, Any]]) -> str:
+    """Classify an ``rpc_request`` body into the lane it is scheduled on."""
+    kinds = {str(item.get("kind")) for item in commands if isinstance(item, dict)}
+    if kinds & _SAFETY_KINDS:
+        return LANE_SAFETY
+    if kinds and kinds <= _IO_KINDS:
+        return LANE_IO
+    return LANE_MOTION
+
+
+def _pin_write_key(commands: list[dict[str, Any]]) -> tuple[int, int] | None:
+    """``(pin, value)`` for a body that is exactly one ``write_pin``, else None."""
+    if len(commands) != 1 or commands[0].get("kind") != "write_pin":
+        return None
+    args = commands[0].get("args") or {}
+    try:
+        return int(args["pin_number"]), int(args["pin_value"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+@dataclass
+class _Outbound:
+    label: str
+    rpc: dict[str, Any]
+    lane: str
+    awaited: bool
+    submitted_at: float
+    published_at: float | None = None
+    pin_write: tuple[int, int] | None = None
+
+
+@dataclass
+class _LaneStats:
+    published: int = 0
+    merged: int = 0
+    dropped: int = 0
+    refused: int = 0
+    expired: int = 0
+    waits_ms: RollingHistogram = field(
+        default_factory=lambda: RollingHistogram(OUTBOUND_LATENCY_SAMPLES)
+    )
+
+
+class OutboundCommandScheduler:
+    """Priority lanes, in-flight limits and bounded queues for one bot's RPCs."""
+
+    def __init__(
+        self,
+        publish: Callable[[dict[str, Any]], None],
+        *,
+        on_failed: Callable[[str, Exception], None] | None = None,
+        on_wakeup: Callable[[float], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._publish = publish
+        self._on_failed = on_failed
+        self._on_wakeup = on_wakeup
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._queues: dict[str, deque[_Outbound]] = {lane: deque() for lane in LANES}
+        self._in_flight: dict[str, _Outbound] = {}
+        self._stats = {lane: _LaneStats() for lane in LANES}
+
+    def submit(self, rpc: dict[str, Any], *, awaited: bool = False) -> str:
+        """Publish ``rpc`` now if its lane has room, otherwise queue it.
+
+        Returns the lane. Raises :class:`OutboundQueueFull` if the lane's
+        queue is full and nothing in it may be dropped, and re-raises a publish
+        failure for a request that was due to go out immediately.
+        """
+        commands = rpc.get("body") or []
+        entry = _Outbound(
+            label=str(rpc["args"]["label"]),
+            rpc=rpc,
+            lane=command_lane(commands),
+            awaited=awaited,
+            submitted_at=self._clock(),
+            pin_write=_pin_write_key(commands),
+        )
+        with self._lock:
+            if entry.lane == LANE_SAFETY:
+                self._send(entry)
+                if any(item.get("kind") == "emergency_lock" for item in commands):
+                    self._discard_queued(LANE_MOTION, "FarmBot was emergency-stopped")
+                return entry.lane
+            self._expire()
+            if not entry.awaited and entry.pin_write is not None and self._merge(entry):
+                return entry.lane
+            queue = self._queues[entry.lane]
+            if not queue and self._has_capacity(entry.lane):
+                self._send(entry)
+                return entry.lane
+            if len(queue) >= OUTBOUND_LANE_QUEUE_LIMIT:
+                victim = next((item for item in queue if not item.awaited), None)
+                if victim is None:
+                    self._stats[entry.lane].refused += 1
+                    raise OutboundQueueFull(f"FarmBot {entry.lane} command queue is full")
+                queue.remove(victim)
+                self._stats[entry.lane].dropped += 1
+                _LOGGER.warning(
+                    "Dropped queued FarmBot %s command %s: queue is full",
+                    entry.lane,
+                    victim.label,
+                )
+            queue.append(entry)
+        self._request_wakeup()
+        return entry.lane
+
+    def acknowledge(self, label: str) -> None:
+        """FarmBot OS answered ``label``: free its slot and send what now fits."""
+        with self._lock:
+            self._in_flight.pop(label, None)
+            self._pump_locked()
+
+    def release(self, label: str) -> None:
+        """Forget ``label`` whether it is queued or in flight (e.g. its caller gave up)."""
+        with self._lock:
+            if self._in_flight.pop(label, None) is None:
+                for queue in self._queues.values():
+                    for item in queue:
+                        if item.label == label:
+                            queue.remove(item)
+                            break
+            self._pump_locked()
+
+    def pump(self) -> None:
+        """Expire stale in-flight requests and publish whatever now fits."""
+        with self._lock:
+            self._pump_locked()
+        self._request_wakeup()
+
+    def cancel_all(self, reason: str) -> None:
+        """Fail every queued request and forget everything in flight."""
+        with self._lock:
+            for lane in LANES:
+                self._discard_queued(lane, reason)
+            self._in_flight.clear()
+
+    def metrics(self) -> dict[str, Any]:
+        """Per-lane counters and queue-wait (submit-to-publish) latency."""
+        with self._lock:
+            result: dict[str, Any] = {}
+            for lane in LANES:
+                stats = self._stats[lane]
+                result[lane] = {
+                    "queued": len(self._queues[lane]),
+                    "in_flight": sum(1 for item in self._in_flight.values() if item.lane == lane),
+                    "published": stats.published,
+                    "merged": stats.merged,
+                    "dropped": stats.dropped,
+                    "refused": stats.refused,
+                    "expired": stats.expired,
+                    "publish_wait_ms": stats.waits_ms.snapshot(),
+                }
+            return result
+
+    # ------------------------------------------------------------------
+
+    def _has_capacity(self, lane: str) -> bool:
+        limit = OUTBOUND_LANE_INFLIGHT_LIMITS.get(lane)
+        if limit is None:
+            return True
+        return sum(1 for item in self._in_flight.values() if item.lane == lane) < limit
+
+    def _send(self, entry: _Outbound) -> None:
+        self._publish(entry.rpc)
+        entry.published_at = self._clock()
+        self._in_flight[entry.label] = entry
+        stats = self._stats[entry.lane]
+        stats.published += 1
+        stats.waits_ms.record((entry.published_at - entry.submitted_at) * 1000.0)
+
+    def _merge(self, entry: _Outbound) -> bool:
+        """Fold an unawaited ``write_pin`` into the latest pending write to its pin.
+
+        Only the most recent write to the pin -- queued, or else the last one
+        published -- is considered: an older identical write does not make
+        this one redundant if a different value was sent after it.
+        """
+        pin = entry.pin_write[0]  # type: ignore[index]
+        latest: _Outbound | None = None
+        for item in self._in_flight.values():
+            if item.pin_write is not None and item.pin_write[0] == pin:
+                latest = item
+        for item in self._queues[entry.lane]:
+            if item.pin_write is not None and item.pin_write[0] == pin:
+                latest = item
+        if latest is None:
+            return False
+        if latest.published_at is None and not latest.awaited:
+            latest.rpc = {
+                **entry.rpc,
+                "args": {**entry.rpc["args"], "label": latest.label},
+            }
+            latest.pin_write = entry.pin_write
+        elif latest.pin_write != entry.pin_write:
+            return False
+        self._stats[entry.lane].merged += 1
+        return True
+
+    def _expire(self) -> None:
+        now = self._clock()
+        for label, item in list(self._in_flight.items()):
+            if (
+                not item.awaited
+                and item.published_at is not None
+                and now - item.published_at >= OUTBOUND_INFLIGHT_EXPIRY_SECONDS
+            ):
+                del self._in_flight[label]
+                self._stats[item.lane].expired += 1
+
+    def _pump_locked(self) -> None:
+        self._expire()
+        for lane in (LANE_MOTION, LANE_IO):
+            queue = self._queues[lane]
+            while queue and self._has_capacity(lane):
+                entry = queue.popleft()
+                try:
+                    self._send(entry)
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.warning(
+                        "Could not publish queued FarmBot command %s: %s", entry.label, err
+                    )
+                    if self._on_failed is not None:
+                        self._on_failed(entry.label, err)
+
+    def _discard_queued(self, lane: str, reason: str) -> None:
+        queue = self._queues[lane]
+        while queue:
+            entry = queue.popleft()
+            self._stats[lane].dropped += 1
+            if self._on_failed is not None:
+                self._on_failed(entry.label, RuntimeError(reason))
+
+    def _request_wakeup(self) -> None:
+        """Ask the owner to pump again once the oldest unawaited request can expire."""
+        if self._on_wakeup is None:
+            return
+        with self._lock:
+            if not any(self._queues[lane] for lane in (LANE_MOTION, LANE_IO)):
+                return
+            published = [
+                item.published_at
+                for item in self._in_flight.values()
+                if not item.awaited and item.published_at is not None
+            ]
+        if not published:
+            return
+        delay = max(0.0, min(published) + OUTBOUND_INFLIGHT_EXPIRY_SECONDS - self._clock())
+        self._on_wakeup(delay)
@@ -0,0 +1,158 @@
+"""A coordinate-indexed cache of this FarmBot's recent processed images.
+
+A photo-grid repair used to re-photograph every cell it was sent, even when
+the bot had uploaded an image of that exact spot a few minutes earlier. With
+``reuse_recent_images_within`` the manager first looks each cell up here and
+only drives to the cells that have no fresh image.
+
+Images are kept in a :class:`spatial.GridIndex`, so a lookup reads only the
+buckets around the target instead of every image the account holds. The
+cache is fed from every ``/images`` listing the manager already makes (the
+Vision image poll and the grid repair's own snapshot); an image seen before
+is skipped, so an update only parses the images that are new. Each listing
+is also the source of truth for what still exists: an indexed image that is
+missing from it has been deleted and is dropped, so a deleted photo can never
+stand in for a cell. ``discard`` drops one straight away when this
+integration deletes it. Images older than ``max_age`` are dropped as they age
+out, oldest first, without rescanning the index.
+
+Only images that FarmBot has finished processing, that belong to this device
+and that carry numeric coordinates are indexed.
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable
+
+from homeassistant.util import dt as dt_util
+
+from . import spatial, vision
+
+
+@dataclass(frozen=True)
+class RecentImage:
+    """One indexed image: its ID, where it was taken and when."""
+
+    image_id: int
+    x: float
+    y: float
+    z: float
+    created_at: datetime
+
+
+class RecentImages:
+    """Recent processed images of one device, indexed by coordinate."""
+
+    def __init__(
+        self,
+        *,
+        cell_mm: float,
+        max_age: timedelta,
+        clock: Callable[[], datetime] = dt_util.utcnow,
+    ) -> None:
+        self._index: spatial.GridIndex[RecentImage] = spatial.GridIndex(cell_mm)
+        self._max_age = max_age
+        self._clock = clock
+        # Listed image IDs whose verdict cannot change (indexed, too old, or
+        # without coordinates), so they are not parsed again. Trimmed to the
+        # latest listing, so it never outgrows the account.
+        self._seen: set[int] = set()
+        # (created_at, image_id) of indexed images, oldest first.
+        self._by_age: list[tuple[datetime, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, image_id: int) -> bool:
+        return image_id in self._index
+
+    def update(self, images: Iterable[Any], *, device_id: Any) -> int:
+        """Reconcile the cache with an ``/images`` listing of ``device_id``.
+
+        New images are indexed and indexed images missing from the listing are
+        dropped. Returns how many were added.
+        """
+        cutoff = self._clock() - self._max_age
+        listed: set[int] = set()
+        added = 0
+        for image in images:
+            if not isinstance(image, dict):
+                continue
+            try:
+                image_id = int(image["id"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            listed.add(image_id)
+            if image_id in self._seen:
+                continue
+            if not vision.is_image_ready(image) or not vision.same_device(
+                image.get("device_id"), device_id
+            ):
+                continue
+            created = dt_util.parse_datetime(str(image.get("created_at") or ""))
+            position = spatial.coordinates(image)
+            if created is None or position is None:
+                self._seen.add(image_id)
+                continue
+            try:
+                stale = created < cutoff
+            except TypeError:
+                stale = True
+            self._seen.add(image_id)
+            if stale:
+                continue
+            self._index.insert(image_id, *position, item=RecentImage(image_id, *position, created))
+            heapq.heappush(self._by_age, (created, image_id))
+            added += 1
+        for entry in self._index:
+            if entry.key not in listed:
+                self._index.remove(entry.key)
+        self._seen &= listed
+        self.prune()
+        return added
+
+    def discard(self, image_id: int) -> None:
+        """Drop an image that has just been deleted."""
+        self._index.remove(image_id)
+
+    def prune(self) -> None:
+        """Drop images older than the cache's maximum age."""
+        cutoff = self._clock() - self._max_age
+        while self._by_age and self._by_age[0][0] < cutoff:
+            _, image_id = heapq.heappop(self._by_age)
+            self._index.remove(image_id)
+        # Entries of images dropped some other way are left in the heap; keep
+        # it from outgrowing the index by rebuilding it when it is mostly that.
+        if len(self._by_age) > 2 * len(self._index) + 64:
+            self._by_age = [(entry.item.created_at, entry.key) for entry in self._index]
+            heapq.heapify(self._by_age)
+
+    def nearest(
+        self,
+        target: dict[str, float],
+        *,
+        radius_mm: float,
+        since: datetime,
+    ) -> tuple[float, RecentImage] | None:
+        """The closest image taken at or after ``since`` within ``radius_mm`` in 3D.
+
+        Equally close images resolve to the most recent upload.
+        """
+        hits = self._index.within(
+            float(target["x"]),
+            float(target["y"]),
+            float(target["z"]),
+            radius=radius_mm,
+            where=lambda entry: entry.item.created_at >= since,
+        )
+        if not hits:
+            return None
+        distance = hits[0][0]
+        newest = max(
+            (entry.item for hit_distance, entry in hits if hit_distance == distance),
+            key=lambda item: item.image_id,
+        )
+        return distance, newest
@@ -0,0 +1,414 @@
+"""Visiting-order optimisation for photo-grid repair and weeding routes.
+
+A photo-grid repair photographs whatever cells the Vision app sends, in the
+order it sends them. For a full serpentine bed grid that order is already
+ideal, but a scattered handful of cells to re-take arrives in index order and
+the gantry zig-zags the bed to visit them. With ``optimize_route`` set, the
+targets are re-ordered to minimise travel *time* from the gantry's current
+position.
+
+Time, not distance: FarmBot drives its axes simultaneously, each at its own
+speed, so a move takes as long as its slowest axis needs. The caller supplies
+the cost of a leg -- the manager uses :meth:`motion.MotionModel.move_seconds`,
+which models each axis's firmware speeds and acceleration. The route is open:
+it starts at the current position and ends at the last cell; the run's own
+return trip is unaffected.
+
+The tour is built nearest-neighbour first and then improved with 2-opt
+(segment reversal) and Or-opt (moving a run of one to three cells, either way
+round, elsewhere in the route) until no move helps or the time budget is
+spent. Each target keeps its caller-supplied ``index``; only the order of the
+list changes.
+
+An adaptive weeding run is ordered the same way, except that each weed is a
+cut with two ends rather than a point: it is entered at ``transit_start``,
+follows its approach waypoints to ``start`` and leaves from ``end``. A weed
+approached directly -- no waypoints, ``transit_start`` at ``start`` -- may be
+cut the other way round, so :func:`order_weeds` chooses a direction for each
+such cut as well as the order, minimising the XY distance travelled between
+cuts. A planned approach is always kept as given.
+
+Once the order is fixed, :func:`plan_z_travel` decides how the camera gets
+from one photo-grid cell to the next. A retract to the safe height and back
+for every cell is only needed when the route dips low; cells near the top of
+the Z axis whose heights differ by a few millimetres are crossed at their
+highest Z instead.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Any, Callable, Sequence
+
+
+def route_cost(matrix: Sequence[Sequence[float]], order: Sequence[int]) -> float:
+    """Total cost of visiting ``order`` (node 0 is the start)."""
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+def optimize_route(
+    start: dict[str, float],
+    targets: list[dict[str, Any]],
+    cost: Callable[[dict, dict], float],
+    *,
+    time_budget: float,
+    clock: Callable[[], float] = time.monotonic,
+) -> tuple[list[dict[str, Any]], float, float]:
+    """Re-order ``targets`` to shorten the route from ``start``.
+
+    Returns ``(ordered_targets, cost_before, cost_after)``, where the costs
+    are for the caller's order and for the optimised one.
+    """
+    nodes = [start, *targets]
+    size = len(nodes)
+    matrix = [[cost(a, b) if a is not b else 0.0 for b in nodes] for a in nodes]
+    before = route_cost(matrix, list(range(size)))
+    if size <= 2:
+        return list(targets), before, before
+
+    deadline = clock() + max(0.0, time_budget)
+    order = _nearest_neighbour(matrix)
+    improved = True
+    while improved and clock() < deadline:
+        improved = _two_opt(matrix, order, deadline, clock)
+        improved = _or_opt(matrix, order, deadline, clock) or improved
+    after = route_cost(matrix, order)
+    if after >= before:
+        return list(targets), before, before
+    return [targets[node - 1] for node in order[1:]], before, after
+
+
+def _nearest_neighbour(matrix: Sequence[Sequence[float]]) -> list[int]:
+    order = [0]
+    remaining = set(range(1, len(matrix)))
+    while remaining:
+        here = matrix[order[-1]]
+        # Ties go to the lower node, i.e. the caller's order.
+        nearest = min(remaining, key=lambda node: (here[node], node))
+        order.append(nearest)
+        remaining.remove(nearest)
+    return order
+
+
+def _two_opt(matrix, order: list[int], deadline: float, clock) -> bool:
+    """Reverse any segment whose reversal shortens the open route."""
+    last = len(order) - 1
+    improved = False
+    for i in range(1, last):
+        if clock() >= deadline:
+            break
+        for j in range(i + 1, last + 1):
+            a, b = order[i - 1], order[i]
+            c = order[j]
+            delta = matrix[a][c] - matrix[a][b]
+            if j < last:
+                d = order[j + 1]
+                delta += matrix[b][d] - matrix[c][d]
+            if delta < -1e-9:
+                order[i : j + 1] = reversed(order[i : j + 1])
+                improved = True
+    return improved
+
+
+def _or_opt(matrix, order: list[int], deadline: float, clock) -> bool:
+    """Move a run of one to three nodes elsewhere, forwards or reversed."""
+    improved = False
+    for length in (1, 2, 3):
+        i = 1
+        while i + length <= len(order):
+            if clock() >= deadline:
+                return improved
+            segment = order[i : i + length]
+            rest = order[:i] + order[i + length :]
+            prev, nxt = order[i - 1], order[i + length] if i + length < len(order) else None
+            removed = matrix[prev][segment[0]]
+            if nxt is not None:
+                removed += matrix[segment[-1]][nxt] - matrix[prev][nxt]
+            best_gain, best = 1e-9, None
+            for k in range(1, len(rest) + 1):
+                if k == i:
+                    continue
+                left = rest[k - 1]
+                right = rest[k] if k < len(rest) else None
+                for candidate in (segment, segment[::-1]):
+                    added = matrix[left][candidate[0]]
+                    if right is not None:
+                        added += matrix[candidate[-1]][right] - matrix[left][right]
+                    gain = removed - added
+                    if gain > best_gain:
+                        best_gain, best = gain, (k, candidate)
+            if best is not None:
+                k, candidate = best
+                order[:] = rest[:k] + candidate + rest[k:]
+                improved = True
+            else:
+                i += 1
+    return improved
+
+
+def order_weeds(
+    start: dict[str, float],
+    weeds: list[dict[str, Any]],
+    *,
+    finish: dict[str, float] | None = None,
+    time_budget: float,
+    clock: Callable[[], float] = time.monotonic,
+) -> tuple[list[dict[str, Any]], float, float]:
+    """Choose an order and cut direction for ``weeds`` to shorten transit.
+
+    Transit is the XY distance travelled from ``start`` to the first cut,
+    between cuts, and -- when ``finish`` is given, e.g. the tool slot -- from
+    the last cut to ``finish``; the cuts themselves are fixed. A reversed weed
+    is returned as a copy with ``start`` and ``end`` swapped, entered directly
+    at its new start, and marked ``"reversed": True``. Returns
+    ``(ordered_weeds, transit_before, transit_after)`` in millimetres, before
+    being for the caller's order.
+    """
+    # Node 2n is weed n as given and 2n + 1 the same cut run backwards, or
+    # None when the weed has a planned approach. The last node is the start.
+    variants: list[tuple | None] = []
+    for weed in weeds:
+        variants.append(_weed_variant(weed, False))
+        variants.append(_weed_variant(weed, True) if _reversible(weed) else None)
+    origin = (float(start["x"]), float(start["y"]))
+    variants.append((origin, origin, 0.0))
+    goal = (float(finish["x"]), float(finish["y"])) if finish is not None else None
+    # legs[a][b]: from leaving ``a`` to reaching the start of cut ``b``;
+    # last[a]: from leaving ``a`` to ``finish``.
+    legs = [
+        [math.dist(a[1], b[0]) + b[2] if a is not None and b is not None else 0.0 for b in variants]
+        for a in variants
+    ]
+    last = [math.dist(a[1], goal) if a is not None and goal is not None else 0.0 for a in variants]
+    problem = (legs, last, variants)
+
+    home = len(variants) - 1
+    before = _weed_route_cost(problem, [home, *range(0, 2 * len(weeds), 2)])
+    if not weeds:
+        return [], before, before
+    deadline = clock() + max(0.0, time_budget)
+    route = _weed_nearest_neighbour(problem, home)
+    improved = True
+    while improved and clock() < deadline:
+        improved = _weed_relocate(problem, route, deadline, clock)
+        improved = _weed_reverse_segments(problem, route, deadline, clock) or improved
+    after = _weed_route_cost(problem, route)
+    if after >= before - 1e-9:
+        return list(weeds), before, before
+    ordered = []
+    for node in route[1:]:
+        weed = weeds[node // 2]
+        if node % 2:
+            weed = {
+                **weed,
+                "transit_start": weed["end"],
+                "start": weed["end"],
+                "end": weed["start"],
+                "reversed": True,
+            }
+        ordered.append(weed)
+    return ordered, before, after
+
+
+def weed_transit_mm(
+    start: dict[str, float],
+    weeds: Sequence[dict[str, Any]],
+    *,
+    finish: dict[str, float] | None = None,
+) -> float:
+    """XY transit distance of running ``weeds`` in the given order."""
+    position = _xy(start)
+    total = 0.0
+    for weed in weeds:
+        entry, exit_, approach = _weed_variant(weed, False)
+        total += math.dist(position, entry) + approach
+        position = exit_
+    if finish is not None:
+        total += math.dist(position, _xy(finish))
+    return total
+
+
+def _xy(point: dict[str, Any]) -> tuple[float, float]:
+    return (float(point["x"]), float(point["y"]))
+
+
+def _reversible(weed: dict[str, Any]) -> bool:
+    """Is the cut approached directly, so either end may come first?"""
+    return (
+        not weed.get("approach_waypoints")
+        and math.dist(_xy(weed["transit_start"]), _xy(weed["start"])) <= 1.0
+    )
+
+
+def _weed_variant(weed: dict[str, Any], reverse: bool) -> tuple:
+    """``(entry_xy, exit_xy, approach_mm)`` for one direction of a cut."""
+    if reverse:
+        return _xy(weed["end"]), _xy(weed["start"]), 0.0
+    entry = _xy(weed["transit_start"])
+    waypoints = [_xy(point) for point in weed.get("approach_waypoints", [])]
+    path = [entry, *waypoints, _xy(weed["start"])]
+    return entry, _xy(weed["end"]), sum(math.dist(a, b) for a, b in zip(path, path[1:]))
+
+
+def _weed_route_cost(problem, route: Sequence[int]) -> float:
+    legs, last, _variants = problem
+    return sum(legs[a][b] for a, b in zip(route, route[1:])) + last[route[-1]]
+
+
+def _weed_nearest_neighbour(problem, home: int) -> list[int]:
+    legs, _last, variants = problem
+    remaining = list(range(0, home, 2))
+    route = [home]
+    while remaining:
+        row = legs[route[-1]]
+        # Either direction of any remaining weed; ties keep the caller's order.
+        node = min(
+            (node + flip for node in remaining for flip in (0, 1) if variants[node + flip]),
+            key=lambda node: (row[node], node),
+        )
+        route.append(node)
+        remaining.remove(node - node % 2)
+    return route
+
+
+def _weed_relocate(problem, route: list[int], deadline: float, clock) -> bool:
+    """Move single cuts, either way round, to wherever transit is shortest."""
+    legs, last, variants = problem
+    improved = False
+    position = 1
+    while position < len(route):
+        if clock() >= deadline:
+            return improved
+        node = route[position]
+        prev = route[position - 1]
+        nxt = route[position + 1] if position + 1 < len(route) else None
+        if nxt is None:
+            removed = legs[prev][node] + last[node] - last[prev]
+        else:
+            removed = legs[prev][node] + legs[node][nxt] - legs[prev][nxt]
+        rest = route[:position] + route[position + 1 :]
+        best_gain, best = 1e-9, None
+        for candidate in (node - node % 2, node - node % 2 + 1):
+            if variants[candidate] is None:
+                continue
+            for slot in range(1, len(rest) + 1):
+                left = rest[slot - 1]
+                if slot == len(rest):
+                    added = legs[left][candidate] + last[candidate] - last[left]
+                else:
+                    right = rest[slot]
+                    added = legs[left][candidate] + legs[candidate][right] - legs[left][right]
+                if removed - added > best_gain:
+                    best_gain, best = removed - added, (slot, candidate)
+        if best is None:
+            position += 1
+            continue
+        slot, candidate = best
+        route[:] = rest[:slot] + [candidate] + rest[slot:]
+        improved = True
+    return improved
+
+
+def _weed_reverse_segments(problem, route: list[int], deadline: float, clock) -> bool:
+    """Run any stretch of cuts backwards, each cut flipped, if that helps."""
+    legs, last, variants = problem
+    improved = False
+    end = len(route) - 1
+    for i in range(1, end + 1):
+        if clock() >= deadline:
+            break
+        if variants[route[i] ^ 1] is None:
+            continue
+        before = route[i - 1]
+        inner_old = inner_new = 0.0
+        for j in range(i, end + 1):
+            if variants[route[j] ^ 1] is None:
+                break
+            if j > i:
+                inner_old += legs[route[j - 1]][route[j]]
+                inner_new += legs[route[j] ^ 1][route[j - 1] ^ 1]
+            head, tail = route[i] ^ 1, route[j] ^ 1
+            if j < end:
+                after = route[j + 1]
+                old_out, new_out = legs[route[j]][after], legs[head][after]
+            else:
+                old_out, new_out = last[route[j]], last[head]
+            delta = (legs[before][tail] + inner_new + new_out) - (
+                legs[before][route[i]] + inner_old + old_out
+            )
+            if delta < -1e-9:
+                route[i : j + 1] = [node ^ 1 for node in reversed(route[i : j + 1])]
+                improved = True
+                break
+    return improved
+
+
+def plan_z_travel(
+    targets: list[dict[str, Any]],
+    *,
+    z_top: float,
+    top_margin: float,
+    span: float,
+    safe_height: float,
+) -> tuple[list[float | None], dict[str, Any]]:
+    """Plan how the gantry travels in Z between consecutive photo-grid cells.
+
+    Consecutive cells are grouped into clusters whose highest cell is within
+    ``top_margin`` of ``z_top`` -- the clearance rule under which lateral
+    travel needs no retract -- and whose Z values differ by at most ``span``.
+    Within a cluster the gantry rises to the cluster's highest cell, crosses
+    at that height and descends to the next cell; ``safe_z`` is only used to
+    enter a cluster.
+
+    ``z_top`` is the top of the Z axis, which is its home end: with
+    ``movement_home_up_z`` set the axis runs ``[-L, 0]`` and the top is its
+    upper bound, otherwise it runs ``[0, L]`` and the top is its lower bound.
+    Height is therefore measured as distance from ``z_top``, and every Z
+    distance with ``abs``, so the plan holds for either direction.
+
+    Returns one entry per target -- ``None`` to arrive with ``safe_z``, or the
+    Z to travel at -- and a summary for the run record: the clusters (by
+    target ``index``) with their travel Z, how many moves still use
+    ``safe_z``, and the Z travel saved against using it on every move, given
+    that ``safe_z`` retracts to ``safe_height``.
+    """
+    travel: list[float | None] = []
+    clusters: list[dict[str, Any]] = []
+    saved = 0.0
+    shallowest = deepest = 0.0
+    for position, target in enumerate(targets):
+        depth = abs(float(target["z"]) - z_top)
+        if clusters:
+            new_shallowest, new_deepest = min(shallowest, depth), max(deepest, depth)
+            if new_shallowest <= top_margin and new_deepest - new_shallowest <= span:
+                shallowest, deepest = new_shallowest, new_deepest
+                clusters[-1]["members"].append(position)
+                continue
+        shallowest = deepest = depth
+        clusters.append({"members": [position]})
+    for cluster in clusters:
+        members = cluster["members"]
+        travel_z = min(
+            (float(targets[position]["z"]) for position in members),
+            key=lambda z: abs(z - z_top),
+        )
+        travel.append(None)
+        for previous, position in zip(members, members[1:]):
+            a, b = float(targets[previous]["z"]), float(targets[position]["z"])
+            retract = abs(safe_height - a) + abs(safe_height - b)
+            saved += retract - (abs(travel_z - a) + abs(travel_z - b))
+            travel.append(travel_z)
+        cluster["travel_z"] = travel_z
+    summary = {
+        "clusters": [
+            {
+                "indexes": [targets[position].get("index") for position in cluster["members"]],
+                "travel_z": cluster["travel_z"],
+            }
+            for cluster in clusters
+        ],
+        "safe_z_moves": len(clusters),
+        "z_travel_saved_mm": round(saved, 1),
+    }
+    return travel, summary
@@ -0,0 +1,223 @@
+"""Bounded, persistent run records for long-running FarmBot jobs.
+
+Soil captures and surveys, photo-grid repairs, raw G-code runs and adaptive
+weeding runs each keep a status record that the Vision app polls by ID. Those
+records used to live in plain dicts for the life of the process: a photo-grid
+repair alone carries every frame, target and failure, so months of nightly
+grids grew memory without bound, and a restart forgot every run mid-poll.
+
+:class:`RunRecords` is the per-kind collection. It is a mapping, so the
+manager keeps indexing it by ID exactly as before, and lookups stay O(1).
+Insertion order is kept, so the most recent runs are listed without sorting.
+Only finished records are ever evicted -- oldest first, once a kind holds
+more than ``RUN_RECORD_MAX_PER_KIND`` records or a record is older than
+``RUN_RECORD_MAX_AGE_DAYS`` -- so a queued or running job can never lose the
+record its task is writing to.
+
+:class:`RunRecordStore` persists all five kinds through Home Assistant's
+``Store`` helper. Saves are debounced: a running job mutates its record in
+place many times a second, so the store only schedules a write when a record
+is added or a job finishes and serializes whatever is current when the write
+happens. Records that were still queued or running when Home Assistant
+stopped are loaded back as failed, because their task did not survive.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterator
+
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    RUN_RECORD_MAX_AGE_DAYS,
+    RUN_RECORD_MAX_PER_KIND,
+    RUN_RECORD_SAVE_DELAY_SECONDS,
+    RUN_RECORD_STORAGE_VERSION,
+)
+
+RUN_KINDS = ("soil_captures", "soil_surveys", "grid_repairs", "gcode_runs", "weeding_runs")
+ACTIVE_STATUSES = frozenset({"queued", "running", "waiting_images"})
+
+# Queue placement only means something while the job is waiting in this
+# process; it is not worth persisting.
+_TRANSIENT_KEYS = frozenset({"queue_position", "estimated_start_at", "estimated_finish_at"})
+# A job's working state. ``before_image_ids`` alone holds every image ID the
+# account had when a capture started. Only a running job reads these, and a
+# persisted record is never resumed, so they are dropped rather than saved.
+_WORKING_KEYS = frozenset({"before_image_ids", "expected_frames"})
+# Photo-grid target lists echo the request the app already holds; once saved,
+# only which cells they were matters, so each target is kept as its index.
+_TARGET_LIST_KEYS = frozenset(
+    {"targets", "completed_targets", "failed_targets", "unattempted_targets"}
+)
+
+
+def _record_time(record: dict[str, Any]) -> datetime | None:
+    for key in ("completed_at", "created_at"):
+        parsed = dt_util.parse_datetime(str(record.get(key) or ""))
+        if parsed is not None:
+            return parsed
+    return None
+
+
+def _target_indexes(targets: Any) -> Any:
+    if not isinstance(targets, list):
+        return targets
+    return [
+        {"index": target["index"]} if isinstance(target, dict) and "index" in target else target
+        for target in targets
+    ]
+
+
+def compact_record(record: dict[str, Any]) -> dict[str, Any]:
+    """The persisted form of a record.
+
+    No ``None`` values, no queue placement and no working state; photo-grid
+    target lists are reduced to target indexes.
+    """
+    compact = {}
+    for key, value in record.items():
+        if value is None or key in _TRANSIENT_KEYS or key in _WORKING_KEYS:
+            continue
+        compact[key] = _target_indexes(value) if key in _TARGET_LIST_KEYS else value
+    return compact
+
+
+class RunRecords(MutableMapping):
+    """Run records of one kind, by ID, oldest first, with retention."""
+
+    def __init__(
+        self,
+        *,
+        max_count: int = RUN_RECORD_MAX_PER_KIND,
+        max_age: timedelta = timedelta(days=RUN_RECORD_MAX_AGE_DAYS),
+        on_change: Callable[[], None] | None = None,
+        clock: Callable[[], datetime] = dt_util.utcnow,
+    ) -> None:
+        self._records: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._max_count = max_count
+        self._max_age = max_age
+        self._on_change = on_change
+        self._clock = clock
+
+    def __getitem__(self, run_id: str) -> dict[str, Any]:
+        return self._records[run_id]
+
+    def __setitem__(self, run_id: str, record: dict[str, Any]) -> None:
+        self._records[run_id] = record
+        self._records.move_to_end(run_id)
+        self.prune()
+        if self._on_change is not None:
+            self._on_change()
+
+    def __delitem__(self, run_id: str) -> None:
+        del self._records[run_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def recent(self, limit: int) -> list[dict[str, Any]]:
+        """The ``limit`` most recently created records, newest first."""
+        result = []
+        for run_id in reversed(self._records):
+            if len(result) >= limit:
+                break
+            result.append(self._records[run_id])
+        return result
+
+    def prune(self) -> None:
+        """Drop the oldest finished records beyond the count and age limits."""
+        cutoff = self._clock() - self._max_age
+        excess = len(self._records) - self._max_count
+        for run_id in list(self._records):
+            record = self._records[run_id]
+            if record.get("status") in ACTIVE_STATUSES:
+                continue
+            when = _record_time(record)
+            if excess > 0 or (when is not None and when < cutoff):
+                del self._records[run_id]
+                excess -= 1
+
+    def load(self, records: list[dict[str, Any]], id_key: str) -> None:
+        """Restore persisted records, failing any whose task did not survive."""
+        now = self._clock().isoformat()
+        # Anything created before the load finished is newer than everything
+        # on disk, so it stays at the end.
+        newer = list(self._records)
+        for record in records:
+            run_id = record.get(id_key)
+            if not run_id or run_id in self._records:
+                continue
+            if record.get("status") in ACTIVE_STATUSES:
+                record.update(
+                    status="failed",
+                    message="Interrupted by a Home Assistant restart",
+                    completed_at=now,
+                )
+            self._records[run_id] = record
+        for run_id in newer:
+            self._records.move_to_end(run_id)
+        self.prune()
+
+
+# The ID field each kind's records carry.
+_ID_KEYS = {
+    "soil_captures": "capture_id",
+    "soil_surveys": "survey_id",
+    "grid_repairs": "repair_id",
+    "gcode_runs": "run_id",
+    "weeding_runs": "run_id",
+}
+
+
+class RunRecordStore:
+    """The run-record kinds of one config entry, persisted with debounce."""
+
+    def __init__(self, hass, entry_id: str | None) -> None:
+        self._store: Store | None = (
+            Store(hass, RUN_RECORD_STORAGE_VERSION, f"{DOMAIN}.runs.{entry_id}")
+            if entry_id is not None
+            else None
+        )
+        self.kinds: dict[str, RunRecords] = {
+            kind: RunRecords(on_change=self.schedule_save) for kind in RUN_KINDS
+        }
+
+    async def async_load(self) -> None:
+        """Restore what was persisted before the last restart."""
+        if self._store is None:
+            return
+        data = await self._store.async_load() or {}
+        for kind, records in (data.get("records") or {}).items():
+            if kind in self.kinds and isinstance(records, list):
+                self.kinds[kind].load(
+                    [dict(item) for item in records if isinstance(item, dict)], _ID_KEYS[kind]
+                )
+
+    def schedule_save(self) -> None:
+        """Write the current records once things have been quiet for a while."""
+        if self._store is not None:
+            self._store.async_delay_save(self._serialize, RUN_RECORD_SAVE_DELAY_SECONDS)
+
+    async def async_flush(self) -> None:
+        """Write the current records now (on unload)."""
+        if self._store is not None:
+            await self._store.async_save(self._serialize())
+
+    def _serialize(self) -> dict[str, Any]:
+        for records in self.kinds.values():
+            records.prune()
+        return {
+            "records": {
+                kind: [compact_record(record) for record in records.values()]
+                for kind, records in self.kinds.items()
+            }
+        }
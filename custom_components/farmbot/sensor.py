@@ -1,25 +1,30 @@
 # custom_components/farmbot/sensor.py
 
 import logging
-from datetime import timedelta
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
 )
+from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DOMAIN, SIGNAL_BUTTON_INPUT, SIGNAL_VISION_STATE
+from .const import (
+    DOMAIN,
+    SIGNAL_BUTTON_INPUT,
+    SIGNAL_STATE,
+    SIGNAL_VISION_STATE,
+)
+from .coordinate_filter import CoordinateWriteFilter
 from .entity import FarmbotEntity
+from .latency import RPC_OUTCOMES, TRACED_RPC_KINDS
 
 _LOGGER = logging.getLogger(__name__)
 
-# Poll every 5 seconds
-SCAN_INTERVAL = timedelta(seconds=3)
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    """Set up FarmBot X/Y/Z coordinate sensors (polling version)."""
+    """Set up FarmBot X/Y/Z coordinate sensors and the diagnostic sensors."""
     manager = hass.data[DOMAIN][entry.entry_id]
     sensors = [
         FarmbotCoordinateSensor(manager, "x"),
@@ -31,16 +36,26 @@ async def async_setup_entry(hass, entry, async_add_entities):
         FarmbotVisionRecommendationsSensor(manager),
         FarmbotVisionUncertainPlantsSensor(manager),
     ]
+    sensors.extend(FarmbotRpcLatencySensor(manager, kind) for kind in TRACED_RPC_KINDS)
     async_add_entities(sensors)
     _LOGGER.debug("Added %d FarmBot sensors", len(sensors))
 
 class FarmbotCoordinateSensor(FarmbotEntity, SensorEntity):
-    """Polling-based sensor for one axis of FarmBot’s position."""
+    """One axis of FarmBot’s position, pushed from the MQTT status stream.
+
+    Never polled. While FarmBot reports itself busy, a new value is written
+    only once it has moved past the configured deadband and the minimum write
+    interval has elapsed; the first status after the bot goes idle always
+    writes the exact final position, whatever the deadband.
+    """
+
+    _attr_should_poll = False
 
     def __init__(self, manager, axis):
         super().__init__(manager)
         self._axis = axis
         self._state = None
+        self._filter = CoordinateWriteFilter(axis)
 
     @property
     def unique_id(self):
@@ -54,25 +69,19 @@ class FarmbotCoordinateSensor(FarmbotEntity, SensorEntity):
     def native_value(self):
         return self._state
 
-    @property
-    def should_poll(self):
-        return True
+    async def async_added_to_hass(self):
+        unsub = async_dispatcher_connect(self.hass, SIGNAL_STATE, self._handle_status)
+        self.async_on_remove(unsub)
+        self._handle_status(self._manager.status)
 
-    async def async_update(self):
-        """Called every SCAN_INTERVAL to refresh axis value."""
-        pos = (
-            self._manager.status
-            .get("location_data", {})
-            .get("position", {})
-        )
-        val = pos.get(self._axis)
-        if val is None:
-            _LOGGER.debug("Sensor %s: position key missing", self._axis)
+    @callback
+    def _handle_status(self, status):
+        """Write the axis value if it has changed enough to be worth recording."""
+        if not self._filter.update(status, self._manager.coordinate_sensor_options()):
             return
-        if val != self._state:
-            _LOGGER.debug("Sensor %s: %s → %s", self._axis, self._state, val)
-            self._state = val
-            self.async_write_ha_state()
+        _LOGGER.debug("Sensor %s: %s → %s", self._axis, self._state, self._filter.value)
+        self._state = self._filter.value
+        self.async_write_ha_state()
 
 
 class FarmbotLastButtonInputSensor(FarmbotEntity, SensorEntity):
@@ -210,3 +219,50 @@ class FarmbotVisionUncertainPlantsSensor(_FarmbotVisionSensor):
     @property
     def native_value(self):
         return self._manager.vision_uncertain
+
+
+class FarmbotRpcLatencySensor(FarmbotEntity, SensorEntity):
+    """95th-percentile publish-to-``rpc_ok`` latency for one CeleryScript kind.
+
+    Disabled by default; enable it to track FarmBot OS response times across
+    upgrades. Polled at the sensor platform's default 30-second interval
+    rather than pushed: the rolling histogram it reads changes on every
+    acknowledgement, and a state write per RPC would cost more than the
+    percentile is worth.
+    """
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_entity_registry_enabled_default = False
+    _attr_native_unit_of_measurement = "ms"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, manager, kind):
+        super().__init__(manager)
+        self._kind = kind
+
+    @property
+    def unique_id(self):
+        return f"{self._manager.device_id}_rpc_latency_{self._kind}"
+
+    @property
+    def name(self):
+        return f"{self._manager.device_name} RPC Latency {self._kind}"
+
+    @property
+    def native_value(self):
+        histogram = self._manager.rpc_latency.histogram(self._kind, "ok")
+        if histogram is None or not len(histogram):
+            return None
+        return round(histogram.percentile(0.95), 1)
+
+    @property
+    def extra_state_attributes(self):
+        attributes = {}
+        for outcome in RPC_OUTCOMES:
+            histogram = self._manager.rpc_latency.histogram(self._kind, outcome)
+            if histogram is None:
+                continue
+            summary = histogram.snapshot()
+            summary.pop("buckets", None)
+            attributes[outcome] = summary
+        return attributes
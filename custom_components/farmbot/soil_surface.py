@@ -0,0 +1,296 @@
+"""A soil-height surface interpolated from FarmBot soil points.
+
+Weeding requests carry ``soil_z`` per weed and soil captures are placed from
+the Vision app's own guess, although every measured soil height is already
+known as a soil-height ``GenericPointer``. :class:`SoilSurface` turns those
+points into a height field once, so a planner can look up Z for any number of
+X/Y positions without another API call.
+
+The surface is a regular grid over the bed. Each node holds the inverse
+distance weighted mean of the soil points within ``radius_mm`` of it, or is
+unknown when there are none: the surface never extrapolates across a bed
+that was only measured in one corner. Because a node only depends on points
+within that radius, a changed point invalidates only the nodes within the
+radius of where it was and where it now is. :meth:`SoilSurface.update` diffs
+the points it is given against the ones it holds and recomputes just those
+nodes, so refreshing after one new measurement is cheap however large the
+grid.
+
+Heights between nodes are bilinear. Node recomputation and queries work on
+whole columns at once, with NumPy when it is installed and a plain pass over
+``array`` columns otherwise; both give the same heights.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Any, Hashable, Iterable, Sequence
+
+from . import spatial
+from .const import SOIL_SURFACE_IDW_POWER, SOIL_SURFACE_MAX_NODES, SOIL_SURFACE_RADIUS_MM
+
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover - Home Assistant ships NumPy
+    _np = None
+
+# A node this close to a point takes the point's height as measured.
+_COINCIDENT_MM = 1e-6
+# Nodes recomputed together with NumPy; bounds the node-by-point matrices.
+_NODE_BLOCK = 4096
+
+
+class SoilSurface:
+    """Soil Z on a regular X/Y grid, kept up to date with the soil points.
+
+    Nodes sit at ``origin + (column, row) * cell_mm`` and cover the given X
+    and Y ranges; unknown nodes hold NaN.
+    """
+
+    def __init__(
+        self,
+        x_range: tuple[float, float],
+        y_range: tuple[float, float],
+        *,
+        cell_mm: float,
+        radius_mm: float = SOIL_SURFACE_RADIUS_MM,
+        power: float = SOIL_SURFACE_IDW_POWER,
+    ) -> None:
+        bounds = [float(value) for value in (*x_range, *y_range)]
+        if not all(math.isfinite(value) for value in bounds):
+            raise ValueError("soil surface bounds must be finite")
+        if bounds[1] < bounds[0] or bounds[3] < bounds[2]:
+            raise ValueError("soil surface bounds are reversed")
+        if not cell_mm > 0 or not radius_mm > 0 or not power > 0:
+            raise ValueError("cell size, radius and power must be positive")
+        self.x_range = (bounds[0], bounds[1])
+        self.y_range = (bounds[2], bounds[3])
+        self.cell_mm = float(cell_mm)
+        self.radius_mm = float(radius_mm)
+        self.power = float(power)
+        # At least two nodes per axis, so every query has a cell to fall in.
+        self.columns = max(2, math.ceil((bounds[1] - bounds[0]) / self.cell_mm) + 1)
+        self.rows = max(2, math.ceil((bounds[3] - bounds[2]) / self.cell_mm) + 1)
+        if self.columns * self.rows > SOIL_SURFACE_MAX_NODES:
+            raise ValueError(
+                f"a {self.cell_mm:g} mm soil surface grid would have more than "
+                f"{SOIL_SURFACE_MAX_NODES} nodes"
+            )
+        self._points: dict[Hashable, tuple[float, float, float]] = {}
+        # Buckets as wide as the radius: a node reads at most nine of them.
+        self._index: spatial.GridIndex[None] = spatial.GridIndex(self.radius_mm)
+        self._z = array("d", [math.nan]) * (self.columns * self.rows)
+        # Bumped whenever the point set changes; nodes recomputed by the last change.
+        self.revision = 0
+        self.last_recomputed = 0
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def fits(
+        self, x_range: tuple[float, float], y_range: tuple[float, float], cell_mm: float
+    ) -> bool:
+        """Whether this grid is the one a surface over these bounds would have."""
+        return (
+            (float(x_range[0]), float(x_range[1])) == self.x_range
+            and (float(y_range[0]), float(y_range[1])) == self.y_range
+            and float(cell_mm) == self.cell_mm
+        )
+
+    def regridded(self, cell_mm: float) -> SoilSurface:
+        """The same points and bounds on a grid of ``cell_mm``."""
+        surface = SoilSurface(
+            self.x_range,
+            self.y_range,
+            cell_mm=cell_mm,
+            radius_mm=self.radius_mm,
+            power=self.power,
+        )
+        surface._apply(dict(self._points))
+        return surface
+
+    def update(self, points: Iterable[dict[str, Any]]) -> int:
+        """Make ``points`` the surface's point set; return the nodes recomputed.
+
+        Points are matched by ``id``. Only the nodes near an added, removed or
+        changed point are recomputed.
+        """
+        wanted: dict[Hashable, tuple[float, float, float]] = {}
+        for point in points:
+            position = spatial.coordinates(point)
+            if position is not None and point.get("id") is not None:
+                wanted[point["id"]] = position
+        changes: dict[Hashable, tuple[float, float, float] | None] = {
+            key: None for key in self._points if key not in wanted
+        }
+        changes.update(
+            (key, position) for key, position in wanted.items() if self._points.get(key) != position
+        )
+        return self._apply(changes)
+
+    def upsert(self, key: Hashable, x: float, y: float, z: float) -> int:
+        """Add or move one point; return the nodes recomputed."""
+        position = spatial.coordinates({"x": x, "y": y, "z": z})
+        if position is None:
+            raise ValueError("soil point coordinates must be finite")
+        if self._points.get(key) == position:
+            self.last_recomputed = 0
+            return 0
+        return self._apply({key: position})
+
+    def _apply(self, changes: dict[Hashable, tuple[float, float, float] | None]) -> int:
+        dirty: set[int] = set()
+        for key, position in changes.items():
+            previous = self._points.pop(key, None)
+            self._index.remove(key)
+            if previous is not None:
+                dirty.update(self._nodes_near(previous[0], previous[1]))
+            if position is not None:
+                self._points[key] = position
+                self._index.insert(key, *position)
+                dirty.update(self._nodes_near(position[0], position[1]))
+        nodes = sorted(dirty)
+        if nodes:
+            (_fill_numpy if _np is not None else _fill_array)(self, nodes)
+        if changes:
+            self.revision += 1
+        self.last_recomputed = len(nodes)
+        return len(nodes)
+
+    def _nodes_near(self, x: float, y: float) -> Iterable[int]:
+        """Indices of the nodes within the radius of ``(x, y)``."""
+        # Widened a hair so rounding never leaves a node on the rim stale.
+        cell, radius = self.cell_mm, self.radius_mm + _COINCIDENT_MM
+        column_x, row_y = x - self.x_range[0], y - self.y_range[0]
+        first = max(0, math.ceil((column_x - radius) / cell))
+        last = min(self.columns - 1, math.floor((column_x + radius) / cell))
+        for column in range(first, last + 1):
+            dx = column * cell - column_x
+            reach = math.sqrt(max(0.0, radius * radius - dx * dx))
+            bottom = max(0, math.ceil((row_y - reach) / cell))
+            top = min(self.rows - 1, math.floor((row_y + reach) / cell))
+            for row in range(bottom, top + 1):
+                yield row * self.columns + column
+
+    def node(self, index: int) -> tuple[float, float]:
+        """X and Y of the node at a row-major ``index``."""
+        row, column = divmod(index, self.columns)
+        return (
+            self.x_range[0] + column * self.cell_mm,
+            self.y_range[0] + row * self.cell_mm,
+        )
+
+    def heights(self, xs: Sequence[float], ys: Sequence[float]) -> list[float | None]:
+        """Bilinear soil Z at each ``(xs[i], ys[i])``; ``None`` where unknown.
+
+        A position is unknown when it lies off the grid or any of the four
+        nodes around it is unknown.
+        """
+        if len(xs) != len(ys):
+            raise ValueError("X and Y must have the same length")
+        if len(xs) == 0:
+            return []
+        resolve = _heights_numpy if _np is not None else _heights_array
+        return [value if math.isfinite(value) else None for value in resolve(self, xs, ys)]
+
+    def grid(self, *, decimals: int = 1) -> dict[str, Any]:
+        """The grid as rows of Z from the lowest Y up, ``None`` where unknown."""
+        values = [round(value, decimals) if math.isfinite(value) else None for value in self._z]
+        return {
+            "origin": {"x": self.x_range[0], "y": self.y_range[0]},
+            "cell_mm": self.cell_mm,
+            "columns": self.columns,
+            "rows": self.rows,
+            "z": [
+                values[row * self.columns : (row + 1) * self.columns] for row in range(self.rows)
+            ],
+        }
+
+
+def _fill_array(surface: SoilSurface, nodes: list[int]) -> None:
+    power = surface.power
+    for index in nodes:
+        x, y = surface.node(index)
+        hits = surface._index.within(x, y, radius=surface.radius_mm)
+        if not hits:
+            surface._z[index] = math.nan
+        elif hits[0][0] < _COINCIDENT_MM:
+            surface._z[index] = hits[0][1].z
+        else:
+            weights = [distance**-power for distance, _ in hits]
+            surface._z[index] = sum(
+                weight * entry.z for weight, (_, entry) in zip(weights, hits)
+            ) / sum(weights)
+
+
+def _fill_numpy(surface: SoilSurface, nodes: list[int]) -> None:
+    np = _np
+    values = np.frombuffer(surface._z, dtype=np.float64)
+    entries = sorted(surface._index, key=lambda entry: entry.order)
+    if not entries:
+        values[nodes] = np.nan
+        return
+    px = np.array([entry.x for entry in entries])
+    py = np.array([entry.y for entry in entries])
+    pz = np.array([entry.z for entry in entries])
+    indices = np.asarray(nodes, dtype=np.int64)
+    for start in range(0, len(indices), _NODE_BLOCK):
+        block = indices[start : start + _NODE_BLOCK]
+        nx = surface.x_range[0] + (block % surface.columns) * surface.cell_mm
+        ny = surface.y_range[0] + (block // surface.columns) * surface.cell_mm
+        distances = np.hypot(nx[:, None] - px[None, :], ny[:, None] - py[None, :])
+        inside = distances <= surface.radius_mm
+        weights = np.where(inside, np.maximum(distances, _COINCIDENT_MM) ** -surface.power, 0.0)
+        total = weights.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = np.where(total > 0, (weights * pz).sum(axis=1) / total, np.nan)
+        # argmin takes the first of equal distances: the earliest point, as
+        # the index's nearest-first order does.
+        nearest = distances.argmin(axis=1)
+        coincident = distances[np.arange(len(block)), nearest] < _COINCIDENT_MM
+        values[block] = np.where(coincident, pz[nearest], result)
+
+
+def _heights_array(surface: SoilSurface, xs: Sequence[float], ys: Sequence[float]) -> list[float]:
+    last_column, last_row = surface.columns - 1, surface.rows - 1
+    z, columns = surface._z, surface.columns
+    result = []
+    for x, y in zip(xs, ys):
+        gx = (float(x) - surface.x_range[0]) / surface.cell_mm
+        gy = (float(y) - surface.y_range[0]) / surface.cell_mm
+        if not (0 <= gx <= last_column and 0 <= gy <= last_row):
+            result.append(math.nan)
+            continue
+        column = min(int(gx), last_column - 1)
+        row = min(int(gy), last_row - 1)
+        fx, fy = gx - column, gy - row
+        corner = row * columns + column
+        result.append(
+            z[corner] * (1 - fx) * (1 - fy)
+            + z[corner + 1] * fx * (1 - fy)
+            + z[corner + columns] * (1 - fx) * fy
+            + z[corner + columns + 1] * fx * fy
+        )
+    return result
+
+
+def _heights_numpy(surface: SoilSurface, xs: Sequence[float], ys: Sequence[float]) -> list[float]:
+    np = _np
+    z = np.frombuffer(surface._z, dtype=np.float64)
+    columns = surface.columns
+    gx = (np.asarray(xs, dtype=np.float64) - surface.x_range[0]) / surface.cell_mm
+    gy = (np.asarray(ys, dtype=np.float64) - surface.y_range[0]) / surface.cell_mm
+    on_grid = (gx >= 0) & (gx <= columns - 1) & (gy >= 0) & (gy <= surface.rows - 1)
+    gx, gy = np.where(on_grid, gx, 0.0), np.where(on_grid, gy, 0.0)
+    column = np.minimum(gx.astype(np.int64), columns - 2)
+    row = np.minimum(gy.astype(np.int64), surface.rows - 2)
+    fx, fy = gx - column, gy - row
+    corner = row * columns + column
+    values = (
+        z[corner] * (1 - fx) * (1 - fy)
+        + z[corner + 1] * fx * (1 - fy)
+        + z[corner + columns] * (1 - fx) * fy
+        + z[corner + columns + 1] * fx * fy
+    )
+    return np.where(on_grid, values, np.nan).tolist()
@@ -0,0 +1,333 @@
+"""A uniform-grid spatial index over FarmBot coordinates.
+
+Matching coordinates used to be a linear scan wherever it happened: every
+soil frame against every new image, every poll of the image API against the
+whole listing, every photo-grid cell against every recent image. An account
+with a few seasons of photos holds thousands of images, and those scans ran
+several times a second while a capture waited for its upload.
+
+:class:`GridIndex` buckets entries on a square X/Y grid. A radius query reads
+only the buckets the circle overlaps; a nearest query reads rings of buckets
+outwards from the query point and stops as soon as no unread ring can hold
+anything closer. Either query falls back to a plain scan when it would read
+more buckets than there are entries, so a sparse index is never slower than
+the scan it replaced. Entries are added and removed one at a time, so an
+index that is fed from repeated polls only ever pays for what changed.
+
+Entries are keyed by the caller (a point or image ID, or a list position) and
+carry an arbitrary payload. Z is stored with every entry; a query that passes
+``z=None`` measures in X/Y only, so the same index serves plants, weeds and
+soil points (planar) as well as image metadata (3D). Ties are broken by
+insertion order, which keeps results identical to a first-wins linear scan
+over the same entries.
+
+:func:`assign` pairs query points with indexed entries one-to-one. Each
+query is matched to at most one entry within a distance gate, as many
+queries as possible are matched, and among those pairings the total distance
+is the smallest. Greedy nearest-first matching gets this wrong when two
+queries sit closer together than the gate: the first takes the image the
+second needed and the second goes unmatched. Candidate pairs come from radius
+queries, the pairs split into independent clusters, and each cluster is
+solved exactly with the Hungarian algorithm, so a large batch costs little
+more than its clusters.
+
+:func:`coordinates` reads X/Y/Z from a FarmBot point, plant, weed or image
+(image coordinates live under ``meta``).
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, Iterator, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def coordinates(record: Any) -> tuple[float, float, float] | None:
+    """Finite X, Y, Z of a FarmBot record, or ``None`` when it has none.
+
+    A missing Z counts as 0, as it does throughout FarmBot's own API.
+    """
+    if not isinstance(record, dict):
+        return None
+    meta = record.get("meta")
+    source = meta if isinstance(meta, dict) and "x" in meta else record
+    try:
+        x, y = float(source["x"]), float(source["y"])
+        z = float(source.get("z") or 0.0)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not all(math.isfinite(value) for value in (x, y, z)):
+        return None
+    return x, y, z
+
+
+@dataclass(frozen=True)
+class Entry(Generic[T]):
+    """One indexed entry."""
+
+    key: Hashable
+    x: float
+    y: float
+    z: float
+    item: T
+    order: int
+
+    def distance(self, x: float, y: float, z: float | None) -> float:
+        if z is None:
+            return math.hypot(self.x - x, self.y - y)
+        return math.sqrt((self.x - x) ** 2 + (self.y - y) ** 2 + (self.z - z) ** 2)
+
+
+class GridIndex(Generic[T]):
+    """Entries by key, bucketed on a square X/Y grid of ``cell_mm``."""
+
+    def __init__(self, cell_mm: float) -> None:
+        if not cell_mm > 0:
+            raise ValueError("cell size must be positive")
+        self._cell = float(cell_mm)
+        self._buckets: dict[tuple[int, int], dict[Hashable, Entry[T]]] = {}
+        self._entries: dict[Hashable, Entry[T]] = {}
+        self._order = 0
+        # Occupied bucket columns and rows; widened on insert, never shrunk.
+        self._extent: list[int] | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[Entry[T]]:
+        return iter(list(self._entries.values()))
+
+    def _cell_of(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x / self._cell), math.floor(y / self._cell)
+
+    def insert(self, key: Hashable, x: float, y: float, z: float = 0.0, item: T = None) -> None:
+        """Add an entry, replacing any entry already under ``key``."""
+        self.remove(key)
+        entry = Entry(key, float(x), float(y), float(z), item, self._order)
+        self._order += 1
+        self._entries[key] = entry
+        column, row = self._cell_of(entry.x, entry.y)
+        self._buckets.setdefault((column, row), {})[key] = entry
+        if self._extent is None:
+            self._extent = [column, column, row, row]
+        else:
+            extent = self._extent
+            extent[:] = [
+                min(extent[0], column),
+                max(extent[1], column),
+                min(extent[2], row),
+                max(extent[3], row),
+            ]
+
+    def remove(self, key: Hashable) -> Entry[T] | None:
+        """Remove and return the entry under ``key``, if there is one."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        cell = self._cell_of(entry.x, entry.y)
+        bucket = self._buckets[cell]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[cell]
+        return entry
+
+    def within(
+        self,
+        x: float,
+        y: float,
+        z: float | None = None,
+        *,
+        radius: float,
+        where: Callable[[Entry[T]], bool] | None = None,
+    ) -> list[tuple[float, Entry[T]]]:
+        """Every entry within ``radius``, nearest first."""
+        column, row = self._cell_of(x, y)
+        reach = math.ceil(radius / self._cell)
+        if (2 * reach + 1) ** 2 > len(self._entries):
+            candidates: Iterator[Entry[T]] = iter(self._entries.values())
+        else:
+            candidates = (
+                entry
+                for dx in range(-reach, reach + 1)
+                for dy in range(-reach, reach + 1)
+                for entry in self._buckets.get((column + dx, row + dy), {}).values()
+            )
+        found = []
+        for entry in candidates:
+            if where is not None and not where(entry):
+                continue
+            distance = entry.distance(x, y, z)
+            if distance <= radius:
+                found.append((distance, entry))
+        found.sort(key=lambda hit: (hit[0], hit[1].order))
+        return found
+
+    def nearest(
+        self,
+        x: float,
+        y: float,
+        z: float | None = None,
+        *,
+        max_distance: float = math.inf,
+        where: Callable[[Entry[T]], bool] | None = None,
+    ) -> tuple[float, Entry[T]] | None:
+        """The nearest entry within ``max_distance``, or ``None``."""
+        if not self._entries or self._extent is None:
+            return None
+        column, row = self._cell_of(x, y)
+        # Beyond this ring every bucket is empty.
+        west, east, south, north = self._extent
+        last_ring = max(column - west, east - column, row - south, north - row, 0)
+        if math.isfinite(max_distance):
+            last_ring = min(last_ring, math.ceil(max_distance / self._cell))
+        best: tuple[float, Entry[T]] | None = None
+
+        def consider(entry: Entry[T]) -> None:
+            nonlocal best
+            if where is not None and not where(entry):
+                return
+            distance = entry.distance(x, y, z)
+            if distance > max_distance:
+                return
+            if best is None or (distance, entry.order) < (best[0], best[1].order):
+                best = (distance, entry)
+
+        budget = len(self._entries)
+        for ring in range(last_ring + 1):
+            # Everything in ring r is at least (r - 1) cells away in X or Y.
+            if best is not None and (ring - 1) * self._cell > best[0]:
+                break
+            budget -= max(1, 8 * ring)
+            if budget < 0:
+                # Mostly empty buckets from here on: a scan is cheaper.
+                for entry in self._entries.values():
+                    consider(entry)
+                break
+            for cell in self._ring(column, row, ring):
+                for entry in self._buckets.get(cell, {}).values():
+                    consider(entry)
+        return best
+
+    @staticmethod
+    def _ring(column: int, row: int, ring: int) -> Iterator[tuple[int, int]]:
+        if ring == 0:
+            yield column, row
+            return
+        for dx in range(-ring, ring + 1):
+            yield column + dx, row - ring
+            yield column + dx, row + ring
+        for dy in range(-ring + 1, ring):
+            yield column - ring, row + dy
+            yield column + ring, row + dy
+
+
+def assign(
+    queries: Sequence[tuple[float, float, float]],
+    index: GridIndex[T],
+    *,
+    gate: float,
+) -> dict[int, tuple[float, Entry[T]]]:
+    """Match queries to indexed entries one-to-one within ``gate`` (3D).
+
+    Returns ``{query position: (distance, entry)}`` for every matched query.
+    The matching has the most pairs possible and, among those, the smallest
+    total distance. The index is left unchanged.
+    """
+    edges: dict[int, list[tuple[float, Entry[T]]]] = {}
+    for position, (x, y, z) in enumerate(queries):
+        hits = index.within(x, y, z, radius=gate)
+        if hits:
+            edges[position] = hits
+
+    # Queries that share a candidate entry, directly or through others, form
+    # one cluster; clusters are independent of each other.
+    parent: dict[Hashable, Hashable] = {}
+
+    def find(node: Hashable) -> Hashable:
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for position, hits in edges.items():
+        for _, entry in hits:
+            parent[find(("q", position))] = find(("e", entry.key))
+    clusters: dict[Hashable, list[int]] = {}
+    for position in edges:
+        clusters.setdefault(find(("q", position)), []).append(position)
+
+    result: dict[int, tuple[float, Entry[T]]] = {}
+    for members in clusters.values():
+        entries: dict[Hashable, Entry[T]] = {}
+        for position in members:
+            for _, entry in edges[position]:
+                entries.setdefault(entry.key, entry)
+        columns = sorted(entries.values(), key=lambda entry: entry.order)
+        column_of = {entry.key: number for number, entry in enumerate(columns)}
+        # A forbidden pair costs more than every allowed pair together, so
+        # no solution trades a match away for a shorter total.
+        forbidden = gate * (len(members) + len(columns) + 1)
+        cost = [[forbidden] * len(columns) for _ in members]
+        for row, position in enumerate(members):
+            for distance, entry in edges[position]:
+                cost[row][column_of[entry.key]] = distance
+        for row, column in _min_cost_assignment(cost):
+            if cost[row][column] < forbidden:
+                result[members[row]] = (cost[row][column], columns[column])
+    return result
+
+
+def _min_cost_assignment(cost: list[list[float]]) -> list[tuple[int, int]]:
+    """Hungarian algorithm: the (row, column) pairs of a min-cost assignment.
+
+    Every row of the smaller side is assigned. O(n^2 m) for n <= m.
+    """
+    if not cost or not cost[0]:
+        return []
+    transposed = len(cost) > len(cost[0])
+    if transposed:
+        cost = [list(column) for column in zip(*cost)]
+    rows, columns = len(cost), len(cost[0])
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (columns + 1)
+    owner = [0] * (columns + 1)
+    way = [0] * (columns + 1)
+    for row in range(1, rows + 1):
+        owner[0] = row
+        current = 0
+        slack = [math.inf] * (columns + 1)
+        used = [False] * (columns + 1)
+        while True:
+            used[current] = True
+            assigned = owner[current]
+            delta, following = math.inf, 0
+            for column in range(1, columns + 1):
+                if used[column]:
+                    continue
+                reduced = cost[assigned - 1][column - 1] - u[assigned] - v[column]
+                if reduced < slack[column]:
+                    slack[column], way[column] = reduced, current
+                if slack[column] < delta:
+                    delta, following = slack[column], column
+            for column in range(columns + 1):
+                if used[column]:
+                    u[owner[column]] += delta
+                    v[column] -= delta
+                else:
+                    slack[column] -= delta
+            current = following
+            if owner[current] == 0:
+                break
+        while current:
+            previous = way[current]
+            owner[current] = owner[previous]
+            current = previous
+    pairs = [(owner[column] - 1, column - 1) for column in range(1, columns + 1) if owner[column]]
+    if transposed:
+        pairs = [(column, row) for row, column in pairs]
+    return sorted(pairs)
@@ -0,0 +1,200 @@
+"""Parametric toolpaths for raw G-code runs.
+
+The Vision app used to send circles, spirals and raster fills as thousands of
+literal ``G00`` lines, which ran into ``GCODE_MAX_LINES`` and made every
+preview parse the whole text again. A shape spec names the shape and its
+dimensions instead; this module turns it into points along the path and
+resolves them with :func:`gcode.resolve_path`, so a generated program passes
+the same bounds, speed and move-limit checks as a written one.
+
+Curves are divided by chord tolerance: each segment's sagitta -- how far the
+straight chord strays from the true arc -- stays within
+``chord_tolerance_mm``, so a large circle gets more segments than a small one
+for the same fidelity.
+
+The path starts with a travel leg: across to the first point at the current
+height, then straight down (or up) to the shape's ``z``, so the gantry never
+cuts a diagonal through the soil on the way in.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any
+
+from .const import GCODE_DEFAULT_CHORD_TOLERANCE_MM
+from .gcode import GcodeError, GcodeProgram, resolve_path
+
+SHAPE_KINDS = ("circle", "spiral", "raster")
+
+# Which spec fields each shape needs.
+_REQUIRED = {
+    "circle": ("center_x", "center_y", "radius"),
+    "spiral": ("center_x", "center_y", "radius", "pitch_mm"),
+    "raster": ("x_min", "y_min", "x_max", "y_max", "spacing_mm"),
+}
+# No arc segment turns more than this, however loose the tolerance, so a tiny
+# circle is still round rather than a triangle.
+_MAX_ARC_STEP = math.pi / 8
+
+
+def arc_step(radius: float, tolerance_mm: float) -> float:
+    """The largest angle whose chord stays within ``tolerance_mm`` of the arc."""
+    if radius <= tolerance_mm:
+        return _MAX_ARC_STEP
+    return min(2 * math.acos(1 - tolerance_mm / radius), _MAX_ARC_STEP)
+
+
+def circle_points(
+    center_x: float, center_y: float, radius: float, tolerance_mm: float
+) -> list[tuple[float, float]]:
+    """A closed circle, anticlockwise from its +X point back to it."""
+    count = math.ceil(2 * math.pi / arc_step(radius, tolerance_mm))
+    return [
+        (
+            center_x + radius * math.cos(2 * math.pi * step / count),
+            center_y + radius * math.sin(2 * math.pi * step / count),
+        )
+        for step in range(count + 1)
+    ]
+
+
+def spiral_points(
+    center_x: float,
+    center_y: float,
+    radius: float,
+    pitch_mm: float,
+    tolerance_mm: float,
+    *,
+    inner_radius: float = 0.0,
+) -> list[tuple[float, float]]:
+    """An Archimedean spiral outwards from ``inner_radius`` to ``radius``.
+
+    Successive turns are ``pitch_mm`` apart. The angular step is recomputed
+    from the current radius, so the inner turns are not oversampled.
+    """
+    points = []
+    angle = 0.0
+    end_angle = 2 * math.pi * (radius - inner_radius) / pitch_mm
+    while True:
+        current = inner_radius + pitch_mm * angle / (2 * math.pi)
+        points.append((center_x + current * math.cos(angle), center_y + current * math.sin(angle)))
+        if angle >= end_angle:
+            return points
+        angle = min(angle + arc_step(current, tolerance_mm), end_angle)
+
+
+def raster_points(
+    x_min: float,
+    y_min: float,
+    x_max: float,
+    y_max: float,
+    spacing_mm: float,
+    *,
+    along: str = "x",
+) -> list[tuple[float, float]]:
+    """A serpentine fill of the rectangle, rows ``spacing_mm`` apart.
+
+    Rows run along ``along`` and alternate direction, so each row starts
+    where the last one ended. The last row lies on the far edge even when
+    the spacing does not divide the rectangle evenly.
+    """
+    low, high = (y_min, y_max) if along == "x" else (x_min, x_max)
+    rows = max(1, math.ceil((high - low) / spacing_mm - 1e-9))
+    points = []
+    for row in range(rows + 1):
+        across = min(low + row * spacing_mm, high)
+        if along == "x":
+            ends = [(x_min, across), (x_max, across)]
+        else:
+            ends = [(across, y_min), (across, y_max)]
+        points.extend(ends if row % 2 == 0 else ends[::-1])
+    return points
+
+
+def shape_points(spec: dict[str, Any]) -> list[tuple[float, float]]:
+    """The X/Y points of a shape spec, validated for its kind."""
+    kind = spec.get("kind")
+    if kind not in _REQUIRED:
+        raise GcodeError(f"Unknown shape {kind!r}; supported: {', '.join(SHAPE_KINDS)}")
+    missing = [key for key in _REQUIRED[kind] if spec.get(key) is None]
+    if missing:
+        raise GcodeError(f"A {kind} needs {', '.join(missing)}")
+    values = {key: float(spec[key]) for key in _REQUIRED[kind]}
+    tolerance = float(spec.get("chord_tolerance_mm") or GCODE_DEFAULT_CHORD_TOLERANCE_MM)
+    if not (math.isfinite(tolerance) and tolerance > 0):
+        raise GcodeError("Chord tolerance must be a positive number of mm")
+
+    if kind == "circle":
+        if values["radius"] <= 0:
+            raise GcodeError("Circle radius must be positive")
+        return circle_points(values["center_x"], values["center_y"], values["radius"], tolerance)
+    if kind == "spiral":
+        inner = float(spec.get("inner_radius") or 0.0)
+        if not 0 <= inner < values["radius"]:
+            raise GcodeError("Spiral inner radius must be at least 0 and less than its radius")
+        if values["pitch_mm"] <= 0:
+            raise GcodeError("Spiral pitch must be positive")
+        return spiral_points(
+            values["center_x"],
+            values["center_y"],
+            values["radius"],
+            values["pitch_mm"],
+            tolerance,
+            inner_radius=inner,
+        )
+    if values["x_max"] <= values["x_min"] or values["y_max"] <= values["y_min"]:
+        raise GcodeError("Raster x_max and y_max must be greater than x_min and y_min")
+    if values["spacing_mm"] <= 0:
+        raise GcodeError("Raster spacing must be positive")
+    along = spec.get("along", "x")
+    if along not in ("x", "y"):
+        raise GcodeError("Raster rows run along x or y")
+    return raster_points(
+        values["x_min"],
+        values["y_min"],
+        values["x_max"],
+        values["y_max"],
+        values["spacing_mm"],
+        along=along,
+    )
+
+
+def shape_program(
+    spec: dict[str, Any],
+    *,
+    start_position: dict[str, float],
+    axis_bounds: dict[str, list[float] | None],
+    firmware_config: dict[str, Any],
+    feed_mm_per_min: float,
+) -> GcodeProgram:
+    """Generate a shape and resolve it into firmware-ready moves.
+
+    The shape is drawn at ``spec["z"]``, or at the current height when the
+    spec does not set one. Raises :class:`GcodeError` if any point of it,
+    travel legs included, is out of bounds.
+    """
+    points = shape_points(spec)
+    start_z = start_position.get("z")
+    z = spec["z"] if spec.get("z") is not None else start_z
+    path: list[dict[str, Any]] = []
+    if start_z is not None:
+        # An unknown start position is left for resolve_path to refuse.
+        path.append({"x": points[0][0], "y": points[0][1], "z": start_z})
+    path.extend({"x": x, "y": y, "z": z} for x, y in points)
+    # Zero-length legs (already above the first point, or already at the
+    # shape's height) would only cost a firmware round trip each.
+    previous = dict(start_position)
+    distinct = []
+    for point in path:
+        if point != previous:
+            distinct.append(point)
+        previous = point
+    return resolve_path(
+        distinct,
+        label=f"{spec['kind'].capitalize()} point",
+        start_position=start_position,
+        axis_bounds=axis_bounds,
+        firmware_config=firmware_config,
+        feed_mm_per_min=feed_mm_per_min,
+    )
@@ -0,0 +1,200 @@
+"""Batched on-bot Lua for adaptive rotary-tool weeding.
+
+A weeding run used to send one ``lua`` RPC per weed, each carrying the whole
+adaptive routine: the current watcher, its locals and the attempt loop. A
+100-weed run was 100 broker round trips and 100 parses of nearly identical
+Lua.
+
+This module compiles a run into chunks of ``WEEDING_WEEDS_PER_LUA_CHUNK``
+weeds instead. Each chunk opens with a prelude that registers the current
+watcher once and defines ``cut()``, followed by one short ``cut(...)`` call
+per weed. FarmBot OS does not keep Lua globals between nodes, so every chunk
+carries its own prelude; that is still one parse per chunk rather than per
+weed.
+
+``cut()`` runs the pass under ``pcall`` and reports every weed through
+``send_message`` as one log line of a fixed form, which the manager parses
+off the logs topic with :func:`parse_report` -- the same channel on-bot
+captures use (see capture_lua.py). A weed whose pass raises is reported as an
+error and the chunk carries on with the next one, as separate RPCs did.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from .const import WEEDING_WEEDS_PER_LUA_CHUNK
+
+REPORT_PREFIX = "ha-weed"
+
+# `ha-weed <tag> <weed number> cut|overload <passes>` or
+# `ha-weed <tag> <weed number> error <message>`
+_REPORT = re.compile(
+    rf"^{REPORT_PREFIX} (?P<tag>[0-9a-f]+) (?P<number>\d+) "
+    r"(?:(?P<outcome>cut|overload) (?P<passes>\d+)|error ?(?P<message>.*))$"
+)
+
+# The adaptive routine, shared by every weed in the chunk. The watcher switches
+# the rotary output off as soon as the configured load is exceeded. A cut
+# overload reverses the next pass at half speed; another overload raises the
+# working height. Contact while lowering raises the next attempt immediately.
+_PRELUDE = """local tag='{tag}'; local motor={motor_pin}; local current={current_pin}
+local limit={max_load}; local toolz={tool_height}; local attempts={attempts}
+local step={height_step}; local cutspd={cut_speed}; local approach={approach_speed}
+local riskz=-300
+local overloaded=false; local phase='idle'
+watch_pin(current,function(data)
+  if tonumber(data.value) and tonumber(data.value) > limit and not overloaded then
+    overloaded=true; off(motor); toast('Rotary overload during '..phase,'warning')
+  end
+end)
+local function pass(ax, ay, bx, by, transitx, transity, safez, soilz, waypoints)
+  local zoff=toolz; local done=false; local used=0
+  move({{z=safez,speed=approach}})
+  move({{x=transitx,y=transity,z=safez,speed=approach}})
+  for _, p in ipairs(waypoints) do move({{x=p[1],y=p[2],z=safez,speed=approach}}) end
+  move({{x=ax,y=ay,z=safez,speed=approach}})
+  local fromx=ax; local fromy=ay; local tox=bx; local toy=by
+  for attempt=1,attempts do
+    used=attempt; overloaded=false; phase='lower'; on(motor)
+    local targetz=soilz+zoff
+    if targetz < riskz then
+      move({{x=fromx,y=fromy,z=riskz,speed=approach}})
+      move({{x=fromx,y=fromy,z=targetz,speed=25}})
+    else
+      move({{x=fromx,y=fromy,z=targetz,speed=approach}})
+    end
+    if overloaded then
+      zoff=zoff+step
+    else
+      phase='cut'
+      local speed=cutspd
+      if attempt > 1 then speed=math.max(10,math.floor(cutspd/2)) end
+      move({{x=tox,y=toy,z=soilz+zoff,speed=speed}})
+      if not overloaded then
+        off(motor); phase='done'; done=true; toast('Weed pass complete','success'); break
+      end
+      if attempt > 1 then zoff=zoff+step end
+    end
+    off(motor); move({{x=fromx,y=fromy,z=safez,speed=approach}})
+    local tx=fromx; local ty=fromy; fromx=tox; fromy=toy; tox=tx; toy=ty
+    move({{x=fromx,y=fromy,z=safez,speed=approach}})
+  end
+  off(motor); phase='retract'; move({{z=safez,speed=approach}})
+  move({{x=bx,y=by,z=safez,speed=approach}})
+  return done, used
+end
+local function cut(number, ax, ay, bx, by, transitx, transity, safez, soilz, waypoints)
+  local ok, done, used = pcall(pass, ax, ay, bx, by, transitx, transity, safez, soilz, waypoints)
+  if not ok then
+    off(motor); phase='idle'
+    local reason = string.gsub(tostring(done), '%s+', ' ')
+    send_message('info', string.format('{prefix} %s %d error %s', tag, number, reason))
+  else
+    local outcome='overload'
+    if done then outcome='cut' end
+    send_message('info', string.format('{prefix} %s %d %s %d', tag, number, outcome, used))
+  end
+end"""
+
+
+@dataclass(frozen=True)
+class WeedingChunk:
+    """One Lua node's worth of weeds, numbered from 1 along the whole run."""
+
+    numbers: tuple[int, ...]
+    weeds: tuple[dict[str, Any], ...]
+    source: str
+
+
+@dataclass(frozen=True)
+class WeedReport:
+    """What FarmBot OS logged for one weed.
+
+    ``outcome`` is ``"cut"`` when a pass finished without overload,
+    ``"overload"`` when every attempt overloaded, and ``"error"`` when the
+    pass raised; ``message`` then carries the Lua error.
+    """
+
+    tag: str
+    number: int
+    outcome: str
+    passes: int | None = None
+    message: str | None = None
+
+
+def _lua_number(value: float) -> str:
+    """Render a finite Lua number without exponent notation."""
+    if not math.isfinite(float(value)):
+        raise ValueError("weeding coordinates must be finite")
+    rendered = f"{float(value):.6f}".rstrip("0").rstrip(".")
+    return "0" if rendered in {"", "-0"} else rendered
+
+
+def prelude(tag: str, settings: dict[str, Any]) -> str:
+    """The watcher and ``cut()`` definition every chunk of a run starts with."""
+    return _PRELUDE.format(
+        tag=tag,
+        motor_pin=int(settings["motor_pin"]),
+        current_pin=int(settings["current_pin"]),
+        max_load=_lua_number(settings["max_load"]),
+        tool_height=_lua_number(settings["tool_height_mm"]),
+        attempts=int(settings["max_attempts"]),
+        height_step=_lua_number(settings["height_step_mm"]),
+        cut_speed=int(settings["cut_speed_percent"]),
+        approach_speed=int(settings["approach_speed_percent"]),
+        prefix=REPORT_PREFIX,
+    )
+
+
+def cut_call(number: int, weed: dict[str, Any]) -> str:
+    """One weed's ``cut(...)`` call: its cut, transit start, heights and waypoints."""
+    waypoints = ",".join(
+        f"{{{_lua_number(point['x'])},{_lua_number(point['y'])}}}"
+        for point in weed.get("approach_waypoints", [])
+    )
+    values = [
+        weed["start"]["x"],
+        weed["start"]["y"],
+        weed["end"]["x"],
+        weed["end"]["y"],
+        weed["transit_start"]["x"],
+        weed["transit_start"]["y"],
+        weed["travel_z"],
+        weed["soil_z"],
+    ]
+    return f"cut({number}, {', '.join(_lua_number(value) for value in values)}, {{{waypoints}}})"
+
+
+def run_chunks(
+    tag: str,
+    weeds: list[dict[str, Any]],
+    settings: dict[str, Any],
+    *,
+    weeds_per_chunk: int = WEEDING_WEEDS_PER_LUA_CHUNK,
+) -> list[WeedingChunk]:
+    """Compile planned ``weeds`` into bounded Lua chunks, in visiting order."""
+    shared = prelude(tag, settings)
+    chunks = []
+    for first in range(0, len(weeds), weeds_per_chunk):
+        batch = weeds[first : first + weeds_per_chunk]
+        numbers = tuple(range(first + 1, first + len(batch) + 1))
+        calls = [cut_call(number, weed) for number, weed in zip(numbers, batch)]
+        chunks.append(WeedingChunk(numbers, tuple(batch), "\n".join([shared, *calls])))
+    return chunks
+
+
+def parse_report(message: str) -> WeedReport | None:
+    """Parse one weeding report log line, or ``None`` for any other message."""
+    match = _REPORT.match(message.strip())
+    if match is None:
+        return None
+    tag, number = match.group("tag"), int(match.group("number"))
+    if match.group("outcome") is None:
+        return WeedReport(
+            tag, number, "error", message=match.group("message").strip() or "Lua error"
+        )
+    return WeedReport(tag, number, match.group("outcome"), passes=int(match.group("passes")))
@@ -1,4 +1,5 @@
 """Shared test doubles for the isolated FarmBot test suite."""
+import asyncio
 import inspect
 
 from homeassistant.config_entries import ConfigEntries
@@ -8,9 +9,31 @@ from homeassistant.core import ServiceCall
 class FakeLoop:
     """Stand-in for hass.loop; runs call_soon_threadsafe synchronously."""
 
+    def __init__(self):
+        self.timers = []
+
     def call_soon_threadsafe(self, func, *args):
         func(*args)
 
+    def call_later(self, delay, func, *args):
+        """Record a timer without running it; tests fire ``timers`` by hand."""
+        handle = FakeTimerHandle(delay, func, args)
+        self.timers.append(handle)
+        return handle
+
+
+class FakeTimerHandle:
+    """What ``FakeLoop.call_later`` returns."""
+
+    def __init__(self, delay, func, args):
+        self.delay = delay
+        self.func = func
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
 
 class FakeEventBus:
     """Minimal stand-in for ``hass.bus``; records fired events."""
@@ -74,3 +97,18 @@ class FakeHass:
 
     async def async_add_executor_job(self, func, *args):
         return func(*args)
+
+
+async def run_capture_restore(manager):
+    """Let the capture lighting/park idle timeout run out, then wait for the restore.
+
+    The restore is a queued motion job, so the bot is brought online first for
+    tests that drive a capture routine directly.
+    """
+    manager._mqtt_connected = True
+    manager._mqtt = manager._mqtt or object()
+    for timer in list(manager.hass.loop.timers):
+        if not timer.cancelled and timer.func == manager._capture_hardware_idle:
+            timer.cancel()
+            timer.func(*timer.args)
+    await asyncio.gather(*manager._motion_job_tasks.values())
@@ -0,0 +1,39 @@
+"""Minimal stand-in for homeassistant.helpers.storage.
+
+``Store`` keeps its data on the ``hass`` instance instead of on disk, so a
+second ``Store`` with the same key on the same ``FakeHass`` sees what the
+first one saved -- which is what a restart looks like to the integration.
+``async_delay_save`` only records the pending write; tests call
+``flush_delayed`` to simulate the delay elapsing.
+"""
+
+
+class Store:
+    def __init__(self, hass, version, key, private=False, *, atomic_writes=False, **_kwargs):
+        self.hass = hass
+        self.version = version
+        self.key = key
+        self.delayed_saves = []
+        self._pending = None
+
+    def _disk(self):
+        disk = getattr(self.hass, "_storage", None)
+        if disk is None:
+            disk = self.hass._storage = {}
+        return disk
+
+    async def async_load(self):
+        return self._disk().get(self.key)
+
+    async def async_save(self, data):
+        self._pending = None
+        self._disk()[self.key] = data
+
+    def async_delay_save(self, data_func, delay=0):
+        self._pending = data_func
+        self.delayed_saves.append(delay)
+
+    def flush_delayed(self):
+        if self._pending is not None:
+            self._disk()[self.key] = self._pending()
+            self._pending = None
@@ -0,0 +1,200 @@
+"""Capture routes run as on-bot Lua, with per-stop reports parsed off the log."""
+
+import asyncio
+import re
+from unittest.mock import patch
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.util import dt as dt_util
+
+from custom_components.farmbot import capture_lua
+from custom_components.farmbot.image_utils import CaptureImageQuality
+from custom_components.farmbot.manager import FarmbotManager
+
+from .helpers import FakeHass, run_capture_restore
+
+FIRMWARE = {
+    "movement_axis_nr_steps_x": 600000,
+    "movement_axis_nr_steps_y": 300000,
+    "movement_axis_nr_steps_z": 100000,
+    "movement_step_per_mm_x": 100,
+    "movement_step_per_mm_y": 100,
+    "movement_step_per_mm_z": 100,
+    "movement_home_up_z": 1,
+}
+
+_CALL = re.compile(r"^capture\((\d+), (\S+), (\S+), (\S+), (true|false), (\S+)\)$", re.M)
+_TAG = re.compile(r"local tag='([0-9a-f]+)'")
+
+
+def _stops(count):
+    return [{"x": 100.0 * n, "y": 50.0, "z": -1.0, "safe_z": n == 0} for n in range(count)]
+
+
+def test_routes_are_split_into_bounded_numbered_chunks():
+    chunks = capture_lua.route_chunks(
+        "abc123", _stops(19), tolerance_mm=15, settle_ms=1500, stops_per_chunk=8
+    )
+
+    assert [chunk.numbers for chunk in chunks] == [
+        tuple(range(1, 9)),
+        tuple(range(9, 17)),
+        (17, 18, 19),
+    ]
+    calls = _CALL.findall(chunks[0].source)
+    assert calls[0] == ("1", "0", "50", "-1", "true", "nil")
+    assert calls[1] == ("2", "100", "50", "-1", "false", "nil")
+    # Every chunk is self-contained: it carries the tag and the helpers.
+    assert all("local tag='abc123'" in chunk.source for chunk in chunks)
+    assert all("take_photo()" in chunk.source for chunk in chunks)
+
+
+def test_reports_are_parsed_and_other_log_lines_ignored():
+    report = capture_lua.parse_report("ha-capture abc123 7 ok 100.0 50.0 -1.0")
+    assert report == capture_lua.CaptureReport(
+        tag="abc123", number=7, ok=True, position={"x": 100.0, "y": 50.0, "z": -1.0}
+    )
+    missed = capture_lua.parse_report("ha-capture abc123 8 miss")
+    assert missed.ok is False and missed.position is None
+    assert capture_lua.parse_report("Weed pass complete") is None
+    assert capture_lua.parse_report("ha-capture abc123 x ok") is None
+
+
+def _make_manager():
+    entry = ConfigEntry(
+        entry_id="entry-1",
+        unique_id="42",
+        domain="farmbot",
+        data={"token": "tok", "device_id": 42, "mqtt_host": "mqtt.example.com"},
+        options={},
+    )
+    manager = FarmbotManager(FakeHass(), "tok", "42", "mqtt.example.com", entry=entry)
+    manager._mqtt_connected = True
+    manager._mqtt = object()
+    manager.status = {
+        "location_data": {"position": {"x": 10.0, "y": 20.0, "z": 0.0}},
+        "informational_settings": {"busy": False, "locked": False},
+        "pins": {"7": {"value": 0}},
+    }
+    return manager
+
+
+def _install_bot(manager, calls, *, missed=()):
+    """A bot that runs Lua capture chunks and logs a report per stop."""
+
+    async def fake_rpc(commands, **_kwargs):
+        calls.append(commands)
+        if commands[0]["kind"] == "lua":
+            source = commands[0]["args"]["lua"]
+            tag = _TAG.search(source).group(1)
+            for number, x, y, z, _safe, _travel in _CALL.findall(source):
+                if int(number) in missed:
+                    message = f"ha-capture {tag} {number} miss"
+                else:
+                    message = f"ha-capture {tag} {number} ok {x} {y} {z}"
+                manager._handle_log_message({"message": message})
+        return {"kind": "rpc_ok"}
+
+    async def fake_images():
+        return []
+
+    async def fake_position(**kwargs):
+        return {axis: float(kwargs["target"][axis]) for axis in ("x", "y", "z")}
+
+    manager.async_rpc_request = fake_rpc
+    manager.api.async_get_images = fake_images
+    manager._wait_for_grid_position = fake_position
+
+
+def test_grid_repair_on_the_bot_only_revisits_cells_it_missed():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_bot(manager, calls, missed={3})
+
+        async def fake_image(**kwargs):
+            target = kwargs["target"]
+            return {
+                "image_id": target["index"],
+                **{axis: target[axis] for axis in ("x", "y", "z")},
+                "distance_from_target_mm": 0,
+            }
+
+        manager._wait_for_grid_image = fake_image
+        targets = [{"x": 100.0 * n, "y": 50.0, "z": -1.0} for n in range(1, 11)]
+
+        repair_id = manager.start_grid_repair(
+            targets=targets, firmware_config=FIRMWARE, engine="lua"
+        )
+        await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
+        repair = manager.grid_repair(repair_id)
+
+        assert repair["status"] == "complete"
+        assert repair["engine"] == "lua"
+        assert repair["lua_capture"] == {"chunks": 2, "chunks_sent": 2, "reported_ok": 9}
+        assert sorted(frame["target_index"] for frame in repair["frames"]) == list(range(10))
+        assert repair["verification_retries"] == [2]
+        kinds = [[item["kind"] for item in command] for command in calls]
+        assert kinds.count(["lua"]) == 2
+        # Only the missed cell is driven to from Home Assistant, then home.
+        assert kinds.count(["move"]) == 2
+        assert kinds.count(["wait", "take_photo"]) == 1
+        await manager.async_close()
+
+    asyncio.run(scenario())
+
+
+def test_soil_capture_on_the_bot_falls_back_for_a_rejected_frame():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_bot(manager, calls)
+        image_id = 0
+
+        async def fake_image(**kwargs):
+            nonlocal image_id
+            image_id += 1
+            image = {"id": image_id, "attachment_url": f"https://example.com/{image_id}.jpg"}
+            return {"image_id": image_id, **kwargs["target"]}, image, "usable"
+
+        async def fake_download(_url):
+            return b"jpeg", "image/jpeg"
+
+        manager._wait_for_soil_frame_image = fake_image
+        manager.api.async_download_image = fake_download
+        manager.soil_captures["soil"] = {
+            "capture_id": "soil",
+            "status": "queued",
+            "message": "queued",
+            "frames": [],
+            "created_at": dt_util.utcnow().isoformat(),
+        }
+        usable = CaptureImageQuality(True, "usable", contrast=20, laplacian_energy=30)
+        qualities = [usable, CaptureImageQuality(False, "image was blurry"), usable, usable]
+        with patch(
+            "custom_components.farmbot.manager.inspect_capture_image", side_effect=qualities
+        ):
+            await manager._run_soil_capture(
+                capture_id="soil",
+                point={"x": 100, "y": 200},
+                capture_z=0,
+                lateral_offsets=[-15, 0, 15],
+                z_offsets=[0],
+                z_direction=-1,
+                original_position={"x": 10, "y": 20, "z": 0},
+                engine="lua",
+            )
+            await run_capture_restore(manager)
+
+        record = manager.soil_captures["soil"]
+        assert record["status"] == "complete"
+        assert [frame["capture_attempt"] for frame in record["frames"]] == [1, 2, 1]
+        assert record["attempts"] == [{"frame": 2, "attempt": 1, "reason": "image was blurry"}]
+        kinds = [[item["kind"] for item in group] for group in calls]
+        assert kinds.count(["lua"]) == 1
+        # The rejected frame is re-shot in place, then the gantry goes home.
+        assert kinds.count(["move"]) == 2
+        assert kinds.count(["wait", "take_photo"]) == 1
+
+    asyncio.run(scenario())
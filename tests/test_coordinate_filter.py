@@ -0,0 +1,74 @@
+"""Deadband, minimum-interval and final-flush behaviour of the coordinate sensors."""
+
+from custom_components.farmbot.const import (
+    OPTION_COORDINATE_DEADBAND_MM,
+    OPTION_COORDINATE_MIN_INTERVAL_SECONDS,
+)
+from custom_components.farmbot.coordinate_filter import CoordinateWriteFilter
+
+OPTIONS = {OPTION_COORDINATE_DEADBAND_MM: 1.0, OPTION_COORDINATE_MIN_INTERVAL_SECONDS: 2.0}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _status(x, busy):
+    return {
+        "location_data": {"position": {"x": x, "y": 0, "z": 0}},
+        "informational_settings": {"busy": busy},
+    }
+
+
+def test_first_value_is_always_written_even_while_moving():
+    clock = FakeClock()
+    axis = CoordinateWriteFilter("x", clock=clock)
+    assert axis.update(_status(10.0, busy=True), OPTIONS) is True
+    assert axis.value == 10.0
+
+
+def test_moves_inside_the_deadband_are_not_written_while_busy():
+    clock = FakeClock()
+    axis = CoordinateWriteFilter("x", clock=clock)
+    axis.update(_status(10.0, busy=True), OPTIONS)
+    clock.now += 5
+    assert axis.update(_status(10.5, busy=True), OPTIONS) is False
+    assert axis.value == 10.0
+    assert axis.update(_status(11.0, busy=True), OPTIONS) is True
+    assert axis.value == 11.0
+
+
+def test_large_moves_are_rate_limited_while_busy():
+    clock = FakeClock()
+    axis = CoordinateWriteFilter("x", clock=clock)
+    axis.update(_status(10.0, busy=True), OPTIONS)
+    clock.now += 0.5
+    assert axis.update(_status(50.0, busy=True), OPTIONS) is False
+    clock.now += 1.5
+    assert axis.update(_status(80.0, busy=True), OPTIONS) is True
+    assert axis.value == 80.0
+
+
+def test_the_first_idle_status_flushes_the_exact_final_position():
+    clock = FakeClock()
+    axis = CoordinateWriteFilter("x", clock=clock)
+    axis.update(_status(10.0, busy=True), OPTIONS)
+    clock.now += 0.1
+    # Suppressed while moving: too soon and inside the deadband.
+    assert axis.update(_status(10.4, busy=True), OPTIONS) is False
+    # Stopped: written regardless of deadband and interval.
+    assert axis.update(_status(10.4, busy=False), OPTIONS) is True
+    assert axis.value == 10.4
+    # An unchanged position is never rewritten.
+    assert axis.update(_status(10.4, busy=False), OPTIONS) is False
+
+
+def test_missing_position_is_ignored():
+    axis = CoordinateWriteFilter("x", clock=FakeClock())
+    assert axis.update(None, OPTIONS) is False
+    assert axis.update({"location_data": {}}, OPTIONS) is False
+    assert axis.value is None
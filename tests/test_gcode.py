@@ -8,16 +8,23 @@ feed rate into the firmware's per-axis steps/second.
 """
 
 import math
+import time
 
 import pytest
 
+from custom_components.farmbot import gcode as gcode_module
 from custom_components.farmbot.const import (
+    GCODE_CHUNK_TARGET_SECONDS,
     GCODE_FALLBACK_MAX_STEPS_PER_SECOND,
+    GCODE_MAX_CALLS_PER_LUA_CHUNK,
     GCODE_MAX_FEED_MM_PER_MIN,
+    GCODE_MAX_LINES,
+    GCODE_MAX_MOVES,
     GCODE_MIN_STEPS_PER_SECOND,
 )
 from custom_components.farmbot.gcode import (
     GcodeError,
+    chunk_moves,
     lua_chunks,
     lua_node,
     parse_program,
@@ -262,6 +269,31 @@ def test_lua_chunks_emit_raw_gcode_calls_and_stay_bounded():
     assert chunks[-1].count("gcode(") == 5
 
 
+def test_timed_chunks_group_short_moves_up_to_the_time_budget():
+    program = parse(["G90"] + [f"G00 X{100 + n}" for n in range(1, 101)])
+    chunks = chunk_moves(program.moves, move_seconds=[0.25] * 100)
+
+    # 40 quarter-second moves fill a 10 s budget; fixed chunking would need 5.
+    assert [len(chunk) for chunk in chunks] == [40, 40, 20]
+    assert [move for chunk in chunks for move in chunk] == program.moves
+
+
+def test_a_move_longer_than_the_budget_is_a_chunk_of_its_own():
+    program = parse(["G90", "G00 X200", "G00 X1900", "G00 X1901", "G00 X1902"])
+    seconds = [10.0, GCODE_CHUNK_TARGET_SECONDS * 17, 0.1, 0.1]
+    chunks = chunk_moves(program.moves, move_seconds=seconds)
+
+    assert [len(chunk) for chunk in chunks] == [1, 1, 2]
+
+
+def test_timed_chunks_still_cap_the_calls_per_node():
+    moves = parse(["G90"] + [f"G00 X{100 + n}" for n in range(1, 251)]).moves
+    chunks = chunk_moves(moves, move_seconds=[0.0] * len(moves))
+
+    assert [len(chunk) for chunk in chunks] == [GCODE_MAX_CALLS_PER_LUA_CHUNK, 50]
+    assert len(lua_chunks(moves, move_seconds=[0.0] * len(moves))) == 2
+
+
 def test_lua_output_never_uses_exponent_notation():
     """Lua source is text; a `1e-05` in a parameter would be a syntax hazard."""
     program = parse(["G90", "G00 X100.0001 Y100.0001"])
@@ -288,3 +320,219 @@ def test_every_emitted_parameter_is_finite():
     program = parse(["G90", "G00 X200 Y200 Z-50"])
 
     assert all(math.isfinite(value) for value in program.moves[0].params().values())
+
+
+def _arc(count, radius=100.0, centre=(500.0, 500.0)):
+    lines = ["G90"]
+    for step in range(count + 1):
+        angle = math.pi * step / count
+        lines.append(
+            f"G00 X{centre[0] + radius * math.cos(angle):.4f} "
+            f"Y{centre[1] + radius * math.sin(angle):.4f}"
+        )
+    return lines
+
+
+def test_simplification_merges_collinear_segments_into_one_move():
+    lines = ["G90"] + [f"G00 X{200 + n}" for n in range(101)]
+    program = parse_program(
+        lines,
+        start_position=dict(START),
+        axis_bounds=dict(BOUNDS),
+        firmware_config=dict(FIRMWARE),
+        default_feed_mm_per_min=600,
+        simplify_tolerance_mm=0.1,
+    )
+    # From the start at X100 every point lies on one straight run along X.
+    assert len(program.moves) == 1
+    merged = program.moves[0]
+    assert merged.target == {"x": 300.0, "y": 100.0, "z": 0.0}
+    assert merged.distance_mm == pytest.approx(200.0)
+    assert merged.line_number == len(lines)
+    assert "merged lines 2-102" in merged.source
+    # Speeds are resolved again for the merged chord: 10 mm/s on X only.
+    assert merged.speeds["x"] == pytest.approx(1000)
+    assert merged.speeds["y"] == GCODE_MIN_STEPS_PER_SECOND
+    assert program.simplification == {
+        "tolerance_mm": 0.1,
+        "moves_before": 101,
+        "moves_after": 1,
+        "max_deviation_mm": 0.0,
+    }
+    assert program.total_distance_mm == pytest.approx(200.0)
+
+
+def test_simplification_stays_within_the_chord_tolerance():
+    lines = _arc(400)
+    exact = parse(lines)
+    points = [tuple(move.target[axis] for axis in "xyz") for move in exact.moves]
+    for tolerance in (0.05, 0.5, 2.0):
+        program = parse_program(
+            lines,
+            start_position=dict(START),
+            axis_bounds=dict(BOUNDS),
+            firmware_config=dict(FIRMWARE),
+            default_feed_mm_per_min=600,
+            simplify_tolerance_mm=tolerance,
+        )
+        kept = [tuple(move.target[axis] for axis in "xyz") for move in program.moves]
+        assert set(kept) <= set(points)
+        assert len(program.moves) < len(exact.moves)
+        assert 0 < program.simplification["max_deviation_mm"] <= tolerance
+        # Every dropped point lies within the tolerance of the simplified path.
+        for point in points:
+            assert min(
+                _gap(point, a, b) for a, b in zip(kept, kept[1:])
+            ) <= tolerance + 1e-9
+
+
+def _gap(point, a, b):
+    chord = [q - p for p, q in zip(a, b)]
+    length = sum(c * c for c in chord)
+    along = sum((x - p) * c for x, p, c in zip(point, a, chord))
+    t = 0.0 if length == 0 else max(0.0, min(1.0, along / length))
+    return math.dist(point, [p + t * c for p, c in zip(a, chord)])
+
+
+def test_simplification_never_merges_across_a_feed_change_or_explicit_speeds():
+    lines = ["G90", "G00 X200", "G00 X300", "G00 X400 F1200", "G00 X500 A500", "G00 X600"]
+    program = parse_program(
+        lines,
+        start_position=dict(START),
+        axis_bounds=dict(BOUNDS),
+        firmware_config=dict(FIRMWARE),
+        default_feed_mm_per_min=600,
+        simplify_tolerance_mm=1.0,
+    )
+    assert [move.target["x"] for move in program.moves] == [300.0, 400.0, 500.0, 600.0]
+    assert program.moves[2].speeds["x"] == 500
+
+
+def test_simplification_lifts_the_move_limit_to_the_merged_program():
+    lines = ["G90"] + [f"G00 X{200 + n * 0.5:.1f}" for n in range(1500)]
+    with pytest.raises(GcodeError, match="more than"):
+        parse(lines)
+    program = parse_program(
+        lines,
+        start_position=dict(START),
+        axis_bounds=dict(BOUNDS),
+        firmware_config=dict(FIRMWARE),
+        default_feed_mm_per_min=600,
+        simplify_tolerance_mm=0.1,
+    )
+    assert len(program.moves) == 1
+
+
+def test_simplification_rejects_a_non_positive_tolerance():
+    with pytest.raises(GcodeError, match="tolerance"):
+        parse_program(
+            ["G00 X200"],
+            start_position=dict(START),
+            axis_bounds=dict(BOUNDS),
+            firmware_config=dict(FIRMWARE),
+            default_feed_mm_per_min=600,
+            simplify_tolerance_mm=0,
+        )
+
+
+@pytest.fixture(params=["array", "numpy"])
+def backend(request, monkeypatch):
+    """Run a test against each bulk resolver: NumPy's and the ``array`` fallback."""
+    if request.param == "numpy":
+        monkeypatch.setattr(gcode_module, "_np", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(gcode_module, "_np", None)
+    return request.param
+
+
+def _mixed_program(count):
+    """Absolute and relative runs, feed changes and explicit speeds, all mixed."""
+    lines = ["G21"]
+    for n in range(count):
+        if n % 50 == 0:
+            lines.append("G91" if n % 100 else "G90")
+        sign = (-1) ** n
+        if n % 100 >= 50:
+            lines.append(f"G00 X{sign * 2.5:g} Y{sign * 0.5:g} Z{-sign * 0.1:g}")
+        else:
+            x, y = 500 + 300 * math.cos(n / 40), 500 + 300 * math.sin(n / 40)
+            lines.append(f"G00 X{x:.3f} Y{y:.3f}")
+        if n % 37 == 0:
+            lines.append(f"F{400 + n % 300}")
+        if n % 91 == 0:
+            lines.append("G00 Y400 A500 C200" if n % 100 < 50 else "G00 Y4 A500 C200")
+    return lines
+
+
+def test_both_resolvers_give_the_same_moves(monkeypatch):
+    np = pytest.importorskip("numpy")
+    lines = _mixed_program(400)
+    monkeypatch.setattr(gcode_module, "_np", None)
+    expected = parse(lines).moves
+    monkeypatch.setattr(gcode_module, "_np", np)
+    resolved = parse(lines).moves
+
+    assert [move.line_number for move in resolved] == [move.line_number for move in expected]
+    for move, reference in zip(resolved, expected):
+        assert move.point == pytest.approx(reference.point, abs=1e-9)
+        assert move.axis_speeds == pytest.approx(reference.axis_speeds)
+        assert move.clamped_axes == reference.clamped_axes
+
+
+@pytest.mark.parametrize(
+    ("lines", "expected"),
+    [
+        # A bounds error comes before a syntax error further down...
+        (["G90", "G00 X200", "G00 X9999", "G01 X5"], "Line 3: X9999"),
+        # ...and after one further up.
+        (["G90", "G01 X5", "G00 X9999"], "Line 2: the FarmBot firmware"),
+        # On one line the bounds are checked before the speeds.
+        (["G90", "G00 X200 A0", "G00 X9999"], "Line 2: A speed"),
+        (["G90", "G00 X9999 A0"], "Line 2: X9999"),
+    ],
+)
+def test_the_first_offending_line_is_reported(backend, lines, expected):
+    with pytest.raises(GcodeError, match=expected):
+        parse(lines)
+
+
+def test_a_bounds_error_on_the_move_over_the_limit_is_reported_first(backend):
+    lines = ["G90"] + [f"G00 X{100 + n % 2}" for n in range(GCODE_MAX_MOVES)]
+
+    with pytest.raises(GcodeError, match=f"Line {GCODE_MAX_MOVES + 2}: X9999"):
+        parse(lines + ["G00 X9999"])
+    with pytest.raises(GcodeError, match=f"more than {GCODE_MAX_MOVES} moves"):
+        parse(lines + ["G00 X200", "G01 X5"])
+
+
+def test_a_move_keeps_its_values_in_slots():
+    move = parse(["G90", "G00 X200 Y150"]).moves[0]
+
+    assert not hasattr(move, "__dict__")
+    assert move.point == (200.0, 150.0, 0.0)
+    assert move.target == {"x": 200.0, "y": 150.0, "z": 0.0}
+    assert move.speeds == dict(zip("xyz", move.axis_speeds))
+
+
+def test_benchmark_resolving_a_program_at_the_line_limit(backend):
+    """The largest program the service accepts: every move at its own feed rate.
+
+    Half the lines are feed changes, so the move limit holds while the line
+    limit is reached; resolution must keep this well inside a preview's budget.
+    """
+    lines = ["G90"]
+    for n in range(GCODE_MAX_MOVES):
+        lines.append(f"F{300 + n % 700}")
+        lines.append(
+            f"G00 X{1000 + 800 * math.cos(n / 60):.3f} Y{500 + 400 * math.sin(n / 60):.3f}"
+        )
+    lines = lines[:GCODE_MAX_LINES]
+
+    parse(lines)
+    started = time.perf_counter()
+    program = parse(lines)
+    seconds = time.perf_counter() - started
+
+    print(f"{backend}: {len(lines)} lines, {len(program.moves)} moves in {seconds * 1000:.1f} ms")
+    assert len(program.moves) == GCODE_MAX_LINES // 2 - 1
+    assert seconds < 0.5
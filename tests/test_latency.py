@@ -0,0 +1,108 @@
+"""Rolling RPC latency histograms and their diagnostics export."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.farmbot.const import DOMAIN
+from custom_components.farmbot.diagnostics import async_get_config_entry_diagnostics
+from custom_components.farmbot.latency import RollingHistogram, RpcLatencyTracker, rpc_kind
+from custom_components.farmbot.manager import FarmbotManager
+
+from .helpers import FakeHass
+
+
+def test_rpc_kind_names_the_first_traced_command():
+    assert rpc_kind([{"kind": "move", "args": {}}]) == "move"
+    assert rpc_kind([{"kind": "wait", "args": {}}, {"kind": "take_photo"}]) == "take_photo"
+    assert rpc_kind([{"kind": "find_home", "args": {}}]) == "other"
+    assert rpc_kind([]) == "other"
+
+
+def test_histogram_percentiles_and_buckets_cover_only_the_rolling_window():
+    histogram = RollingHistogram(window=100, bounds_ms=(10.0, 100.0))
+    for value in range(1, 201):
+        histogram.record(value)
+    snapshot = histogram.snapshot()
+    # Only the last hundred samples (101..200) remain.
+    assert snapshot["samples"] == 100
+    assert snapshot["total"] == 200
+    assert snapshot["p50"] == 150
+    assert snapshot["p95"] == 195
+    assert snapshot["p99"] == 199
+    assert snapshot["max"] == 200
+    assert snapshot["buckets"] == {"le_10": 0, "le_100": 0, "le_inf": 100}
+    assert RollingHistogram().snapshot() == {"samples": 0, "total": 0}
+
+
+def test_tracker_groups_by_kind_and_outcome():
+    tracker = RpcLatencyTracker()
+    tracker.record("move", "ok", 1200)
+    tracker.record("move", "timeout", 120000)
+    tracker.record("read_status", "ok", 80)
+    snapshot = tracker.snapshot()
+    assert set(snapshot) == {"move", "read_status"}
+    assert set(snapshot["move"]) == {"ok", "timeout"}
+    assert tracker.histogram("move", "ok").percentile(0.5) == 1200
+
+
+def _connected_manager():
+    manager = FarmbotManager(FakeHass(), "tok", "42", "mqtt.example.com")
+    manager._mqtt = MagicMock()
+    manager._mqtt_connected = True
+    return manager
+
+
+def test_async_rpc_request_traces_ok_error_and_timeout():
+    async def scenario():
+        manager = _connected_manager()
+
+        ok = asyncio.create_task(
+            manager.async_rpc_request([{"kind": "move", "args": {}}], label="a")
+        )
+        rejected = asyncio.create_task(
+            manager.async_rpc_request([{"kind": "lua", "args": {}}], label="b")
+        )
+        await asyncio.sleep(0)
+        manager._resolve_rpc_response({"kind": "rpc_ok", "args": {"label": "a"}})
+        manager._resolve_rpc_response({"kind": "rpc_error", "args": {"label": "b"}, "body": []})
+        await ok
+        with pytest.raises(RuntimeError):
+            await rejected
+        with pytest.raises(asyncio.TimeoutError):
+            await manager.async_rpc_request(
+                [{"kind": "read_status", "args": {}}], timeout=0.01, label="c"
+            )
+
+        snapshot = manager.rpc_latency_snapshot()
+        assert snapshot["move"]["ok"]["samples"] == 1
+        assert snapshot["lua"]["error"]["samples"] == 1
+        assert snapshot["read_status"]["timeout"]["samples"] == 1
+        assert snapshot["read_status"]["timeout"]["max"] >= 10
+        # Nothing is left waiting for an answer.
+        assert manager._rpc_published_at == {}
+        await manager.async_close()
+
+    asyncio.run(scenario())
+
+
+def test_diagnostics_export_latency_and_outbound_metrics_without_credentials():
+    async def scenario():
+        manager = _connected_manager()
+        manager.rpc_latency.record("take_photo", "ok", 900)
+        hass = manager.hass
+        hass.data[DOMAIN] = {"entry-1": manager}
+
+        result = await async_get_config_entry_diagnostics(hass, SimpleNamespace(entry_id="entry-1"))
+        assert result["loaded"] is True
+        assert result["rpc_latency_ms"]["take_photo"]["ok"]["p50"] == 900
+        assert set(result["outbound"]) == {"safety", "motion", "io"}
+        assert result["connection"] == {"connected": True, "locked": False}
+        assert "tok" not in repr(result)
+
+        missing = await async_get_config_entry_diagnostics(hass, SimpleNamespace(entry_id="x"))
+        assert missing == {"loaded": False}
+
+    asyncio.run(scenario())
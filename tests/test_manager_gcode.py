@@ -2,7 +2,7 @@
 
 Everything on this path bypasses FarmBot OS's motion planning, so the run has
 to be conservative in ways the CeleryScript paths do not: it must refuse to
-start on a disconnected, locked or busy bot, must validate the entire program
+start on a disconnected or locked bot, must validate the entire program
 before publishing the first chunk, and must hand the return trip back to
 FarmBot OS's supervised movement.
 """
@@ -12,6 +12,7 @@ import asyncio
 import pytest
 from homeassistant.config_entries import ConfigEntry
 
+from custom_components.farmbot import gcode as gcode_lib
 from custom_components.farmbot.gcode import GcodeError
 from custom_components.farmbot.manager import FarmbotManager
 
@@ -83,12 +84,13 @@ def test_a_run_publishes_lua_gcode_then_restores_position():
 
         assert run["status"] == "complete"
         assert run["moves"] == 5
-        assert run["chunks_sent"] == run["chunks_total"] == 1
-
-        # One Lua node carrying raw firmware G-code...
-        assert calls[0][0]["kind"] == "lua"
-        lua = calls[0][0]["args"]["lua"]
-        assert lua.count('gcode("G00"') == 5
+        # Each 200 mm side takes longer than a chunk's time budget on its own,
+        # so every side is its own Lua node carrying raw firmware G-code...
+        assert run["chunks_sent"] == run["chunks_total"] == 5
+        lua_calls = [command[0] for command in calls if command[0]["kind"] == "lua"]
+        assert len(lua_calls) == 5
+        assert all(node["args"]["lua"].count('gcode("G00"') == 1 for node in lua_calls)
+        lua = "\n".join(node["args"]["lua"] for node in lua_calls)
         assert "X = 600" in lua and "Y = 600" in lua
 
         # ...then the return trip through FarmBot OS's own planner, with safe Z.
@@ -112,7 +114,7 @@ def test_return_to_start_can_be_declined():
         )
         await asyncio.gather(*manager._gcode_tasks)
 
-        assert [command[0]["kind"] for command in calls] == ["lua"]
+        assert {command[0]["kind"] for command in calls} == {"lua"}
 
     asyncio.run(scenario())
 
@@ -132,10 +134,12 @@ def test_a_long_program_is_split_into_bounded_chunks():
         await asyncio.gather(*manager._gcode_tasks)
         run = manager.gcode_run(run_id)
 
+        # The 300 mm traverse to the start fills a chunk on its own; the
+        # millimetre steps after it are grouped by their estimated time.
         lua_calls = [command for command in calls if command[0]["kind"] == "lua"]
-        assert len(lua_calls) == 3
-        assert run["chunks_total"] == 3
-        assert run["chunks_sent"] == 3
+        assert [node[0]["args"]["lua"].count("gcode(") for node in lua_calls] == [1, 23, 23, 3]
+        assert run["chunks_total"] == 4
+        assert run["chunks_sent"] == 4
         assert run["status"] == "complete"
 
     asyncio.run(scenario())
@@ -176,7 +180,6 @@ def test_an_emergency_stop_partway_through_stops_the_run():
             lambda m: m.status["informational_settings"].update(locked=True),
             "emergency-stopped",
         ),
-        (lambda m: m.status["informational_settings"].update(busy=True), "busy"),
     ],
 )
 def test_a_run_is_refused_on_an_unavailable_bot(mutate, expected):
@@ -214,9 +217,10 @@ def test_plan_gcode_reports_the_program_without_moving():
     calls = []
     _install_rpc(manager, calls)
 
-    program, _state = manager.plan_gcode(
+    plan, _state = manager.plan_gcode(
         lines=SQUARE, firmware_config=FIRMWARE, feed_mm_per_min=600
     )
+    program = plan.program
 
     assert len(program.moves) == 5
     assert program.extent()["x"] == (100.0, 600.0)
@@ -224,23 +228,356 @@ def test_plan_gcode_reports_the_program_without_moving():
     assert manager.gcode_runs == {}
 
 
-def test_a_second_run_is_refused_while_one_is_in_flight():
+def test_a_second_run_queues_behind_the_one_in_flight():
     async def scenario():
         manager = _make_manager()
         release = asyncio.Event()
+        calls = []
 
-        async def fake_rpc(_commands, **_kwargs):
+        async def fake_rpc(commands, **_kwargs):
+            calls.append(commands)
             await release.wait()
             return {"kind": "rpc_ok"}
 
         manager.async_rpc_request = fake_rpc
-        manager.start_gcode_run(lines=SQUARE, firmware_config=FIRMWARE, feed_mm_per_min=600)
+        first = manager.start_gcode_run(
+            lines=SQUARE, firmware_config=FIRMWARE, feed_mm_per_min=600
+        )
+        second = manager.start_gcode_run(
+            lines=SQUARE, firmware_config=FIRMWARE, feed_mm_per_min=600
+        )
         await asyncio.sleep(0)
 
-        with pytest.raises(GcodeError, match="busy"):
-            manager.start_gcode_run(lines=SQUARE, firmware_config=FIRMWARE, feed_mm_per_min=600)
+        assert len(calls) == 1
+        assert manager.gcode_run(second)["status"] == "queued"
+        assert manager.gcode_run(second)["queue_position"] == 1
+
+        release.set()
+        await asyncio.gather(*manager._gcode_tasks)
+        assert manager.gcode_run(first)["status"] == "complete"
+        assert manager.gcode_run(second)["status"] == "complete"
+
+    asyncio.run(scenario())
+
+
+def test_a_queued_run_is_refused_if_the_gantry_moved_before_its_turn():
+    """The program was resolved against the old position; running it would be wrong."""
+
+    async def scenario():
+        manager = _make_manager()
+        release = asyncio.Event()
+
+        async def fake_rpc(_commands, **_kwargs):
+            await release.wait()
+            return {"kind": "rpc_ok"}
+
+        manager.async_rpc_request = fake_rpc
+        manager.start_gcode_run(
+            lines=SQUARE, firmware_config=FIRMWARE, feed_mm_per_min=600, return_to_start=False
+        )
+        second = manager.start_gcode_run(
+            lines=SQUARE, firmware_config=FIRMWARE, feed_mm_per_min=600
+        )
+        await asyncio.sleep(0)
+        manager.status["location_data"]["position"] = {"x": 400.0, "y": 400.0, "z": 0.0}
 
         release.set()
         await asyncio.gather(*manager._gcode_tasks)
+        run = manager.gcode_run(second)
+        assert run["status"] == "failed"
+        assert "moved" in run["message"]
+
+    asyncio.run(scenario())
+
+
+def _install_simulated_bot(manager, events, *, hops=3, fail_chunk=None):
+    """FarmBot OS as seen over MQTT: a broker hop each way, chunks run one at a time.
+
+    ``events`` records ("publish", n) and ("ack", n) for each Lua chunk, in the
+    order they happen, so tests can check the overlap without a wall clock.
+    """
+    executing = asyncio.Lock()
+    in_flight = [0, 0]  # current, peak
+
+    async def hop():
+        for _ in range(hops):
+            await asyncio.sleep(0)
+
+    async def fake_rpc(commands, **_kwargs):
+        if commands[0]["kind"] != "lua":
+            return {"kind": "rpc_ok"}
+        number = sum(1 for kind, _ in events if kind == "publish") + 1
+        events.append(("publish", number))
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        try:
+            await hop()
+            async with executing:
+                await hop()
+            await hop()
+            if number == fail_chunk:
+                raise RuntimeError("Firmware error")
+            events.append(("ack", number))
+            return {"kind": "rpc_ok"}
+        finally:
+            in_flight[0] -= 1
+
+    manager.async_rpc_request = fake_rpc
+    return in_flight
+
+
+# Five traverses, each longer than a chunk's time budget: five chunks.
+LONG_PROGRAM = ["G90"] + [f"G00 X{400 + 200 * n}" for n in range(5)]
+
+
+async def _run_long_program(manager, *, pipeline):
+    run_id = manager.start_gcode_run(
+        lines=LONG_PROGRAM,
+        firmware_config=FIRMWARE,
+        feed_mm_per_min=600,
+        return_to_start=False,
+        pipeline=pipeline,
+    )
+    await asyncio.gather(*manager._gcode_tasks)
+    return manager.gcode_run(run_id)
+
+
+def test_a_pipelined_run_keeps_one_chunk_queued_ahead():
+    async def scenario():
+        manager = _make_manager()
+        events = []
+        in_flight = _install_simulated_bot(manager, events)
+
+        run = await _run_long_program(manager, pipeline=True)
+
+        assert run["status"] == "complete"
+        assert run["pipeline"] is True
+        assert run["chunks_sent"] == run["chunks_total"] == 5
+        assert in_flight[1] == 2
+        assert run["timing"]["estimated_motion_seconds"] > 0
+
+    asyncio.run(scenario())
+
+
+def test_pipelining_hides_the_round_trip_between_chunks():
+    """The next chunk is on the bot before the current one is acknowledged.
+
+    Unpipelined, every chunk waits for the previous acknowledgement, so the
+    Farmduino idles for a broker round trip at each boundary.
+    """
+
+    async def scenario(pipeline):
+        manager = _make_manager()
+        events = []
+        _install_simulated_bot(manager, events)
+        run = await _run_long_program(manager, pipeline=pipeline)
+        assert run["status"] == "complete"
+        return events
+
+    sequential = asyncio.run(scenario(False))
+    pipelined = asyncio.run(scenario(True))
+
+    for number in range(1, 5):
+        assert sequential.index(("ack", number)) < sequential.index(("publish", number + 1))
+        assert pipelined.index(("publish", number + 1)) < pipelined.index(("ack", number))
+    assert [event for event in pipelined if event[0] == "ack"] == [
+        ("ack", number) for number in range(1, 6)
+    ]
+
+
+def test_a_pipelined_failure_reports_the_queued_chunk_that_still_ran():
+    """FarmBot OS cannot withdraw a published chunk, so its motion is reported."""
+
+    async def scenario():
+        manager = _make_manager()
+        events = []
+        _install_simulated_bot(manager, events, fail_chunk=2)
+
+        run = await _run_long_program(manager, pipeline=True)
+
+        assert run["status"] == "failed"
+        assert "Firmware error" in run["message"]
+        assert "queued chunk(s) 3 had already run" in run["message"]
+        # Chunk 3 was published while chunk 2 ran; nothing after it was.
+        assert [number for kind, number in events if kind == "publish"] == [1, 2, 3]
+        assert run["chunks_sent"] == 1
+        assert run["chunks_overrun"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_a_pipelined_run_checks_for_an_emergency_stop_between_chunks():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+
+        async def fake_rpc(commands, **_kwargs):
+            calls.append(commands)
+            await asyncio.sleep(0)
+            if len(calls) == 2:
+                manager.status["informational_settings"]["locked"] = True
+            return {"kind": "rpc_ok"}
+
+        manager.async_rpc_request = fake_rpc
+        run = await _run_long_program(manager, pipeline=True)
+
+        assert run["status"] == "failed"
+        assert "emergency-stopped" in run["message"]
+        assert len(calls) == 2
+        # The lock aborts the queued chunk on the bot, so it is not counted.
+        assert run["chunks_sent"] == 1
+        assert "chunks_overrun" not in run
+
+    asyncio.run(scenario())
+
+
+def test_a_simplified_run_sends_the_merged_moves_and_records_the_reduction():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_rpc(manager, calls)
+
+        run_id = manager.start_gcode_run(
+            lines=["G90"] + [f"G00 X{400 + n}" for n in range(100)],
+            firmware_config=FIRMWARE,
+            feed_mm_per_min=600,
+            return_to_start=False,
+            simplify_tolerance_mm=0.1,
+        )
+        await asyncio.gather(*manager._gcode_tasks)
+        run = manager.gcode_run(run_id)
+
+        assert run["status"] == "complete"
+        assert run["simplification"]["moves_before"] == 100
+        assert run["moves"] == run["simplification"]["moves_after"] == 1
+        assert run["chunks_total"] == len(calls) == 1
+        assert calls[0][0]["args"]["lua"].count("gcode(") == 1
+
+    asyncio.run(scenario())
+
+
+def _refuse_parsing(monkeypatch):
+    def parse_program(*_args, **_kwargs):
+        raise AssertionError("a cached plan was parsed again")
+
+    monkeypatch.setattr(gcode_lib, "parse_program", parse_program)
+
+
+def test_a_previewed_plan_runs_without_being_resolved_again(monkeypatch):
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_rpc(manager, calls)
+        plan, _state = manager.plan_gcode(
+            lines=SQUARE, firmware_config=FIRMWARE, feed_mm_per_min=600
+        )
+        _refuse_parsing(monkeypatch)
+
+        again, _state = manager.plan_gcode(
+            lines=SQUARE, firmware_config=FIRMWARE, feed_mm_per_min=600
+        )
+        run_id = manager.start_gcode_run(
+            plan_id=plan.plan_id, firmware_config=FIRMWARE, return_to_start=False
+        )
+        await asyncio.gather(*manager._gcode_tasks)
+        run = manager.gcode_run(run_id)
+
+        assert again is plan
+        assert run["status"] == "complete"
+        assert run["plan_id"] == plan.plan_id
+        assert [command[0]["args"]["lua"] for command in calls] == list(plan.chunks)
 
     asyncio.run(scenario())
+
+
+def test_a_plan_is_keyed_by_its_program_feed_and_start():
+    manager = _make_manager()
+
+    def plan_id(**overrides):
+        kwargs = {"lines": SQUARE, "firmware_config": FIRMWARE, "feed_mm_per_min": 600}
+        return manager.plan_gcode(**{**kwargs, **overrides})[0].plan_id
+
+    first = plan_id()
+    assert plan_id() == first
+    assert plan_id(feed_mm_per_min=300) != first
+    assert plan_id(lines=SQUARE[:-1]) != first
+    # Sub-quantum jitter in the reported position reuses the plan.
+    manager.status["location_data"]["position"]["x"] = 100.01
+    assert plan_id() == first
+    manager.status["location_data"]["position"]["x"] = 101.0
+    assert plan_id() != first
+
+
+@pytest.mark.parametrize(
+    ("mutate", "expected"),
+    [
+        (
+            lambda manager, firmware: manager.status["location_data"]["position"].update(x=150.0),
+            "moved",
+        ),
+        (
+            lambda manager, firmware: firmware.update(movement_max_spd_x=500),
+            "movement settings changed",
+        ),
+    ],
+)
+def test_a_plan_is_dropped_once_the_bot_no_longer_matches_it(monkeypatch, mutate, expected):
+    manager = _make_manager()
+    _install_rpc(manager, [])
+    firmware = dict(FIRMWARE)
+    plan, _state = manager.plan_gcode(
+        lines=SQUARE, firmware_config=firmware, feed_mm_per_min=600
+    )
+    _refuse_parsing(monkeypatch)
+    mutate(manager, firmware)
+
+    with pytest.raises(GcodeError, match=expected):
+        manager.start_gcode_run(plan_id=plan.plan_id, firmware_config=firmware)
+    with pytest.raises(GcodeError, match="not found"):
+        manager.gcode_plan(plan.plan_id, firmware)
+    assert manager.gcode_runs == {}
+
+
+def test_a_run_needs_exactly_one_of_lines_or_plan_id():
+    manager = _make_manager()
+
+    with pytest.raises(GcodeError, match="either"):
+        manager.start_gcode_run(firmware_config=FIRMWARE)
+    with pytest.raises(GcodeError, match="either"):
+        manager.start_gcode_run(lines=SQUARE, plan_id="0" * 32, firmware_config=FIRMWARE)
+
+
+def test_a_shape_runs_like_a_program_and_is_planned_once(monkeypatch):
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_rpc(manager, calls)
+        shape = {"kind": "circle", "center_x": 500, "center_y": 500, "radius": 100}
+        plan, _state = manager.plan_gcode(
+            shape=shape, firmware_config=FIRMWARE, feed_mm_per_min=600
+        )
+        _refuse_parsing(monkeypatch)
+
+        run_id = manager.start_gcode_run(
+            plan_id=plan.plan_id, firmware_config=FIRMWARE, return_to_start=False
+        )
+        await asyncio.gather(*manager._gcode_tasks)
+        run = manager.gcode_run(run_id)
+
+        assert run["status"] == "complete"
+        assert run["moves"] == len(plan.program.moves) > 30
+        assert sum(command[0]["args"]["lua"].count("gcode(") for command in calls) == run["moves"]
+
+    asyncio.run(scenario())
+
+
+def test_a_shape_is_not_simplified_again():
+    manager = _make_manager()
+
+    with pytest.raises(GcodeError, match="chord tolerance"):
+        manager.plan_gcode(
+            shape={"kind": "circle", "center_x": 500, "center_y": 500, "radius": 100},
+            firmware_config=FIRMWARE,
+            feed_mm_per_min=600,
+            simplify_tolerance_mm=0.5,
+        )
@@ -8,16 +8,19 @@ lighting cycles and rows cut in half. These tests pin the run-level lifecycle.
 """
 
 import asyncio
+from datetime import timedelta
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.util import dt as dt_util
 
 from custom_components.farmbot.const import (
     GRID_REPAIR_FLAT_TRAVEL_TOP_MARGIN_MM,
     GRID_REPAIR_MAX_TARGETS_PER_CALL,
+    GRID_REPAIR_Z_CLUSTER_SPAN_MM,
 )
 from custom_components.farmbot.manager import FarmbotManager
 
-from .helpers import FakeHass
+from .helpers import FakeHass, run_capture_restore
 
 BED_COLUMNS = 11
 BED_ROWS = 7
@@ -125,6 +128,7 @@ def test_whole_bed_grid_runs_as_one_continuous_capture():
 
         repair_id = manager.start_grid_repair(targets=targets, firmware_config=FIRMWARE)
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
         repair = manager.grid_repair(repair_id)
 
         assert repair["status"] == "complete"
@@ -181,6 +185,7 @@ def test_flat_travel_keeps_the_camera_at_capture_height_across_the_grid():
 
         manager.start_grid_repair(targets=targets, firmware_config=FIRMWARE)
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
 
         moves = [command[0] for command in calls if command[0]["kind"] == "move"]
         retracts = [
@@ -213,6 +218,7 @@ def test_a_low_capture_height_keeps_safe_z_on_every_move():
 
         manager.start_grid_repair(targets=targets, firmware_config=FIRMWARE)
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
 
         moves = [command[0] for command in calls if command[0]["kind"] == "move"]
         assert len(moves) == 7
@@ -223,7 +229,7 @@ def test_a_low_capture_height_keeps_safe_z_on_every_move():
     _run(scenario())
 
 
-def test_mixed_capture_heights_keep_safe_z_on_every_move():
+def test_slightly_uneven_cells_cross_at_the_highest_capture_height():
     async def scenario():
         manager = _make_manager()
         calls = []
@@ -231,11 +237,58 @@ def test_mixed_capture_heights_keep_safe_z_on_every_move():
         targets = _bed_route()[:4]
         targets[2] = dict(targets[2], z=CAPTURE_Z - 5)
 
-        manager.start_grid_repair(targets=targets, firmware_config=FIRMWARE)
+        repair_id = manager.start_grid_repair(targets=targets, firmware_config=FIRMWARE)
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
+        repair = manager.grid_repair(repair_id)
+
+        moves = [command for command in calls if command[0]["kind"] == "move"]
+        retracts = [
+            [any(item["kind"] == "safe_z" for item in move["body"]) for move in command]
+            for command in moves
+        ]
+        # Only the drive in and the drive home retract.
+        assert retracts[0] == [True] and retracts[-1] == [True]
+        assert not any(any(flags) for flags in retracts[1:-1])
+        # The lower cell is reached by crossing at the cluster's highest Z
+        # and then descending.
+        assert [_axis_targets(move) for move in moves[2]] == [
+            {"x": targets[2]["x"], "y": targets[2]["y"], "z": CAPTURE_Z},
+            {"x": targets[2]["x"], "y": targets[2]["y"], "z": CAPTURE_Z - 5},
+        ]
+        plan = repair["z_plan"]
+        assert plan["clusters"] == [{"indexes": [0, 1, 2, 3], "travel_z": CAPTURE_Z}]
+        assert plan["safe_z_moves"] == 1
+        # Three crossings that no longer retract to Z 0 and back.
+        assert plan["z_travel_saved_mm"] == 3 * 2 * -CAPTURE_Z
+
+        await manager.async_close()
+
+    _run(scenario())
+
+
+def test_cells_outside_the_cluster_envelope_keep_safe_z():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_fakes(manager, calls)
+        targets = _bed_route()[:4]
+        targets[2] = dict(targets[2], z=CAPTURE_Z - GRID_REPAIR_Z_CLUSTER_SPAN_MM - 10)
+
+        repair_id = manager.start_grid_repair(targets=targets, firmware_config=FIRMWARE)
+        await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
+        repair = manager.grid_repair(repair_id)
 
         moves = [command[0] for command in calls if command[0]["kind"] == "move"]
-        assert all(any(item["kind"] == "safe_z" for item in move["body"]) for move in moves)
+        retracts = [any(item["kind"] == "safe_z" for item in move["body"]) for move in moves]
+        # In, the deep cell, the cell after it, and home.
+        assert retracts == [True, False, True, True, True]
+        assert [cluster["indexes"] for cluster in repair["z_plan"]["clusters"]] == [
+            [0, 1],
+            [2],
+            [3],
+        ]
 
         await manager.async_close()
 
@@ -257,6 +310,7 @@ def test_lighting_is_restored_when_the_run_fails():
             targets=_bed_route()[:3], firmware_config=FIRMWARE
         )
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
         repair = manager.grid_repair(repair_id)
 
         assert repair["status"] == "failed"
@@ -317,3 +371,272 @@ def test_duplicate_target_indexes_are_rejected():
 
 def test_one_call_carries_a_whole_bed_grid():
     assert GRID_REPAIR_MAX_TARGETS_PER_CALL >= BED_COLUMNS * BED_ROWS
+
+
+def test_optimize_route_visits_scattered_cells_in_travel_order():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_fakes(manager, calls)
+        bed = _bed_route()
+        # Cells at opposite ends of the bed, interleaved.
+        scattered = [bed[0], bed[76], bed[1], bed[75], bed[2], bed[74]]
+
+        repair_id = manager.start_grid_repair(
+            targets=scattered, firmware_config=FIRMWARE, optimize_route=True
+        )
+        await asyncio.gather(*manager._grid_repair_tasks)
+        repair = manager.grid_repair(repair_id)
+
+        assert repair["status"] == "complete"
+        visited = [frame["target_index"] for frame in repair["frames"]]
+        assert sorted(visited) == [0, 1, 2, 74, 75, 76]
+        # Each end of the bed is finished before crossing to the other.
+        assert {visited[0], visited[1], visited[2]} in ({0, 1, 2}, {74, 75, 76})
+        route = repair["route"]
+        assert route["order"] == visited
+        assert route["estimated_travel_seconds_after"] < route["estimated_travel_seconds_before"]
+
+        await manager.async_close()
+
+    _run(scenario())
+
+
+def _uploaded(image_id, target, *, minutes_ago):
+    return {
+        "id": image_id,
+        "device_id": 42,
+        "attachment_processed_at": "processed",
+        "created_at": (dt_util.utcnow() - timedelta(minutes=minutes_ago)).isoformat(),
+        "meta": {"x": target["x"] + 3, "y": target["y"], "z": target["z"]},
+    }
+
+
+def test_reuse_skips_cells_that_already_have_a_fresh_image():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_fakes(manager, calls)
+        bed = _bed_route()
+        targets = bed[:4]
+        existing = [
+            _uploaded(901, bed[0], minutes_ago=5),
+            # Too old for the window: the cell is photographed again.
+            _uploaded(902, bed[1], minutes_ago=45),
+            _uploaded(903, bed[3], minutes_ago=1),
+        ]
+
+        async def fake_images():
+            return existing
+
+        manager.api.async_get_images = fake_images
+
+        repair_id = manager.start_grid_repair(
+            targets=targets, firmware_config=FIRMWARE, reuse_recent_images_within=600
+        )
+        await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
+        repair = manager.grid_repair(repair_id)
+
+        assert repair["status"] == "complete"
+        reused = repair["reused_frames"]
+        assert [(frame["target_index"], frame["image_id"]) for frame in reused] == [
+            (0, 901),
+            (3, 903),
+        ]
+        assert repair["reused_frames"][0]["distance_from_target_mm"] == 3.0
+        assert sorted(frame["target_index"] for frame in repair["frames"]) == [1, 2]
+        assert sorted(item["index"] for item in repair["completed_targets"]) == [0, 1, 2, 3]
+        photographed = [
+            _axis_targets(group[0]) for group in calls if group[0]["kind"] == "move"
+        ][:-1]
+        assert [(move["x"], move["y"]) for move in photographed] == [
+            (bed[1]["x"], bed[1]["y"]),
+            (bed[2]["x"], bed[2]["y"]),
+        ]
+        assert "reused 2" in repair["message"]
+
+        await manager.async_close()
+
+    _run(scenario())
+
+
+def test_reuse_with_every_cell_fresh_never_moves_the_gantry():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_fakes(manager, calls)
+        bed = _bed_route()
+
+        async def fake_images():
+            return [_uploaded(900 + n, bed[n], minutes_ago=2) for n in range(3)]
+
+        manager.api.async_get_images = fake_images
+
+        repair_id = manager.start_grid_repair(
+            targets=bed[:3], firmware_config=FIRMWARE, reuse_recent_images_within=600
+        )
+        await asyncio.gather(*manager._grid_repair_tasks)
+        repair = manager.grid_repair(repair_id)
+
+        assert repair["status"] == "complete"
+        assert len(repair["reused_frames"]) == 3
+        assert repair["frames"] == []
+        assert calls == []
+
+        await manager.async_close()
+
+    _run(scenario())
+
+
+def test_pipeline_moves_on_before_each_image_is_verified():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_fakes(manager, calls)
+        events = []
+
+        async def fake_rpc(commands, **_kwargs):
+            calls.append(commands)
+            if commands[0]["kind"] == "move":
+                events.append(("move", _axis_targets(commands[0])["x"]))
+            return {"kind": "rpc_ok"}
+
+        async def slow_upload(**kwargs):
+            target = kwargs["target"]
+            assert "before" in kwargs and "started_at" in kwargs
+            await asyncio.sleep(0.01)
+            events.append(("verified", target["x"]))
+            return {
+                "image_id": target["index"],
+                "x": target["x"],
+                "y": target["y"],
+                "z": target["z"],
+                "distance_from_target_mm": 0,
+            }
+
+        manager.async_rpc_request = fake_rpc
+        manager._wait_for_grid_image = slow_upload
+        targets = _bed_route()[:6]
+
+        repair_id = manager.start_grid_repair(
+            targets=targets, firmware_config=FIRMWARE, pipeline=True
+        )
+        await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
+        repair = manager.grid_repair(repair_id)
+
+        assert repair["status"] == "complete"
+        assert repair["pipelined"] is True
+        assert "verification_retries" not in repair
+        assert [frame["target_index"] for frame in repair["frames"]] == list(range(6))
+        assert repair["completed_targets"] == targets
+        # The gantry was already on its way to the second cell before the
+        # first cell's image had been verified.
+        assert events.index(("move", targets[1]["x"])) < events.index(
+            ("verified", targets[0]["x"])
+        )
+        moves = [command for command in calls if command[0]["kind"] == "move"]
+        assert len(moves) == len(targets) + 1
+
+        await manager.async_close()
+
+    _run(scenario())
+
+
+def _pipelined_with_lost_upload(lost_index, *, recovers):
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_fakes(manager, calls)
+        seen = []
+
+        async def flaky_upload(**kwargs):
+            target = kwargs["target"]
+            seen.append(target["index"])
+            if target["index"] == lost_index and (not recovers or seen.count(lost_index) == 1):
+                return None
+            return {
+                "image_id": len(seen),
+                "x": target["x"],
+                "y": target["y"],
+                "z": target["z"],
+                "distance_from_target_mm": 0,
+            }
+
+        manager._wait_for_grid_image = flaky_upload
+        targets = _bed_route()[:5]
+        repair_id = manager.start_grid_repair(
+            targets=targets, firmware_config=FIRMWARE, pipeline=True
+        )
+        await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
+        repair = manager.grid_repair(repair_id)
+        await manager.async_close()
+        moves = [_axis_targets(command[0]) for command in calls if command[0]["kind"] == "move"]
+        return targets, repair, moves
+
+    return _run(scenario())
+
+
+def test_pipeline_retries_a_lost_upload_once_the_route_is_done():
+    targets, repair, moves = _pipelined_with_lost_upload(2, recovers=True)
+
+    assert repair["status"] == "complete"
+    assert repair["verification_retries"] == [2]
+    assert repair["failed_targets"] == []
+    assert sorted(item["index"] for item in repair["completed_targets"]) == list(range(5))
+    assert [frame["target_index"] for frame in repair["frames"]] == [0, 1, 3, 4, 2]
+    # Five cells, one revisit of the lost cell, then the drive home.
+    assert moves[5] == {axis: targets[2][axis] for axis in ("x", "y", "z")}
+    assert len(moves) == 7
+
+
+def test_pipeline_fails_a_cell_only_after_its_verified_retry_fails():
+    targets, repair, _moves = _pipelined_with_lost_upload(2, recovers=False)
+
+    assert repair["status"] == "failed"
+    assert repair["failed_targets"] == [targets[2]]
+    assert [item["code"] for item in repair["failures"]] == ["upload_timeout"]
+    assert [item["index"] for item in repair["completed_targets"]] == [0, 1, 3, 4]
+    assert repair["unattempted_targets"] == []
+
+
+def test_the_z_plan_uses_the_home_end_as_the_top_of_either_axis_direction():
+    assert FarmbotManager._z_top([-500.0, 0.0], -1) == 0.0
+    assert FarmbotManager._z_top([0.0, 500.0], 1) == 0.0
+    assert FarmbotManager._z_top(None, 1) is None
+
+
+def test_a_stopped_pipeline_waits_for_its_cancelled_verifications():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+        _install_fakes(manager, calls)
+        waiting, cleaned_up = [], []
+
+        async def hung_upload(**kwargs):
+            waiting.append(kwargs["target"]["index"])
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                for _ in range(20):
+                    await asyncio.sleep(0)
+                cleaned_up.append(kwargs["target"]["index"])
+                raise
+
+        manager._wait_for_grid_image = hung_upload
+        manager.start_grid_repair(
+            targets=_bed_route()[:5], firmware_config=FIRMWARE, pipeline=True
+        )
+        while not waiting:
+            await asyncio.sleep(0)
+        for task in manager._grid_repair_tasks:
+            task.cancel()
+        await asyncio.gather(*manager._grid_repair_tasks, return_exceptions=True)
+
+        # Every verification was cancelled and had finished before the run did.
+        assert cleaned_up and sorted(cleaned_up) == sorted(waiting)
+        await manager.async_close()
+
+    _run(scenario())
@@ -0,0 +1,282 @@
+"""The per-bot motion job queue and the services that expose it.
+
+Soil captures, photo-grid repairs, raw G-code runs and weeding runs all share
+one gantry. They queue behind each other by priority instead of being refused
+as busy, and the run record each caller polls doubles as its queue entry.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from homeassistant.config_entries import ConfigEntry
+
+from custom_components.farmbot import (
+    DOMAIN,
+    SERVICE_CANCEL_VISION_JOB,
+    SERVICE_GET_VISION_JOB_QUEUE,
+    _async_register_services,
+)
+from custom_components.farmbot.const import MOTION_JOB_MAX_QUEUED
+from custom_components.farmbot.jobs import MotionJobQueueFull, MotionJobScheduler
+from custom_components.farmbot.manager import FarmbotManager
+
+from .helpers import FakeHass
+
+NOW = datetime(2026, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+FIRMWARE = {
+    "movement_axis_nr_steps_x": 1000,
+    "movement_axis_nr_steps_y": 1000,
+    "movement_axis_nr_steps_z": 1000,
+    "movement_step_per_mm_x": 10,
+    "movement_step_per_mm_y": 10,
+    "movement_step_per_mm_z": 10,
+}
+
+
+def _make_manager(hass=None):
+    hass = hass or FakeHass()
+    entry = ConfigEntry(
+        entry_id="entry-1",
+        unique_id="42",
+        domain="farmbot",
+        data={"token": "tok", "device_id": 42, "mqtt_host": "mqtt.example.com"},
+        options={},
+    )
+    manager = FarmbotManager(hass, "tok", "42", "mqtt.example.com", entry=entry)
+    manager._mqtt_connected = True
+    manager._mqtt = object()
+    manager.status = {
+        "location_data": {"position": {"x": 10.0, "y": 10.0, "z": 0.0}},
+        "informational_settings": {"busy": False, "locked": False},
+    }
+    return manager
+
+
+def _block_soil_captures(manager, monkeypatch):
+    """Make every soil capture record its X and wait for ``release``."""
+    release = asyncio.Event()
+    started = []
+
+    async def fake_capture(**kwargs):
+        started.append(kwargs["point"]["x"])
+        await release.wait()
+
+    monkeypatch.setattr(manager, "_run_soil_capture", fake_capture)
+    return release, started
+
+
+def _start_soil(manager, x, priority=50):
+    return manager.start_soil_capture(
+        point={"x": x, "y": 50},
+        firmware_config=FIRMWARE,
+        capture_z=0,
+        baseline_mm=15,
+        z_offsets_mm=[0],
+        priority=priority,
+    )
+
+
+# --------------------------- MotionJobScheduler ---------------------------
+
+
+def test_scheduler_orders_by_priority_then_arrival_and_estimates_start_times():
+    async def scenario():
+        scheduler = MotionJobScheduler(clock=lambda: NOW)
+        records = {name: {} for name in ("a", "b", "c", "d")}
+        scheduler.enqueue(records["a"], job_id="a", kind="gcode", priority=50, estimated_seconds=60)
+        scheduler.enqueue(records["b"], job_id="b", kind="gcode", priority=50, estimated_seconds=30)
+        scheduler.enqueue(records["c"], job_id="c", kind="gcode", priority=90, estimated_seconds=10)
+        scheduler.enqueue(records["d"], job_id="d", kind="gcode", priority=50, estimated_seconds=5)
+
+        snapshot = scheduler.snapshot()
+        assert snapshot["running"]["job_id"] == "a"
+        assert [job["job_id"] for job in snapshot["queued"]] == ["c", "b", "d"]
+        assert records["c"]["queue_position"] == 1
+        assert records["c"]["estimated_start_at"] == (NOW + timedelta(seconds=60)).isoformat()
+        assert records["b"]["estimated_start_at"] == (NOW + timedelta(seconds=70)).isoformat()
+        assert records["d"]["estimated_start_at"] == (NOW + timedelta(seconds=100)).isoformat()
+        assert records["a"]["estimated_finish_at"] == (NOW + timedelta(seconds=60)).isoformat()
+        assert records["d"]["estimated_finish_at"] == (NOW + timedelta(seconds=105)).isoformat()
+
+        # Discarding a waiting job closes the gap behind it.
+        scheduler.discard("b")
+        assert records["b"]["queue_position"] is None
+        assert records["d"]["queue_position"] == 2
+        assert records["d"]["estimated_start_at"] == (NOW + timedelta(seconds=70)).isoformat()
+
+        # Releasing the gantry hands it to the highest-priority waiter.
+        async with scheduler.turn("a"):
+            pass
+        assert scheduler.snapshot()["running"]["job_id"] == "c"
+        async with scheduler.turn("c"):
+            pass
+        async with scheduler.turn("d"):
+            pass
+        assert scheduler.active is False
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_bounds_the_waiting_line():
+    async def scenario():
+        scheduler = MotionJobScheduler(clock=lambda: NOW)
+        # One running plus MOTION_JOB_MAX_QUEUED waiting is the limit.
+        for n in range(MOTION_JOB_MAX_QUEUED + 1):
+            scheduler.enqueue({}, job_id=str(n), kind="gcode", priority=50, estimated_seconds=1)
+        with pytest.raises(MotionJobQueueFull):
+            scheduler.enqueue({}, job_id="x", kind="gcode", priority=50, estimated_seconds=1)
+
+    asyncio.run(scenario())
+
+
+# --------------------------- manager integration ---------------------------
+
+
+def test_higher_priority_jobs_overtake_the_queue(monkeypatch):
+    async def scenario():
+        manager = _make_manager()
+        release, started = _block_soil_captures(manager, monkeypatch)
+        _start_soil(manager, 10)
+        _start_soil(manager, 20)
+        urgent = _start_soil(manager, 30, priority=90)
+        await asyncio.sleep(0)
+
+        assert manager.soil_capture(urgent)["queue_position"] == 1
+        release.set()
+        await asyncio.gather(*manager._soil_capture_tasks)
+        assert started == [10, 30, 20]
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_a_queued_job_never_moves_the_gantry(monkeypatch):
+    async def scenario():
+        manager = _make_manager()
+        release, started = _block_soil_captures(manager, monkeypatch)
+        _start_soil(manager, 10)
+        waiting = _start_soil(manager, 20)
+        await asyncio.sleep(0)
+
+        assert manager.cancel_motion_job(waiting) is True
+        assert manager.motion_job_queue()["queued"] == []
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert manager.soil_capture(waiting)["status"] == "cancelled"
+        assert manager.cancel_motion_job(waiting) is False
+
+        release.set()
+        await asyncio.gather(*manager._soil_capture_tasks)
+        assert started == [10]
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_the_running_job_hands_the_gantry_on(monkeypatch):
+    async def scenario():
+        manager = _make_manager()
+        release, started = _block_soil_captures(manager, monkeypatch)
+        running = _start_soil(manager, 10)
+        _start_soil(manager, 20)
+        await asyncio.sleep(0)
+
+        manager.cancel_motion_job(running)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert started == [10, 20]
+        assert manager.soil_capture(running)["status"] == "cancelled"
+        release.set()
+        await asyncio.gather(*manager._soil_capture_tasks, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_a_job_whose_turn_comes_on_a_locked_bot_fails_without_moving(monkeypatch):
+    async def scenario():
+        manager = _make_manager()
+        release, started = _block_soil_captures(manager, monkeypatch)
+        _start_soil(manager, 10)
+        waiting = _start_soil(manager, 20)
+        await asyncio.sleep(0)
+
+        manager.status["informational_settings"]["locked"] = True
+        release.set()
+        await asyncio.gather(*manager._soil_capture_tasks)
+        assert started == [10]
+        assert manager.soil_capture(waiting)["status"] == "failed"
+        assert "emergency-stopped" in manager.soil_capture(waiting)["message"]
+
+    asyncio.run(scenario())
+
+
+def test_batch_restore_waits_for_the_batch_captures(monkeypatch):
+    async def scenario():
+        manager = _make_manager()
+        release, _started = _block_soil_captures(manager, monkeypatch)
+        calls = []
+
+        async def fake_rpc(commands, **_kwargs):
+            calls.append(commands)
+            return {"kind": "rpc_ok"}
+
+        manager.async_rpc_request = fake_rpc
+        for x in (10, 20):
+            manager.start_soil_capture(
+                point={"x": x, "y": 50},
+                firmware_config=FIRMWARE,
+                capture_z=0,
+                baseline_mm=15,
+                z_offsets_mm=[0],
+                batch_id="batch-1",
+            )
+        assert manager.finish_soil_capture_batch("batch-1")["status"] == "queued"
+        await asyncio.sleep(0)
+        assert calls == []
+
+        release.set()
+        await asyncio.gather(*manager._soil_capture_tasks)
+        finishing = manager._soil_batch_finish_tasks.get("batch-1")
+        if finishing is not None:
+            await finishing
+        assert manager.finish_soil_capture_batch("batch-1")["status"] == "complete"
+        assert calls[0][0]["kind"] == "move"
+
+    asyncio.run(scenario())
+
+
+# --------------------------- services ---------------------------
+
+
+def test_job_queue_and_cancel_services(monkeypatch):
+    async def scenario():
+        hass = FakeHass()
+        _async_register_services(hass)
+        manager = _make_manager(hass)
+        hass.data.setdefault(DOMAIN, {})["entry-1"] = manager
+        release, _started = _block_soil_captures(manager, monkeypatch)
+        running = _start_soil(manager, 10)
+        waiting = _start_soil(manager, 20)
+        await asyncio.sleep(0)
+
+        queue = await hass.services.async_call(
+            DOMAIN, SERVICE_GET_VISION_JOB_QUEUE, {"config_entry_id": "entry-1"}
+        )
+        assert queue["running"]["job_id"] == running
+        assert queue["running"]["job_kind"] == "soil_capture"
+        assert [job["job_id"] for job in queue["queued"]] == [waiting]
+
+        result = await hass.services.async_call(
+            DOMAIN, SERVICE_CANCEL_VISION_JOB, {"config_entry_id": "entry-1", "job_id": waiting}
+        )
+        assert result["status"] == "cancelled"
+        await asyncio.sleep(0)
+        again = await hass.services.async_call(
+            DOMAIN, SERVICE_CANCEL_VISION_JOB, {"config_entry_id": "entry-1", "job_id": waiting}
+        )
+        assert again["status"] == "rejected"
+
+        release.set()
+        await asyncio.gather(*manager._soil_capture_tasks, return_exceptions=True)
+
+    asyncio.run(scenario())
@@ -210,37 +210,60 @@ def test_move_command_puts_coordinates_in_farmbot_move_body():
     assert speeds == {"x": 75, "y": 75, "z": 75}
 
 
-def test_only_one_soil_capture_can_be_queued_per_bot():
+SOIL_FIRMWARE = {
+    "movement_axis_nr_steps_x": 1000,
+    "movement_axis_nr_steps_y": 1000,
+    "movement_axis_nr_steps_z": 1000,
+    "movement_step_per_mm_x": 10,
+    "movement_step_per_mm_y": 10,
+    "movement_step_per_mm_z": 10,
+}
+
+
+@pytest.mark.asyncio
+async def test_a_second_soil_capture_queues_behind_the_first(monkeypatch):
     _, manager = _make_manager()
-    active = MagicMock()
-    active.done.return_value = False
-    manager._soil_capture_tasks.add(active)
     manager._mqtt = object()
     manager._mqtt_connected = True
     manager.status = {
         "informational_settings": {"busy": False, "locked": False},
         "location_data": {"position": {"x": 0, "y": 0, "z": 0}},
     }
-    firmware = {
-        "movement_axis_nr_steps_x": 1000,
-        "movement_axis_nr_steps_y": 1000,
-        "movement_axis_nr_steps_z": 1000,
-        "movement_step_per_mm_x": 10,
-        "movement_step_per_mm_y": 10,
-        "movement_step_per_mm_z": 10,
-    }
-    try:
-        manager.start_soil_capture(
-            point={"x": 50, "y": 50},
-            firmware_config=firmware,
-            capture_z=0,
-            baseline_mm=15,
-            z_offsets_mm=[0],
-        )
-    except ValueError as exc:
-        assert str(exc) == "FarmBot is busy"
-    else:
-        raise AssertionError("a second soil capture was queued")
+    release = asyncio.Event()
+    started = []
+
+    async def fake_capture(**kwargs):
+        started.append(kwargs["point"]["x"])
+        await release.wait()
+
+    monkeypatch.setattr(manager, "_run_soil_capture", fake_capture)
+    first = manager.start_soil_capture(
+        point={"x": 50, "y": 50},
+        firmware_config=SOIL_FIRMWARE,
+        capture_z=0,
+        baseline_mm=15,
+        z_offsets_mm=[0],
+    )
+    second = manager.start_soil_capture(
+        point={"x": 60, "y": 50},
+        firmware_config=SOIL_FIRMWARE,
+        capture_z=0,
+        baseline_mm=15,
+        z_offsets_mm=[0],
+    )
+    await asyncio.sleep(0)
+
+    # Only one capture drives the gantry; the other waits its turn.
+    assert started == [50]
+    assert manager.soil_captures[first]["queue_position"] is None
+    assert manager.soil_captures[second]["queue_position"] == 1
+    assert manager.soil_captures[second]["status"] == "queued"
+    assert manager.soil_motion_state(SOIL_FIRMWARE)["busy"] is True
+
+    release.set()
+    await asyncio.gather(*manager._soil_capture_tasks)
+    assert started == [50, 60]
+    assert manager.motion_job_queue() == {"running": None, "queued": []}
 
 
 @pytest.mark.asyncio
@@ -249,44 +272,40 @@ async def test_same_batch_capture_queues_behind_the_finishing_capture(monkeypatc
     manager._mqtt = object()
     manager._mqtt_connected = True
     manager.status = {
-        "informational_settings": {"busy": True, "locked": False},
+        "informational_settings": {"busy": False, "locked": False},
         "location_data": {"position": {"x": 10, "y": 20, "z": 0}},
     }
-    firmware = {
-        "movement_axis_nr_steps_x": 1000,
-        "movement_axis_nr_steps_y": 1000,
-        "movement_axis_nr_steps_z": 1000,
-        "movement_step_per_mm_x": 10,
-        "movement_step_per_mm_y": 10,
-        "movement_step_per_mm_z": 10,
-    }
     release = asyncio.Event()
-    existing = asyncio.create_task(release.wait())
-    manager._soil_capture_tasks.add(existing)
-    manager._soil_capture_task_batches[existing] = "batch-1"
-    manager._soil_capture_batches["batch-1"] = {
-        "batch_id": "batch-1",
-        "original_position": {"x": 10, "y": 20, "z": 0},
-    }
-    received = {}
+    received = []
 
     async def fake_capture(**kwargs):
-        received.update(kwargs)
+        received.append(kwargs)
+        manager.status["location_data"]["position"] = {"x": 90, "y": 90, "z": 0}
         await release.wait()
 
     monkeypatch.setattr(manager, "_run_soil_capture", fake_capture)
     try:
-        capture_id = manager.start_soil_capture(
-            point={"x": 50, "y": 50},
-            firmware_config=firmware,
-            capture_z=0,
-            baseline_mm=15,
-            z_offsets_mm=[0],
-            batch_id="batch-1",
-        )
+        for x in (50, 60):
+            capture_id = manager.start_soil_capture(
+                point={"x": x, "y": 50},
+                firmware_config=SOIL_FIRMWARE,
+                capture_z=0,
+                baseline_mm=15,
+                z_offsets_mm=[0],
+                batch_id="batch-1",
+            )
+            assert capture_id in manager.soil_captures
         await asyncio.sleep(0)
-        assert capture_id in manager.soil_captures
-        assert received["original_position"] is None
+        release.set()
+        await asyncio.gather(*manager._soil_capture_tasks)
+        # Restoration is deferred to the batch, which remembers where the
+        # gantry was parked when the first capture of the batch started.
+        assert [item["original_position"] for item in received] == [None, None]
+        assert manager._soil_capture_batches["batch-1"]["original_position"] == {
+            "x": 10,
+            "y": 20,
+            "z": 0,
+        }
     finally:
         release.set()
         await asyncio.gather(*manager._soil_capture_tasks)
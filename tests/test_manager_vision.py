@@ -5,18 +5,24 @@ real (base-URL resolution is pure/local) but never invoked here.
 """
 
 import asyncio
+import json
 from datetime import timedelta
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.util import dt as dt_util
 
-from custom_components.farmbot.const import EVENT_VISION_REQUEST, SIGNAL_VISION_STATE
+from custom_components.farmbot.const import (
+    CAPTURE_HARDWARE_IDLE_SECONDS,
+    EVENT_VISION_REQUEST,
+    SIGNAL_VISION_STATE,
+    TOPIC_STATUS,
+)
 from custom_components.farmbot.image_utils import CaptureImageQuality
 from custom_components.farmbot.manager import FarmbotManager
 
 from .fake_api import FakeVisionApi
-from .helpers import FakeHass
+from .helpers import FakeHass, run_capture_restore
 
 
 def _run(coro):
@@ -104,6 +110,7 @@ def test_soil_capture_retries_a_bad_photo_in_place_before_advancing():
                 z_direction=-1,
                 original_position={"x": 10, "y": 20, "z": 0},
             )
+            await run_capture_restore(manager)
 
         record = manager.soil_captures["soil"]
         assert record["status"] == "complete"
@@ -180,6 +187,7 @@ def test_soil_capture_aborts_after_five_bad_photos_without_advancing():
                 z_direction=-1,
                 original_position={"x": 10, "y": 20, "z": 0},
             )
+            await run_capture_restore(manager)
 
         record = manager.soil_captures["soil"]
         assert record["status"] == "failed"
@@ -230,6 +238,294 @@ def test_finishing_soil_batch_restores_original_position_once():
     _run(scenario())
 
 
+_SURVEY_FIRMWARE = {
+    "movement_axis_nr_steps_x": 600000,
+    "movement_axis_nr_steps_y": 300000,
+    "movement_axis_nr_steps_z": 100000,
+    "movement_step_per_mm_x": 100,
+    "movement_step_per_mm_y": 100,
+    "movement_step_per_mm_z": 100,
+    "movement_home_up_z": 1,
+}
+
+
+def _install_survey_bot(manager, calls, *, unreachable_x=None):
+    manager._mqtt = object()
+    manager._mqtt_connected = True
+    manager.status = {
+        "location_data": {"position": {"x": 0, "y": 200, "z": 0}},
+        "informational_settings": {"busy": False, "locked": False},
+        "pins": {"7": {"value": 0}},
+    }
+    image_id = 0
+
+    async def fake_rpc(commands, **_kwargs):
+        calls.append(commands)
+        return {"kind": "rpc_ok"}
+
+    async def fake_images():
+        return []
+
+    async def fake_position(**kwargs):
+        if kwargs["target"]["x"] == unreachable_x:
+            return None
+        return {axis: float(kwargs["target"][axis]) for axis in ("x", "y", "z")}
+
+    async def fake_image(**kwargs):
+        nonlocal image_id
+        image_id += 1
+        image = {"id": image_id, "attachment_url": f"https://example.com/{image_id}.jpg"}
+        return {"image_id": image_id, **kwargs["target"]}, image, "usable"
+
+    async def fake_download(_url):
+        return b"jpeg", "image/jpeg"
+
+    manager.async_rpc_request = fake_rpc
+    manager.api.async_get_images = fake_images
+    manager.api.async_download_image = fake_download
+    manager._wait_for_grid_position = fake_position
+    manager._wait_for_soil_frame_image = fake_image
+
+
+def _moves(calls):
+    return [
+        {
+            item["args"]["axis"]: item["args"]["axis_operand"]["args"]["number"]
+            for item in group[0]["body"]
+            if item["kind"] == "axis_overwrite"
+        }
+        for group in calls
+        if group[0]["kind"] == "move"
+    ]
+
+
+def test_soil_survey_lights_once_orders_points_and_restores_once():
+    async def scenario():
+        _, manager, _ = _make_manager()
+        calls = []
+        _install_survey_bot(manager, calls)
+        usable = CaptureImageQuality(True, "usable", contrast=20, laplacian_energy=30)
+        survey_id = manager.start_soil_survey(
+            points=[
+                {"id": 3, "x": 900, "y": 200},
+                {"id": 1, "x": 100, "y": 200},
+                {"id": 2, "x": 500, "y": 200},
+            ],
+            firmware_config=_SURVEY_FIRMWARE,
+            capture_z=-100,
+            baseline_mm=15,
+            z_offsets_mm=[0, 25],
+        )
+        with patch(
+            "custom_components.farmbot.manager.inspect_capture_image", return_value=usable
+        ):
+            await asyncio.gather(*manager._soil_capture_tasks)
+            await run_capture_restore(manager)
+        survey = manager.soil_survey(survey_id)
+
+        assert survey["status"] == "complete"
+        assert survey["completed_points"] == 3
+        assert survey["route"]["order"] == [1, 2, 0]
+        assert [point["status"] for point in survey["points"]] == ["complete"] * 3
+        assert all(len(point["frames"]) == 6 for point in survey["points"])
+        assert "expected_frames" not in survey and "before_image_ids" not in survey
+        kinds = [[item["kind"] for item in group] for group in calls]
+        assert kinds.count(["write_pin"]) == 2
+        assert kinds[0] == ["write_pin"]
+        assert kinds[-2:] == [["write_pin"], ["move"]]
+        moves = _moves(calls)
+        assert moves[-1] == {"x": 0.0, "y": 200.0, "z": 0.0}
+        # Back and forth across the laterals, never jumping back to the start
+        # of a row; the next point starts from the nearer end.
+        first_point = [(move["y"], move["z"]) for move in moves[:6]]
+        assert first_point == [
+            (185.0, -100.0),
+            (200.0, -100.0),
+            (215.0, -100.0),
+            (215.0, -125.0),
+            (200.0, -125.0),
+            (185.0, -125.0),
+        ]
+        assert moves[6]["y"] == 185.0
+
+    _run(scenario())
+
+
+def test_soil_survey_records_a_failed_point_and_carries_on():
+    async def scenario():
+        _, manager, _ = _make_manager()
+        calls = []
+        _install_survey_bot(manager, calls, unreachable_x=500)
+        usable = CaptureImageQuality(True, "usable", contrast=20, laplacian_energy=30)
+        survey_id = manager.start_soil_survey(
+            points=[{"x": 100, "y": 200}, {"x": 500, "y": 200}, {"x": 900, "y": 200}],
+            firmware_config=_SURVEY_FIRMWARE,
+            capture_z=-100,
+            baseline_mm=15,
+            z_offsets_mm=[0],
+        )
+        with patch(
+            "custom_components.farmbot.manager.inspect_capture_image", return_value=usable
+        ):
+            await asyncio.gather(*manager._soil_capture_tasks)
+            await run_capture_restore(manager)
+        survey = manager.soil_survey(survey_id)
+
+        assert survey["status"] == "failed"
+        assert [point["status"] for point in survey["points"]] == [
+            "complete",
+            "failed",
+            "complete",
+        ]
+        assert "did not reach" in survey["points"][1]["message"]
+        assert survey["message"] == "Captured 2 of 3 soil survey point(s); 1 failed"
+        kinds = [[item["kind"] for item in group] for group in calls]
+        assert kinds.count(["write_pin"]) == 2
+
+    _run(scenario())
+
+
+def _survey_with_tracked_lighting(manager, calls):
+    """A survey bot whose status stream follows the lighting pin writes."""
+    _install_survey_bot(manager, calls)
+    record = manager.async_rpc_request
+
+    async def fake_rpc(commands, **kwargs):
+        if commands[0]["kind"] == "write_pin":
+            manager.status["pins"]["7"] = {"value": commands[0]["args"]["pin_value"]}
+        return await record(commands, **kwargs)
+
+    manager.async_rpc_request = fake_rpc
+
+
+async def _survey(manager, x):
+    usable = CaptureImageQuality(True, "usable", contrast=20, laplacian_energy=30)
+    survey_id = manager.start_soil_survey(
+        points=[{"x": x, "y": 200}],
+        firmware_config=_SURVEY_FIRMWARE,
+        capture_z=-100,
+        baseline_mm=15,
+        z_offsets_mm=[0],
+    )
+    with patch("custom_components.farmbot.manager.inspect_capture_image", return_value=usable):
+        await asyncio.gather(*manager._soil_capture_tasks)
+    return manager.soil_survey(survey_id)
+
+
+def _idle_timers(manager):
+    return [
+        timer
+        for timer in manager.hass.loop.timers
+        if timer.func == manager._capture_hardware_idle and not timer.cancelled
+    ]
+
+
+def test_back_to_back_surveys_share_one_lighting_cycle_and_one_drive_home():
+    async def scenario():
+        _, manager, _ = _make_manager()
+        calls = []
+        _survey_with_tracked_lighting(manager, calls)
+
+        first = await _survey(manager, 100)
+        assert [timer.delay for timer in _idle_timers(manager)] == [CAPTURE_HARDWARE_IDLE_SECONDS]
+        # The gantry is left at the last frame; the next run starts from there.
+        manager.status["location_data"]["position"] = {"x": 100, "y": 215, "z": -100}
+        second = await _survey(manager, 500)
+        assert len(_idle_timers(manager)) == 1
+        await run_capture_restore(manager)
+
+        assert first["status"] == second["status"] == "complete"
+        pin_writes = [
+            group[0]["args"]["pin_value"] for group in calls if group[0]["kind"] == "write_pin"
+        ]
+        assert pin_writes == [1, 0]
+        moves = _moves(calls)
+        # Three laterals per survey, then a single drive back to the first park.
+        assert len(moves) == 7
+        assert moves[-1] == {"x": 0.0, "y": 200.0, "z": 0.0}
+        assert manager._capture_hardware is None
+
+    _run(scenario())
+
+
+def test_a_light_that_was_already_on_is_left_on():
+    async def scenario():
+        _, manager, _ = _make_manager()
+        calls = []
+        _survey_with_tracked_lighting(manager, calls)
+        manager.status["pins"]["7"] = {"value": 1}
+
+        await _survey(manager, 100)
+        await run_capture_restore(manager)
+
+        assert [group[0]["kind"] for group in calls].count("write_pin") == 0
+        assert _moves(calls)[-1] == {"x": 0.0, "y": 200.0, "z": 0.0}
+
+    _run(scenario())
+
+
+def test_emergency_stop_drops_the_pending_restore():
+    async def scenario():
+        _, manager, _ = _make_manager()
+        calls = []
+        _survey_with_tracked_lighting(manager, calls)
+        await _survey(manager, 100)
+        calls.clear()
+
+        message = MagicMock()
+        message.topic = TOPIC_STATUS.format(device_id="42")
+        message.payload = json.dumps(
+            {**manager.status, "informational_settings": {"busy": False, "locked": True}}
+        ).encode()
+        manager._on_message(None, None, message)
+        # Unlocking later must not bring the deferred drive home back.
+        manager.status["informational_settings"]["locked"] = False
+        await run_capture_restore(manager)
+
+        assert manager._capture_hardware is None
+        assert _idle_timers(manager) == []
+        assert calls == []
+
+    _run(scenario())
+
+
+def test_unloading_switches_capture_lighting_off_without_moving():
+    async def scenario():
+        _, manager, _ = _make_manager()
+        calls = []
+        _survey_with_tracked_lighting(manager, calls)
+        await _survey(manager, 100)
+        calls.clear()
+
+        await manager.async_release_capture_hardware()
+
+        assert [group[0]["kind"] for group in calls] == ["write_pin"]
+        assert calls[0][0]["args"]["pin_value"] == 0
+        assert _idle_timers(manager) == []
+        assert manager._capture_hardware is None
+
+    _run(scenario())
+
+
+def test_soil_survey_rejects_every_point_before_queueing_anything():
+    _, manager, _ = _make_manager()
+    _install_survey_bot(manager, [])
+    try:
+        manager.start_soil_survey(
+            points=[{"x": 100, "y": 200}, {"x": 9000, "y": 200}],
+            firmware_config=_SURVEY_FIRMWARE,
+            capture_z=-100,
+            baseline_mm=15,
+            z_offsets_mm=[0],
+        )
+    except ValueError as err:
+        assert "X is outside" in str(err)
+    else:
+        raise AssertionError("an out-of-bounds survey point was accepted")
+    assert len(manager.soil_surveys) == 0
+    assert manager.motion_job_queue()["queued"] == []
+
+
 def test_grid_repair_moves_takes_photos_and_restores_position():
     async def scenario():
         _, manager, _ = _make_manager()
@@ -283,6 +579,7 @@ def test_grid_repair_moves_takes_photos_and_restores_position():
             firmware_config=firmware,
         )
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
         repair = manager.grid_repair(repair_id)
         assert repair["status"] == "complete"
         assert repair["frames"] == [
@@ -384,6 +681,7 @@ def test_grid_repair_retries_photo_until_a_processed_target_image_exists():
             firmware_config=firmware,
         )
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
 
         repair = manager.grid_repair(repair_id)
         assert repair["status"] == "complete"
@@ -587,6 +885,7 @@ def test_grid_repair_continues_when_a_target_image_never_arrives():
             firmware_config=firmware,
         )
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
 
         repair = manager.grid_repair(repair_id)
         assert repair["status"] == "failed"
@@ -647,6 +946,7 @@ def test_grid_repair_stops_after_max_consecutive_failures():
         ]
         repair_id = manager.start_grid_repair(targets=targets, firmware_config=firmware)
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
 
         repair = manager.grid_repair(repair_id)
         assert repair["status"] == "failed"
@@ -715,6 +1015,7 @@ def test_grid_repair_aborts_immediately_when_bot_becomes_emergency_stopped():
             firmware_config=firmware,
         )
         await asyncio.gather(*manager._grid_repair_tasks)
+        await run_capture_restore(manager)
 
         repair = manager.grid_repair(repair_id)
         assert repair["status"] == "failed"
@@ -724,7 +1025,8 @@ def test_grid_repair_aborts_immediately_when_bot_becomes_emergency_stopped():
         # Only the first target was ever moved to; the batch stopped before
         # attempting the second or third.
         move_calls = [c for c in calls if c[0]["kind"] == "move"]
-        assert len(move_calls) == 2  # first target's move + the final restore
+        # The deferred drive back to park is refused while the bot is locked.
+        assert len(move_calls) == 1
         await manager.async_close()
 
     _run(scenario())
@@ -821,6 +1123,19 @@ def test_vision_options_without_entry_returns_defaults():
     assert manager.vision_options()["vision_enabled"] is False
 
 
+def test_coordinate_sensor_options_default_and_read_live_from_entry():
+    _, manager, entry = _make_manager()
+    assert manager.coordinate_sensor_options() == {
+        "coordinate_deadband_mm": 1.0,
+        "coordinate_min_interval_seconds": 2.0,
+    }
+    entry.options = {"coordinate_deadband_mm": 5, "coordinate_min_interval_seconds": 0}
+    assert manager.coordinate_sensor_options() == {
+        "coordinate_deadband_mm": 5.0,
+        "coordinate_min_interval_seconds": 0.0,
+    }
+
+
 # --------------------------- heartbeat / availability ---------------------------
 
 
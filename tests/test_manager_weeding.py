@@ -1,9 +1,19 @@
-"""Adaptive rotary weeding validation and current-recovery Lua."""
+"""Adaptive rotary weeding planning and rotary-tool handling."""
+
+import asyncio
+import math
+import random
+import re
 
 import pytest
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.util import dt as dt_util
 
+from custom_components.farmbot.const import WEEDING_MAX_WEEDS_PER_RUN
 from custom_components.farmbot.manager import FarmbotManager
 
+from .helpers import FakeHass
+
 SETTINGS = {
     "motor_pin": 2,
     "current_pin": 60,
@@ -27,42 +37,6 @@ WEED = {
 }
 
 
-def test_lua_watches_current_reverses_slows_raises_and_always_retracts():
-    source = FarmbotManager._weeding_lua(WEED, SETTINGS)
-    assert "watch_pin(current" in source
-    assert "off(motor)" in source
-    assert "math.floor(cutspd/2)" in source
-    assert "zoff=zoff+10" in source
-    assert "fromx=tox" in source
-    assert source.index("move({z=safez,speed=approach})") < source.index(
-        "move({x=transitx,y=transity,z=safez"
-    )
-    assert source.index("move({x=transitx,y=transity,z=safez") < source.index(
-        "move({x=ax,y=ay,z=safez"
-    )
-    assert "move({x=fromx,y=fromy,z=safez" in source
-    assert source.rstrip().endswith("move({x=bx,y=by,z=safez,speed=approach})")
-
-
-def test_lua_only_slows_the_descent_below_the_soil_risk_height():
-    source = FarmbotManager._weeding_lua(WEED, SETTINGS)
-    assert "local riskz=-300" in source
-    assert "if targetz < riskz then" in source
-    assert "move({x=fromx,y=fromy,z=riskz,speed=approach})" in source
-    assert "move({x=fromx,y=fromy,z=targetz,speed=25})" in source
-    assert "move({x=fromx,y=fromy,z=targetz,speed=approach})" in source
-
-
-def test_lua_uses_validated_tall_plant_approach_waypoints():
-    source = FarmbotManager._weeding_lua(
-        {**WEED, "approach_waypoints": [{"x": 300, "y": 350}, {"x": 400, "y": 400}]},
-        SETTINGS,
-    )
-    first = "move({x=300,y=350,z=safez,speed=approach})"
-    second = "move({x=400,y=400,z=safez,speed=approach})"
-    assert source.index(first) < source.index(second) < source.index("move({x=ax,y=ay")
-
-
 def test_weeding_plan_rejects_out_of_bounds_before_movement():
     manager = object.__new__(FarmbotManager)
     manager.soil_motion_state = lambda _firmware: {
@@ -98,6 +72,71 @@ def test_weeding_plan_rejects_low_transit_height_before_movement():
         )
 
 
+def _planner(position=None):
+    manager = object.__new__(FarmbotManager)
+    manager.soil_motion_state = lambda _firmware: {
+        "connected": True,
+        "locked": False,
+        "busy": False,
+        "position": position or {"x": 0, "y": 0, "z": 0},
+        "axis_bounds": {"x": (0, 3000), "y": (0, 1500), "z": (-500, 0)},
+    }
+    return manager
+
+
+def _bed_of_weeds(count):
+    rng = random.Random(3)
+    weeds = []
+    for weed_id in range(1, count + 1):
+        x, y = rng.uniform(200, 2800), rng.uniform(200, 1300)
+        angle = rng.uniform(0, 2 * math.pi)
+        weeds.append(
+            {
+                **WEED,
+                "weed_id": weed_id,
+                "transit_start": {"x": x, "y": y},
+                "start": {"x": x, "y": y},
+                "end": {"x": x + 120 * math.cos(angle), "y": y + 120 * math.sin(angle)},
+            }
+        )
+    return weeds
+
+
+def test_a_full_weeding_run_is_planned_to_cut_more_than_it_travels():
+    weeds = _bed_of_weeds(WEEDING_MAX_WEEDS_PER_RUN)
+
+    plan = _planner().plan_weeding(weeds=weeds, settings=SETTINGS, firmware_config={})
+
+    route = plan["route"]
+    assert sorted(route["order"]) == list(range(1, WEEDING_MAX_WEEDS_PER_RUN + 1))
+    assert route["order"] == [weed["weed_id"] for weed in plan["weeds"]]
+    assert route["reversed"] == [weed["weed_id"] for weed in plan["weeds"] if weed.get("reversed")]
+    cutting = 120 * WEEDING_MAX_WEEDS_PER_RUN
+    assert route["planned_transit_mm"] < cutting
+    assert route["planned_transit_mm"] < route["request_order_transit_mm"] / 4
+
+
+def test_weeding_order_can_be_kept_as_requested():
+    weeds = _bed_of_weeds(10)
+
+    plan = _planner().plan_weeding(
+        weeds=weeds, settings={**SETTINGS, "optimize_order": False}, firmware_config={}
+    )
+
+    assert plan["weeds"] == weeds
+    assert plan["route"]["optimized"] is False
+    assert plan["route"]["planned_transit_mm"] == plan["route"]["request_order_transit_mm"]
+
+
+def test_weeding_plan_rejects_more_weeds_than_a_run_allows():
+    with pytest.raises(ValueError, match="1 to 100 weeds"):
+        _planner().plan_weeding(
+            weeds=_bed_of_weeds(WEEDING_MAX_WEEDS_PER_RUN + 1),
+            settings=SETTINGS,
+            firmware_config={},
+        )
+
+
 def test_farmbot_slot_uses_standard_mount_and_dismount_helpers():
     settings = {
         **SETTINGS,
@@ -160,3 +199,152 @@ def test_manual_slot_uses_farmbot_mount_motion_and_user_coordinates():
     assert "move_absolute(4.2,576.8,-386,50)" in mount
     assert "move_absolute(104.2,576.8,-386,50)" in dismount
     assert "move_absolute(4.2,576.8,-386,50)" in dismount
+
+
+MANAGED = {
+    **SETTINGS,
+    "manage_tool": True,
+    "tool_name": "Rotary Tool",
+    "tool_id": 9,
+    "tool_slot_x": 4.2,
+    "tool_slot_y": 576.8,
+    "tool_slot_z": -386,
+    "tool_pullout_direction": 1,
+    "tool_slot_from_bot": False,
+    "tool_hold_seconds": 60,
+}
+
+
+class _ToolBot:
+    """A bot whose device resource tracks the tool its Lua mounts."""
+
+    def __init__(self, manager, *, mounted_tool_id=0):
+        self.manager = manager
+        self.mounted_tool_id = mounted_tool_id
+        self.calls = []
+        manager.api.async_get_device = self.async_get_device
+        manager.async_rpc_request = self.async_rpc_request
+
+    async def async_get_device(self):
+        return {"id": 42, "mounted_tool_id": self.mounted_tool_id}
+
+    async def async_rpc_request(self, commands, **_kwargs):
+        if commands[0]["kind"] != "lua":
+            self.calls.append(commands[0]["kind"])
+            return {"kind": "rpc_ok"}
+        source = commands[0]["args"]["lua"]
+        if "update_device({mounted_tool_id=fbv_tool_id})" in source:
+            self.calls.append("mount")
+            self.mounted_tool_id = 9
+        elif "update_device({mounted_tool_id=0})" in source:
+            self.calls.append("dismount")
+            self.mounted_tool_id = 0
+        else:
+            self.calls.append("weeds")
+            tag = re.search(r"local tag='([0-9a-f]+)'", source).group(1)
+            for number in re.findall(r"^cut\((\d+),", source, re.M):
+                self.manager._handle_log_message({"message": f"ha-weed {tag} {number} cut 1"})
+        return {"kind": "rpc_ok"}
+
+
+def _tool_manager():
+    entry = ConfigEntry(
+        entry_id="entry-1",
+        unique_id="42",
+        domain="farmbot",
+        data={"token": "tok", "device_id": 42, "mqtt_host": "mqtt.example.com"},
+        options={},
+    )
+    manager = FarmbotManager(FakeHass(), "tok", "42", "mqtt.example.com", entry=entry)
+    manager._mqtt_connected = True
+    manager._mqtt = object()
+    manager.status = {
+        "location_data": {"position": {"x": 10.0, "y": 20.0, "z": 0.0}},
+        "informational_settings": {"busy": False, "locked": False},
+    }
+    return manager
+
+
+async def _weed(manager, run_id, settings):
+    manager.weeding_runs[run_id] = {
+        "run_id": run_id,
+        "status": "queued",
+        "message": "queued",
+        "weeds_total": 1,
+        "weeds_completed": 0,
+        "weeds_failed": 0,
+        "results": [],
+        "created_at": dt_util.utcnow().isoformat(),
+    }
+    await manager._run_weeding(run_id=run_id, weeds=[WEED], settings=settings)
+    return manager.weeding_runs[run_id]
+
+
+def test_back_to_back_runs_reuse_a_held_rotary_tool():
+    async def scenario():
+        manager = _tool_manager()
+        bot = _ToolBot(manager)
+
+        first = await _weed(manager, "first", MANAGED)
+        assert bot.calls == ["mount", "weeds", "write_pin"]
+        assert first["status"] == "complete" and first["tool_reused"] is False
+        assert manager._tool_lease["held_until"] == first["tool_held_until"]
+
+        second = await _weed(manager, "second", MANAGED)
+        # Already on the UTM: no homing, no tool change, held again.
+        assert bot.calls[3:] == ["weeds", "write_pin"]
+        assert second["tool_reused"] is True and "tool_held_until" in second
+
+        # When the hold runs out the tool goes back as a queued gantry job.
+        first_hold, second_hold = manager.hass.loop.timers
+        assert first_hold.cancelled and second_hold.delay == 60
+        second_hold.func(*second_hold.args)
+        await asyncio.gather(*manager._motion_job_tasks.values())
+        assert bot.calls[-1] == "dismount"
+        assert manager._tool_lease is None and bot.mounted_tool_id == 0
+        await manager.async_close()
+
+    asyncio.run(scenario())
+
+
+def test_another_kind_of_job_returns_a_held_tool_before_it_starts():
+    async def scenario():
+        manager = _tool_manager()
+        bot = _ToolBot(manager, mounted_tool_id=9)
+        manager._hold_rotary_tool(MANAGED, 60)
+
+        async def gcode_run():
+            bot.calls.append("gcode")
+
+        record = {"status": "queued"}
+        await manager._queue_motion_job(
+            job_id="job",
+            kind="gcode",
+            record=record,
+            priority=50,
+            estimated_seconds=1,
+            tasks=None,
+            run=gcode_run,
+        )
+        assert bot.calls == ["dismount", "gcode"]
+        assert manager._tool_lease is None
+        await manager.async_close()
+
+    asyncio.run(scenario())
+
+
+def test_a_tool_the_status_stream_reports_missing_is_mounted_and_returned():
+    async def scenario():
+        manager = _tool_manager()
+        # The device still names the tool, but the verification pin reads open.
+        bot = _ToolBot(manager, mounted_tool_id=9)
+        manager.status["pins"] = {"63": {"mode": 0, "value": 1}}
+
+        record = await _weed(manager, "run", {**MANAGED, "tool_hold_seconds": 0})
+
+        assert bot.calls == ["mount", "weeds", "write_pin", "dismount"]
+        assert record["status"] == "complete" and "tool_held_until" not in record
+        assert manager._tool_lease is None
+        await manager.async_close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,222 @@
+"""Firmware-aware motion time estimates and the timeouts derived from them."""
+
+import math
+import re
+
+import pytest
+from homeassistant.config_entries import ConfigEntry
+
+from custom_components.farmbot import gcode, weeding_lua
+from custom_components.farmbot.const import (
+    GCODE_FALLBACK_MAX_STEPS_PER_SECOND,
+    MOTION_TIMEOUT_MARGIN_SECONDS,
+)
+from custom_components.farmbot.manager import FarmbotManager
+from custom_components.farmbot.motion import AxisProfile, MotionModel, rpc_timeout, weed_legs
+
+from .helpers import FakeHass
+
+# 10 steps/mm; 1000 steps/s cruise (100 mm/s), starting at 200 steps/s and
+# ramping over 400 steps (40 mm).
+FIRMWARE = {
+    f"movement_{key}_{axis}": value
+    for axis in ("x", "y", "z")
+    for key, value in (
+        ("step_per_mm", 10),
+        ("max_spd", 1000),
+        ("min_spd", 200),
+        ("steps_acc_dec", 400),
+    )
+}
+ORIGIN = {"x": 0.0, "y": 0.0, "z": 0.0}
+
+
+def test_long_moves_ramp_up_cruise_and_ramp_down():
+    profile = AxisProfile(
+        steps_per_mm=10, max_steps_per_second=1000, min_steps_per_second=200, accel_steps=400
+    )
+    # Each ramp averages 600 steps/s over 400 steps; the cruise covers the rest.
+    ramp = 400 / 600
+    assert profile.seconds(1000) == pytest.approx(2 * ramp + (10000 - 800) / 1000)
+    assert profile.seconds(-1000) == profile.seconds(1000)
+    assert profile.seconds(0) == 0
+
+
+def test_short_moves_never_reach_cruise_speed():
+    profile = AxisProfile(
+        steps_per_mm=10, max_steps_per_second=1000, min_steps_per_second=200, accel_steps=400
+    )
+    # 40 mm is one full ramp each way at most: slower than cruising it.
+    assert profile.seconds(40) > 400 / 1000
+    assert profile.seconds(40) < profile.seconds(80) / 1.5
+    # A triangle profile is continuous with the trapezoid at the boundary.
+    assert profile.seconds(80) == pytest.approx(2 * 400 / 600)
+
+
+def test_axes_move_together_and_slow_ones_set_the_pace():
+    model = MotionModel({**FIRMWARE, "movement_max_spd_y": 500})
+    diagonal = model.move_seconds(ORIGIN, {"x": 500, "y": 500, "z": 0})
+    assert diagonal == pytest.approx(model.axis_seconds("y", 500))
+    assert diagonal > model.axis_seconds("x", 500)
+    # Half speed is slower, but the ramps do not halve.
+    assert model.axis_seconds("x", 500, speed_percent=50) < 2 * model.axis_seconds("x", 500)
+
+
+def test_safe_z_moves_retract_travel_and_descend():
+    model = MotionModel(FIRMWARE)
+    start = {"x": 0, "y": 0, "z": -300}
+    end = {"x": 500, "y": 0, "z": -300}
+    direct = model.move_seconds(start, end)
+    safe = model.move_seconds(start, end, safe_z=True)
+    assert safe == pytest.approx(direct + 2 * model.axis_seconds("z", 300))
+    # Without XY travel FarmBot OS does not retract.
+    assert model.move_seconds(start, {"z": -100}, safe_z=True) == model.axis_seconds("z", 200)
+
+
+def test_missing_firmware_values_fall_back_to_factory_defaults():
+    unknown = MotionModel({"movement_max_spd_x": "?", "movement_step_per_mm_x": 0})
+    assert unknown.axes["x"] == AxisProfile(
+        steps_per_mm=5.0,
+        max_steps_per_second=GCODE_FALLBACK_MAX_STEPS_PER_SECOND,
+        min_steps_per_second=50.0,
+        accel_steps=300.0,
+    )
+    assert unknown.axes["z"].steps_per_mm == 25.0
+
+
+def test_gcode_programs_use_their_own_axis_speeds():
+    model = MotionModel(FIRMWARE)
+    program = gcode.parse_program(
+        ["G90", "G00 X100 F600", "G00 X100 Y100"],
+        firmware_config=FIRMWARE,
+        start_position=dict(ORIGIN),
+        axis_bounds={"x": [0, 1000], "y": [0, 1000], "z": [-500, 0]},
+        default_feed_mm_per_min=600,
+    )
+    # 600 mm/min is 10 mm/s: far below the 100 mm/s cruise the axes allow.
+    assert model.gcode_seconds(ORIGIN, program.moves) > 2 * 100 / 10 * 0.9
+    assert model.gcode_seconds(ORIGIN, program.moves[:1]) < model.gcode_seconds(
+        ORIGIN, program.moves
+    )
+
+
+def test_weeding_runs_are_estimated_from_their_moves():
+    model = MotionModel(FIRMWARE)
+    settings = {
+        "approach_speed_percent": 100,
+        "cut_speed_percent": 50,
+        "tool_height_mm": 80,
+        "max_attempts": 3,
+    }
+    weed = {
+        "transit_start": {"x": 400, "y": 400},
+        "start": {"x": 450, "y": 500},
+        "end": {"x": 550, "y": 500},
+        "soil_z": -430,
+        "travel_z": 0,
+    }
+    once = model.weeding_seconds(ORIGIN, [weed], settings)
+    worst = model.weeding_seconds(ORIGIN, [weed], settings, attempts=3)
+    assert 0 < once < worst
+    assert model.weeding_seconds(ORIGIN, [weed, weed], settings) > once
+
+
+def _path_mm(start, legs):
+    position, total = dict(start), 0.0
+    for target, _speed, _safe_z in legs:
+        following = {**position, **target}
+        total += math.dist(
+            [position[axis] for axis in "xyz"], [following[axis] for axis in "xyz"]
+        )
+        position = following
+    return total
+
+
+def test_weeding_retries_follow_the_lua_travel_legs():
+    settings = {
+        "approach_speed_percent": 100,
+        "cut_speed_percent": 50,
+        "tool_height_mm": 80,
+        "height_step_mm": 5,
+        "max_attempts": 3,
+        "motor_pin": 10,
+        "current_pin": 59,
+        "max_load": 600,
+    }
+    weed = {
+        "transit_start": {"x": 400, "y": 400},
+        "start": {"x": 450, "y": 500},
+        "end": {"x": 550, "y": 500},
+        "soil_z": -200,
+        "travel_z": 0,
+    }
+    source = weeding_lua.prelude("abc123", settings)
+    # Between an overloaded cut and the next lowering the Lua goes back to
+    # the pass's start at safe Z, swaps the ends, then crosses to the new start.
+    loop_end = source.index("\n  end\n  off(motor)")
+    retry = source[source.index("off(motor); move({x=fromx") : loop_end]
+    assert re.findall(r"move\(\{x=(\w+),y=(\w+),z=safez", retry) == [
+        ("fromx", "fromy"),
+        ("fromx", "fromy"),
+    ]
+    assert retry.index("fromx=tox") < retry.rindex("move(")
+
+    a, b = {"x": 450.0, "y": 500.0}, {"x": 550.0, "y": 500.0}
+    lead_in = [
+        ({"z": 0.0}, 100, False),
+        ({"x": 400.0, "y": 400.0, "z": 0.0}, 100, False),
+        ({**a, "z": 0.0}, 100, False),
+    ]
+    retract = [({"z": 0.0}, 100, False), ({**b, "z": 0.0}, 100, False)]
+    legs = weed_legs(weed, settings, attempts=3)
+    assert legs == [
+        *lead_in,
+        ({**a, "z": -120.0}, 100, False),
+        ({**b, "z": -120.0}, 50, False),
+        ({**a, "z": 0.0}, 100, False),
+        ({**b, "z": 0.0}, 100, False),
+        ({**b, "z": -120.0}, 100, False),
+        ({**a, "z": -120.0}, 25, False),
+        ({**b, "z": 0.0}, 100, False),
+        ({**a, "z": 0.0}, 100, False),
+        # The second overload raised the working height by one step.
+        ({**a, "z": -115.0}, 100, False),
+        ({**b, "z": -115.0}, 25, False),
+        *retract,
+    ]
+    once = weed_legs(weed, settings)
+    # Each retry adds the two travel legs, a lowering and a reverse cut.
+    assert len(legs) - len(once) == 2 * 4
+    retreat = math.hypot(100, 120) + 100
+    passes = (120 + 100) + (115 + 100)
+    # The last pass retracts 5 mm less, from the raised working height.
+    assert _path_mm(ORIGIN, legs) - _path_mm(ORIGIN, once) == pytest.approx(
+        2 * retreat + passes - 5
+    )
+
+
+def test_timeouts_follow_the_estimate():
+    assert rpc_timeout(0) == MOTION_TIMEOUT_MARGIN_SECONDS
+    assert rpc_timeout(100) > 100
+    assert rpc_timeout(10) < rpc_timeout(100)
+
+
+def test_manager_move_timeouts_scale_with_distance():
+    entry = ConfigEntry(
+        entry_id="entry-1",
+        unique_id="42",
+        domain="farmbot",
+        data={"token": "tok", "device_id": 42, "mqtt_host": "mqtt.example.com"},
+        options={},
+    )
+    manager = FarmbotManager(FakeHass(), "tok", "42", "mqtt.example.com", entry=entry)
+    manager._motion = MotionModel(FIRMWARE)
+    manager.status = {"location_data": {"position": {"x": 0.0, "y": 0.0, "z": 0.0}}}
+
+    hop = manager._move_timeout({"x": 10, "y": 0, "z": 0}, safe_z=True)
+    across = manager._move_timeout({"x": 3000, "y": 1500, "z": -400}, safe_z=True)
+
+    # A short hop is given well under the old fixed two minutes...
+    assert hop < 30
+    # ...while a full traverse at 100 mm/s gets more than it needs.
+    assert across > 30 + 4 + 4
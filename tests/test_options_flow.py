@@ -35,6 +35,8 @@ def test_options_form_defaults_match_documented_defaults():
     defaults = {str(key): key.default() for key in schema_dict}
     assert defaults["vision_enabled"] is False
     assert defaults["vision_heartbeat_timeout_minutes"] == 10
+    assert defaults["coordinate_deadband_mm"] == 1.0
+    assert defaults["coordinate_min_interval_seconds"] == 2.0
 
 
 def test_options_form_shows_currently_saved_values_as_defaults():
@@ -0,0 +1,223 @@
+"""Outbound CeleryScript lanes, in-flight limits and bounded queues."""
+
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.farmbot.const import (
+    OUTBOUND_INFLIGHT_EXPIRY_SECONDS,
+    OUTBOUND_LANE_INFLIGHT_LIMITS,
+    OUTBOUND_LANE_QUEUE_LIMIT,
+)
+from custom_components.farmbot.manager import FarmbotManager
+from custom_components.farmbot.outbound import (
+    OutboundCommandScheduler,
+    OutboundQueueFull,
+    command_lane,
+)
+
+from .helpers import FakeHass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _rpc(label, *commands):
+    return {
+        "kind": "rpc_request",
+        "args": {"label": label, "priority": 600},
+        "body": list(commands),
+    }
+
+
+def _move(x=0):
+    return {"kind": "move", "args": {}, "body": [{"kind": "axis_overwrite", "args": {"x": x}}]}
+
+
+def _write_pin(pin, value):
+    return {"kind": "write_pin", "args": {"pin_number": pin, "pin_value": value, "pin_mode": 0}}
+
+
+def _scheduler(**kwargs):
+    published = []
+    clock = FakeClock()
+    scheduler = OutboundCommandScheduler(
+        lambda rpc: published.append(rpc["args"]["label"]), clock=clock, **kwargs
+    )
+    return scheduler, published, clock
+
+
+def test_commands_are_classified_by_celeryscript_kind():
+    assert command_lane([{"kind": "emergency_lock"}]) == "safety"
+    assert command_lane([{"kind": "emergency_unlock"}]) == "safety"
+    assert command_lane([_write_pin(7, 1)]) == "io"
+    assert command_lane([{"kind": "read_status", "args": {}}]) == "io"
+    assert command_lane([_move()]) == "motion"
+    assert command_lane([{"kind": "lua", "args": {"lua": "x"}}]) == "motion"
+    # Anything mixing I/O with motion waits its turn as motion.
+    assert command_lane([_write_pin(7, 1), _move()]) == "motion"
+
+
+def test_motion_waits_for_acknowledgements_and_estop_bypasses_the_queue():
+    failed = []
+    scheduler, published, _ = _scheduler(on_failed=lambda label, err: failed.append(label))
+    limit = OUTBOUND_LANE_INFLIGHT_LIMITS["motion"]
+    for index in range(limit + 2):
+        scheduler.submit(_rpc(f"m{index}", _move(index)))
+    assert published == [f"m{index}" for index in range(limit)]
+
+    scheduler.acknowledge("m0")
+    assert published[-1] == f"m{limit}"
+
+    scheduler.submit(_rpc("stop", {"kind": "emergency_lock"}))
+    assert published[-1] == "stop"
+    # The move still waiting when the bot was stopped must never be sent.
+    assert failed == [f"m{limit + 1}"]
+    scheduler.acknowledge("m1")
+    assert f"m{limit + 1}" not in published
+    assert scheduler.metrics()["motion"]["queued"] == 0
+
+
+def test_io_is_not_blocked_by_long_motion():
+    scheduler, published, _ = _scheduler()
+    for index in range(OUTBOUND_LANE_INFLIGHT_LIMITS["motion"]):
+        scheduler.submit(_rpc(f"m{index}", _move(index)), awaited=True)
+    scheduler.submit(_rpc("pin", _write_pin(7, 1)))
+    assert published[-1] == "pin"
+
+
+def test_queued_pin_writes_merge_last_write_wins():
+    scheduler, published, _ = _scheduler()
+    limit = OUTBOUND_LANE_INFLIGHT_LIMITS["io"]
+    for index in range(limit):
+        scheduler.submit(_rpc(f"busy{index}", {"kind": "read_status", "args": {}}), awaited=True)
+    scheduler.submit(_rpc("on", _write_pin(7, 1)))
+    scheduler.submit(_rpc("off", _write_pin(7, 0)))
+    scheduler.submit(_rpc("on-again", _write_pin(7, 1)))
+    metrics = scheduler.metrics()["io"]
+    assert metrics["queued"] == 1
+    assert metrics["merged"] == 2
+
+    captured = []
+    scheduler._publish = captured.append
+    scheduler.acknowledge("busy0")
+    assert len(captured) == 1
+    assert captured[0]["args"]["label"] == "on"
+    assert captured[0]["body"][0]["args"]["pin_value"] == 1
+
+    # The same write while that one is still unacknowledged is not sent twice.
+    scheduler.submit(_rpc("dup", _write_pin(7, 1)))
+    assert len(captured) == 1
+
+
+def test_on_off_on_inside_the_ack_window_leaves_the_pin_on():
+    scheduler, _, _ = _scheduler()
+    captured = []
+    scheduler._publish = captured.append
+    scheduler.submit(_rpc("on", _write_pin(7, 1)))
+    scheduler.submit(_rpc("off", _write_pin(7, 0)))
+    # Identical to the first write, but not to the last one sent.
+    scheduler.submit(_rpc("on-again", _write_pin(7, 1)))
+    assert [rpc["body"][0]["args"]["pin_value"] for rpc in captured] == [1, 0, 1]
+
+    # Repeating the last write while it is unacknowledged is still skipped.
+    scheduler.submit(_rpc("dup", _write_pin(7, 1)))
+    assert len(captured) == 3
+
+
+def test_full_queue_drops_oldest_unawaited_and_refuses_when_all_are_awaited():
+    scheduler, published, _ = _scheduler()
+    for index in range(OUTBOUND_LANE_INFLIGHT_LIMITS["motion"]):
+        scheduler.submit(_rpc(f"m{index}", _move(index)), awaited=True)
+    for index in range(OUTBOUND_LANE_QUEUE_LIMIT):
+        scheduler.submit(_rpc(f"q{index}", _move(index)))
+    scheduler.submit(_rpc("newest", _move()))
+    assert scheduler.metrics()["motion"]["dropped"] == 1
+
+    awaited, _, _ = _scheduler()
+    for index in range(OUTBOUND_LANE_INFLIGHT_LIMITS["motion"] + OUTBOUND_LANE_QUEUE_LIMIT):
+        awaited.submit(_rpc(f"a{index}", _move(index)), awaited=True)
+    with pytest.raises(OutboundQueueFull):
+        awaited.submit(_rpc("refused", _move()), awaited=True)
+
+
+def test_lost_acknowledgements_expire_and_latency_is_measured():
+    wakeups = []
+    scheduler, published, clock = _scheduler(on_wakeup=wakeups.append)
+    limit = OUTBOUND_LANE_INFLIGHT_LIMITS["motion"]
+    for index in range(limit + 1):
+        scheduler.submit(_rpc(f"m{index}", _move(index)))
+    assert wakeups == [OUTBOUND_INFLIGHT_EXPIRY_SECONDS]
+
+    clock.now += OUTBOUND_INFLIGHT_EXPIRY_SECONDS
+    scheduler.pump()
+    assert published[-1] == f"m{limit}"
+
+    metrics = scheduler.metrics()["motion"]
+    assert metrics["expired"] == limit
+    assert metrics["published"] == limit + 1
+    assert metrics["publish_wait_ms"]["samples"] == limit + 1
+    assert metrics["publish_wait_ms"]["max"] == OUTBOUND_INFLIGHT_EXPIRY_SECONDS * 1000
+
+
+def _connected_manager():
+    manager = FarmbotManager(FakeHass(), "tok", "42", "mqtt.example.com")
+    manager._mqtt = MagicMock()
+    manager._mqtt_connected = True
+    return manager
+
+
+def _published_labels(manager):
+    return [
+        json.loads(call.args[1])["args"]["label"] for call in manager._mqtt.publish.call_args_list
+    ]
+
+
+def test_queued_awaited_rpc_is_published_when_a_slot_frees():
+    async def scenario():
+        manager = _connected_manager()
+        limit = OUTBOUND_LANE_INFLIGHT_LIMITS["motion"]
+        waiters = [
+            asyncio.create_task(manager.async_rpc_request([_move(index)], label=f"m{index}"))
+            for index in range(limit + 1)
+        ]
+        await asyncio.sleep(0)
+        assert _published_labels(manager) == [f"m{index}" for index in range(limit)]
+
+        manager._resolve_rpc_response({"kind": "rpc_ok", "args": {"label": "m0"}})
+        assert _published_labels(manager)[-1] == f"m{limit}"
+        for index in range(1, limit + 1):
+            manager._resolve_rpc_response({"kind": "rpc_ok", "args": {"label": f"m{index}"}})
+        results = await asyncio.gather(*waiters)
+        assert all(result["kind"] == "rpc_ok" for result in results)
+        assert manager.outbound_metrics()["motion"]["in_flight"] == 0
+        await manager.async_close()
+
+    asyncio.run(scenario())
+
+
+def test_estop_fails_queued_awaited_motion_immediately():
+    async def scenario():
+        manager = _connected_manager()
+        limit = OUTBOUND_LANE_INFLIGHT_LIMITS["motion"]
+        waiters = [
+            asyncio.create_task(manager.async_rpc_request([_move(index)], label=f"m{index}"))
+            for index in range(limit + 1)
+        ]
+        await asyncio.sleep(0)
+        manager.send_rpc_request([{"kind": "emergency_lock"}], priority=9000, label="stop")
+        assert _published_labels(manager)[-1] == "stop"
+
+        with pytest.raises(RuntimeError, match="emergency-stopped"):
+            await waiters[-1]
+        await manager.async_close()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(scenario())
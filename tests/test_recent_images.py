@@ -0,0 +1,97 @@
+"""The coordinate-indexed cache of recent images behind photo-grid reuse."""
+
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.farmbot.recent_images import RecentImages
+
+NOW = dt_util.utcnow()
+
+
+def _image(image_id, x, y, z=-1.0, *, minutes_ago=1, device_id=42, processed=True):
+    return {
+        "id": image_id,
+        "device_id": device_id,
+        "attachment_processed_at": "done" if processed else None,
+        "created_at": (NOW - timedelta(minutes=minutes_ago)).isoformat(),
+        "meta": {"x": x, "y": y, "z": z},
+    }
+
+
+def _cache():
+    return RecentImages(cell_mm=25, max_age=timedelta(hours=24), clock=lambda: NOW)
+
+
+def test_only_ready_images_of_this_device_with_coordinates_are_indexed():
+    cache = _cache()
+    added = cache.update(
+        [
+            _image(1, 100, 100),
+            _image(2, 200, 200, device_id=7),
+            _image(3, 300, 300, processed=False),
+            {"id": 4, "device_id": 42, "attachment_processed_at": "done", "meta": {}},
+            _image(5, 400, 400, minutes_ago=25 * 60),
+        ],
+        device_id="device_42",
+    )
+    assert added == 1
+    assert len(cache) == 1
+    # Images already seen are skipped on the next listing.
+    assert cache.update([_image(1, 100, 100), _image(6, 120, 100)], device_id=42) == 1
+
+
+def test_nearest_crosses_bucket_edges_and_respects_radius_and_age():
+    cache = _cache()
+    cache.update(
+        [
+            _image(1, 49.0, 10.0, minutes_ago=2),
+            _image(2, 52.0, 10.0, minutes_ago=30),
+            _image(3, 90.0, 10.0),
+        ],
+        device_id=42,
+    )
+    target = {"x": 51.0, "y": 10.0, "z": -1.0}
+
+    distance, image = cache.nearest(target, radius_mm=25, since=NOW - timedelta(hours=1))
+    assert (image.image_id, distance) == (2, 1.0)
+    # Image 2 is older than ten minutes; image 1 is in the neighbouring bucket.
+    distance, image = cache.nearest(target, radius_mm=25, since=NOW - timedelta(minutes=10))
+    assert (image.image_id, distance) == (1, 2.0)
+    assert cache.nearest({"x": 500, "y": 500, "z": 0}, radius_mm=25, since=NOW) is None
+
+
+def test_images_missing_from_a_listing_are_dropped():
+    """A photo deleted in the app must never stand in for a cell."""
+    cache = _cache()
+    cache.update([_image(1, 100, 100), _image(2, 300, 300)], device_id=42)
+    assert cache.update([_image(2, 300, 300)], device_id=42) == 0
+    assert 1 not in cache and 2 in cache
+    assert (
+        cache.nearest({"x": 100, "y": 100, "z": -1}, radius_mm=25, since=NOW - timedelta(hours=1))
+        is None
+    )
+    cache.discard(2)
+    assert len(cache) == 0
+
+
+def test_bookkeeping_stays_bounded_by_the_listing():
+    cache = _cache()
+    for start in range(0, 5000, 500):
+        listing = [
+            _image(image_id, 10.0 * (image_id % 50), 10.0, minutes_ago=25 * 60 * (image_id % 2))
+            for image_id in range(start, start + 500)
+        ]
+        cache.update(listing, device_id=42)
+        assert len(cache._seen) <= len(listing)
+        assert len(cache) == 250
+        assert len(cache._by_age) <= 2 * len(cache) + 64
+
+
+def test_images_age_out_oldest_first():
+    now = [NOW]
+    cache = RecentImages(cell_mm=25, max_age=timedelta(hours=1), clock=lambda: now[0])
+    cache.update([_image(1, 0, 0, minutes_ago=50), _image(2, 0, 0, minutes_ago=10)], device_id=42)
+    now[0] = NOW + timedelta(minutes=20)
+    cache.prune()
+    assert 1 not in cache and 2 in cache
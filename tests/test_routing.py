@@ -0,0 +1,150 @@
+"""Visiting-order optimisation for photo-grid repairs and weeding runs."""
+
+import random
+
+from custom_components.farmbot.motion import MotionModel
+from custom_components.farmbot.routing import (
+    optimize_route,
+    order_weeds,
+    plan_z_travel,
+    weed_transit_mm,
+)
+
+FIRMWARE = {
+    "movement_max_spd_x": 800,
+    "movement_max_spd_y": 400,
+    "movement_max_spd_z": 1000,
+    "movement_step_per_mm_x": 5,
+    "movement_step_per_mm_y": 5,
+    "movement_step_per_mm_z": 25,
+}
+START = {"x": 0.0, "y": 0.0, "z": 0.0}
+
+
+def test_scattered_cells_are_reordered_and_indexes_are_kept():
+    rng = random.Random(7)
+    targets = [
+        {"x": rng.uniform(0, 2600), "y": rng.uniform(0, 1200), "z": -100.0, "index": n}
+        for n in range(40)
+    ]
+    cost = MotionModel(FIRMWARE).move_seconds
+
+    ordered, before, after = optimize_route(START, targets, cost, time_budget=1.0)
+
+    assert sorted(item["index"] for item in ordered) == list(range(40))
+    assert all(item is targets[item["index"]] for item in ordered)
+    # Random order is dreadful; the optimised route should be far shorter.
+    assert after < before * 0.5
+
+
+def test_an_already_optimal_route_is_left_alone():
+    targets = [{"x": 100.0 * n, "y": 0.0, "z": 0.0, "index": n} for n in range(1, 10)]
+    cost = MotionModel(FIRMWARE).move_seconds
+
+    ordered, before, after = optimize_route(START, targets, cost, time_budget=1.0)
+
+    assert ordered == targets
+    assert after == before
+
+
+def test_a_spent_budget_still_returns_a_valid_route():
+    targets = [{"x": 100.0 * n, "y": 0.0, "z": 0.0, "index": n} for n in (5, 1, 3)]
+    cost = MotionModel(FIRMWARE).move_seconds
+
+    ordered, before, after = optimize_route(START, targets, cost, time_budget=0.0)
+
+    # Nearest-neighbour alone already fixes a line.
+    assert [item["index"] for item in ordered] == [1, 3, 5]
+    assert after < before
+
+
+def _cut(weed_id, x, y, dx, dy=0.0, **extra):
+    start = {"x": x, "y": y}
+    return {
+        "weed_id": weed_id,
+        "transit_start": dict(start),
+        "start": start,
+        "end": {"x": x + dx, "y": y + dy},
+        **extra,
+    }
+
+
+def test_weeds_are_reordered_and_reversed_to_cut_instead_of_travel():
+    # Request order ping-pongs along the bed; every cut points back at 0.
+    weeds = [
+        _cut(1, 1100, 0, -100),
+        _cut(2, 300, 0, -100),
+        _cut(3, 700, 0, -100),
+        _cut(4, 1500, 0, -100),
+    ]
+
+    ordered, before, after = order_weeds({"x": 0, "y": 0}, weeds, time_budget=1.0)
+
+    assert [weed["weed_id"] for weed in ordered] == [2, 3, 1, 4]
+    assert all(weed["reversed"] for weed in ordered)
+    assert ordered[0]["start"] == {"x": 200, "y": 0}
+    assert ordered[0]["transit_start"] == ordered[0]["start"]
+    # 200 mm to the first cut, then 300 mm between each.
+    assert after == 200 + 3 * 300
+    assert before == weed_transit_mm({"x": 0, "y": 0}, weeds)
+    assert after < before
+
+
+def test_planned_approaches_keep_their_direction():
+    lane = _cut(1, 500, 0, -100, approach_waypoints=[{"x": 500, "y": 200}])
+    offset = {**_cut(2, 900, 0, -100), "transit_start": {"x": 900, "y": 100}}
+
+    ordered, _before, _after = order_weeds({"x": 0, "y": 0}, [lane, offset], time_budget=1.0)
+
+    assert not any(weed.get("reversed") for weed in ordered)
+    assert {weed["weed_id"] for weed in ordered} == {1, 2}
+
+
+def test_a_tool_run_starts_and_finishes_at_the_slot():
+    slot = {"x": 0, "y": 0}
+    weeds = [_cut(1, 0, 900, 0, 100), _cut(2, 0, 100, 0, 100), _cut(3, 0, 500, 0, 100)]
+
+    ordered, before, after = order_weeds(slot, weeds, finish=slot, time_budget=1.0)
+
+    # Out along the bed and back; the return leg to the slot counts.
+    assert [weed["weed_id"] for weed in ordered] == [2, 3, 1]
+    assert after == 100 + 300 + 300 + 1000
+    assert after == weed_transit_mm(slot, ordered, finish=slot)
+    assert weed_transit_mm(slot, ordered) == after - 1000
+    assert after < before
+
+
+def test_z_plan_keeps_safe_z_below_the_clearance_margin():
+    cells = [{"x": 100.0 * n, "y": 0.0, "z": -200.0, "index": n} for n in range(3)]
+
+    travel, summary = plan_z_travel(
+        cells, z_top=0.0, top_margin=25.0, span=20.0, safe_height=0.0
+    )
+
+    assert travel == [None, None, None]
+    assert summary["safe_z_moves"] == 3
+    assert summary["z_travel_saved_mm"] == 0
+
+
+def test_z_plan_measures_height_from_the_home_end_of_either_axis_direction():
+    """Without ``movement_home_up_z`` the axis runs [0, L] and the top is 0."""
+    down = [{"x": 100.0 * n, "y": 0.0, "z": z, "index": n} for n, z in enumerate((-10, -5, -15))]
+    up = [{**cell, "z": -cell["z"]} for cell in down]
+
+    travel_down, summary_down = plan_z_travel(
+        down, z_top=0.0, top_margin=25.0, span=20.0, safe_height=0.0
+    )
+    travel_up, summary_up = plan_z_travel(
+        up, z_top=0.0, top_margin=25.0, span=20.0, safe_height=0.0
+    )
+
+    assert travel_down == [None, -5.0, -5.0]
+    assert travel_up == [None, 5.0, 5.0]
+    # Retracting to 0 and back would cost 15 + 20 mm; crossing at 5 costs 5 + 10.
+    assert summary_up["z_travel_saved_mm"] == summary_down["z_travel_saved_mm"] == 20.0
+    assert summary_up["safe_z_moves"] == 1
+    # Deep in a [0, L] axis is far from the top, so safe_z is kept.
+    deep = [{**cell, "z": 400.0 + cell["z"]} for cell in up]
+    travel, summary = plan_z_travel(deep, z_top=0.0, top_margin=25.0, span=20.0, safe_height=0.0)
+    assert travel == [None, None, None]
+    assert summary["z_travel_saved_mm"] == 0
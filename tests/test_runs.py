@@ -0,0 +1,139 @@
+"""Bounded, persistent run records."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.config_entries import ConfigEntry
+
+from custom_components.farmbot.const import RUN_RECORD_SAVE_DELAY_SECONDS
+from custom_components.farmbot.manager import FarmbotManager
+from custom_components.farmbot.runs import RunRecords, RunRecordStore, compact_record
+
+from .helpers import FakeHass
+
+NOW = datetime(2026, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _record(run_id, status="complete", age_days=0):
+    return {
+        "run_id": run_id,
+        "status": status,
+        "created_at": (NOW - timedelta(days=age_days)).isoformat(),
+    }
+
+
+def test_count_retention_only_evicts_finished_records():
+    records = RunRecords(max_count=3, clock=lambda: NOW)
+    records["running"] = _record("running", status="running")
+    for n in range(4):
+        records[f"done{n}"] = _record(f"done{n}")
+
+    assert list(records) == ["running", "done2", "done3"]
+    assert [item["run_id"] for item in records.recent(2)] == ["done3", "done2"]
+
+
+def test_age_retention_drops_old_finished_records():
+    records = RunRecords(max_count=10, max_age=timedelta(days=7), clock=lambda: NOW)
+    records["old"] = _record("old", age_days=30)
+    records["queued"] = _record("queued", status="queued", age_days=30)
+    records["new"] = _record("new", age_days=1)
+
+    assert set(records) == {"queued", "new"}
+
+
+def test_compact_record_drops_empty_and_queue_only_fields():
+    assert compact_record(
+        {"run_id": "a", "message": None, "queue_position": 2, "frames": [], "status": "failed"}
+    ) == {"run_id": "a", "frames": [], "status": "failed"}
+
+
+def test_compact_record_pins_the_persisted_shape_of_bulky_records():
+    target = {"index": 3, "x": 100.0, "y": 200.0, "z": -50.0}
+    capture = {
+        "capture_id": "c",
+        "status": "complete",
+        "before_image_ids": list(range(5000)),
+        "expected_frames": [{"x": 1.0, "y": 2.0, "z": 3.0}] * 3,
+        "frames": [{"image_id": 7, "x": 1.0, "y": 2.0, "z": 3.0}],
+    }
+    repair = {
+        "repair_id": "r",
+        "status": "complete",
+        "targets": [target, {"index": 4, "x": 1.0, "y": 1.0, "z": 0.0}],
+        "completed_targets": [target],
+        "failed_targets": [],
+        "frames": [{"image_id": 8, "x": 100.0, "y": 200.0, "z": -50.0, "target_index": 3}],
+    }
+
+    assert compact_record(capture) == {
+        "capture_id": "c",
+        "status": "complete",
+        "frames": [{"image_id": 7, "x": 1.0, "y": 2.0, "z": 3.0}],
+    }
+    assert compact_record(repair) == {
+        "repair_id": "r",
+        "status": "complete",
+        "targets": [{"index": 3}, {"index": 4}],
+        "completed_targets": [{"index": 3}],
+        "failed_targets": [],
+        "frames": repair["frames"],
+    }
+    # The live record is left alone.
+    assert len(capture["before_image_ids"]) == 5000
+
+
+def _manager(hass):
+    entry = ConfigEntry(
+        entry_id="entry-1",
+        unique_id="42",
+        domain="farmbot",
+        data={"token": "tok", "device_id": 42, "mqtt_host": "mqtt.example.com"},
+        options={},
+    )
+    return FarmbotManager(hass, "tok", "42", "mqtt.example.com", entry=entry)
+
+
+def test_records_survive_a_restart_and_unfinished_runs_are_failed():
+    async def scenario():
+        hass = FakeHass()
+        manager = _manager(hass)
+        await manager.async_load_run_records()
+        manager.gcode_runs["done"] = {"run_id": "done", "status": "complete", "message": "ok"}
+        manager.weeding_runs["mid"] = {
+            "run_id": "mid",
+            "status": "running",
+            "queue_position": None,
+            "created_at": _now(),
+        }
+        # Writes are debounced rather than made per change.
+        store = manager._runs._store
+        assert store.delayed_saves == [RUN_RECORD_SAVE_DELAY_SECONDS] * 2
+        await manager.async_close()
+
+        restarted = _manager(hass)
+        await restarted.async_load_run_records()
+        assert restarted.gcode_run("done")["message"] == "ok"
+        interrupted = restarted.weeding_run("mid")
+        assert interrupted["status"] == "failed"
+        assert "restart" in interrupted["message"]
+        assert "queue_position" not in interrupted
+        assert restarted.recent_runs(1)["gcode_runs"] == [
+            {"run_id": "done", "status": "complete", "message": "ok"}
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_without_an_entry_records_are_kept_in_memory_only():
+    async def scenario():
+        store = RunRecordStore(FakeHass(), None)
+        store.kinds["gcode_runs"]["a"] = {"run_id": "a", "status": "complete", "created_at": _now()}
+        await store.async_load()
+        await store.async_flush()
+        assert list(store.kinds["gcode_runs"]) == ["a"]
+
+    asyncio.run(scenario())
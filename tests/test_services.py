@@ -2,7 +2,7 @@
 
 Exercises _async_register_services / _async_remove_services_if_last_entry
 against the stub hass.services registry, and validates
-SERVICE_MOVE_TO_SCHEMA directly. No network or MQTT calls are made.
+SERVICE_MOVE_TO_SCHEMA (and the raw G-code options) directly. No network or MQTT calls are made.
 """
 import pytest
 import voluptuous as vol
@@ -13,6 +13,7 @@ from custom_components.farmbot import (
     SERVICE_EXECUTE_SEQUENCE,
     SERVICE_MOVE_TO,
     SERVICE_MOVE_TO_SCHEMA,
+    SERVICE_START_VISION_GCODE_SCHEMA,
     _async_register_services,
     _async_remove_services_if_last_entry,
 )
@@ -91,6 +92,49 @@ def test_move_to_schema_rejects_speed_out_of_range(speed):
         SERVICE_MOVE_TO_SCHEMA({"config_entry_id": "entry-1", "x": 1, "speed": speed})
 
 
+# ---------------------- SERVICE_START_VISION_GCODE_SCHEMA ----------------------
+
+_GCODE_CALL = {
+    "config_entry_id": "entry-1",
+    "lines": ["G90", "G00 X10"],
+    "acknowledge_experimental": True,
+}
+
+
+def test_gcode_schema_accepts_a_simplify_tolerance():
+    result = SERVICE_START_VISION_GCODE_SCHEMA({**_GCODE_CALL, "simplify_tolerance_mm": "0.5"})
+    assert result["simplify_tolerance_mm"] == 0.5
+
+
+def test_gcode_schema_takes_lines_or_a_plan_id_but_not_both():
+    plan = {key: value for key, value in _GCODE_CALL.items() if key != "lines"}
+    assert SERVICE_START_VISION_GCODE_SCHEMA({**plan, "plan_id": "a" * 32})["plan_id"] == "a" * 32
+    with pytest.raises(vol.Invalid):
+        SERVICE_START_VISION_GCODE_SCHEMA(plan)
+    with pytest.raises(vol.Invalid):
+        SERVICE_START_VISION_GCODE_SCHEMA({**_GCODE_CALL, "plan_id": "a" * 32})
+
+
+def test_gcode_schema_takes_a_shape_in_place_of_lines():
+    call = {key: value for key, value in _GCODE_CALL.items() if key != "lines"}
+    shape = {"kind": "circle", "center_x": "500", "center_y": 500, "radius": 80}
+
+    result = SERVICE_START_VISION_GCODE_SCHEMA({**call, "shape": shape})
+
+    assert result["shape"]["center_x"] == 500.0
+    assert result["shape"]["chord_tolerance_mm"] == 0.5
+    with pytest.raises(vol.Invalid):
+        SERVICE_START_VISION_GCODE_SCHEMA({**_GCODE_CALL, "shape": shape})
+    with pytest.raises(vol.Invalid):
+        SERVICE_START_VISION_GCODE_SCHEMA({**call, "shape": {**shape, "kind": "star"}})
+
+
+@pytest.mark.parametrize("tolerance", [0, 5.5])
+def test_gcode_schema_rejects_a_simplify_tolerance_out_of_range(tolerance):
+    with pytest.raises(vol.Invalid):
+        SERVICE_START_VISION_GCODE_SCHEMA({**_GCODE_CALL, "simplify_tolerance_mm": tolerance})
+
+
 # --------------------------- service registration ---------------------------
 
 def test_register_services_registers_execute_sequence_and_move_to():
@@ -0,0 +1,152 @@
+"""Soil surface interpolation, incremental rebuilds and bulk height queries."""
+
+import math
+import random
+
+import pytest
+
+from custom_components.farmbot import soil_surface as soil_surface_module
+from custom_components.farmbot.soil_surface import SoilSurface
+
+
+@pytest.fixture(params=["array", "numpy"])
+def backend(request, monkeypatch):
+    """Run a test against the NumPy path and the ``array`` fallback."""
+    if request.param == "numpy":
+        monkeypatch.setattr(soil_surface_module, "_np", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(soil_surface_module, "_np", None)
+    return request.param
+
+
+def _point(point_id, x, y, z):
+    return {"id": point_id, "x": x, "y": y, "z": z}
+
+
+def _bed_points(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        _point(n, rng.uniform(0, 3000), rng.uniform(0, 1500), rng.uniform(-520, -480))
+        for n in range(count)
+    ]
+
+
+def test_nodes_on_a_point_take_its_height_and_between_points_the_weighted_mean(backend):
+    surface = SoilSurface((0, 1000), (0, 500), cell_mm=100, radius_mm=400)
+    surface.update([_point(1, 200, 200, -500), _point(2, 600, 200, -480)])
+
+    grid = surface.grid()
+    assert (grid["columns"], grid["rows"]) == (11, 6)
+    assert grid["z"][2][2] == -500.0
+    assert grid["z"][2][6] == -480.0
+    # Equidistant from both points.
+    assert grid["z"][2][4] == -490.0
+    # Closer to the first point: 100 mm against 300 mm, weights 9 to 1.
+    assert surface.heights([300], [200]) == [pytest.approx(-498.0)]
+
+
+def test_nodes_beyond_the_radius_of_every_point_are_unknown(backend):
+    surface = SoilSurface((0, 1000), (0, 500), cell_mm=100, radius_mm=250)
+    surface.update([_point(1, 200, 200, -500)])
+
+    grid = surface.grid()
+    assert grid["z"][2][2] == -500.0
+    assert grid["z"][0][9] is None
+    assert surface.heights([900, 200, 5000], [100, 200, 200]) == [None, -500.0, None]
+
+
+def test_an_incremental_update_matches_a_full_rebuild_and_touches_only_nearby_nodes(backend):
+    points = _bed_points(40)
+    surface = SoilSurface((0, 3000), (0, 1500), cell_mm=50, radius_mm=300)
+    surface.update(points)
+    nodes = surface.columns * surface.rows
+
+    moved = [dict(point) for point in points]
+    moved[3].update(x=moved[3]["x"] + 40, z=-470.0)
+    del moved[10]
+    moved.append(_point(99, 1500, 750, -505))
+    recomputed = surface.update(moved)
+
+    rebuilt = SoilSurface((0, 3000), (0, 1500), cell_mm=50, radius_mm=300)
+    rebuilt.update(moved)
+    assert 0 < recomputed < nodes / 2
+    assert surface.revision == 2
+    assert surface.grid() == rebuilt.grid()
+    assert surface.update(moved) == 0
+    assert surface.revision == 2
+
+
+def test_one_written_point_is_folded_in_without_a_full_rebuild(backend):
+    surface = SoilSurface((0, 3000), (0, 1500), cell_mm=50, radius_mm=300)
+    surface.update(_bed_points(20))
+
+    recomputed = surface.upsert(5, 100, 100, -400)
+
+    assert recomputed < surface.columns * surface.rows / 10
+    assert surface.heights([100], [100]) == [-400.0]
+    assert surface.upsert(5, 100, 100, -400) == 0
+
+
+def test_bulk_heights_are_bilinear_between_nodes(backend):
+    surface = SoilSurface((0, 3000), (0, 1500), cell_mm=50, radius_mm=400)
+    surface.update(_bed_points(60))
+    grid = surface.grid(decimals=9)["z"]
+
+    xs = [1025.0, 0.0, 3000.0, 1010.0]
+    ys = [510.0, 0.0, 1500.0, 500.0]
+    heights = surface.heights(xs, ys)
+
+    corners = [grid[10][20], grid[10][21], grid[11][20], grid[11][21]]
+    expected = (
+        corners[0] * 0.5 * 0.8
+        + corners[1] * 0.5 * 0.8
+        + corners[2] * 0.5 * 0.2
+        + corners[3] * 0.5 * 0.2
+    )
+    assert heights[0] == pytest.approx(expected)
+    assert heights[1] == pytest.approx(grid[0][0])
+    assert heights[2] == pytest.approx(grid[-1][-1])
+    assert heights[3] == pytest.approx(grid[10][20] * 0.8 + grid[10][21] * 0.2)
+
+
+def test_both_backends_give_the_same_surface(monkeypatch):
+    np = pytest.importorskip("numpy")
+    points = _bed_points(80)
+    rng = random.Random(3)
+    xs = [rng.uniform(-100, 3100) for _ in range(500)]
+    ys = [rng.uniform(-100, 1600) for _ in range(500)]
+    surfaces = {}
+    for name, module in (("array", None), ("numpy", np)):
+        monkeypatch.setattr(soil_surface_module, "_np", module)
+        surface = SoilSurface((0, 3000), (0, 1500), cell_mm=25, radius_mm=250)
+        surface.update(points)
+        surface.upsert(7, 1200, 600, -450)
+        surfaces[name] = (surface, surface.heights(xs, ys))
+
+    (reference, expected), (surface, heights) = surfaces["array"], surfaces["numpy"]
+    assert surface.grid(decimals=6) == reference.grid(decimals=6)
+    assert [value is None for value in heights] == [value is None for value in expected]
+    assert [value for value in heights if value is not None] == pytest.approx(
+        [value for value in expected if value is not None]
+    )
+
+
+def test_a_regridded_surface_keeps_its_points_and_bounds(backend):
+    surface = SoilSurface((0, 1000), (0, 500), cell_mm=100, radius_mm=400)
+    surface.update([_point(1, 200, 200, -500), _point(2, 600, 200, -480)])
+
+    finer = surface.regridded(50)
+
+    assert (finer.columns, finer.rows) == (21, 11)
+    assert len(finer) == 2
+    assert finer.heights([400], [200]) == [-490.0]
+    assert finer.fits((0, 1000), (0, 500), 50) and not finer.fits((0, 1000), (0, 500), 100)
+
+
+def test_oversized_grids_and_bad_bounds_are_refused():
+    with pytest.raises(ValueError, match="nodes"):
+        SoilSurface((0, 100000), (0, 100000), cell_mm=10)
+    with pytest.raises(ValueError, match="finite"):
+        SoilSurface((0, math.inf), (0, 100), cell_mm=10)
+    with pytest.raises(ValueError, match="reversed"):
+        SoilSurface((100, 0), (0, 100), cell_mm=10)
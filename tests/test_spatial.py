@@ -0,0 +1,238 @@
+"""The uniform-grid spatial index behind every coordinate match."""
+
+import itertools
+import math
+import random
+import time
+
+from custom_components.farmbot import spatial
+from custom_components.farmbot.manager import FarmbotManager
+
+
+def _brute_nearest(records, x, y, z=None, max_distance=math.inf):
+    best = None
+    for key, (rx, ry, rz) in records:
+        if z is None:
+            distance = math.hypot(rx - x, ry - y)
+        else:
+            distance = math.sqrt((rx - x) ** 2 + (ry - y) ** 2 + (rz - z) ** 2)
+        if distance <= max_distance and (best is None or distance < best[0]):
+            best = (distance, key)
+    return best
+
+
+def _scatter(count, seed):
+    rng = random.Random(seed)
+    return [
+        (key, (rng.uniform(0, 3000), rng.uniform(0, 1500), rng.uniform(-400, 0)))
+        for key in range(count)
+    ]
+
+
+def _index(records, cell_mm):
+    index = spatial.GridIndex(cell_mm)
+    for key, position in records:
+        index.insert(key, *position)
+    return index
+
+
+def test_coordinates_read_points_and_image_metadata():
+    assert spatial.coordinates({"x": 1, "y": 2, "z": 3, "meta": {"color": "red"}}) == (1, 2, 3)
+    assert spatial.coordinates({"id": 9, "meta": {"x": "4", "y": 5, "z": None}}) == (4, 5, 0)
+    assert spatial.coordinates({"x": 1, "y": math.nan}) is None
+    assert spatial.coordinates({"meta": {}}) is None
+    assert spatial.coordinates(None) is None
+
+
+def test_nearest_and_within_agree_with_a_linear_scan():
+    records = _scatter(800, seed=1)
+    index = _index(records, cell_mm=25)
+    rng = random.Random(2)
+    for _ in range(200):
+        x, y, z = rng.uniform(-100, 3100), rng.uniform(-100, 1600), rng.uniform(-400, 0)
+        for query_z in (z, None):
+            hit = index.nearest(x, y, query_z)
+            expected = _brute_nearest(records, x, y, query_z)
+            assert (hit[0], hit[1].key) == expected
+            bounded = index.nearest(x, y, query_z, max_distance=40)
+            expected = _brute_nearest(records, x, y, query_z, max_distance=40)
+            assert (bounded and (bounded[0], bounded[1].key)) == expected
+        found = [entry.key for _, entry in index.within(x, y, z, radius=60)]
+        assert sorted(found) == sorted(
+            key for key, position in records if math.dist(position, (x, y, z)) <= 60
+        )
+
+
+def test_incremental_updates_and_insertion_order_ties():
+    index = spatial.GridIndex(10)
+    index.insert("a", 5, 5, item="first")
+    index.insert("b", 5, 5, item="second")
+    assert index.nearest(5, 5)[1].item == "first"
+    index.remove("a")
+    assert "a" not in index and len(index) == 1
+    assert index.nearest(5, 5)[1].item == "second"
+    # Re-inserting moves an entry and makes it the newest.
+    index.insert("b", 500, 500, item="moved")
+    assert index.nearest(5, 5)[1].key == "b"
+    assert index.within(5, 5, radius=20) == []
+    assert index.nearest(5, 5, max_distance=20) is None
+    index.remove("b")
+    assert index.nearest(5, 5) is None
+
+
+def test_soil_frames_match_images_one_to_one():
+    images = [
+        {"id": 1, "meta": {"x": 100.0, "y": 200.0, "z": 0.0}},
+        {"id": 2, "meta": {"x": 100.5, "y": 200.0, "z": 0.0}},
+        {"id": 3, "meta": {"x": 100.0, "y": 215.0, "z": 0.0}},
+        {"id": 4, "meta": {"x": 400.0, "y": 200.0, "z": 0.0}},
+    ]
+    expected = [
+        {"x": 100.0, "y": 200.0, "z": 0.0},
+        {"x": 100.0, "y": 200.0, "z": 0.0},
+        {"x": 100.0, "y": 215.0, "z": 0.0},
+        {"x": 100.0, "y": 230.0, "z": 0.0},
+    ]
+    matched = FarmbotManager._match_soil_frames(images, expected)
+    assert [frame["image_id"] for frame in matched] == [1, 2, 3]
+
+
+def _timed(function):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def test_benchmark_ten_thousand_images_and_five_thousand_points():
+    """Each query at this scale must beat the linear scan it replaced.
+
+    The index is built once, as the image waits and the recent-image cache
+    do, then queried; the scan pays for every record on every query.
+    """
+    images = _scatter(10_000, seed=3)
+    points = _scatter(5_000, seed=4)
+    rng = random.Random(5)
+    queries = [
+        (rng.uniform(0, 3000), rng.uniform(0, 1500), rng.uniform(-400, 0)) for _ in range(200)
+    ]
+
+    for records, cell in ((images, 25.0), (points, 50.0)):
+        build_seconds, index = _timed(lambda: _index(records, cell))
+        index_seconds, hits = _timed(
+            lambda: [index.nearest(x, y, z, max_distance=cell) for x, y, z in queries]
+        )
+        scan_seconds, expected = _timed(
+            lambda: [_brute_nearest(records, x, y, z, max_distance=cell) for x, y, z in queries]
+        )
+        assert [hit and (hit[0], hit[1].key) for hit in hits] == expected
+        print(
+            f"{len(records)} records: build {build_seconds * 1000:.1f} ms, "
+            f"{len(queries)} indexed queries {index_seconds * 1000:.1f} ms, "
+            f"scan {scan_seconds * 1000:.1f} ms"
+        )
+        assert index_seconds * 10 < scan_seconds
+
+
+def _greedy(queries, records, gate):
+    remaining = dict(records)
+    pairs = {}
+    for position, query in enumerate(queries):
+        hit = _brute_nearest(list(remaining.items()), *query, max_distance=gate)
+        if hit is not None:
+            pairs[position] = hit
+            del remaining[hit[1]]
+    return pairs
+
+
+def test_assignment_recovers_the_frame_a_greedy_match_would_lose():
+    # Frame A's nearest image is the only one frame B can use.
+    index = _index([("near-b", (1.1, 0, 0)), ("only-a", (-1.2, 0, 0))], cell_mm=2.5)
+    queries = [(0.0, 0, 0), (2.0, 0, 0)]
+    assert len(_greedy(queries, [("near-b", (1.1, 0, 0)), ("only-a", (-1.2, 0, 0))], 2.5)) == 1
+
+    pairs = spatial.assign(queries, index, gate=2.5)
+    assert {position: entry.key for position, (_, entry) in pairs.items()} == {
+        0: "only-a",
+        1: "near-b",
+    }
+    assert len(index) == 2
+
+
+def test_assignment_is_optimal_on_small_random_clusters():
+    rng = random.Random(6)
+    for _ in range(150):
+        records = [(key, (rng.uniform(0, 6), rng.uniform(0, 6), 0.0)) for key in range(5)]
+        queries = [(rng.uniform(0, 6), rng.uniform(0, 6), 0.0) for _ in range(rng.randint(1, 6))]
+        pairs = spatial.assign(queries, _index(records, 2.5), gate=2.5)
+        assert len({entry.key for _, entry in pairs.values()}) == len(pairs)
+
+        best = (0, 0.0)
+        for chosen in itertools.product([None, *range(len(records))], repeat=len(queries)):
+            used = [key for key in chosen if key is not None]
+            if len(used) != len(set(used)):
+                continue
+            distances = [
+                math.dist(queries[position], records[key][1])
+                for position, key in enumerate(chosen)
+                if key is not None
+            ]
+            if any(distance > 2.5 for distance in distances):
+                continue
+            candidate = (len(distances), -sum(distances))
+            best = max(best, candidate)
+        found = (len(pairs), -sum(distance for distance, _ in pairs.values()))
+        assert found[0] == best[0]
+        assert math.isclose(found[1], best[1], abs_tol=1e-9)
+
+
+def test_benchmark_claiming_a_large_batch_of_new_images():
+    """Hundreds of triplet frames against a ready set with decoys.
+
+    The assignment must match at least as many frames as greedy matching,
+    never at a larger total distance, and stay fast at this size.
+    """
+    rng = random.Random(7)
+    expected = []
+    images = []
+    for point in range(200):
+        x, y = 50.0 + 14.0 * (point % 20), 50.0 + 14.0 * (point // 20)
+        for lateral in (-5.0, 0.0, 5.0):
+            expected.append({"x": x, "y": y + lateral, "z": -100.0})
+            images.append(
+                {
+                    "id": len(images) + 1,
+                    "meta": {
+                        "x": x + rng.uniform(-1.5, 1.5),
+                        "y": y + lateral + rng.uniform(-1.5, 1.5),
+                        "z": -100.0,
+                    },
+                }
+            )
+    for _ in range(400):
+        images.append(
+            {
+                "id": len(images) + 1,
+                "meta": {"x": rng.uniform(0, 400), "y": rng.uniform(0, 250), "z": -100.0},
+            }
+        )
+    rng.shuffle(images)
+
+    seconds, matched = _timed(lambda: FarmbotManager._match_soil_frames(images, expected))
+    records = [(image["id"], tuple(image["meta"][axis] for axis in "xyz")) for image in images]
+    queries = [tuple(frame[axis] for axis in "xyz") for frame in expected]
+    greedy_seconds, greedy = _timed(lambda: _greedy(queries, records, 2.5))
+    print(
+        f"{len(expected)} frames x {len(images)} images: assignment {seconds * 1000:.1f} ms, "
+        f"greedy scan {greedy_seconds * 1000:.1f} ms"
+    )
+
+    by_id = dict(records)
+    assert len({frame["image_id"] for frame in matched}) == len(matched)
+    assert len(matched) >= len(greedy)
+    total = sum(
+        math.dist(by_id[frame["image_id"]], tuple(frame[axis] for axis in "xyz"))
+        for frame in matched
+    )
+    if len(matched) == len(greedy):
+        assert total <= sum(distance for distance, _ in greedy.values()) + 1e-9
+    assert seconds < greedy_seconds
@@ -0,0 +1,139 @@
+"""Server-side shape generation for raw G-code runs."""
+
+import math
+
+import pytest
+
+from custom_components.farmbot.const import GCODE_MAX_MOVES
+from custom_components.farmbot.gcode import GcodeError
+from custom_components.farmbot.toolpath import (
+    arc_step,
+    circle_points,
+    raster_points,
+    shape_points,
+    shape_program,
+    spiral_points,
+)
+
+from .test_gcode import BOUNDS, FIRMWARE, START, parse
+
+
+def program(spec, *, start=None):
+    return shape_program(
+        spec,
+        start_position=dict(start or START),
+        axis_bounds=dict(BOUNDS),
+        firmware_config=dict(FIRMWARE),
+        feed_mm_per_min=600,
+    )
+
+
+def _sagitta(radius, a, b):
+    """How far the midpoint of chord a-b lies inside a circle of ``radius``."""
+    return radius - math.hypot((a[0] + b[0]) / 2 - 500, (a[1] + b[1]) / 2 - 500)
+
+
+@pytest.mark.parametrize("radius", [20.0, 100.0, 400.0])
+def test_circle_chords_stay_within_the_tolerance(radius):
+    points = circle_points(500, 500, radius, 0.5)
+
+    assert points[0] == pytest.approx(points[-1])
+    assert max(_sagitta(radius, a, b) for a, b in zip(points, points[1:])) <= 0.5 + 1e-9
+
+
+def test_a_larger_circle_needs_more_segments_for_the_same_tolerance():
+    assert len(circle_points(0, 0, 400, 0.5)) > len(circle_points(0, 0, 50, 0.5))
+    assert len(circle_points(0, 0, 400, 0.5)) > len(circle_points(0, 0, 400, 2.0))
+
+
+def test_a_loose_tolerance_still_leaves_a_tiny_circle_round():
+    assert arc_step(1.0, 5.0) == pytest.approx(math.pi / 8)
+    assert len(circle_points(0, 0, 1.0, 5.0)) == 17
+
+
+def test_a_spiral_widens_by_its_pitch_each_turn():
+    points = spiral_points(500, 500, 100, 10, 0.5, inner_radius=20)
+    radii = [math.hypot(x - 500, y - 500) for x, y in points]
+
+    assert radii[0] == pytest.approx(20)
+    assert radii[-1] == pytest.approx(100)
+    assert radii == sorted(radii)
+    # Eight turns at a 10 mm pitch from 20 mm out to 100 mm.
+    angles = [math.atan2(y - 500, x - 500) for x, y in points]
+    swept = sum((b - a) % (2 * math.pi) for a, b in zip(angles, angles[1:]))
+    assert swept == pytest.approx(8 * 2 * math.pi)
+
+
+def test_a_raster_snakes_across_the_rectangle_and_ends_on_its_far_edge():
+    points = raster_points(100, 100, 200, 125, 10)
+
+    assert points == [
+        (100, 100), (200, 100),
+        (200, 110), (100, 110),
+        (100, 120), (200, 120),
+        (200, 125), (100, 125),
+    ]  # fmt: skip
+    assert raster_points(100, 100, 200, 125, 10, along="y")[:4] == [
+        (100, 100), (100, 125), (110, 125), (110, 100),
+    ]  # fmt: skip
+
+
+@pytest.mark.parametrize(
+    ("spec", "expected"),
+    [
+        ({"kind": "star"}, "Unknown shape"),
+        ({"kind": "circle", "center_x": 1, "center_y": 1}, "needs radius"),
+        ({"kind": "circle", "center_x": 1, "center_y": 1, "radius": -1}, "positive"),
+        (
+            {"kind": "spiral", "center_x": 1, "center_y": 1, "radius": 5, "pitch_mm": 1,
+             "inner_radius": 5},
+            "inner radius",
+        ),
+        (
+            {"kind": "raster", "x_min": 5, "y_min": 0, "x_max": 5, "y_max": 10,
+             "spacing_mm": 1},
+            "greater than",
+        ),
+    ],
+)  # fmt: skip
+def test_an_invalid_shape_is_refused_by_name(spec, expected):
+    with pytest.raises(GcodeError, match=expected):
+        shape_points(spec)
+
+
+def test_a_shape_is_resolved_with_the_same_speed_rules_as_gcode():
+    circle = program({"kind": "circle", "center_x": 500, "center_y": 500, "radius": 100})
+
+    # Across at the current height to the first point; the start height is
+    # also the shape's, so there is no separate plunge.
+    assert circle.moves[0].target == {"x": 600.0, "y": 500.0, "z": 0.0}
+    assert circle.moves[0].source == "Circle point 1"
+    assert circle.moves[0].speeds == parse(["G90", "G00 X600 Y500"]).moves[0].speeds
+    assert circle.moves[-1].target["x"] == pytest.approx(600)
+    assert circle.feed_mm_per_min == 600
+
+
+def test_a_shape_below_the_current_height_travels_then_plunges():
+    raster = program(
+        {"kind": "raster", "x_min": 200, "y_min": 200, "x_max": 300, "y_max": 220,
+         "spacing_mm": 10, "z": -30}
+    )  # fmt: skip
+
+    assert [move.target for move in raster.moves[:3]] == [
+        {"x": 200.0, "y": 200.0, "z": 0.0},
+        {"x": 200.0, "y": 200.0, "z": -30.0},
+        {"x": 300.0, "y": 200.0, "z": -30.0},
+    ]
+
+
+def test_a_shape_that_leaves_the_bed_is_refused_at_the_first_bad_point():
+    with pytest.raises(GcodeError, match=r"Circle point \d+: Y-.* outside the Y axis"):
+        program({"kind": "circle", "center_x": 500, "center_y": 50, "radius": 100})
+
+
+def test_a_shape_with_too_many_points_is_refused():
+    with pytest.raises(GcodeError, match=f"limit is {GCODE_MAX_MOVES}"):
+        program(
+            {"kind": "circle", "center_x": 1000, "center_y": 500, "radius": 400,
+             "chord_tolerance_mm": 0.001}
+        )  # fmt: skip
@@ -35,6 +35,8 @@ from custom_components.farmbot import (
     SERVICE_GET_VISION_INVENTORY,
     SERVICE_GET_VISION_SOIL_CAPTURE,
     SERVICE_GET_VISION_SOIL_POINTS,
+    SERVICE_GET_VISION_SOIL_SURFACE,
+    SERVICE_GET_VISION_SOIL_SURVEY,
     SERVICE_LIST_VISION_BOTS,
     SERVICE_MOVE_TO,
     SERVICE_REMOVE_VISION_WEED,
@@ -42,6 +44,7 @@ from custom_components.farmbot import (
     SERVICE_REQUEST_VISION_ANALYSIS,
     SERVICE_START_VISION_GRID_REPAIR,
     SERVICE_START_VISION_SOIL_CAPTURE,
+    SERVICE_START_VISION_SOIL_SURVEY,
     SERVICE_UPDATE_VISION_WEED_RADIUS,
     SERVICE_UPSERT_VISION_SPREAD_CURVE,
     _async_register_services,
@@ -99,6 +102,7 @@ def test_registers_all_services_with_one_entry():
         SERVICE_APPLY_VISION_PLANT_CENTER,
         SERVICE_CREATE_VISION_WEED,
         SERVICE_GET_VISION_SOIL_POINTS,
+        SERVICE_GET_VISION_SOIL_SURFACE,
         SERVICE_START_VISION_SOIL_CAPTURE,
         SERVICE_GET_VISION_SOIL_CAPTURE,
         SERVICE_APPLY_VISION_SOIL_HEIGHT,
@@ -629,6 +633,92 @@ def test_get_vision_soil_points_filters_by_metadata_not_name():
     assert result["motion"]["axis_bounds"]["z"] == [-1200.0, 0.0]
 
 
+def test_get_vision_soil_surface_is_built_once_and_then_served_from_the_cache():
+    hass = FakeHass()
+    manager, _ = _make_bot(hass)
+    manager.api.points = {
+        70: _soil_point(),
+        71: _soil_point(71, x=300.0, z=-320.0),
+        72: _soil_point(72, meta={}, x=200.0, z=0.0),
+    }
+    _async_register_services(hass)
+    data = {
+        "config_entry_id": "entry-1",
+        "query": [{"x": 200, "y": 200}, {"x": 5900, "y": 200}],
+    }
+
+    first = _run(_call(hass, SERVICE_GET_VISION_SOIL_SURFACE, data))
+    fetches = manager.api.calls.count("async_get_points")
+    second = _run(_call(hass, SERVICE_GET_VISION_SOIL_SURFACE, data))
+
+    assert first["point_count"] == 2
+    assert first["heights"] == [-310.0, None]
+    assert (first["columns"], first["rows"], first["cell_mm"]) == (121, 61, 50.0)
+    assert first["z"][4][2] == -300.0 and first["z"][4][100] is None
+    assert first["origin"] == {"x": 0.0, "y": 0.0}
+    assert fetches == 1
+    assert manager.api.calls.count("async_get_points") == 1
+    assert second["revision"] == first["revision"]
+    assert second["z"] == first["z"]
+
+
+def test_soil_surface_follows_fetched_and_written_soil_points():
+    hass = FakeHass()
+    manager, _ = _make_bot(hass)
+    manager.api.points = {70: _soil_point(), 71: _soil_point(71, x=300.0, z=-320.0)}
+    _async_register_services(hass)
+    query = {"config_entry_id": "entry-1", "query": [{"x": 200, "y": 200}]}
+    first = _run(_call(hass, SERVICE_GET_VISION_SOIL_SURFACE, query))
+
+    manager.api.points[71]["z"] = -340.0
+    _run(_call(hass, SERVICE_GET_VISION_SOIL_POINTS, {"config_entry_id": "entry-1"}))
+    refreshed = _run(_call(hass, SERVICE_GET_VISION_SOIL_SURFACE, query))
+    applied = _run(
+        _call(
+            hass,
+            SERVICE_APPLY_VISION_SOIL_HEIGHT,
+            {
+                "config_entry_id": "entry-1",
+                "measurement_id": str(uuid.uuid4()),
+                "recommended_x": 200,
+                "recommended_y": 200,
+                "recommended_z_mm": -290,
+                "confidence": 0.91,
+                "apply": True,
+                "human_approved": True,
+            },
+        )
+    )
+    written = _run(_call(hass, SERVICE_GET_VISION_SOIL_SURFACE, query))
+    finer = _run(_call(hass, SERVICE_GET_VISION_SOIL_SURFACE, {**query, "cell_mm": 25}))
+
+    assert applied["status"] == "applied"
+    assert [result["heights"] for result in (first, refreshed, written)] == [
+        [-310.0],
+        [-320.0],
+        [-290.0],
+    ]
+    assert written["point_count"] == 3
+    assert (finer["columns"], finer["heights"]) == (241, [-290.0])
+    # Only the explicit soil-point listing went back to the API.
+    assert manager.api.calls.count("async_get_points") == 2
+
+
+def test_get_vision_soil_surface_rejects_a_cell_size_out_of_range():
+    hass = FakeHass()
+    _make_bot(hass)
+    _async_register_services(hass)
+
+    with pytest.raises(vol.Invalid):
+        _run(
+            _call(
+                hass,
+                SERVICE_GET_VISION_SOIL_SURFACE,
+                {"config_entry_id": "entry-1", "cell_mm": 5},
+            )
+        )
+
+
 def test_start_and_get_soil_capture_are_typed_and_asynchronous():
     hass = FakeHass()
     manager, _ = _make_bot(hass)
@@ -696,6 +786,71 @@ def test_start_and_get_soil_capture_are_typed_and_asynchronous():
     assert finished == [batch_id]
 
 
+def test_start_soil_survey_resolves_points_and_is_pollable():
+    hass = FakeHass()
+    manager, _ = _make_bot(hass)
+    manager.api.points[70] = _soil_point()
+    survey_id = str(uuid.uuid4())
+    calls = []
+
+    def fake_start(**kwargs):
+        calls.append(kwargs)
+        manager.soil_surveys[survey_id] = {
+            "survey_id": survey_id,
+            "status": "queued",
+            "message": "Soil survey queued",
+            "points": [],
+            "expected_frames": [],
+        }
+        return survey_id
+
+    manager.start_soil_survey = fake_start
+    _async_register_services(hass)
+    started = _run(
+        _call(
+            hass,
+            SERVICE_START_VISION_SOIL_SURVEY,
+            {
+                "config_entry_id": "entry-1",
+                "points": [{"point_id": 70}, {"x": 300, "y": 400}],
+                "capture_z": 0,
+                "baseline_mm": 15,
+                "z_offsets_mm": [0],
+            },
+        )
+    )
+    assert started["status"] == "queued"
+    assert started["survey_id"] == survey_id
+    assert [point["id"] for point in calls[0]["points"]] == [70, None]
+    assert calls[0]["points"][1]["x"] == 300.0
+    polled = _run(
+        _call(
+            hass,
+            SERVICE_GET_VISION_SOIL_SURVEY,
+            {"config_entry_id": "entry-1", "survey_id": survey_id},
+        )
+    )
+    assert polled["status"] == "queued"
+    assert "expected_frames" not in polled
+
+    missing = _run(
+        _call(
+            hass,
+            SERVICE_START_VISION_SOIL_SURVEY,
+            {
+                "config_entry_id": "entry-1",
+                "points": [{"x": 300}],
+                "capture_z": 0,
+                "baseline_mm": 15,
+                "z_offsets_mm": [0],
+            },
+        )
+    )
+    assert missing["status"] == "rejected"
+    assert "needs a point_id" in missing["message"]
+    assert len(calls) == 1
+
+
 def test_start_grid_repair_accepts_app_payload_and_is_pollable():
     hass = FakeHass()
     manager, _ = _make_bot(hass)
@@ -755,6 +910,18 @@ def test_delete_vision_image_removes_an_owned_image():
     assert 5 not in manager.api.images
 
 
+def test_delete_vision_image_stops_the_image_being_reused_for_a_grid_cell():
+    hass = FakeHass()
+    manager, _ = _make_bot(hass, device_id="42")
+    image = _image_record(5, created_at=dt_util.utcnow().isoformat())
+    manager.api.images[5] = image
+    manager._recent_images.update([image], device_id="42")
+    assert 5 in manager._recent_images
+    _async_register_services(hass)
+    _run(_call(hass, SERVICE_DELETE_VISION_IMAGE, {"config_entry_id": "entry-1", "image_id": 5}))
+    assert 5 not in manager._recent_images
+
+
 def test_delete_vision_image_rejects_another_farmbots_image():
     hass = FakeHass()
     manager, _ = _make_bot(hass, device_id="42")
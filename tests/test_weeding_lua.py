@@ -0,0 +1,165 @@
+"""Weeding runs as batched on-bot Lua, with per-weed reports parsed off the log."""
+
+import asyncio
+import re
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.util import dt as dt_util
+
+from custom_components.farmbot import weeding_lua
+from custom_components.farmbot.manager import FarmbotManager
+
+from .helpers import FakeHass
+from .test_manager_weeding import SETTINGS, WEED
+
+_CALL = re.compile(r"^cut\((\d+), ([^{]*), \{(.*)\}\)$", re.M)
+_TAG = re.compile(r"local tag='([0-9a-f]+)'")
+
+
+def _weeds(count):
+    return [
+        {
+            **WEED,
+            "weed_id": 100 + n,
+            "transit_start": {"x": 400 + 20 * n, "y": 400},
+            "start": {"x": 450 + 20 * n, "y": 500},
+            "end": {"x": 550 + 20 * n, "y": 500},
+        }
+        for n in range(count)
+    ]
+
+
+def test_lua_watches_current_reverses_slows_raises_and_always_retracts():
+    source = weeding_lua.prelude("abc123", SETTINGS)
+    assert source.count("watch_pin(current") == 1
+    assert "off(motor)" in source
+    assert "math.floor(cutspd/2)" in source
+    assert "local step=10" in source and "zoff=zoff+step" in source
+    assert "fromx=tox" in source
+    assert source.index("move({z=safez,speed=approach})") < source.index(
+        "move({x=transitx,y=transity,z=safez"
+    )
+    assert source.index("move({x=transitx,y=transity,z=safez") < source.index(
+        "move({x=ax,y=ay,z=safez"
+    )
+    assert "move({x=fromx,y=fromy,z=safez" in source
+    retract = source.index("phase='retract'")
+    assert source.index("move({x=bx,y=by,z=safez,speed=approach})") > retract
+    # A pass that raises is caught, switched off and reported, not fatal.
+    assert "pcall(pass" in source
+
+
+def test_lua_only_slows_the_descent_below_the_soil_risk_height():
+    source = weeding_lua.prelude("abc123", SETTINGS)
+    assert "local riskz=-300" in source
+    assert "if targetz < riskz then" in source
+    assert "move({x=fromx,y=fromy,z=riskz,speed=approach})" in source
+    assert "move({x=fromx,y=fromy,z=targetz,speed=25})" in source
+    assert "move({x=fromx,y=fromy,z=targetz,speed=approach})" in source
+
+
+def test_lua_uses_validated_tall_plant_approach_waypoints():
+    call = weeding_lua.cut_call(
+        1, {**WEED, "approach_waypoints": [{"x": 300, "y": 350}, {"x": 400, "y": 400}]}
+    )
+    assert call == "cut(1, 450, 500, 550, 500, 400, 400, 0, -430, {{300,350},{400,400}})"
+    source = weeding_lua.prelude("abc123", SETTINGS)
+    waypoints = source.index("for _, p in ipairs(waypoints)")
+    assert source.index("move({x=transitx") < waypoints < source.index("move({x=ax,y=ay")
+
+
+def test_runs_are_split_into_chunks_that_each_carry_the_routine_once():
+    chunks = weeding_lua.run_chunks("abc123", _weeds(23), SETTINGS, weeds_per_chunk=10)
+
+    assert [chunk.numbers for chunk in chunks] == [
+        tuple(range(1, 11)),
+        tuple(range(11, 21)),
+        (21, 22, 23),
+    ]
+    assert [len(_CALL.findall(chunk.source)) for chunk in chunks] == [10, 10, 3]
+    assert all(chunk.source.count("watch_pin(") == 1 for chunk in chunks)
+    assert all("local tag='abc123'" in chunk.source for chunk in chunks)
+    assert _CALL.findall(chunks[2].source)[0] == ("21", "850, 500, 950, 500, 800, 400, 0, -430", "")
+
+
+def test_reports_are_parsed_and_other_log_lines_ignored():
+    assert weeding_lua.parse_report("ha-weed abc123 4 cut 2") == weeding_lua.WeedReport(
+        tag="abc123", number=4, outcome="cut", passes=2
+    )
+    assert weeding_lua.parse_report("ha-weed abc123 5 overload 3").outcome == "overload"
+    failed = weeding_lua.parse_report("ha-weed abc123 6 error move: target out of range")
+    assert failed.outcome == "error" and failed.message == "move: target out of range"
+    assert weeding_lua.parse_report("ha-capture abc123 7 ok") is None
+    assert weeding_lua.parse_report("Weed pass complete") is None
+
+
+def _make_manager():
+    entry = ConfigEntry(
+        entry_id="entry-1",
+        unique_id="42",
+        domain="farmbot",
+        data={"token": "tok", "device_id": 42, "mqtt_host": "mqtt.example.com"},
+        options={},
+    )
+    manager = FarmbotManager(FakeHass(), "tok", "42", "mqtt.example.com", entry=entry)
+    manager._mqtt_connected = True
+    manager._mqtt = object()
+    manager.status = {
+        "location_data": {"position": {"x": 10.0, "y": 20.0, "z": 0.0}},
+        "informational_settings": {"busy": False, "locked": False},
+    }
+    return manager
+
+
+def test_a_weeding_run_is_one_rpc_per_chunk_with_a_result_per_weed():
+    async def scenario():
+        manager = _make_manager()
+        calls = []
+
+        async def fake_rpc(commands, **_kwargs):
+            calls.append(commands)
+            if commands[0]["kind"] != "lua":
+                return {"kind": "rpc_ok"}
+            source = commands[0]["args"]["lua"]
+            numbers = [int(number) for number, _args, _points in _CALL.findall(source)]
+            if 11 in numbers:
+                raise RuntimeError("lua node timed out")
+            tag = _TAG.search(source).group(1)
+            for number in numbers:
+                outcome = {3: "error bad move", 5: "overload 3"}.get(number, "cut 1")
+                manager._handle_log_message({"message": f"ha-weed {tag} {number} {outcome}"})
+            return {"kind": "rpc_ok"}
+
+        manager.async_rpc_request = fake_rpc
+        weeds = _weeds(12)
+        manager.weeding_runs["run"] = {
+            "run_id": "run",
+            "status": "queued",
+            "message": "queued",
+            "weeds_total": len(weeds),
+            "weeds_completed": 0,
+            "weeds_failed": 0,
+            "results": [],
+            "created_at": dt_util.utcnow().isoformat(),
+        }
+
+        await manager._run_weeding(run_id="run", weeds=weeds, settings=SETTINGS)
+
+        record = manager.weeding_runs["run"]
+        assert record["status"] == "complete"
+        assert [command[0]["kind"] for command in calls] == ["lua", "lua", "write_pin"]
+        assert record["weeds_completed"] == 9 and record["weeds_failed"] == 3
+        results = {result["weed_id"]: result for result in record["results"]}
+        assert [result["weed_id"] for result in record["results"]] == [100 + n for n in range(12)]
+        assert results[100] == {
+            "weed_id": 100,
+            "status": "attempted",
+            "outcome": "cut",
+            "passes": 1,
+        }
+        assert results[102] == {"weed_id": 102, "status": "failed", "message": "bad move"}
+        assert results[104]["outcome"] == "overload" and results[104]["passes"] == 3
+        assert results[110] == {"weed_id": 110, "status": "failed", "message": "lua node timed out"}
+        assert manager._lua_weeding_reports == {}
+
+    asyncio.run(scenario())